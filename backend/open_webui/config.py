@@ -1,3 +1,5 @@
+import asyncio
+import copy
 import json
 import logging
 import os
@@ -7,10 +9,17 @@ from pathlib import Path
 from typing import Generic, Optional, TypeVar
 from urllib.parse import urlparse
 
-import chromadb
+import redis
+import redis.asyncio as aioredis
 import requests
 import yaml
-from open_webui.internal.db import Base, get_db
+from open_webui.internal.db import (
+    Base,
+    engine,
+    get_db,
+    handle_peewee_migration,
+    migration_lock,
+)
 from open_webui.env import (
     OPEN_WEBUI_DIR,
     DATA_DIR,
@@ -22,7 +31,12 @@ from open_webui.env import (
     log,
     DATABASE_URL,
     OFFLINE_MODE,
+    REDIS_URL,
+    WEBSOCKET_MANAGER,
+    WEBSOCKET_REDIS_URL,
+    CONFIG_SYNC_INTERVAL,
 )
+from open_webui.utils.startup import end_startup_stage
 from pydantic import BaseModel
 from sqlalchemy import JSON, Column, DateTime, Integer, func
 
@@ -40,9 +54,18 @@ logging.getLogger("uvicorn.access").addFilter(EndpointFilter())
 ####################################
 
 
-# Function to run the alembic migrations
+def is_database_up_to_date(alembic_cfg) -> bool:
+    from alembic.runtime.migration import MigrationContext
+    from alembic.script import ScriptDirectory
+
+    heads = set(ScriptDirectory.from_config(alembic_cfg).get_heads())
+    with engine.connect() as connection:
+        current = set(MigrationContext.configure(connection).get_current_heads())
+    return current == heads
+
+
+# Function to run the peewee and alembic migrations
 def run_migrations():
-    print("Running migrations")
     try:
         from alembic import command
         from alembic.config import Config
@@ -53,12 +76,23 @@ def run_migrations():
         migrations_path = OPEN_WEBUI_DIR / "migrations"
         alembic_cfg.set_main_option("script_location", str(migrations_path))
 
-        command.upgrade(alembic_cfg, "head")
+        # Workers start together, the first one migrates and the others
+        # find the database up to date once they get the lock
+        with migration_lock():
+            if is_database_up_to_date(alembic_cfg):
+                log.info("Database is up to date")
+                return
+
+            log.info("Running migrations")
+            handle_peewee_migration(DATABASE_URL)
+            command.upgrade(alembic_cfg, "head")
     except Exception as e:
-        print(f"Error: {e}")
+        log.error(f"Error running migrations: {e}")
 
 
+end_startup_stage("imports")
 run_migrations()
+end_startup_stage("migrations")
 
 
 class Config(Base):
@@ -89,12 +123,6 @@ def save_to_db(data):
         db.commit()
 
 
-def reset_config():
-    with get_db() as db:
-        db.query(Config).delete()
-        db.commit()
-
-
 # When initializing, check if config.json exists and migrate it to the database
 if os.path.exists(f"{DATA_DIR}/config.json"):
     data = load_json_config()
@@ -154,13 +182,21 @@ DEFAULT_CONFIG = {
 }
 
 
-def get_config():
+def load_config() -> tuple[dict, int]:
     with get_db() as db:
         config_entry = db.query(Config).order_by(Config.id.desc()).first()
-        return config_entry.data if config_entry else DEFAULT_CONFIG
+        if config_entry:
+            return config_entry.data, config_entry.version or 0
+        return DEFAULT_CONFIG, 0
+
+
+def get_config():
+    return load_config()[0]
 
 
-CONFIG_DATA = get_config()
+# Every save increments the version of the config, so workers can tell
+# whether theirs is still current
+CONFIG_DATA, CONFIG_VERSION = load_config()
 
 
 def get_config_value(config_path: str):
@@ -174,19 +210,185 @@ def get_config_value(config_path: str):
     return cur_config
 
 
+def set_config_value(config: dict, config_path: str, value):
+    path_parts = config_path.split(".")
+    for key in path_parts[:-1]:
+        if key not in config or not isinstance(config[key], dict):
+            config[key] = {}
+        config = config[key]
+    config[path_parts[-1]] = value
+
+
 PERSISTENT_CONFIG_REGISTRY = []
 
+CONFIG_CHANNEL = "open-webui:config"
+
+if WEBSOCKET_MANAGER == "redis":
+    CONFIG_REDIS = redis.Redis.from_url(WEBSOCKET_REDIS_URL, decode_responses=True)
+else:
+    CONFIG_REDIS = None
+
+
+def swap_config(config: dict, version: int):
+    """
+    Makes `config` the current config of this worker. Values are replaced, not
+    modified, so readers never need a lock; this runs without awaiting, so no
+    request handler sees half of a change.
+    """
+    global CONFIG_DATA, CONFIG_VERSION
+    CONFIG_DATA = config
+    CONFIG_VERSION = version
+
+    # Trigger updates on all registered PersistentConfig entries
+    for config_item in PERSISTENT_CONFIG_REGISTRY:
+        config_item.update()
+
+
+def write_config(changes: Optional[dict] = None, config: Optional[dict] = None):
+    """
+    Saves `changes` ({config path: value}) on top of the latest config in the
+    database, or replaces it with `config`, then notifies the other workers.
+
+    The row is only updated if its version didn't change since it was read,
+    so concurrent saves from several workers are all kept.
+    """
+    while True:
+        with get_db() as db:
+            config_entry = db.query(Config).order_by(Config.id.desc()).first()
+
+            if config is not None:
+                data = config
+            else:
+                data = copy.deepcopy(
+                    config_entry.data if config_entry else DEFAULT_CONFIG
+                )
+                for config_path, value in changes.items():
+                    set_config_value(data, config_path, value)
+
+            if not config_entry:
+                version = 1
+                db.add(Config(data=data, version=version))
+            else:
+                version = (config_entry.version or 0) + 1
+                updated = (
+                    db.query(Config)
+                    .filter_by(id=config_entry.id, version=config_entry.version)
+                    .update(
+                        {
+                            "data": data,
+                            "version": version,
+                            "updated_at": datetime.now(),
+                        },
+                        synchronize_session=False,
+                    )
+                )
+                if not updated:
+                    # Saved by another worker in the meantime
+                    db.rollback()
+                    continue
+            db.commit()
+            break
+
+    swap_config(data, version)
+
+    if CONFIG_REDIS is not None:
+        try:
+            # Full configs are too large for a message, they are read from the db
+            CONFIG_REDIS.publish(
+                CONFIG_CHANNEL,
+                json.dumps({"version": version, "changes": changes}),
+            )
+        except Exception as e:
+            log.error(f"Error publishing config change: {e}")
+
+
+def apply_config_changes(version: int, changes: Optional[dict]) -> bool:
+    """
+    Applies the `changes` another worker saved as `version`. Returns False if
+    they can't be, because versions were missed, and the config must be
+    reloaded instead.
+    """
+    if version <= CONFIG_VERSION:
+        return True
+    if version != CONFIG_VERSION + 1 or changes is None:
+        return False
+
+    data = copy.deepcopy(CONFIG_DATA)
+    for config_path, value in changes.items():
+        set_config_value(data, config_path, value)
+
+    log.info(f"Config updated to version {version}")
+    swap_config(data, version)
+    return True
+
+
+async def reload_config():
+    data, version = await asyncio.to_thread(load_config)
+    # Swapped on the event loop, never from a thread
+    if version > CONFIG_VERSION:
+        log.info(f"Config reloaded at version {version}")
+        swap_config(data, version)
+
+
+def get_latest_config_version() -> int:
+    with get_db() as db:
+        config_entry = db.query(Config.version).order_by(Config.id.desc()).first()
+        return (config_entry.version or 0) if config_entry else 0
+
+
+async def poll_config_changes():
+    while True:
+        await asyncio.sleep(CONFIG_SYNC_INTERVAL)
+        try:
+            if await asyncio.to_thread(get_latest_config_version) > CONFIG_VERSION:
+                await reload_config()
+        except Exception as e:
+            log.error(f"Error checking for config changes: {e}")
+
+
+async def listen_config_changes():
+    client = aioredis.Redis.from_url(WEBSOCKET_REDIS_URL, decode_responses=True)
+    while True:
+        try:
+            async with client.pubsub() as pubsub:
+                await pubsub.subscribe(CONFIG_CHANNEL)
+                async for message in pubsub.listen():
+                    if message["type"] == "subscribe":
+                        # Catch up on what was missed while unsubscribed
+                        await reload_config()
+                    elif message["type"] == "message":
+                        change = json.loads(message["data"])
+                        if not apply_config_changes(
+                            change["version"], change.get("changes")
+                        ):
+                            await reload_config()
+        except Exception as e:
+            log.error(f"Error listening for config changes: {e}")
+        await asyncio.sleep(CONFIG_SYNC_INTERVAL or 10)
+
+
+async def watch_config_changes():
+    """Keeps the config of this worker in sync with the others."""
+    watchers = []
+    if CONFIG_REDIS is not None:
+        watchers.append(listen_config_changes())
+    if CONFIG_SYNC_INTERVAL > 0:
+        # Also with Redis, in case a message was lost
+        watchers.append(poll_config_changes())
+    await asyncio.gather(*watchers)
+
+
+def reset_config():
+    """
+    Replaces the config with the default one. It is saved as the next version,
+    not from scratch, so workers still holding the old config pick it up.
+    """
+    write_config(config=copy.deepcopy(DEFAULT_CONFIG))
+
 
 def save_config(config):
-    global CONFIG_DATA
-    global PERSISTENT_CONFIG_REGISTRY
     try:
-        save_to_db(config)
-        CONFIG_DATA = config
-
-        # Trigger updates on all registered PersistentConfig entries
-        for config_item in PERSISTENT_CONFIG_REGISTRY:
-            config_item.update()
+        write_config(config=config)
     except Exception as e:
         log.exception(e)
         return False
@@ -228,20 +430,14 @@ class PersistentConfig(Generic[T]):
 
     def update(self):
         new_value = get_config_value(self.config_path)
-        if new_value is not None:
+        if new_value is not None and new_value != self.value:
             self.value = new_value
+            self.config_value = new_value
             log.info(f"Updated {self.env_name} to new value {self.value}")
 
     def save(self):
         log.info(f"Saving '{self.env_name}' to the database")
-        path_parts = self.config_path.split(".")
-        sub_config = CONFIG_DATA
-        for key in path_parts[:-1]:
-            if key not in sub_config:
-                sub_config[key] = {}
-            sub_config = sub_config[key]
-        sub_config[path_parts[-1]] = self.value
-        save_to_db(CONFIG_DATA)
+        write_config(changes={self.config_path: self.value})
         self.config_value = self.value
 
 
@@ -588,6 +784,15 @@ S3_REGION_NAME = os.environ.get("S3_REGION_NAME", None)
 S3_BUCKET_NAME = os.environ.get("S3_BUCKET_NAME", None)
 S3_ENDPOINT_URL = os.environ.get("S3_ENDPOINT_URL", None)
 
+# Local copies of S3 files are evicted (least recently used first) above this
+# many bytes, 0 keeps all of them
+S3_CACHE_MAX_SIZE = os.environ.get("S3_CACHE_MAX_SIZE", f"{10 * 1024**3}")
+
+try:
+    S3_CACHE_MAX_SIZE = int(S3_CACHE_MAX_SIZE)
+except Exception:
+    S3_CACHE_MAX_SIZE = 10 * 1024**3
+
 ####################################
 # File Upload DIR
 ####################################
@@ -661,6 +866,33 @@ OLLAMA_API_CONFIGS = PersistentConfig(
     {},
 )
 
+# Selection of the Ollama backend among the ones serving a model:
+# random, least_outstanding, ewma or consistent_hash (by chat)
+OLLAMA_LOAD_BALANCER_STRATEGY = os.environ.get(
+    "OLLAMA_LOAD_BALANCER_STRATEGY", "least_outstanding"
+)
+
+try:
+    OLLAMA_LOAD_BALANCER_FAILURE_THRESHOLD = int(
+        os.environ.get("OLLAMA_LOAD_BALANCER_FAILURE_THRESHOLD", "3")
+    )
+except Exception:
+    OLLAMA_LOAD_BALANCER_FAILURE_THRESHOLD = 3
+
+try:
+    OLLAMA_LOAD_BALANCER_COOLDOWN = float(
+        os.environ.get("OLLAMA_LOAD_BALANCER_COOLDOWN", "30")
+    )
+except Exception:
+    OLLAMA_LOAD_BALANCER_COOLDOWN = 30.0
+
+try:
+    OLLAMA_LOAD_BALANCER_MAX_ATTEMPTS = int(
+        os.environ.get("OLLAMA_LOAD_BALANCER_MAX_ATTEMPTS", "2")
+    )
+except Exception:
+    OLLAMA_LOAD_BALANCER_MAX_ATTEMPTS = 2
+
 ####################################
 # OPENAI_API
 ####################################
@@ -1173,8 +1405,9 @@ VECTOR_DB = os.environ.get("VECTOR_DB", "chroma")
 
 # Chroma
 CHROMA_DATA_PATH = f"{DATA_DIR}/vector_db"
-CHROMA_TENANT = os.environ.get("CHROMA_TENANT", chromadb.DEFAULT_TENANT)
-CHROMA_DATABASE = os.environ.get("CHROMA_DATABASE", chromadb.DEFAULT_DATABASE)
+# Defaults of chromadb, which is only imported once the client is created
+CHROMA_TENANT = os.environ.get("CHROMA_TENANT", "default_tenant")
+CHROMA_DATABASE = os.environ.get("CHROMA_DATABASE", "default_database")
 CHROMA_HTTP_HOST = os.environ.get("CHROMA_HTTP_HOST", "")
 CHROMA_HTTP_PORT = int(os.environ.get("CHROMA_HTTP_PORT", "8000"))
 CHROMA_CLIENT_AUTH_PROVIDER = os.environ.get("CHROMA_CLIENT_AUTH_PROVIDER", "")
@@ -1264,6 +1497,17 @@ ENABLE_RAG_HYBRID_SEARCH = PersistentConfig(
     os.environ.get("ENABLE_RAG_HYBRID_SEARCH", "").lower() == "true",
 )
 
+# Persistent per-collection BM25 indexes used by hybrid search
+RAG_BM25_INDEX_DIR = os.environ.get("RAG_BM25_INDEX_DIR", f"{CACHE_DIR}/bm25")
+
+# Maximum number of collections (or hybrid searches) queried concurrently per request
+RAG_QUERY_CONCURRENCY = os.environ.get("RAG_QUERY_CONCURRENCY", "8")
+
+try:
+    RAG_QUERY_CONCURRENCY = max(int(RAG_QUERY_CONCURRENCY), 1)
+except Exception:
+    RAG_QUERY_CONCURRENCY = 8
+
 RAG_FILE_MAX_COUNT = PersistentConfig(
     "RAG_FILE_MAX_COUNT",
     "rag.file.max_count",
@@ -1327,6 +1571,77 @@ RAG_EMBEDDING_BATCH_SIZE = PersistentConfig(
     ),
 )
 
+# Batches sent concurrently to remote (OpenAI/Ollama) embedding backends
+RAG_EMBEDDING_CONCURRENCY = os.environ.get("RAG_EMBEDDING_CONCURRENCY", "4")
+
+try:
+    RAG_EMBEDDING_CONCURRENCY = max(int(RAG_EMBEDDING_CONCURRENCY), 1)
+except Exception:
+    RAG_EMBEDDING_CONCURRENCY = 4
+
+# Retries of a batch on 429/5xx and connection errors, with exponential backoff
+RAG_EMBEDDING_MAX_RETRIES = os.environ.get("RAG_EMBEDDING_MAX_RETRIES", "3")
+
+try:
+    RAG_EMBEDDING_MAX_RETRIES = int(RAG_EMBEDDING_MAX_RETRIES)
+except Exception:
+    RAG_EMBEDDING_MAX_RETRIES = 3
+
+# Files and knowledge batches queued for processing, run by each worker
+INGESTION_WORKER_CONCURRENCY = os.environ.get("INGESTION_WORKER_CONCURRENCY", "2")
+
+try:
+    INGESTION_WORKER_CONCURRENCY = max(int(INGESTION_WORKER_CONCURRENCY), 1)
+except Exception:
+    INGESTION_WORKER_CONCURRENCY = 2
+
+INGESTION_JOB_MAX_RETRIES = os.environ.get("INGESTION_JOB_MAX_RETRIES", "2")
+
+try:
+    INGESTION_JOB_MAX_RETRIES = int(INGESTION_JOB_MAX_RETRIES)
+except Exception:
+    INGESTION_JOB_MAX_RETRIES = 2
+
+# Running jobs without progress for this many seconds are picked up again
+INGESTION_JOB_TIMEOUT = os.environ.get("INGESTION_JOB_TIMEOUT", "3600")
+
+try:
+    INGESTION_JOB_TIMEOUT = int(INGESTION_JOB_TIMEOUT)
+except Exception:
+    INGESTION_JOB_TIMEOUT = 3600
+
+# Cache of query embeddings keyed by (engine, model, text)
+RAG_EMBEDDING_CACHE_SIZE = os.environ.get("RAG_EMBEDDING_CACHE_SIZE", "10000")
+
+try:
+    RAG_EMBEDDING_CACHE_SIZE = int(RAG_EMBEDDING_CACHE_SIZE)
+except Exception:
+    RAG_EMBEDDING_CACHE_SIZE = 10000
+
+# Optional second tier shared across restarts/workers: "", "disk" or "redis"
+RAG_EMBEDDING_CACHE_BACKEND = os.environ.get("RAG_EMBEDDING_CACHE_BACKEND", "").lower()
+RAG_EMBEDDING_CACHE_DIR = os.environ.get(
+    "RAG_EMBEDDING_CACHE_DIR", f"{CACHE_DIR}/embeddings"
+)
+RAG_EMBEDDING_CACHE_DISK_SIZE = os.environ.get(
+    "RAG_EMBEDDING_CACHE_DISK_SIZE", "100000"
+)
+
+try:
+    RAG_EMBEDDING_CACHE_DISK_SIZE = int(RAG_EMBEDDING_CACHE_DISK_SIZE)
+except Exception:
+    RAG_EMBEDDING_CACHE_DISK_SIZE = 100000
+
+RAG_EMBEDDING_CACHE_REDIS_URL = os.environ.get(
+    "RAG_EMBEDDING_CACHE_REDIS_URL", REDIS_URL
+)
+RAG_EMBEDDING_CACHE_TTL = os.environ.get("RAG_EMBEDDING_CACHE_TTL", "604800")
+
+try:
+    RAG_EMBEDDING_CACHE_TTL = int(RAG_EMBEDDING_CACHE_TTL)
+except Exception:
+    RAG_EMBEDDING_CACHE_TTL = 604800
+
 RAG_RERANKING_MODEL = PersistentConfig(
     "RAG_RERANKING_MODEL",
     "rag.reranking_model",
@@ -1344,6 +1659,10 @@ RAG_RERANKING_MODEL_TRUST_REMOTE_CODE = (
     os.environ.get("RAG_RERANKING_MODEL_TRUST_REMOTE_CODE", "True").lower() == "true"
 )
 
+# Load the local embedding and reranking models in the background once the
+# server starts, instead of on first use
+RAG_PRELOAD_MODELS = os.environ.get("RAG_PRELOAD_MODELS", "True").lower() == "true"
+
 
 RAG_TEXT_SPLITTER = PersistentConfig(
     "RAG_TEXT_SPLITTER",
@@ -1434,6 +1753,62 @@ ENABLE_RAG_LOCAL_WEB_FETCH = (
     os.getenv("ENABLE_RAG_LOCAL_WEB_FETCH", "False").lower() == "true"
 )
 
+# Time budget in seconds for fetching one web page, redirects included
+RAG_WEB_LOADER_TIMEOUT = os.environ.get("RAG_WEB_LOADER_TIMEOUT", "10")
+
+try:
+    RAG_WEB_LOADER_TIMEOUT = float(RAG_WEB_LOADER_TIMEOUT)
+except Exception:
+    RAG_WEB_LOADER_TIMEOUT = 10.0
+
+# Web pages are truncated to this many bytes
+RAG_WEB_LOADER_MAX_SIZE = os.environ.get("RAG_WEB_LOADER_MAX_SIZE", "5242880")
+
+try:
+    RAG_WEB_LOADER_MAX_SIZE = int(RAG_WEB_LOADER_MAX_SIZE)
+except Exception:
+    RAG_WEB_LOADER_MAX_SIZE = 5242880
+
+RAG_WEB_LOADER_REQUESTS_PER_HOST = os.environ.get(
+    "RAG_WEB_LOADER_REQUESTS_PER_HOST", "2"
+)
+
+try:
+    RAG_WEB_LOADER_REQUESTS_PER_HOST = max(int(RAG_WEB_LOADER_REQUESTS_PER_HOST), 1)
+except Exception:
+    RAG_WEB_LOADER_REQUESTS_PER_HOST = 2
+
+# Fetched pages are served without a request for this many seconds, and
+# revalidated with their ETag/Last-Modified afterwards (0 disables the cache)
+RAG_WEB_LOADER_CACHE_TTL = os.environ.get("RAG_WEB_LOADER_CACHE_TTL", "3600")
+
+try:
+    RAG_WEB_LOADER_CACHE_TTL = int(RAG_WEB_LOADER_CACHE_TTL)
+except Exception:
+    RAG_WEB_LOADER_CACHE_TTL = 3600
+
+RAG_WEB_LOADER_CACHE_SIZE = os.environ.get("RAG_WEB_LOADER_CACHE_SIZE", "256")
+
+try:
+    RAG_WEB_LOADER_CACHE_SIZE = int(RAG_WEB_LOADER_CACHE_SIZE)
+except Exception:
+    RAG_WEB_LOADER_CACHE_SIZE = 256
+
+# Search engine results are reused for this many seconds (0 disables the cache)
+RAG_WEB_SEARCH_CACHE_TTL = os.environ.get("RAG_WEB_SEARCH_CACHE_TTL", "3600")
+
+try:
+    RAG_WEB_SEARCH_CACHE_TTL = int(RAG_WEB_SEARCH_CACHE_TTL)
+except Exception:
+    RAG_WEB_SEARCH_CACHE_TTL = 3600
+
+RAG_WEB_SEARCH_CACHE_SIZE = os.environ.get("RAG_WEB_SEARCH_CACHE_SIZE", "1000")
+
+try:
+    RAG_WEB_SEARCH_CACHE_SIZE = int(RAG_WEB_SEARCH_CACHE_SIZE)
+except Exception:
+    RAG_WEB_SEARCH_CACHE_SIZE = 1000
+
 YOUTUBE_LOADER_LANGUAGE = PersistentConfig(
     "YOUTUBE_LOADER_LANGUAGE",
     "rag.youtube_loader_language",
@@ -1969,3 +2344,6 @@ LDAP_CA_CERT_FILE = PersistentConfig(
 LDAP_CIPHERS = PersistentConfig(
     "LDAP_CIPHERS", "ldap.server.ciphers", os.environ.get("LDAP_CIPHERS", "ALL")
 )
+
+
+end_startup_stage("config")
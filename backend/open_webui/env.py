@@ -314,6 +314,22 @@ ENABLE_REALTIME_CHAT_SAVE = (
     os.environ.get("ENABLE_REALTIME_CHAT_SAVE", "True").lower() == "true"
 )
 
+# Streamed messages are saved at most once per interval (in seconds), or sooner
+# once this many bytes of new content have been buffered
+REALTIME_CHAT_SAVE_INTERVAL = os.environ.get("REALTIME_CHAT_SAVE_INTERVAL", "1")
+
+try:
+    REALTIME_CHAT_SAVE_INTERVAL = float(REALTIME_CHAT_SAVE_INTERVAL)
+except Exception:
+    REALTIME_CHAT_SAVE_INTERVAL = 1.0
+
+REALTIME_CHAT_SAVE_MAX_BYTES = os.environ.get("REALTIME_CHAT_SAVE_MAX_BYTES", "4096")
+
+try:
+    REALTIME_CHAT_SAVE_MAX_BYTES = int(REALTIME_CHAT_SAVE_MAX_BYTES)
+except Exception:
+    REALTIME_CHAT_SAVE_MAX_BYTES = 4096
+
 ####################################
 # REDIS
 ####################################
@@ -334,6 +350,25 @@ BYPASS_MODEL_ACCESS_CONTROL = (
     os.environ.get("BYPASS_MODEL_ACCESS_CONTROL", "False").lower() == "true"
 )
 
+# Authenticated users are cached for this many seconds (0 disables the cache).
+# Changes made on other workers are picked up once the entry expires.
+USER_CACHE_TTL = os.environ.get("USER_CACHE_TTL", "5")
+
+try:
+    USER_CACHE_TTL = float(USER_CACHE_TTL)
+except Exception:
+    USER_CACHE_TTL = 5.0
+
+# `last_active_at` is written at most once per user per interval (in seconds)
+USER_LAST_ACTIVE_UPDATE_INTERVAL = os.environ.get(
+    "USER_LAST_ACTIVE_UPDATE_INTERVAL", "60"
+)
+
+try:
+    USER_LAST_ACTIVE_UPDATE_INTERVAL = float(USER_LAST_ACTIVE_UPDATE_INTERVAL)
+except Exception:
+    USER_LAST_ACTIVE_UPDATE_INTERVAL = 60.0
+
 ####################################
 # WEBUI_SECRET_KEY
 ####################################
@@ -366,6 +401,44 @@ WEBSOCKET_MANAGER = os.environ.get("WEBSOCKET_MANAGER", "")
 
 WEBSOCKET_REDIS_URL = os.environ.get("WEBSOCKET_REDIS_URL", REDIS_URL)
 
+# "redis" shares the running tasks between workers, so they can be listed and
+# stopped from any of them
+TASK_MANAGER = os.environ.get("TASK_MANAGER", WEBSOCKET_MANAGER)
+
+TASK_REDIS_URL = os.environ.get("TASK_REDIS_URL", WEBSOCKET_REDIS_URL)
+
+# Workers renew their ownership of their tasks every interval (in seconds), the
+# tasks of a worker that hasn't for `TASK_HEARTBEAT_TIMEOUT` are dropped
+TASK_HEARTBEAT_INTERVAL = os.environ.get("TASK_HEARTBEAT_INTERVAL", "10")
+
+try:
+    TASK_HEARTBEAT_INTERVAL = float(TASK_HEARTBEAT_INTERVAL)
+except Exception:
+    TASK_HEARTBEAT_INTERVAL = 10.0
+
+TASK_HEARTBEAT_TIMEOUT = os.environ.get("TASK_HEARTBEAT_TIMEOUT", "30")
+
+try:
+    TASK_HEARTBEAT_TIMEOUT = float(TASK_HEARTBEAT_TIMEOUT)
+except Exception:
+    TASK_HEARTBEAT_TIMEOUT = 30.0
+
+# Seconds between checks for configuration changes saved by other workers (0
+# disables them). With WEBSOCKET_MANAGER=redis changes are also pushed at once.
+CONFIG_SYNC_INTERVAL = os.environ.get("CONFIG_SYNC_INTERVAL", "10")
+
+try:
+    CONFIG_SYNC_INTERVAL = float(CONFIG_SYNC_INTERVAL)
+except Exception:
+    CONFIG_SYNC_INTERVAL = 10.0
+
+####################################
+# METRICS
+####################################
+
+# Serves Prometheus metrics on /metrics, without authentication
+ENABLE_METRICS = os.environ.get("ENABLE_METRICS", "False").lower() == "true"
+
 AIOHTTP_CLIENT_TIMEOUT = os.environ.get("AIOHTTP_CLIENT_TIMEOUT", "")
 
 if AIOHTTP_CLIENT_TIMEOUT == "":
@@ -390,6 +463,30 @@ else:
     except Exception:
         AIOHTTP_CLIENT_TIMEOUT_OPENAI_MODEL_LIST = 5
 
+# Connection pool of the shared upstream HTTP client (one pool per upstream host)
+AIOHTTP_CLIENT_POOL_SIZE = os.environ.get("AIOHTTP_CLIENT_POOL_SIZE", "100")
+
+try:
+    AIOHTTP_CLIENT_POOL_SIZE = int(AIOHTTP_CLIENT_POOL_SIZE)
+except Exception:
+    AIOHTTP_CLIENT_POOL_SIZE = 100
+
+AIOHTTP_CLIENT_KEEPALIVE_TIMEOUT = os.environ.get(
+    "AIOHTTP_CLIENT_KEEPALIVE_TIMEOUT", "30"
+)
+
+try:
+    AIOHTTP_CLIENT_KEEPALIVE_TIMEOUT = float(AIOHTTP_CLIENT_KEEPALIVE_TIMEOUT)
+except Exception:
+    AIOHTTP_CLIENT_KEEPALIVE_TIMEOUT = 30.0
+
+AIOHTTP_CLIENT_DNS_CACHE_TTL = os.environ.get("AIOHTTP_CLIENT_DNS_CACHE_TTL", "300")
+
+try:
+    AIOHTTP_CLIENT_DNS_CACHE_TTL = int(AIOHTTP_CLIENT_DNS_CACHE_TTL)
+except Exception:
+    AIOHTTP_CLIENT_DNS_CACHE_TTL = 300
+
 ####################################
 # OFFLINE_MODE
 ####################################
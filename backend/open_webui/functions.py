@@ -27,7 +27,7 @@ from open_webui.socket.main import (
 from open_webui.models.functions import Functions
 from open_webui.models.models import Models
 
-from open_webui.utils.plugin import load_function_module_by_id
+from open_webui.utils.plugin import get_function_module
 from open_webui.utils.tools import get_tools
 from open_webui.utils.access_control import has_access
 
@@ -51,13 +51,10 @@ log = logging.getLogger(__name__)
 log.setLevel(SRC_LOG_LEVELS["MAIN"])
 
 
-def get_function_module_by_id(request: Request, pipe_id: str):
-    # Check if function is already loaded
-    if pipe_id not in request.app.state.FUNCTIONS:
-        function_module, _, _ = load_function_module_by_id(pipe_id)
-        request.app.state.FUNCTIONS[pipe_id] = function_module
-    else:
-        function_module = request.app.state.FUNCTIONS[pipe_id]
+def get_function_module_by_id(request: Request, pipe_id: str, function=None):
+    # Reuses the loaded function, only checking if its content changed when the
+    # row is at hand (i.e. when listing the models)
+    function_module = get_function_module(request, pipe_id, function)
 
     if hasattr(function_module, "valves") and hasattr(function_module, "Valves"):
         valves = Functions.get_function_valves_by_id(pipe_id)
@@ -70,7 +67,7 @@ async def get_function_models(request):
     pipe_models = []
 
     for pipe in pipes:
-        function_module = get_function_module_by_id(request, pipe.id)
+        function_module = get_function_module_by_id(request, pipe.id, pipe)
 
         # Check if function is a manifold
         if hasattr(function_module, "pipes"):
@@ -1,11 +1,13 @@
 import json
 import logging
+import zlib
 from contextlib import contextmanager
 from typing import Any, Optional
 
 from open_webui.internal.wrappers import register_connection
 from open_webui.env import (
     OPEN_WEBUI_DIR,
+    DATA_DIR,
     DATABASE_URL,
     SRC_LOG_LEVELS,
     DATABASE_POOL_MAX_OVERFLOW,
@@ -14,7 +16,7 @@ from open_webui.env import (
     DATABASE_POOL_TIMEOUT,
 )
 from peewee_migrate import Router
-from sqlalchemy import Dialect, create_engine, types
+from sqlalchemy import Dialect, create_engine, text, types
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import scoped_session, sessionmaker
 from sqlalchemy.pool import QueuePool, NullPool
@@ -71,9 +73,6 @@ def handle_peewee_migration(DATABASE_URL):
         assert db.is_closed(), "Database connection is still open."
 
 
-handle_peewee_migration(DATABASE_URL)
-
-
 SQLALCHEMY_DATABASE_URL = DATABASE_URL
 if "sqlite" in SQLALCHEMY_DATABASE_URL:
     engine = create_engine(
@@ -112,3 +111,39 @@ def get_session():
 
 
 get_db = contextmanager(get_session)
+
+
+@contextmanager
+def migration_lock():
+    """
+    Held while migrating the database, so concurrent workers migrate it once.
+    A file lock covers the workers of this host, and a PostgreSQL advisory
+    lock those of other hosts.
+    """
+    try:
+        import fcntl
+    except ImportError:
+        # Windows, which runs a single worker
+        fcntl = None
+
+    with open(DATA_DIR / ".migrations.lock", "a") as lock_file:
+        if fcntl:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            if engine.dialect.name == "postgresql":
+                key = zlib.crc32(b"open-webui:migrations")
+                with engine.connect() as connection:
+                    connection.execute(
+                        text("SELECT pg_advisory_lock(:key)"), {"key": key}
+                    )
+                    try:
+                        yield
+                    finally:
+                        connection.execute(
+                            text("SELECT pg_advisory_unlock(:key)"), {"key": key}
+                        )
+            else:
+                yield
+        finally:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
@@ -9,6 +9,13 @@ import sys
 import time
 import random
 
+# First, so the startup is timed from here
+from open_webui.utils.startup import (
+    STARTUP_STAGES,
+    end_startup_stage,
+    get_startup_time,
+)
+
 from contextlib import asynccontextmanager
 from urllib.parse import urlencode, parse_qs, urlparse
 from pydantic import BaseModel
@@ -77,12 +84,13 @@ from open_webui.routers import (
 
 from open_webui.routers.retrieval import (
     get_embedding_function,
-    get_ef,
-    get_rf,
+    get_lazy_ef,
+    get_lazy_rf,
 )
 
 from open_webui.internal.db import Session
 
+from open_webui.models.chats import Chats
 from open_webui.models.functions import Functions
 from open_webui.models.models import Models
 from open_webui.models.users import UserModel, Users
@@ -139,6 +147,7 @@ from open_webui.config import (
     RAG_EMBEDDING_MODEL_TRUST_REMOTE_CODE,
     RAG_RERANKING_MODEL,
     RAG_RERANKING_MODEL_AUTO_UPDATE,
+    RAG_PRELOAD_MODELS,
     RAG_RERANKING_MODEL_TRUST_REMOTE_CODE,
     RAG_EMBEDDING_ENGINE,
     RAG_EMBEDDING_BATCH_SIZE,
@@ -260,6 +269,7 @@ from open_webui.config import (
     AUTOCOMPLETE_GENERATION_INPUT_MAX_LENGTH,
     AppConfig,
     reset_config,
+    watch_config_changes,
 )
 from open_webui.env import (
     CHANGELOG,
@@ -277,6 +287,7 @@ from open_webui.env import (
     BYPASS_MODEL_ACCESS_CONTROL,
     RESET_CONFIG_ON_START,
     OFFLINE_MODE,
+    ENABLE_METRICS,
 )
 
 
@@ -291,17 +302,39 @@ from open_webui.utils.chat import (
     chat_action as chat_action_handler,
 )
 from open_webui.utils.middleware import process_chat_payload, process_chat_response
-from open_webui.utils.access_control import has_access
+from open_webui.utils.metrics import (
+    DB_QUERY_COUNT,
+    REQUEST_DB_QUERIES,
+    REQUEST_DURATION,
+    generate_metrics,
+    get_route_name,
+    monitor_event_loop_lag,
+)
+from open_webui.utils.access_control import has_access, user_groups_cache
 
 from open_webui.utils.auth import (
     decode_token,
     get_admin_user,
     get_verified_user,
+    periodic_user_last_active_flush,
 )
 from open_webui.utils.oauth import oauth_manager
+from open_webui.utils.http_client import HTTP_CLIENT
+from open_webui.utils.plugin import install_plugin_requirements
+from open_webui.retrieval.ingestion import INGESTION_QUEUE
+from open_webui.retrieval.models.lazy import LazyModel, are_models_ready
+from open_webui.retrieval.vector.connector import VECTOR_DB_CLIENT
 from open_webui.utils.security_headers import SecurityHeadersMiddleware
 
-from open_webui.tasks import stop_task, list_tasks  # Import from tasks.py
+from open_webui.constants import ERROR_MESSAGES
+from open_webui.tasks import (
+    TASK_REGISTRY,
+    stop_task,
+    list_tasks,
+    list_task_ids_by_chat_id,
+)  # Import from tasks.py
+
+end_startup_stage("routers")
 
 if SAFE_MODE:
     print("SAFE MODE ENABLED")
@@ -346,8 +379,28 @@ async def lifespan(app: FastAPI):
         reset_config()
 
     asyncio.create_task(periodic_usage_pool_cleanup())
+    asyncio.create_task(periodic_user_last_active_flush())
+    asyncio.create_task(asyncio.to_thread(install_plugin_requirements))
+    asyncio.create_task(INGESTION_QUEUE.run(app))
+    asyncio.create_task(TASK_REGISTRY.run())
+    asyncio.create_task(watch_config_changes())
+    if ENABLE_METRICS:
+        asyncio.create_task(monitor_event_loop_lag())
+
+    if RAG_PRELOAD_MODELS:
+        # Loaded off the event loop, requests needing them wait for them
+        asyncio.create_task(asyncio.to_thread(preload_retrieval, app))
+
+    app.state.HTTP_CLIENT = HTTP_CLIENT
+
+    end_startup_stage("lifespan")
+    log.info(f"Started in {get_startup_time():.2f}s")
     yield
 
+    await HTTP_CLIENT.close()
+    await TASK_REGISTRY.close()
+    Users.flush_user_last_active()
+
 
 app = FastAPI(
     docs_url="/docs" if ENV == "dev" else None,
@@ -530,20 +583,17 @@ app.state.rf = None
 app.state.YOUTUBE_LOADER_TRANSLATION = None
 
 
-try:
-    app.state.ef = get_ef(
-        app.state.config.RAG_EMBEDDING_ENGINE,
-        app.state.config.RAG_EMBEDDING_MODEL,
-        RAG_EMBEDDING_MODEL_AUTO_UPDATE,
-    )
+# Loaded in the background once the server starts, or on first use
+app.state.ef = get_lazy_ef(
+    app.state.config.RAG_EMBEDDING_ENGINE,
+    app.state.config.RAG_EMBEDDING_MODEL,
+    RAG_EMBEDDING_MODEL_AUTO_UPDATE,
+)
 
-    app.state.rf = get_rf(
-        app.state.config.RAG_RERANKING_MODEL,
-        RAG_RERANKING_MODEL_AUTO_UPDATE,
-    )
-except Exception as e:
-    log.error(f"Error updating models: {e}")
-    pass
+app.state.rf = get_lazy_rf(
+    app.state.config.RAG_RERANKING_MODEL,
+    RAG_RERANKING_MODEL_AUTO_UPDATE,
+)
 
 
 app.state.EMBEDDING_FUNCTION = get_embedding_function(
@@ -695,13 +745,32 @@ async def commit_session_after_request(request: Request, call_next):
     return response
 
 
+@app.middleware("http")
+async def cache_user_groups(request: Request, call_next):
+    with user_groups_cache():
+        return await call_next(request)
+
+
 @app.middleware("http")
 async def check_url(request: Request, call_next):
-    start_time = int(time.time())
+    start_time = time.perf_counter()
     request.state.enable_api_key = app.state.config.ENABLE_API_KEY
-    response = await call_next(request)
-    process_time = int(time.time()) - start_time
-    response.headers["X-Process-Time"] = str(process_time)
+
+    db_queries = [0]
+    token = DB_QUERY_COUNT.set(db_queries)
+    try:
+        response = await call_next(request)
+    finally:
+        DB_QUERY_COUNT.reset(token)
+
+    process_time = time.perf_counter() - start_time
+    response.headers["X-Process-Time"] = f"{process_time:.4f}"
+
+    route = get_route_name(request.scope)
+    REQUEST_DURATION.labels(request.method, route, response.status_code).observe(
+        process_time
+    )
+    REQUEST_DB_QUERIES.labels(request.method, route).observe(db_queries[0])
     return response
 
 
@@ -932,7 +1001,17 @@ async def stop_task_endpoint(task_id: str, user=Depends(get_verified_user)):
 
 @app.get("/api/tasks")
 async def list_tasks_endpoint(user=Depends(get_verified_user)):
-    return {"tasks": list_tasks()}  # Use the function from tasks.py
+    return {"tasks": await list_tasks()}  # Use the function from tasks.py
+
+
+@app.get("/api/tasks/chat/{chat_id}")
+async def list_tasks_by_chat_id_endpoint(chat_id: str, user=Depends(get_verified_user)):
+    if user.role != "admin" and not Chats.get_chat_by_id_and_user_id(chat_id, user.id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail=ERROR_MESSAGES.NOT_FOUND
+        )
+
+    return {"task_ids": await list_task_ids_by_chat_id(chat_id)}
 
 
 ##################################
@@ -1165,6 +1244,48 @@ async def healthcheck_with_db():
     return {"status": True}
 
 
+def get_lazy_models() -> dict[str, LazyModel]:
+    return {
+        name: model
+        for name, model in [("embedding", app.state.ef), ("reranking", app.state.rf)]
+        if isinstance(model, LazyModel)
+    }
+
+
+def preload_retrieval(app: FastAPI):
+    for model in [app.state.ef, app.state.rf]:
+        if isinstance(model, LazyModel):
+            model.preload()
+
+    try:
+        VECTOR_DB_CLIENT.initialize()
+    except Exception as e:
+        log.error(f"Error connecting to the vector database: {e}")
+
+
+@app.get("/health/ready")
+async def readiness():
+    models = get_lazy_models()
+    # Models loaded on first use don't hold the worker back
+    ready = are_models_ready(models.values(), RAG_PRELOAD_MODELS)
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={
+            "status": ready,
+            "startup": {"time": get_startup_time(), "stages": STARTUP_STAGES},
+            "models": {name: model.status() for name, model in models.items()},
+        },
+    )
+
+
+if ENABLE_METRICS:
+
+    @app.get("/metrics", include_in_schema=False)
+    async def get_metrics():
+        content, media_type = generate_metrics()
+        return Response(content=content, media_type=media_type)
+
+
 app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
 app.mount("/cache", StaticFiles(directory=CACHE_DIR), name="cache")
 
@@ -1192,3 +1313,6 @@ else:
     log.warning(
         f"Frontend build directory not found at '{FRONTEND_BUILD_DIR}'. Serving API only."
     )
+
+
+end_startup_stage("app")
@@ -0,0 +1,59 @@
+"""Add group_member table
+
+Revision ID: 540bf5548f0f
+Revises: f0d009e8dda8
+Create Date: 2025-01-09 02:00:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.sql import table, column
+
+revision = "540bf5548f0f"
+down_revision = "f0d009e8dda8"
+branch_labels = None
+depends_on = None
+
+
+group_table = table(
+    "group",
+    column("id", sa.Text()),
+    column("user_ids", sa.JSON()),
+)
+
+group_member_table = table(
+    "group_member",
+    column("group_id", sa.Text()),
+    column("user_id", sa.Text()),
+)
+
+
+def upgrade():
+    op.create_table(
+        "group_member",
+        sa.Column("group_id", sa.Text(), nullable=False),
+        sa.Column("user_id", sa.Text(), nullable=False),
+        sa.PrimaryKeyConstraint("group_id", "user_id"),
+    )
+    op.create_index("group_member_user_id_idx", "group_member", ["user_id"])
+
+    # Index the members listed in `group.user_ids`, which stays the source
+    # returned by the API
+    conn = op.get_bind()
+    rows = conn.execute(sa.select(group_table.c.id, group_table.c.user_ids)).fetchall()
+    for row in rows:
+        user_ids = row.user_ids if isinstance(row.user_ids, list) else []
+        if user_ids:
+            conn.execute(
+                group_member_table.insert(),
+                [
+                    {"group_id": row.id, "user_id": user_id}
+                    for user_id in dict.fromkeys(user_ids)
+                ],
+            )
+
+
+def downgrade():
+    op.drop_index("group_member_user_id_idx", table_name="group_member")
+    op.drop_table("group_member")
@@ -0,0 +1,43 @@
+"""Add ingestion_job table
+
+Revision ID: 9b4c1de7a2f3
+Revises: 540bf5548f0f
+Create Date: 2025-01-10 02:00:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "9b4c1de7a2f3"
+down_revision = "540bf5548f0f"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "ingestion_job",
+        sa.Column("id", sa.Text(), nullable=False),
+        sa.Column("user_id", sa.Text(), nullable=True),
+        sa.Column("type", sa.Text(), nullable=True),
+        sa.Column("status", sa.Text(), nullable=True),
+        sa.Column("progress", sa.Float(), nullable=True),
+        sa.Column("data", sa.JSON(), nullable=True),
+        sa.Column("result", sa.JSON(), nullable=True),
+        sa.Column("error", sa.Text(), nullable=True),
+        sa.Column("attempts", sa.Integer(), nullable=True),
+        sa.Column("cancel_requested", sa.Boolean(), nullable=True),
+        sa.Column("scheduled_at", sa.BigInteger(), nullable=True),
+        sa.Column("created_at", sa.BigInteger(), nullable=True),
+        sa.Column("updated_at", sa.BigInteger(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ingestion_job_status_idx", "ingestion_job", ["status", "scheduled_at"]
+    )
+
+
+def downgrade():
+    op.drop_index("ingestion_job_status_idx", table_name="ingestion_job")
+    op.drop_table("ingestion_job")
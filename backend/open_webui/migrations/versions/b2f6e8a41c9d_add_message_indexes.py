@@ -0,0 +1,35 @@
+"""Add message and message_reaction indexes
+
+Revision ID: b2f6e8a41c9d
+Revises: 9b4c1de7a2f3
+Create Date: 2025-01-12 03:00:00.000000
+
+"""
+
+from alembic import op
+
+revision = "b2f6e8a41c9d"
+down_revision = "9b4c1de7a2f3"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Pages of channel messages and of threads are read newest first
+    op.create_index(
+        "message_channel_id_idx",
+        "message",
+        ["channel_id", "parent_id", "created_at"],
+    )
+    op.create_index("message_parent_id_idx", "message", ["parent_id", "created_at"])
+
+    # Reactions are loaded for a page of messages at once
+    op.create_index(
+        "message_reaction_message_id_idx", "message_reaction", ["message_id"]
+    )
+
+
+def downgrade():
+    op.drop_index("message_reaction_message_id_idx", table_name="message_reaction")
+    op.drop_index("message_parent_id_idx", table_name="message")
+    op.drop_index("message_channel_id_idx", table_name="message")
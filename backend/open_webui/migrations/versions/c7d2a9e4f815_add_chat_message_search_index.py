@@ -0,0 +1,135 @@
+"""Add full-text search index of chat messages
+
+Revision ID: c7d2a9e4f815
+Revises: b2f6e8a41c9d
+Create Date: 2025-01-13 03:00:00.000000
+
+"""
+
+import logging
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "c7d2a9e4f815"
+down_revision = "b2f6e8a41c9d"
+branch_labels = None
+depends_on = None
+
+log = logging.getLogger(__name__)
+
+
+# Same expression when indexing and when removing an entry from the
+# contentless FTS5 table, which needs the indexed values to delete them
+SQLITE_CONTENT = "coalesce(json_extract({}.message, '$.content'), '')"
+
+SQLITE_TRIGGERS = [
+    f"""
+    CREATE TRIGGER chat_message_search_insert AFTER INSERT ON chat_message BEGIN
+        INSERT INTO chat_message_search (chat_id, message_id)
+        VALUES (new.chat_id, new.id);
+        INSERT INTO chat_message_fts (rowid, content)
+        VALUES (last_insert_rowid(), {SQLITE_CONTENT.format("new")});
+    END
+    """,
+    f"""
+    CREATE TRIGGER chat_message_search_delete AFTER DELETE ON chat_message BEGIN
+        INSERT INTO chat_message_fts (chat_message_fts, rowid, content)
+        SELECT 'delete', id, {SQLITE_CONTENT.format("old")}
+        FROM chat_message_search
+        WHERE chat_id = old.chat_id AND message_id = old.id;
+        DELETE FROM chat_message_search
+        WHERE chat_id = old.chat_id AND message_id = old.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER chat_message_search_update AFTER UPDATE OF message ON chat_message
+    WHEN {SQLITE_CONTENT.format("old")} IS NOT {SQLITE_CONTENT.format("new")}
+    BEGIN
+        INSERT INTO chat_message_fts (chat_message_fts, rowid, content)
+        SELECT 'delete', id, {SQLITE_CONTENT.format("old")}
+        FROM chat_message_search
+        WHERE chat_id = old.chat_id AND message_id = old.id;
+        INSERT INTO chat_message_fts (rowid, content)
+        SELECT id, {SQLITE_CONTENT.format("new")}
+        FROM chat_message_search
+        WHERE chat_id = new.chat_id AND message_id = new.id;
+    END
+    """,
+]
+
+
+def upgrade():
+    # Search and chat lists only ever look at the chats of one user
+    op.create_index("chat_user_id_idx", "chat", ["user_id", "updated_at"])
+
+    dialect = op.get_bind().dialect.name
+    if dialect == "sqlite":
+        upgrade_sqlite()
+    elif dialect == "postgresql":
+        op.execute(
+            "ALTER TABLE chat_message ADD COLUMN search_vector tsvector "
+            "GENERATED ALWAYS AS "
+            "(to_tsvector('simple', coalesce(message->>'content', ''))) STORED"
+        )
+        op.execute(
+            "CREATE INDEX chat_message_search_vector_idx "
+            "ON chat_message USING GIN (search_vector)"
+        )
+
+
+def upgrade_sqlite():
+    conn = op.get_bind()
+    try:
+        conn.exec_driver_sql(
+            "CREATE VIRTUAL TABLE chat_message_fts USING fts5("
+            "content, content='', tokenize='unicode61 remove_diacritics 2')"
+        )
+    except Exception as e:
+        # Search falls back to scanning the messages
+        log.warning(f"SQLite FTS5 is unavailable, chats are not indexed: {e}")
+        return
+
+    # FTS5 entries are keyed by an integer rowid; chat_message has a composite
+    # text key (and an implicit rowid that VACUUM may renumber)
+    op.create_table(
+        "chat_message_search",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("chat_id", sa.Text(), nullable=False),
+        sa.Column("message_id", sa.Text(), nullable=False),
+    )
+    op.create_index(
+        "chat_message_search_message_idx",
+        "chat_message_search",
+        ["chat_id", "message_id"],
+        unique=True,
+    )
+
+    conn.exec_driver_sql(
+        "INSERT INTO chat_message_search (chat_id, message_id) "
+        "SELECT chat_id, id FROM chat_message"
+    )
+    conn.exec_driver_sql(
+        "INSERT INTO chat_message_fts (rowid, content) "
+        f"SELECT search.id, {SQLITE_CONTENT.format('chat_message')} "
+        "FROM chat_message_search AS search JOIN chat_message "
+        "ON chat_message.chat_id = search.chat_id "
+        "AND chat_message.id = search.message_id"
+    )
+
+    for trigger in SQLITE_TRIGGERS:
+        conn.exec_driver_sql(trigger)
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == "sqlite":
+        for name in ["insert", "delete", "update"]:
+            op.execute(f"DROP TRIGGER IF EXISTS chat_message_search_{name}")
+        op.execute("DROP TABLE IF EXISTS chat_message_fts")
+        op.execute("DROP TABLE IF EXISTS chat_message_search")
+    elif dialect == "postgresql":
+        op.execute("DROP INDEX IF EXISTS chat_message_search_vector_idx")
+        op.execute("ALTER TABLE chat_message DROP COLUMN IF EXISTS search_vector")
+
+    op.drop_index("chat_user_id_idx", table_name="chat")
@@ -0,0 +1,137 @@
+"""Add chat_message table
+
+Revision ID: f0d009e8dda8
+Revises: 3781e22d8b01
+Create Date: 2025-01-08 03:00:00.000000
+
+"""
+
+import time
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.sql import table, column
+
+revision = "f0d009e8dda8"
+down_revision = "3781e22d8b01"
+branch_labels = None
+depends_on = None
+
+
+chat_table = table(
+    "chat",
+    column("id", sa.String()),
+    column("chat", sa.JSON()),
+)
+
+chat_message_table = table(
+    "chat_message",
+    column("chat_id", sa.Text()),
+    column("id", sa.Text()),
+    column("parent_id", sa.Text()),
+    column("children_ids", sa.JSON()),
+    column("message", sa.JSON()),
+    column("created_at", sa.BigInteger()),
+    column("updated_at", sa.BigInteger()),
+)
+
+
+def upgrade():
+    op.create_table(
+        "chat_message",
+        sa.Column("chat_id", sa.Text(), nullable=False),
+        sa.Column("id", sa.Text(), nullable=False),
+        sa.Column("parent_id", sa.Text(), nullable=True),
+        sa.Column("children_ids", sa.JSON(), nullable=True),
+        sa.Column("message", sa.JSON(), nullable=True),
+        sa.Column("created_at", sa.BigInteger(), nullable=True),
+        sa.Column("updated_at", sa.BigInteger(), nullable=True),
+        sa.PrimaryKeyConstraint("chat_id", "id"),
+    )
+
+    # Move `history.messages` out of every chat document into the new table.
+    # Chats are fetched one at a time so that large databases are not loaded into memory.
+    conn = op.get_bind()
+    chat_ids = [row.id for row in conn.execute(sa.select(chat_table.c.id))]
+
+    now = int(time.time())
+    for chat_id in chat_ids:
+        row = conn.execute(
+            sa.select(chat_table.c.chat).where(chat_table.c.id == chat_id)
+        ).fetchone()
+        chat = row.chat if row else None
+        if not isinstance(chat, dict):
+            continue
+
+        history = chat.get("history")
+        if not isinstance(history, dict):
+            continue
+
+        messages = history.get("messages")
+        if not isinstance(messages, dict) or not messages:
+            continue
+
+        conn.execute(
+            chat_message_table.insert(),
+            [
+                {
+                    "chat_id": chat_id,
+                    "id": message_id,
+                    "parent_id": message.get("parentId"),
+                    "children_ids": message.get("childrenIds"),
+                    "message": {**message, "id": message.get("id", message_id)},
+                    "created_at": message.get("timestamp", now),
+                    "updated_at": now,
+                }
+                for message_id, message in messages.items()
+                if isinstance(message, dict)
+            ],
+        )
+
+        conn.execute(
+            chat_table.update()
+            .where(chat_table.c.id == chat_id)
+            .values(chat={**chat, "history": {**history, "messages": {}}})
+        )
+
+
+def downgrade():
+    # Fold the messages back into the chat documents before dropping the table
+    conn = op.get_bind()
+    chat_ids = [
+        row.chat_id
+        for row in conn.execute(sa.select(chat_message_table.c.chat_id).distinct())
+    ]
+
+    for chat_id in chat_ids:
+        row = conn.execute(
+            sa.select(chat_table.c.chat).where(chat_table.c.id == chat_id)
+        ).fetchone()
+        if row is None or not isinstance(row.chat, dict):
+            continue
+
+        messages = {
+            message_row.id: message_row.message
+            for message_row in conn.execute(
+                sa.select(chat_message_table.c.id, chat_message_table.c.message).where(
+                    chat_message_table.c.chat_id == chat_id
+                )
+            )
+        }
+
+        history = row.chat.get("history") or {}
+        conn.execute(
+            chat_table.update()
+            .where(chat_table.c.id == chat_id)
+            .values(
+                chat={
+                    **row.chat,
+                    "history": {
+                        **history,
+                        "messages": {**(history.get("messages") or {}), **messages},
+                    },
+                }
+            )
+        )
+
+    op.drop_table("chat_message")
@@ -1,17 +1,23 @@
 import json
+import logging
+import re
 import time
 import uuid
 from typing import Optional
 
 from open_webui.internal.db import Base, get_db
 from open_webui.models.tags import TagModel, Tag, Tags
+from open_webui.env import SRC_LOG_LEVELS
 
 
 from pydantic import BaseModel, ConfigDict
-from sqlalchemy import BigInteger, Boolean, Column, String, Text, JSON
-from sqlalchemy import or_, func, select, and_, text
+from sqlalchemy import BigInteger, Boolean, Column, Float, Index, String, Text, JSON
+from sqlalchemy import or_, func, select, text, literal
 from sqlalchemy.sql import exists
 
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["MODELS"])
+
 ####################
 # Chat DB Schema
 ####################
@@ -35,6 +41,8 @@ class Chat(Base):
     meta = Column(JSON, server_default="{}")
     folder_id = Column(Text, nullable=True)
 
+    __table_args__ = (Index("chat_user_id_idx", "user_id", "updated_at"),)
+
 
 class ChatModel(BaseModel):
     model_config = ConfigDict(from_attributes=True)
@@ -55,6 +63,40 @@ class ChatModel(BaseModel):
     folder_id: Optional[str] = None
 
 
+####################
+# ChatMessage DB Schema
+####################
+
+
+class ChatMessage(Base):
+    __tablename__ = "chat_message"
+
+    # Composite key: message ids are only unique within a chat (shared chats reuse them)
+    chat_id = Column(Text, primary_key=True)
+    id = Column(Text, primary_key=True)
+
+    parent_id = Column(Text, nullable=True)
+    children_ids = Column(JSON, nullable=True)
+    message = Column(JSON)
+
+    created_at = Column(BigInteger)
+    updated_at = Column(BigInteger)
+
+
+class ChatMessageModel(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    chat_id: str
+    id: str
+
+    parent_id: Optional[str] = None
+    children_ids: Optional[list[str]] = None
+    message: dict
+
+    created_at: int  # timestamp in epoch
+    updated_at: int  # timestamp in epoch
+
+
 ####################
 # Forms
 ####################
@@ -100,7 +142,134 @@ class ChatTitleIdResponse(BaseModel):
     created_at: int
 
 
+# database url -> full-text index of chat messages ("fts5", "tsvector" or None)
+SEARCH_BACKENDS: dict[str, Optional[str]] = {}
+
+
 class ChatTable:
+    ####################
+    # Message storage helpers
+    #
+    # `history.messages` lives in the `chat_message` table (one row per message)
+    # rather than in the `chat` JSON document, so that a single message update is
+    # a single row write. The document is reassembled on read.
+    ####################
+
+    def _split_messages(self, chat: dict) -> tuple[dict, Optional[dict]]:
+        """
+        Returns the chat document without `history.messages`, and the messages
+        (None if the document does not carry a history to sync).
+        """
+        history = chat.get("history")
+        if not isinstance(history, dict) or "messages" not in history:
+            return chat, None
+
+        messages = history.get("messages") or {}
+        if not isinstance(messages, dict):
+            # Legacy list-shaped histories are left inline
+            return chat, None
+
+        return {**chat, "history": {**history, "messages": {}}}, messages
+
+    def _message_row_values(self, message_id: str, message: dict) -> dict:
+        return {
+            "parent_id": message.get("parentId"),
+            "children_ids": message.get("childrenIds"),
+            "message": {**message, "id": message.get("id", message_id)},
+        }
+
+    def _sync_messages(self, db, chat_id: str, messages: dict) -> None:
+        """
+        Makes the stored rows of a chat match `messages`, writing only the rows
+        that were added, changed or removed.
+        """
+        now = int(time.time())
+        rows = {
+            row.id: row
+            for row in db.query(ChatMessage).filter_by(chat_id=chat_id).all()
+        }
+
+        for message_id, message in messages.items():
+            values = self._message_row_values(message_id, message)
+            row = rows.pop(message_id, None)
+
+            if row is None:
+                db.add(
+                    ChatMessage(
+                        chat_id=chat_id,
+                        id=message_id,
+                        created_at=now,
+                        updated_at=now,
+                        **values,
+                    )
+                )
+            elif row.message != values["message"]:
+                for key, value in values.items():
+                    setattr(row, key, value)
+                row.updated_at = now
+
+        if rows:
+            db.query(ChatMessage).filter(
+                ChatMessage.chat_id == chat_id, ChatMessage.id.in_(list(rows))
+            ).delete(synchronize_session=False)
+
+    def _get_message_maps(self, db, chat_ids: list[str]) -> dict[str, dict]:
+        message_maps = {}
+
+        # Chunked to stay below the bound parameter limit of SQLite
+        for i in range(0, len(chat_ids), 500):
+            rows = (
+                db.query(ChatMessage)
+                .filter(ChatMessage.chat_id.in_(chat_ids[i : i + 500]))
+                .all()
+            )
+            for row in rows:
+                message_maps.setdefault(row.chat_id, {})[row.id] = {
+                    **row.message,
+                    "parentId": row.parent_id,
+                    "childrenIds": row.children_ids or [],
+                }
+
+        return message_maps
+
+    def _assemble_chat(self, chat: dict, messages: Optional[dict]) -> dict:
+        if not messages:
+            return chat
+
+        history = chat.get("history") or {}
+        inline_messages = history.get("messages") or {}
+        if not isinstance(inline_messages, dict):
+            inline_messages = {}
+
+        return {
+            **chat,
+            "history": {**history, "messages": {**inline_messages, **messages}},
+        }
+
+    def _to_chat_models(self, db, chats: list[Chat]) -> list[ChatModel]:
+        message_maps = self._get_message_maps(db, [chat.id for chat in chats])
+
+        models = []
+        for chat in chats:
+            model = ChatModel.model_validate(chat)
+            model.chat = self._assemble_chat(model.chat, message_maps.get(chat.id))
+            models.append(model)
+        return models
+
+    def _to_chat_model(self, db, chat: Chat) -> ChatModel:
+        return self._to_chat_models(db, [chat])[0]
+
+    def _insert_chat(self, db, chat: ChatModel) -> Chat:
+        chat_data, messages = self._split_messages(chat.chat)
+
+        result = Chat(**{**chat.model_dump(), "chat": chat_data})
+        db.add(result)
+        if messages:
+            self._sync_messages(db, chat.id, messages)
+        db.commit()
+        db.refresh(result)
+        return result
+
     def insert_new_chat(self, user_id: str, form_data: ChatForm) -> Optional[ChatModel]:
         with get_db() as db:
             id = str(uuid.uuid4())
@@ -119,11 +288,8 @@ class ChatTable:
                 }
             )
 
-            result = Chat(**chat.model_dump())
-            db.add(result)
-            db.commit()
-            db.refresh(result)
-            return ChatModel.model_validate(result) if result else None
+            result = self._insert_chat(db, chat)
+            return self._to_chat_model(db, result) if result else None
 
     def import_chat(
         self, user_id: str, form_data: ChatImportForm
@@ -148,23 +314,24 @@ class ChatTable:
                 }
             )
 
-            result = Chat(**chat.model_dump())
-            db.add(result)
-            db.commit()
-            db.refresh(result)
-            return ChatModel.model_validate(result) if result else None
+            result = self._insert_chat(db, chat)
+            return self._to_chat_model(db, result) if result else None
 
     def update_chat_by_id(self, id: str, chat: dict) -> Optional[ChatModel]:
         try:
             with get_db() as db:
                 chat_item = db.get(Chat, id)
-                chat_item.chat = chat
+                chat_data, messages = self._split_messages(chat)
+                if messages is not None:
+                    self._sync_messages(db, id, messages)
+
+                chat_item.chat = chat_data
                 chat_item.title = chat["title"] if "title" in chat else "New Chat"
                 chat_item.updated_at = int(time.time())
                 db.commit()
                 db.refresh(chat_item)
 
-                return ChatModel.model_validate(chat_item)
+                return self._to_chat_model(db, chat_item)
         except Exception:
             return None
 
@@ -206,6 +373,11 @@ class ChatTable:
         return chat.chat.get("title", "New Chat")
 
     def get_messages_by_chat_id(self, id: str) -> Optional[dict]:
+        with get_db() as db:
+            messages = self._get_message_maps(db, [id]).get(id)
+            if messages:
+                return messages
+
         chat = self.get_chat_by_id(id)
         if chat is None:
             return None
@@ -215,6 +387,15 @@ class ChatTable:
     def get_message_by_id_and_message_id(
         self, id: str, message_id: str
     ) -> Optional[dict]:
+        with get_db() as db:
+            row = db.get(ChatMessage, (id, message_id))
+            if row:
+                return {
+                    **row.message,
+                    "parentId": row.parent_id,
+                    "childrenIds": row.children_ids or [],
+                }
+
         chat = self.get_chat_by_id(id)
         if chat is None:
             return None
@@ -223,44 +404,79 @@ class ChatTable:
 
     def upsert_message_to_chat_by_id_and_message_id(
         self, id: str, message_id: str, message: dict
-    ) -> Optional[ChatModel]:
-        chat = self.get_chat_by_id(id)
-        if chat is None:
-            return None
+    ) -> Optional[ChatMessageModel]:
+        try:
+            with get_db() as db:
+                now = int(time.time())
+                row = db.get(ChatMessage, (id, message_id))
 
-        chat = chat.chat
-        history = chat.get("history", {})
+                if row:
+                    values = self._message_row_values(
+                        message_id, {**row.message, **message}
+                    )
+                    for key, value in values.items():
+                        setattr(row, key, value)
+                    row.updated_at = now
 
-        if message_id in history.get("messages", {}):
-            history["messages"][message_id] = {
-                **history["messages"][message_id],
-                **message,
-            }
-        else:
-            history["messages"][message_id] = message
+                    # Touch the chat without loading or rewriting its document
+                    if not db.query(Chat).filter_by(id=id).update({"updated_at": now}):
+                        return None
+                else:
+                    chat_item = db.get(Chat, id)
+                    if chat_item is None:
+                        return None
+
+                    history = chat_item.chat.get("history", {})
+                    inline_message = (history.get("messages") or {}).get(message_id)
+
+                    row = ChatMessage(
+                        chat_id=id,
+                        id=message_id,
+                        created_at=now,
+                        updated_at=now,
+                        **self._message_row_values(
+                            message_id, {**(inline_message or {}), **message}
+                        ),
+                    )
+                    db.add(row)
 
-        history["currentId"] = message_id
+                    if history.get("currentId") != message_id:
+                        chat_item.chat = {
+                            **chat_item.chat,
+                            "history": {**history, "currentId": message_id},
+                        }
+                    chat_item.updated_at = now
 
-        chat["history"] = history
-        return self.update_chat_by_id(id, chat)
+                db.commit()
+                db.refresh(row)
+                return ChatMessageModel.model_validate(row)
+        except Exception:
+            log.exception(f"Error saving message {message_id} of chat {id}")
+            return None
 
     def add_message_status_to_chat_by_id_and_message_id(
         self, id: str, message_id: str, status: dict
-    ) -> Optional[ChatModel]:
-        chat = self.get_chat_by_id(id)
-        if chat is None:
-            return None
-
-        chat = chat.chat
-        history = chat.get("history", {})
+    ) -> Optional[ChatMessageModel]:
+        try:
+            with get_db() as db:
+                row = db.get(ChatMessage, (id, message_id))
+                if row is None:
+                    return None
 
-        if message_id in history.get("messages", {}):
-            status_history = history["messages"][message_id].get("statusHistory", [])
-            status_history.append(status)
-            history["messages"][message_id]["statusHistory"] = status_history
+                row.message = {
+                    **row.message,
+                    "statusHistory": [
+                        *row.message.get("statusHistory", []),
+                        status,
+                    ],
+                }
+                row.updated_at = int(time.time())
 
-        chat["history"] = history
-        return self.update_chat_by_id(id, chat)
+                db.commit()
+                db.refresh(row)
+                return ChatMessageModel.model_validate(row)
+        except Exception:
+            return None
 
     def insert_shared_chat_by_chat_id(self, chat_id: str) -> Optional[ChatModel]:
         with get_db() as db:
@@ -275,15 +491,12 @@ class ChatTable:
                     "id": str(uuid.uuid4()),
                     "user_id": f"shared-{chat_id}",
                     "title": chat.title,
-                    "chat": chat.chat,
+                    "chat": self._to_chat_model(db, chat).chat,
                     "created_at": chat.created_at,
                     "updated_at": int(time.time()),
                 }
             )
-            shared_result = Chat(**shared_chat.model_dump())
-            db.add(shared_result)
-            db.commit()
-            db.refresh(shared_result)
+            shared_result = self._insert_chat(db, shared_chat)
 
             # Update the original chat with the share_id
             result = (
@@ -305,20 +518,32 @@ class ChatTable:
                 if shared_chat is None:
                     return self.insert_shared_chat_by_chat_id(chat_id)
 
+                chat_data, messages = self._split_messages(
+                    self._to_chat_model(db, chat).chat
+                )
+                if messages is not None:
+                    self._sync_messages(db, shared_chat.id, messages)
+
                 shared_chat.title = chat.title
-                shared_chat.chat = chat.chat
+                shared_chat.chat = chat_data
 
                 shared_chat.updated_at = int(time.time())
                 db.commit()
                 db.refresh(shared_chat)
 
-                return ChatModel.model_validate(shared_chat)
+                return self._to_chat_model(db, shared_chat)
         except Exception:
             return None
 
     def delete_shared_chat_by_chat_id(self, chat_id: str) -> bool:
         try:
             with get_db() as db:
+                shared_chat_ids = select(Chat.id).where(
+                    Chat.user_id == f"shared-{chat_id}"
+                )
+                db.query(ChatMessage).filter(
+                    ChatMessage.chat_id.in_(shared_chat_ids)
+                ).delete(synchronize_session=False)
                 db.query(Chat).filter_by(user_id=f"shared-{chat_id}").delete()
                 db.commit()
 
@@ -335,7 +560,7 @@ class ChatTable:
                 chat.share_id = share_id
                 db.commit()
                 db.refresh(chat)
-                return ChatModel.model_validate(chat)
+                return self._to_chat_model(db, chat)
         except Exception:
             return None
 
@@ -347,7 +572,7 @@ class ChatTable:
                 chat.updated_at = int(time.time())
                 db.commit()
                 db.refresh(chat)
-                return ChatModel.model_validate(chat)
+                return self._to_chat_model(db, chat)
         except Exception:
             return None
 
@@ -359,7 +584,7 @@ class ChatTable:
                 chat.updated_at = int(time.time())
                 db.commit()
                 db.refresh(chat)
-                return ChatModel.model_validate(chat)
+                return self._to_chat_model(db, chat)
         except Exception:
             return None
 
@@ -383,7 +608,7 @@ class ChatTable:
                 # .limit(limit).offset(skip)
                 .all()
             )
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return self._to_chat_models(db, list(all_chats))
 
     def get_chat_list_by_user_id(
         self,
@@ -405,7 +630,7 @@ class ChatTable:
                 query = query.limit(limit)
 
             all_chats = query.all()
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return self._to_chat_models(db, list(all_chats))
 
     def get_chat_title_id_list_by_user_id(
         self,
@@ -456,13 +681,13 @@ class ChatTable:
                 .order_by(Chat.updated_at.desc())
                 .all()
             )
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return self._to_chat_models(db, list(all_chats))
 
     def get_chat_by_id(self, id: str) -> Optional[ChatModel]:
         try:
             with get_db() as db:
                 chat = db.get(Chat, id)
-                return ChatModel.model_validate(chat)
+                return self._to_chat_model(db, chat)
         except Exception:
             return None
 
@@ -482,7 +707,7 @@ class ChatTable:
         try:
             with get_db() as db:
                 chat = db.query(Chat).filter_by(id=id, user_id=user_id).first()
-                return ChatModel.model_validate(chat)
+                return self._to_chat_model(db, chat)
         except Exception:
             return None
 
@@ -493,7 +718,7 @@ class ChatTable:
                 # .limit(limit).offset(skip)
                 .order_by(Chat.updated_at.desc())
             )
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return self._to_chat_models(db, list(all_chats))
 
     def get_chats_by_user_id(self, user_id: str) -> list[ChatModel]:
         with get_db() as db:
@@ -502,7 +727,7 @@ class ChatTable:
                 .filter_by(user_id=user_id)
                 .order_by(Chat.updated_at.desc())
             )
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return self._to_chat_models(db, list(all_chats))
 
     def get_pinned_chats_by_user_id(self, user_id: str) -> list[ChatModel]:
         with get_db() as db:
@@ -511,7 +736,7 @@ class ChatTable:
                 .filter_by(user_id=user_id, pinned=True, archived=False)
                 .order_by(Chat.updated_at.desc())
             )
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return self._to_chat_models(db, list(all_chats))
 
     def get_archived_chats_by_user_id(self, user_id: str) -> list[ChatModel]:
         with get_db() as db:
@@ -520,7 +745,120 @@ class ChatTable:
                 .filter_by(user_id=user_id, archived=True)
                 .order_by(Chat.updated_at.desc())
             )
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return self._to_chat_models(db, list(all_chats))
+
+    def _get_search_backend(self, db) -> Optional[str]:
+        """Returns the full-text index of chat messages of the database, if any."""
+        url = str(db.bind.url)
+        if url not in SEARCH_BACKENDS:
+            backend = None
+            dialect_name = db.bind.dialect.name
+            if dialect_name == "sqlite":
+                if db.execute(
+                    text(
+                        "SELECT 1 FROM sqlite_master "
+                        "WHERE type = 'table' AND name = 'chat_message_fts'"
+                    )
+                ).first():
+                    backend = "fts5"
+            elif dialect_name == "postgresql":
+                if db.execute(
+                    text(
+                        "SELECT 1 FROM information_schema.columns WHERE "
+                        "table_name = 'chat_message' AND column_name = 'search_vector'"
+                    )
+                ).first():
+                    backend = "tsvector"
+            SEARCH_BACKENDS[url] = backend
+        return SEARCH_BACKENDS[url]
+
+    def _get_message_matches(self, db, user_id: str, search_text: str):
+        """
+        Returns a subquery of (chat_id, rank) of the chats of the user with
+        messages matching every word of `search_text` (as a prefix), a higher
+        rank meaning a better match. None if there is nothing to match.
+        """
+        words = re.findall(r"\w+", search_text)
+        if not words:
+            return None
+
+        backend = self._get_search_backend(db)
+        if backend == "fts5":
+            # The `rank` column of FTS5 is bm25(), lower for better matches
+            return (
+                text(
+                    """
+                    SELECT search.chat_id AS chat_id,
+                        -MIN(chat_message_fts.rank) AS rank
+                    FROM chat_message_fts
+                    JOIN chat_message_search AS search
+                        ON search.id = chat_message_fts.rowid
+                    WHERE chat_message_fts MATCH :search_query
+                        AND search.chat_id IN (
+                            SELECT id FROM chat WHERE user_id = :user_id
+                        )
+                    GROUP BY search.chat_id
+                    """
+                )
+                .bindparams(
+                    search_query=" ".join(f'"{word}"*' for word in words),
+                    user_id=user_id,
+                )
+                .columns(chat_id=Text, rank=Float)
+                .subquery()
+            )
+        elif backend == "tsvector":
+            return (
+                text(
+                    """
+                    SELECT chat_id, MAX(ts_rank(search_vector, search_query)) AS rank
+                    FROM chat_message,
+                        to_tsquery('simple', :search_query) AS search_query
+                    WHERE search_vector @@ search_query
+                        AND chat_id IN (SELECT id FROM chat WHERE user_id = :user_id)
+                    GROUP BY chat_id
+                    """
+                )
+                .bindparams(
+                    search_query=" & ".join(f"{word}:*" for word in words),
+                    user_id=user_id,
+                )
+                .columns(chat_id=Text, rank=Float)
+                .subquery()
+            )
+
+        # No index, scan the messages of the user's chats
+        content = (
+            func.json_extract(ChatMessage.message, "$.content")
+            if db.bind.dialect.name == "sqlite"
+            else ChatMessage.message["content"].as_string()
+        )
+        return (
+            select(ChatMessage.chat_id.label("chat_id"), literal(0.0).label("rank"))
+            .where(
+                ChatMessage.chat_id.in_(select(Chat.id).where(Chat.user_id == user_id)),
+                func.lower(content).contains(search_text, autoescape=True),
+            )
+            .group_by(ChatMessage.chat_id)
+            .subquery()
+        )
+
+    def _filter_by_tags(self, db, query, tag_ids: list[str]):
+        if db.bind.dialect.name == "postgresql":
+            tags = "SELECT tag FROM json_array_elements_text(chat.meta->'tags') AS tag"
+        else:
+            tags = "SELECT tag.value FROM json_each(chat.meta, '$.tags') AS tag"
+
+        if "none" in tag_ids:
+            return query.filter(text(f"NOT EXISTS ({tags})"))
+
+        for tag_idx, tag_id in enumerate(tag_ids):
+            query = query.filter(
+                text(f":tag_id_{tag_idx} IN ({tags})").bindparams(
+                    **{f"tag_id_{tag_idx}": tag_id}
+                )
+            )
+        return query
 
     def get_chats_by_user_id_and_search_text(
         self,
@@ -529,13 +867,25 @@ class ChatTable:
         include_archived: bool = False,
         skip: int = 0,
         limit: int = 60,
+        folder_id: Optional[str] = None,
     ) -> list[ChatModel]:
         """
-        Filters chats based on a search query using Python, allowing pagination using skip and limit.
+        Searches the chats of the user by title and message content, through
+        the full-text index of the messages (FTS5 on SQLite, a tsvector on
+        PostgreSQL). Chats whose title matches come first, then the best
+        matching messages, then the most recently updated.
+
+        Titles match the text anywhere in them. Through the index, messages
+        match when each word of the text starts one of their words ("wor"
+        finds "world", "orld" doesn't); without one, they match the text
+        anywhere in them, like titles.
+
+        `search_text` may contain `tag:tag_name` words (`tag:none` for chats
+        without tags), which all have to match.
         """
         search_text = search_text.lower().strip()
 
-        if not search_text:
+        if not search_text and folder_id is None:
             return self.get_chat_list_by_user_id(user_id, include_archived, skip, limit)
 
         search_text_words = search_text.split(" ")
@@ -551,127 +901,40 @@ class ChatTable:
             word for word in search_text_words if not word.startswith("tag:")
         ]
 
-        search_text = " ".join(search_text_words)
+        search_text = " ".join(search_text_words).strip()
 
         with get_db() as db:
             query = db.query(Chat).filter(Chat.user_id == user_id)
 
             if not include_archived:
                 query = query.filter(Chat.archived == False)
-
-            query = query.order_by(Chat.updated_at.desc())
-
-            # Check if the database dialect is either 'sqlite' or 'postgresql'
-            dialect_name = db.bind.dialect.name
-            if dialect_name == "sqlite":
-                # SQLite case: using JSON1 extension for JSON searching
-                query = query.filter(
-                    (
-                        Chat.title.ilike(
-                            f"%{search_text}%"
-                        )  # Case-insensitive search in title
-                        | text(
-                            """
-                            EXISTS (
-                                SELECT 1 
-                                FROM json_each(Chat.chat, '$.messages') AS message 
-                                WHERE LOWER(message.value->>'content') LIKE '%' || :search_text || '%'
-                            )
-                            """
-                        )
-                    ).params(search_text=search_text)
+            if folder_id is not None:
+                query = query.filter(Chat.folder_id == folder_id)
+            if tag_ids:
+                query = self._filter_by_tags(db, query, tag_ids)
+
+            order_by = []
+            if search_text:
+                title_match = func.lower(Chat.title).contains(
+                    search_text, autoescape=True
                 )
 
-                # Check if there are any tags to filter, it should have all the tags
-                if "none" in tag_ids:
-                    query = query.filter(
-                        text(
-                            """
-                            NOT EXISTS (
-                                SELECT 1
-                                FROM json_each(Chat.meta, '$.tags') AS tag
-                            )
-                            """
-                        )
-                    )
-                elif tag_ids:
-                    query = query.filter(
-                        and_(
-                            *[
-                                text(
-                                    f"""
-                                    EXISTS (
-                                        SELECT 1
-                                        FROM json_each(Chat.meta, '$.tags') AS tag
-                                        WHERE tag.value = :tag_id_{tag_idx}
-                                    )
-                                    """
-                                ).params(**{f"tag_id_{tag_idx}": tag_id})
-                                for tag_idx, tag_id in enumerate(tag_ids)
-                            ]
-                        )
-                    )
-
-            elif dialect_name == "postgresql":
-                # PostgreSQL relies on proper JSON query for search
-                query = query.filter(
-                    (
-                        Chat.title.ilike(
-                            f"%{search_text}%"
-                        )  # Case-insensitive search in title
-                        | text(
-                            """
-                            EXISTS (
-                                SELECT 1
-                                FROM json_array_elements(Chat.chat->'messages') AS message
-                                WHERE LOWER(message->>'content') LIKE '%' || :search_text || '%'
-                            )
-                            """
-                        )
-                    ).params(search_text=search_text)
-                )
+                matches = self._get_message_matches(db, user_id, search_text)
+                if matches is not None:
+                    query = query.outerjoin(matches, matches.c.chat_id == Chat.id)
+                    query = query.filter(or_(title_match, matches.c.chat_id != None))
+                    order_by = [
+                        title_match.desc(),
+                        func.coalesce(matches.c.rank, 0).desc(),
+                    ]
+                else:
+                    query = query.filter(title_match)
 
-                # Check if there are any tags to filter, it should have all the tags
-                if "none" in tag_ids:
-                    query = query.filter(
-                        text(
-                            """
-                            NOT EXISTS (
-                                SELECT 1
-                                FROM json_array_elements_text(Chat.meta->'tags') AS tag
-                            )
-                            """
-                        )
-                    )
-                elif tag_ids:
-                    query = query.filter(
-                        and_(
-                            *[
-                                text(
-                                    f"""
-                                    EXISTS (
-                                        SELECT 1
-                                        FROM json_array_elements_text(Chat.meta->'tags') AS tag
-                                        WHERE tag = :tag_id_{tag_idx}
-                                    )
-                                    """
-                                ).params(**{f"tag_id_{tag_idx}": tag_id})
-                                for tag_idx, tag_id in enumerate(tag_ids)
-                            ]
-                        )
-                    )
-            else:
-                raise NotImplementedError(
-                    f"Unsupported dialect: {db.bind.dialect.name}"
-                )
+            query = query.order_by(*order_by, Chat.updated_at.desc())
 
             # Perform pagination at the SQL level
             all_chats = query.offset(skip).limit(limit).all()
-
-            print(len(all_chats))
-
-            # Validate and return chats
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return self._to_chat_models(db, list(all_chats))
 
     def get_chats_by_folder_id_and_user_id(
         self, folder_id: str, user_id: str
@@ -684,7 +947,7 @@ class ChatTable:
             query = query.order_by(Chat.updated_at.desc())
 
             all_chats = query.all()
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return self._to_chat_models(db, list(all_chats))
 
     def get_chats_by_folder_ids_and_user_id(
         self, folder_ids: list[str], user_id: str
@@ -699,7 +962,7 @@ class ChatTable:
             query = query.order_by(Chat.updated_at.desc())
 
             all_chats = query.all()
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return self._to_chat_models(db, list(all_chats))
 
     def update_chat_folder_id_by_id_and_user_id(
         self, id: str, user_id: str, folder_id: str
@@ -712,7 +975,7 @@ class ChatTable:
                 chat.pinned = False
                 db.commit()
                 db.refresh(chat)
-                return ChatModel.model_validate(chat)
+                return self._to_chat_model(db, chat)
         except Exception:
             return None
 
@@ -751,7 +1014,7 @@ class ChatTable:
 
             all_chats = query.all()
             print("all_chats", all_chats)
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return self._to_chat_models(db, list(all_chats))
 
     def add_chat_tag_by_id_and_user_id_and_tag_name(
         self, id: str, user_id: str, tag_name: str
@@ -772,7 +1035,7 @@ class ChatTable:
 
                 db.commit()
                 db.refresh(chat)
-                return ChatModel.model_validate(chat)
+                return self._to_chat_model(db, chat)
         except Exception:
             return None
 
@@ -848,6 +1111,7 @@ class ChatTable:
     def delete_chat_by_id(self, id: str) -> bool:
         try:
             with get_db() as db:
+                db.query(ChatMessage).filter_by(chat_id=id).delete()
                 db.query(Chat).filter_by(id=id).delete()
                 db.commit()
 
@@ -858,7 +1122,8 @@ class ChatTable:
     def delete_chat_by_id_and_user_id(self, id: str, user_id: str) -> bool:
         try:
             with get_db() as db:
-                db.query(Chat).filter_by(id=id, user_id=user_id).delete()
+                if db.query(Chat).filter_by(id=id, user_id=user_id).delete():
+                    db.query(ChatMessage).filter_by(chat_id=id).delete()
                 db.commit()
 
                 return True and self.delete_shared_chat_by_chat_id(id)
@@ -870,6 +1135,10 @@ class ChatTable:
             with get_db() as db:
                 self.delete_shared_chats_by_user_id(user_id)
 
+                chat_ids = select(Chat.id).where(Chat.user_id == user_id)
+                db.query(ChatMessage).filter(ChatMessage.chat_id.in_(chat_ids)).delete(
+                    synchronize_session=False
+                )
                 db.query(Chat).filter_by(user_id=user_id).delete()
                 db.commit()
 
@@ -882,6 +1151,12 @@ class ChatTable:
     ) -> bool:
         try:
             with get_db() as db:
+                chat_ids = select(Chat.id).where(
+                    Chat.user_id == user_id, Chat.folder_id == folder_id
+                )
+                db.query(ChatMessage).filter(ChatMessage.chat_id.in_(chat_ids)).delete(
+                    synchronize_session=False
+                )
                 db.query(Chat).filter_by(user_id=user_id, folder_id=folder_id).delete()
                 db.commit()
 
@@ -895,6 +1170,11 @@ class ChatTable:
                 chats_by_user = db.query(Chat).filter_by(user_id=user_id).all()
                 shared_chat_ids = [f"shared-{chat.id}" for chat in chats_by_user]
 
+                db.query(ChatMessage).filter(
+                    ChatMessage.chat_id.in_(
+                        select(Chat.id).where(Chat.user_id.in_(shared_chat_ids))
+                    )
+                ).delete(synchronize_session=False)
                 db.query(Chat).filter(Chat.user_id.in_(shared_chat_ids)).delete()
                 db.commit()
 
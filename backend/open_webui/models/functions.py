@@ -6,7 +6,7 @@ from open_webui.internal.db import Base, JSONField, get_db
 from open_webui.models.users import Users
 from open_webui.env import SRC_LOG_LEVELS
 from pydantic import BaseModel, ConfigDict
-from sqlalchemy import BigInteger, Boolean, Column, String, Text
+from sqlalchemy import BigInteger, Boolean, Column, String, Text, func
 
 log = logging.getLogger(__name__)
 log.setLevel(SRC_LOG_LEVELS["MODELS"])
@@ -146,6 +146,19 @@ class FunctionsTable:
                     for function in db.query(Function).filter_by(type=type).all()
                 ]
 
+    def get_functions_state_by_type(self, type: str) -> tuple[int, int]:
+        """
+        Returns the number and latest `updated_at` of the functions of `type`,
+        which change whenever one of them is created, updated or deleted.
+        """
+        with get_db() as db:
+            count, updated_at = (
+                db.query(func.count(Function.id), func.max(Function.updated_at))
+                .filter_by(type=type)
+                .one()
+            )
+            return count, updated_at or 0
+
     def get_global_filter_functions(self) -> list[FunctionModel]:
         with get_db() as db:
             return [
@@ -11,7 +11,7 @@ from open_webui.models.files import FileMetadataResponse
 
 
 from pydantic import BaseModel, ConfigDict
-from sqlalchemy import BigInteger, Column, String, Text, JSON, func
+from sqlalchemy import BigInteger, Column, Index, Text, JSON
 
 
 log = logging.getLogger(__name__)
@@ -41,6 +41,16 @@ class Group(Base):
     updated_at = Column(BigInteger)
 
 
+class GroupMember(Base):
+    # Index of `Group.user_ids`, kept in sync by GroupTable
+    __tablename__ = "group_member"
+
+    group_id = Column(Text, primary_key=True)
+    user_id = Column(Text, primary_key=True)
+
+    __table_args__ = (Index("group_member_user_id_idx", "user_id"),)
+
+
 class GroupModel(BaseModel):
     model_config = ConfigDict(from_attributes=True)
     id: str
@@ -89,6 +99,15 @@ class GroupUpdateForm(GroupForm):
 
 
 class GroupTable:
+    def _set_members(self, db, id: str, user_ids: Optional[list[str]]):
+        db.query(GroupMember).filter_by(group_id=id).delete()
+        db.add_all(
+            [
+                GroupMember(group_id=id, user_id=user_id)
+                for user_id in dict.fromkeys(user_ids or [])
+            ]
+        )
+
     def insert_new_group(
         self, user_id: str, form_data: GroupForm
     ) -> Optional[GroupModel]:
@@ -106,6 +125,7 @@ class GroupTable:
             try:
                 result = Group(**group.model_dump())
                 db.add(result)
+                self._set_members(db, group.id, group.user_ids)
                 db.commit()
                 db.refresh(result)
                 if result:
@@ -128,12 +148,8 @@ class GroupTable:
             return [
                 GroupModel.model_validate(group)
                 for group in db.query(Group)
-                .filter(
-                    func.json_array_length(Group.user_ids) > 0
-                )  # Ensure array exists
-                .filter(
-                    Group.user_ids.cast(String).like(f'%"{user_id}"%')
-                )  # String-based check
+                .join(GroupMember, GroupMember.group_id == Group.id)
+                .filter(GroupMember.user_id == user_id)
                 .order_by(Group.updated_at.desc())
                 .all()
             ]
@@ -164,6 +180,8 @@ class GroupTable:
                         "updated_at": int(time.time()),
                     }
                 )
+                if form_data.user_ids is not None:
+                    self._set_members(db, id, form_data.user_ids)
                 db.commit()
                 return self.get_group_by_id(id=id)
         except Exception as e:
@@ -174,6 +192,7 @@ class GroupTable:
         try:
             with get_db() as db:
                 db.query(Group).filter_by(id=id).delete()
+                db.query(GroupMember).filter_by(group_id=id).delete()
                 db.commit()
                 return True
         except Exception:
@@ -183,6 +202,7 @@ class GroupTable:
         with get_db() as db:
             try:
                 db.query(Group).delete()
+                db.query(GroupMember).delete()
                 db.commit()
 
                 return True
@@ -0,0 +1,228 @@
+import logging
+import time
+import uuid
+from typing import Optional
+
+from open_webui.internal.db import Base, get_db
+
+from open_webui.env import SRC_LOG_LEVELS
+from pydantic import BaseModel, ConfigDict
+from sqlalchemy import BigInteger, Boolean, Column, Float, Index, Integer, Text, JSON
+from sqlalchemy import and_, or_
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["MODELS"])
+
+
+####################
+# IngestionJob DB Schema
+####################
+
+
+class IngestionJob(Base):
+    __tablename__ = "ingestion_job"
+
+    id = Column(Text, primary_key=True)
+    user_id = Column(Text)
+    type = Column(Text)
+
+    # pending, running, completed, failed or cancelled
+    status = Column(Text)
+    progress = Column(Float, default=0.0)
+
+    data = Column(JSON, nullable=True)
+    result = Column(JSON, nullable=True)
+    error = Column(Text, nullable=True)
+
+    attempts = Column(Integer, default=0)
+    cancel_requested = Column(Boolean, default=False)
+
+    # Pending jobs are not run before this time (retry backoff)
+    scheduled_at = Column(BigInteger)
+    created_at = Column(BigInteger)
+    updated_at = Column(BigInteger)
+
+    __table_args__ = (Index("ingestion_job_status_idx", "status", "scheduled_at"),)
+
+
+class IngestionJobModel(BaseModel):
+    id: str
+    user_id: str
+    type: str
+
+    status: str
+    progress: float = 0.0
+
+    data: Optional[dict] = None
+    result: Optional[dict] = None
+    error: Optional[str] = None
+
+    attempts: int = 0
+    cancel_requested: bool = False
+
+    scheduled_at: int
+    created_at: int  # timestamp in epoch
+    updated_at: int  # timestamp in epoch
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class IngestionJobsTable:
+    def insert_new_job(
+        self, user_id: str, type: str, data: dict
+    ) -> Optional[IngestionJobModel]:
+        with get_db() as db:
+            now = int(time.time())
+            job = IngestionJobModel(
+                **{
+                    "id": str(uuid.uuid4()),
+                    "user_id": user_id,
+                    "type": type,
+                    "status": "pending",
+                    "data": data,
+                    "scheduled_at": now,
+                    "created_at": now,
+                    "updated_at": now,
+                }
+            )
+
+            try:
+                result = IngestionJob(**job.model_dump())
+                db.add(result)
+                db.commit()
+                db.refresh(result)
+                return IngestionJobModel.model_validate(result)
+            except Exception as e:
+                log.exception(e)
+                return None
+
+    def get_job_by_id(self, id: str) -> Optional[IngestionJobModel]:
+        with get_db() as db:
+            job = db.get(IngestionJob, id)
+            return IngestionJobModel.model_validate(job) if job else None
+
+    def get_jobs_by_user_id(
+        self, user_id: str, limit: int = 50
+    ) -> list[IngestionJobModel]:
+        with get_db() as db:
+            return [
+                IngestionJobModel.model_validate(job)
+                for job in db.query(IngestionJob)
+                .filter_by(user_id=user_id)
+                .order_by(IngestionJob.created_at.desc())
+                .limit(limit)
+                .all()
+            ]
+
+    def claim_next_job(self, timeout: int) -> Optional[IngestionJobModel]:
+        """
+        Marks the oldest runnable job as running and returns it. Running jobs
+        not updated for `timeout` seconds (e.g. their worker was stopped) are
+        runnable again, workers touch the jobs they run more often than that.
+        Safe to call from several workers: a job is only claimed if nobody
+        changed it since it was read.
+        """
+        now = int(time.time())
+        with get_db() as db:
+            candidates = (
+                db.query(IngestionJob.id, IngestionJob.status, IngestionJob.updated_at)
+                .filter(
+                    or_(
+                        and_(
+                            IngestionJob.status == "pending",
+                            IngestionJob.scheduled_at <= now,
+                        ),
+                        and_(
+                            IngestionJob.status == "running",
+                            IngestionJob.updated_at < now - timeout,
+                        ),
+                    )
+                )
+                .order_by(IngestionJob.created_at)
+                .limit(10)
+                .all()
+            )
+
+            for id, status, updated_at in candidates:
+                claimed = (
+                    db.query(IngestionJob)
+                    .filter_by(id=id, status=status, updated_at=updated_at)
+                    .update(
+                        {
+                            "status": "running",
+                            "attempts": IngestionJob.attempts + 1,
+                            "updated_at": now,
+                        },
+                        synchronize_session=False,
+                    )
+                )
+                db.commit()
+                if claimed:
+                    return IngestionJobModel.model_validate(db.get(IngestionJob, id))
+
+            return None
+
+    def update_job_progress(self, id: str, attempts: int, progress: float) -> bool:
+        """
+        Records the progress of run `attempts` of a job. Returns whether to stop
+        it: it was cancelled, or claimed again by another worker.
+        """
+        with get_db() as db:
+            updated = (
+                db.query(IngestionJob)
+                .filter_by(id=id, status="running", attempts=attempts)
+                .update({"progress": progress, "updated_at": int(time.time())})
+            )
+            db.commit()
+
+            job = db.get(IngestionJob, id)
+            return not updated or job is None or job.cancel_requested
+
+    def touch_job(self, id: str, attempts: int) -> bool:
+        """
+        Keeps run `attempts` of a job from being claimed again while it runs.
+        Returns whether the run still owns the job.
+        """
+        with get_db() as db:
+            updated = (
+                db.query(IngestionJob)
+                .filter_by(id=id, status="running", attempts=attempts)
+                .update({"updated_at": int(time.time())})
+            )
+            db.commit()
+            return bool(updated)
+
+    def update_job_status_by_id(
+        self, id: str, attempts: int, status: str, **updated
+    ) -> Optional[IngestionJobModel]:
+        """
+        Ends run `attempts` of a job. Returns None without updating it if the
+        run no longer owns the job, i.e. it was claimed again by another worker.
+        """
+        with get_db() as db:
+            owned = (
+                db.query(IngestionJob)
+                .filter_by(id=id, status="running", attempts=attempts)
+                .update({**updated, "status": status, "updated_at": int(time.time())})
+            )
+            db.commit()
+            return self.get_job_by_id(id) if owned else None
+
+    def cancel_job_by_id(self, id: str) -> Optional[IngestionJobModel]:
+        """
+        Cancels a pending job right away, and asks the worker of a running job
+        to stop at its next progress update.
+        """
+        with get_db() as db:
+            now = int(time.time())
+            db.query(IngestionJob).filter_by(id=id, status="pending").update(
+                {"status": "cancelled", "cancel_requested": True, "updated_at": now}
+            )
+            db.query(IngestionJob).filter_by(id=id, status="running").update(
+                {"cancel_requested": True}
+            )
+            db.commit()
+            return self.get_job_by_id(id)
+
+
+IngestionJobs = IngestionJobsTable()
@@ -5,10 +5,11 @@ from typing import Optional
 
 from open_webui.internal.db import Base, get_db
 from open_webui.models.tags import TagModel, Tag, Tags
+from open_webui.models.users import User, UserNameResponse
 
 
 from pydantic import BaseModel, ConfigDict
-from sqlalchemy import BigInteger, Boolean, Column, String, Text, JSON
+from sqlalchemy import BigInteger, Boolean, Column, Index, String, Text, JSON
 from sqlalchemy import or_, func, select, and_, text
 from sqlalchemy.sql import exists
 
@@ -25,6 +26,8 @@ class MessageReaction(Base):
     name = Column(Text)
     created_at = Column(BigInteger)
 
+    __table_args__ = (Index("message_reaction_message_id_idx", "message_id"),)
+
 
 class MessageReactionModel(BaseModel):
     model_config = ConfigDict(from_attributes=True)
@@ -52,6 +55,12 @@ class Message(Base):
     created_at = Column(BigInteger)  # time_ns
     updated_at = Column(BigInteger)  # time_ns
 
+    __table_args__ = (
+        # Pages of a channel and of a thread, newest first
+        Index("message_channel_id_idx", "channel_id", "parent_id", "created_at"),
+        Index("message_parent_id_idx", "parent_id", "created_at"),
+    )
+
 
 class MessageModel(BaseModel):
     model_config = ConfigDict(from_attributes=True)
@@ -94,6 +103,10 @@ class MessageResponse(MessageModel):
     reactions: list[Reactions]
 
 
+class MessageUserResponse(MessageResponse):
+    user: Optional[UserNameResponse] = None
+
+
 class MessageTable:
     def insert_new_message(
         self, form_data: MessageForm, channel_id: str, user_id: str
@@ -128,18 +141,109 @@ class MessageTable:
             if not message:
                 return None
 
-            reactions = self.get_reactions_by_message_id(id)
-            replies = self.get_replies_by_message_id(id)
+            reply_stats = self._get_reply_stats_by_message_ids(db, [id])
+            reactions = self._get_reactions_by_message_ids(db, [id])
 
             return MessageResponse(
                 **{
                     **MessageModel.model_validate(message).model_dump(),
-                    "latest_reply_at": replies[0].created_at if replies else None,
-                    "reply_count": len(replies),
-                    "reactions": reactions,
+                    "latest_reply_at": reply_stats.get(id, (0, None))[1],
+                    "reply_count": reply_stats.get(id, (0, None))[0],
+                    "reactions": reactions.get(id, []),
                 }
             )
 
+    def _get_reply_stats_by_message_ids(
+        self, db, ids: list[str]
+    ) -> dict[str, tuple[int, int]]:
+        """Returns the reply count and latest reply time of the messages."""
+        if not ids:
+            return {}
+
+        return {
+            parent_id: (count, latest_reply_at)
+            for parent_id, count, latest_reply_at in db.query(
+                Message.parent_id, func.count(Message.id), func.max(Message.created_at)
+            )
+            .filter(Message.parent_id.in_(ids))
+            .group_by(Message.parent_id)
+            .all()
+        }
+
+    def _get_reactions_by_message_ids(
+        self, db, ids: list[str]
+    ) -> dict[str, list[Reactions]]:
+        if not ids:
+            return {}
+
+        # message id -> name -> reaction
+        reactions: dict[str, dict[str, dict]] = {}
+        for message_id, user_id, name in (
+            db.query(
+                MessageReaction.message_id,
+                MessageReaction.user_id,
+                MessageReaction.name,
+            )
+            .filter(MessageReaction.message_id.in_(ids))
+            .order_by(MessageReaction.created_at)
+            .all()
+        ):
+            reaction = reactions.setdefault(message_id, {}).setdefault(
+                name, {"name": name, "user_ids": [], "count": 0}
+            )
+            reaction["user_ids"].append(user_id)
+            reaction["count"] += 1
+
+        return {
+            message_id: [Reactions(**reaction) for reaction in by_name.values()]
+            for message_id, by_name in reactions.items()
+        }
+
+    def _get_message_user_responses(
+        self, db, messages: list[Message], replies: bool = True
+    ) -> list[MessageUserResponse]:
+        """
+        Builds the responses of `messages` with their reply counts, reactions
+        and authors, in three queries whatever the number of messages.
+        """
+        ids = [message.id for message in messages]
+
+        reply_stats = self._get_reply_stats_by_message_ids(db, ids) if replies else {}
+        reactions = self._get_reactions_by_message_ids(db, ids)
+
+        user_ids = list({message.user_id for message in messages})
+        users = {
+            user.id: UserNameResponse(
+                id=user.id,
+                name=user.name,
+                role=user.role,
+                profile_image_url=user.profile_image_url,
+            )
+            for user in (
+                db.query(User).filter(User.id.in_(user_ids)).all() if user_ids else []
+            )
+        }
+
+        return [
+            MessageUserResponse(
+                **{
+                    **MessageModel.model_validate(message).model_dump(),
+                    "latest_reply_at": reply_stats.get(message.id, (0, None))[1],
+                    "reply_count": reply_stats.get(message.id, (0, None))[0],
+                    "reactions": reactions.get(message.id, []),
+                    "user": users.get(message.user_id),
+                }
+            )
+            for message in messages
+        ]
+
+    def get_message_user_response_by_id(self, id: str) -> Optional[MessageUserResponse]:
+        with get_db() as db:
+            message = db.get(Message, id)
+            if not message:
+                return None
+            return self._get_message_user_responses(db, [message])[0]
+
     def get_replies_by_message_id(self, id: str) -> list[MessageModel]:
         with get_db() as db:
             all_messages = (
@@ -193,6 +297,66 @@ class MessageTable:
                 MessageModel.model_validate(message) for message in all_messages
             ] + [MessageModel.model_validate(message)]
 
+    def get_message_page_by_channel_id(
+        self,
+        channel_id: str,
+        before: Optional[int] = None,
+        skip: int = 0,
+        limit: int = 50,
+    ) -> list[MessageUserResponse]:
+        """
+        Top-level messages of the channel, newest first, with their replies,
+        reactions and authors. `before` is a cursor: the `created_at` of the
+        oldest message of the previous page.
+        """
+        with get_db() as db:
+            query = db.query(Message).filter_by(channel_id=channel_id, parent_id=None)
+            if before is not None:
+                query = query.filter(Message.created_at < before)
+
+            messages = (
+                query.order_by(Message.created_at.desc())
+                .offset(skip)
+                .limit(limit)
+                .all()
+            )
+            return self._get_message_user_responses(db, messages)
+
+    def get_thread_page_by_parent_id(
+        self,
+        channel_id: str,
+        parent_id: str,
+        before: Optional[int] = None,
+        skip: int = 0,
+        limit: int = 50,
+    ) -> list[MessageUserResponse]:
+        """
+        Replies to the message, newest first, with their reactions and
+        authors. The first page ends with the parent message itself.
+        """
+        with get_db() as db:
+            parent = db.get(Message, parent_id)
+            if not parent:
+                return []
+
+            query = db.query(Message).filter_by(
+                channel_id=channel_id, parent_id=parent_id
+            )
+            if before is not None:
+                query = query.filter(Message.created_at < before)
+
+            messages = (
+                query.order_by(Message.created_at.desc())
+                .offset(skip)
+                .limit(limit)
+                .all()
+            )
+
+            responses = self._get_message_user_responses(db, messages, replies=False)
+            if before is None and skip == 0:
+                responses += self._get_message_user_responses(db, [parent])
+            return responses
+
     def update_message_by_id(
         self, id: str, form_data: MessageForm
     ) -> Optional[MessageModel]:
@@ -226,20 +390,7 @@ class MessageTable:
 
     def get_reactions_by_message_id(self, id: str) -> list[Reactions]:
         with get_db() as db:
-            all_reactions = db.query(MessageReaction).filter_by(message_id=id).all()
-
-            reactions = {}
-            for reaction in all_reactions:
-                if reaction.name not in reactions:
-                    reactions[reaction.name] = {
-                        "name": reaction.name,
-                        "user_ids": [],
-                        "count": 0,
-                    }
-                reactions[reaction.name]["user_ids"].append(reaction.user_id)
-                reactions[reaction.name]["count"] += 1
-
-            return [Reactions(**reaction) for reaction in reactions.values()]
+            return self._get_reactions_by_message_ids(db, [id]).get(id, [])
 
     def remove_reaction_by_id_and_user_id_and_name(
         self, id: str, user_id: str, name: str
@@ -1,7 +1,9 @@
+import threading
 import time
 from typing import Optional
 
 from open_webui.internal.db import Base, JSONField, get_db
+from open_webui.env import USER_CACHE_TTL, USER_LAST_ACTIVE_UPDATE_INTERVAL
 from open_webui.models.chats import Chats
 from pydantic import BaseModel, ConfigDict
 from sqlalchemy import BigInteger, Column, String, Text
@@ -90,6 +92,76 @@ class UserUpdateForm(BaseModel):
 
 
 class UsersTable:
+    def __init__(self):
+        # id -> (expiry, user) of recently authenticated users
+        self._cache: dict[str, tuple[float, UserModel]] = {}
+        # api key -> id of the users in `_cache`
+        self._api_keys: dict[str, str] = {}
+        # id -> last_active_at not written to the database yet
+        self._last_active: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def _cache_user(self, user: UserModel):
+        with self._lock:
+            now = time.monotonic()
+            if len(self._cache) > 1000:
+                expired = [
+                    id for id, (expiry, _) in self._cache.items() if expiry < now
+                ]
+                for id in expired:
+                    self._invalidate(id)
+
+            self._cache[user.id] = (now + USER_CACHE_TTL, user)
+            if user.api_key:
+                self._api_keys[user.api_key] = user.id
+
+    def _invalidate(self, id: str):
+        _, user = self._cache.pop(id, (None, None))
+        if user is not None and user.api_key:
+            self._api_keys.pop(user.api_key, None)
+
+    def invalidate_user_cache_by_id(self, id: str):
+        with self._lock:
+            self._invalidate(id)
+
+    def _get_cached_user(self, id: str) -> Optional[UserModel]:
+        with self._lock:
+            expiry, user = self._cache.get(id, (0, None))
+            if user is None or expiry < time.monotonic():
+                return None
+
+            user = user.model_copy()
+            if id in self._last_active:
+                user.last_active_at = self._last_active[id]
+            return user
+
+    def get_cached_user_by_id(self, id: str) -> Optional[UserModel]:
+        """
+        `get_user_by_id` served from a short-lived cache (USER_CACHE_TTL), for
+        authenticating requests. Updates through this table invalidate it.
+        """
+        if USER_CACHE_TTL <= 0:
+            return self.get_user_by_id(id)
+
+        user = self._get_cached_user(id)
+        if user is None:
+            user = self.get_user_by_id(id)
+            if user is not None:
+                self._cache_user(user)
+        return user
+
+    def get_cached_user_by_api_key(self, api_key: str) -> Optional[UserModel]:
+        if USER_CACHE_TTL <= 0:
+            return self.get_user_by_api_key(api_key)
+
+        id = self._api_keys.get(api_key)
+        user = self._get_cached_user(id) if id else None
+        if user is None or user.api_key != api_key:
+            user = self.get_user_by_api_key(api_key)
+            if user is not None:
+                self._cache_user(user)
+        return user
+
     def insert_new_user(
         self,
         id: str,
@@ -208,6 +280,7 @@ class UsersTable:
             with get_db() as db:
                 db.query(User).filter_by(id=id).update({"role": role})
                 db.commit()
+                self.invalidate_user_cache_by_id(id)
                 user = db.query(User).filter_by(id=id).first()
                 return UserModel.model_validate(user)
         except Exception:
@@ -222,6 +295,7 @@ class UsersTable:
                     {"profile_image_url": profile_image_url}
                 )
                 db.commit()
+                self.invalidate_user_cache_by_id(id)
 
                 user = db.query(User).filter_by(id=id).first()
                 return UserModel.model_validate(user)
@@ -241,6 +315,39 @@ class UsersTable:
         except Exception:
             return None
 
+    def touch_user_last_active_by_id(self, id: str):
+        """
+        Records activity of a user without writing to the database; pending
+        timestamps are written by `flush_user_last_active`, so every user costs
+        at most one write per USER_LAST_ACTIVE_UPDATE_INTERVAL.
+        """
+        if USER_LAST_ACTIVE_UPDATE_INTERVAL <= 0:
+            self.update_user_last_active_by_id(id)
+            return
+
+        with self._lock:
+            self._last_active[id] = int(time.time())
+
+    def flush_user_last_active(self):
+        with self._lock:
+            last_active, self._last_active = self._last_active, {}
+
+        if not last_active:
+            return
+
+        try:
+            with get_db() as db:
+                for id, last_active_at in last_active.items():
+                    db.query(User).filter_by(id=id).update(
+                        {"last_active_at": last_active_at}
+                    )
+                db.commit()
+        except Exception:
+            # Keep them for the next flush, unless newer ones were recorded
+            with self._lock:
+                self._last_active = {**last_active, **self._last_active}
+            raise
+
     def update_user_oauth_sub_by_id(
         self, id: str, oauth_sub: str
     ) -> Optional[UserModel]:
@@ -248,6 +355,7 @@ class UsersTable:
             with get_db() as db:
                 db.query(User).filter_by(id=id).update({"oauth_sub": oauth_sub})
                 db.commit()
+                self.invalidate_user_cache_by_id(id)
 
                 user = db.query(User).filter_by(id=id).first()
                 return UserModel.model_validate(user)
@@ -259,6 +367,7 @@ class UsersTable:
             with get_db() as db:
                 db.query(User).filter_by(id=id).update(updated)
                 db.commit()
+                self.invalidate_user_cache_by_id(id)
 
                 user = db.query(User).filter_by(id=id).first()
                 return UserModel.model_validate(user)
@@ -276,6 +385,7 @@ class UsersTable:
                     # Delete User
                     db.query(User).filter_by(id=id).delete()
                     db.commit()
+                    self.invalidate_user_cache_by_id(id)
 
                 return True
             else:
@@ -288,6 +398,7 @@ class UsersTable:
             with get_db() as db:
                 result = db.query(User).filter_by(id=id).update({"api_key": api_key})
                 db.commit()
+                self.invalidate_user_cache_by_id(id)
                 return True if result == 1 else False
         except Exception:
             return False
@@ -0,0 +1,447 @@
+import hashlib
+import json
+import logging
+import math
+import os
+import re
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Optional
+
+from open_webui.config import ENABLE_RAG_HYBRID_SEARCH, RAG_BM25_INDEX_DIR
+from open_webui.retrieval.vector.connector import VECTOR_DB_CLIENT
+from open_webui.env import SRC_LOG_LEVELS
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["RAG"])
+
+
+def tokenize(text: str) -> list[str]:
+    # Same as langchain's BM25Retriever default_preprocessing_func
+    return text.split()
+
+
+class BM25Index:
+    """
+    Inverted index over the documents of one collection.
+
+    Scores are identical to rank_bm25's BM25Okapi (as used by langchain's
+    BM25Retriever), but a query only visits the postings of its own terms
+    instead of scoring every document of the collection.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75, epsilon: float = 0.25):
+        self.k1 = k1
+        self.b = b
+        self.epsilon = epsilon
+
+        # id -> {"text", "metadata", "length"}
+        self.docs: dict[str, dict] = {}
+        # term -> {id: term frequency}
+        self.postings: dict[str, dict[str, int]] = {}
+        self.total_length = 0
+
+        self._idf: Optional[dict[str, float]] = None
+
+    def __len__(self):
+        return len(self.docs)
+
+    def add(self, items: list[dict]):
+        for item in items:
+            if item["id"] in self.docs:
+                self._remove(item["id"])
+
+            tokens = tokenize(item["text"])
+            self.docs[item["id"]] = {
+                "text": item["text"],
+                "metadata": item.get("metadata") or {},
+                "length": len(tokens),
+            }
+            self.total_length += len(tokens)
+
+            frequencies = {}
+            for token in tokens:
+                frequencies[token] = frequencies.get(token, 0) + 1
+            for token, frequency in frequencies.items():
+                self.postings.setdefault(token, {})[item["id"]] = frequency
+
+        self._idf = None
+
+    def _remove(self, id: str):
+        doc = self.docs.pop(id)
+        self.total_length -= doc["length"]
+
+        for token in set(tokenize(doc["text"])):
+            postings = self.postings.get(token)
+            if postings is not None:
+                postings.pop(id, None)
+                if not postings:
+                    del self.postings[token]
+
+    def delete(
+        self, ids: Optional[list[str]] = None, filter: Optional[dict] = None
+    ) -> bool:
+        if ids:
+            ids = [id for id in ids if id in self.docs]
+        elif filter:
+            ids = [
+                id
+                for id, doc in self.docs.items()
+                if all(
+                    doc["metadata"].get(key) == value for key, value in filter.items()
+                )
+            ]
+        else:
+            ids = []
+
+        for id in ids:
+            self._remove(id)
+
+        if ids:
+            self._idf = None
+        return len(ids) > 0
+
+    def get_idf(self) -> dict[str, float]:
+        # Recomputed once per change of the index, not per query
+        if self._idf is None:
+            corpus_size = len(self.docs)
+
+            idf = {}
+            idf_sum = 0.0
+            negative_idfs = []
+            for token, postings in self.postings.items():
+                value = math.log(corpus_size - len(postings) + 0.5) - math.log(
+                    len(postings) + 0.5
+                )
+                idf[token] = value
+                idf_sum += value
+                if value < 0:
+                    negative_idfs.append(token)
+
+            average_idf = idf_sum / len(idf) if idf else 0.0
+            for token in negative_idfs:
+                idf[token] = self.epsilon * average_idf
+
+            self._idf = idf
+        return self._idf
+
+    def search(self, query: str, k: int) -> list[tuple[str, float]]:
+        if not self.docs:
+            return []
+
+        idf = self.get_idf()
+        avgdl = self.total_length / len(self.docs)
+
+        scores: dict[str, float] = {}
+        for token in tokenize(query):
+            token_idf = idf.get(token) or 0
+            for id, frequency in self.postings.get(token, {}).items():
+                length = self.docs[id]["length"]
+                scores[id] = scores.get(id, 0.0) + token_idf * (
+                    frequency
+                    * (self.k1 + 1)
+                    / (
+                        frequency
+                        + self.k1 * (1 - self.b + self.b * length / (avgdl or 1))
+                    )
+                )
+
+        return sorted(scores.items(), key=lambda x: x[1], reverse=True)[:k]
+
+    def copy(self) -> "BM25Index":
+        index = BM25Index(k1=self.k1, b=self.b, epsilon=self.epsilon)
+        index.docs = dict(self.docs)
+        index.postings = {
+            token: dict(postings) for token, postings in self.postings.items()
+        }
+        index.total_length = self.total_length
+        return index
+
+    def to_dict(self) -> dict:
+        return {
+            "docs": {
+                id: {"text": doc["text"], "metadata": doc["metadata"]}
+                for id, doc in self.docs.items()
+            }
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "BM25Index":
+        index = cls()
+        index.add(
+            [
+                {"id": id, "text": doc["text"], "metadata": doc["metadata"]}
+                for id, doc in data.get("docs", {}).items()
+            ]
+        )
+        return index
+
+
+class BM25IndexManager:
+    """
+    Keeps one BM25Index per vector DB collection, persisted to `index_dir` as a
+    snapshot (`<name>.json`) and a log of the changes made since (`<name>.log`).
+
+    Adding or deleting documents appends one line to the log, which is folded
+    into the snapshot once it grows larger than it. A collection without a
+    snapshot (e.g. created before the index existed, or dropped) is indexed
+    once from the vector DB on first use.
+
+    Changes are made under a lock of their collection, shared with the other
+    workers through a lock file, so concurrent changes are all kept. Workers
+    notice each other's changes through the size of the log, and apply the new
+    lines to a copy of their loaded index; searches run without any lock, on
+    indexes that are never modified once loaded.
+    """
+
+    def __init__(
+        self,
+        index_dir: str = RAG_BM25_INDEX_DIR,
+        max_loaded: int = 64,
+        min_compact_size: int = 1024 * 1024,
+    ):
+        self.index_dir = index_dir
+        self.max_loaded = max_loaded
+        self.min_compact_size = min_compact_size
+
+        # collection name -> (index, state of the files it was loaded from)
+        self.indexes: OrderedDict[str, tuple[BM25Index, tuple]] = OrderedDict()
+        self._indexes_lock = threading.Lock()
+        # Collections are spread over a fixed set of locks
+        self._locks = [threading.Lock() for _ in range(64)]
+
+    def is_enabled(self) -> bool:
+        return ENABLE_RAG_HYBRID_SEARCH.value
+
+    def _get_path(self, collection_name: str, extension: str = "json") -> str:
+        if re.fullmatch(r"[A-Za-z0-9_-]{1,128}", collection_name):
+            filename = collection_name
+        else:
+            filename = hashlib.sha256(collection_name.encode()).hexdigest()
+        return os.path.join(self.index_dir, f"{filename}.{extension}")
+
+    @contextmanager
+    def _lock(self, collection_name: str):
+        try:
+            import fcntl
+        except ImportError:
+            # Windows, which runs a single worker
+            fcntl = None
+
+        with self._locks[hash(collection_name) % len(self._locks)]:
+            Path(self.index_dir).mkdir(parents=True, exist_ok=True)
+            with open(self._get_path(collection_name, "lock"), "a") as lock_file:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    if fcntl:
+                        fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _get_state(self, collection_name: str) -> Optional[tuple]:
+        """Identifies the snapshot and the size of the log, None without a snapshot."""
+        try:
+            stat = os.stat(self._get_path(collection_name))
+        except FileNotFoundError:
+            return None
+
+        try:
+            log_size = os.stat(self._get_path(collection_name, "log")).st_size
+        except FileNotFoundError:
+            log_size = 0
+
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size), log_size
+
+    def _cache(self, collection_name: str, index: BM25Index, state: tuple):
+        with self._indexes_lock:
+            self.indexes[collection_name] = (index, state)
+            self.indexes.move_to_end(collection_name)
+            while len(self.indexes) > self.max_loaded:
+                self.indexes.popitem(last=False)
+
+    def _get_cached(self, collection_name: str, state: Optional[tuple]):
+        with self._indexes_lock:
+            cached = self.indexes.get(collection_name)
+            if cached and cached[1] == state:
+                self.indexes.move_to_end(collection_name)
+                return cached[0]
+        return None
+
+    def _apply_log(self, collection_name: str, index: BM25Index, offset: int):
+        with open(self._get_path(collection_name, "log"), "rb") as f:
+            f.seek(offset)
+            for line in f:
+                change = json.loads(line)
+                if "add" in change:
+                    index.add(change["add"])
+                else:
+                    index.delete(**change["delete"])
+
+    def _load(self, collection_name: str) -> Optional[BM25Index]:
+        """The index with every change logged so far, the lock must be held."""
+        state = self._get_state(collection_name)
+        if state is None:
+            with self._indexes_lock:
+                self.indexes.pop(collection_name, None)
+            return None
+
+        with self._indexes_lock:
+            cached = self.indexes.get(collection_name)
+        if cached and cached[1] == state:
+            return cached[0]
+
+        if cached and cached[1][0] == state[0] and cached[1][1] < state[1]:
+            # Only new lines in the log, applied to a copy as searches may be
+            # using the loaded index
+            index = cached[0].copy()
+            offset = cached[1][1]
+        else:
+            with open(self._get_path(collection_name)) as f:
+                index = BM25Index.from_dict(json.load(f))
+            offset = 0
+
+        if state[1] > offset:
+            self._apply_log(collection_name, index, offset)
+
+        self._cache(collection_name, index, state)
+        return index
+
+    def _save(self, collection_name: str, index: BM25Index):
+        path = self._get_path(collection_name)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(index.to_dict(), f, default=str)
+        os.replace(tmp_path, path)
+
+        # A crash before this only replays changes the snapshot already has,
+        # which leaves the index the same
+        try:
+            os.remove(self._get_path(collection_name, "log"))
+        except FileNotFoundError:
+            pass
+
+        self._cache(collection_name, index, self._get_state(collection_name))
+
+    def _append(self, collection_name: str, change: dict):
+        with open(self._get_path(collection_name, "log"), "a") as f:
+            f.write(json.dumps(change, default=str) + "\n")
+
+        snapshot_state, log_size = self._get_state(collection_name)
+        if log_size > max(snapshot_state[2], self.min_compact_size):
+            self._save(collection_name, self._load(collection_name))
+
+    def _build(self, collection_name: str) -> BM25Index:
+        index = BM25Index()
+
+        result = VECTOR_DB_CLIENT.get(collection_name=collection_name)
+        if result and result.ids:
+            index.add(
+                [
+                    {"id": id, "text": text, "metadata": metadata}
+                    for id, text, metadata in zip(
+                        result.ids[0], result.documents[0], result.metadatas[0]
+                    )
+                ]
+            )
+
+        log.info(f"Built BM25 index for {collection_name} ({len(index)} documents)")
+        self._save(collection_name, index)
+        return index
+
+    def _drop(self, collection_name: str):
+        with self._indexes_lock:
+            self.indexes.pop(collection_name, None)
+        for extension in ["json", "log"]:
+            try:
+                os.remove(self._get_path(collection_name, extension))
+            except FileNotFoundError:
+                pass
+
+    def _get(self, collection_name: str) -> BM25Index:
+        index = self._get_cached(collection_name, self._get_state(collection_name))
+        if index is not None:
+            return index
+
+        with self._lock(collection_name):
+            try:
+                index = self._load(collection_name)
+            except Exception as e:
+                log.warning(
+                    f"Rebuilding unreadable BM25 index of {collection_name}: {e}"
+                )
+                index = None
+            return index if index is not None else self._build(collection_name)
+
+    def search(self, collection_name: str, query: str, k: int) -> list[dict]:
+        index = self._get(collection_name)
+
+        return [
+            {
+                "id": id,
+                "text": index.docs[id]["text"],
+                # Copied, callers (e.g. the reranker) add keys to it
+                "metadata": {**index.docs[id]["metadata"]},
+                "score": score,
+            }
+            for id, score in index.search(query, k)
+        ]
+
+    def _update(self, collection_name: str, change: dict):
+        if not self.is_enabled():
+            # Not kept up to date without hybrid search, so rebuilt from the
+            # vector DB if it is enabled again
+            if self._get_state(collection_name) is not None:
+                self.drop(collection_name)
+            return
+
+        with self._lock(collection_name):
+            try:
+                # Without a snapshot there is nothing to update, the next build
+                # reads the collection, which already has the change
+                if self._get_state(collection_name) is not None:
+                    self._append(collection_name, change)
+            except Exception as e:
+                # The vector DB is the source of truth, rebuild on next use
+                log.exception(f"Failed to update BM25 index of {collection_name}: {e}")
+                self._drop(collection_name)
+
+    def add(self, collection_name: str, items: list[dict]):
+        self._update(
+            collection_name,
+            {
+                "add": [
+                    {
+                        "id": item["id"],
+                        "text": item["text"],
+                        "metadata": item.get("metadata") or {},
+                    }
+                    for item in items
+                ]
+            },
+        )
+
+    def delete(
+        self,
+        collection_name: str,
+        ids: Optional[list[str]] = None,
+        filter: Optional[dict] = None,
+    ):
+        self._update(collection_name, {"delete": {"ids": ids, "filter": filter}})
+
+    def drop(self, collection_name: str):
+        with self._lock(collection_name):
+            self._drop(collection_name)
+
+    def reset(self):
+        with self._indexes_lock:
+            self.indexes.clear()
+        if os.path.isdir(self.index_dir):
+            for filename in os.listdir(self.index_dir):
+                if filename.endswith((".json", ".log")):
+                    os.remove(os.path.join(self.index_dir, filename))
+
+
+BM25_INDEX = BM25IndexManager()
@@ -0,0 +1,264 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+import redis
+
+from open_webui.config import (
+    RAG_EMBEDDING_CACHE_SIZE,
+    RAG_EMBEDDING_CACHE_BACKEND,
+    RAG_EMBEDDING_CACHE_DIR,
+    RAG_EMBEDDING_CACHE_DISK_SIZE,
+    RAG_EMBEDDING_CACHE_REDIS_URL,
+    RAG_EMBEDDING_CACHE_TTL,
+)
+from open_webui.env import SRC_LOG_LEVELS
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["RAG"])
+
+
+class DiskEmbeddingStore:
+    """SQLite file holding the `max_size` most recently used embeddings."""
+
+    def __init__(self, path: str, max_size: int):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._writes = 0
+
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS embedding (key TEXT PRIMARY KEY, "
+            "embedding TEXT NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS embedding_accessed_at "
+            "ON embedding (accessed_at)"
+        )
+        self.conn.commit()
+
+    def get_many(self, keys: list[str]) -> dict[str, list[float]]:
+        with self._lock:
+            rows = self.conn.execute(
+                f"SELECT key, embedding FROM embedding "
+                f"WHERE key IN ({','.join('?' * len(keys))})",
+                keys,
+            ).fetchall()
+            if rows:
+                self.conn.executemany(
+                    "UPDATE embedding SET accessed_at = ? WHERE key = ?",
+                    [(time.time(), key) for key, _ in rows],
+                )
+                self.conn.commit()
+
+        return {key: json.loads(embedding) for key, embedding in rows}
+
+    def set_many(self, items: dict[str, list[float]]):
+        with self._lock:
+            now = time.time()
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO embedding (key, embedding, accessed_at) "
+                "VALUES (?, ?, ?)",
+                [(key, json.dumps(value), now) for key, value in items.items()],
+            )
+
+            # Evicting needs a count, so it only runs every few hundred writes
+            self._writes += len(items)
+            if self._writes >= 256:
+                self._writes = 0
+                self.conn.execute(
+                    "DELETE FROM embedding WHERE key IN (SELECT key FROM embedding "
+                    "ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_size,),
+                )
+            self.conn.commit()
+
+
+class RedisEmbeddingStore:
+    """Embeddings shared by all workers, expiring `ttl` seconds after the write."""
+
+    def __init__(self, redis_url: str, ttl: int, prefix: str = "open-webui:embedding"):
+        self.redis = redis.Redis.from_url(redis_url)
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get_many(self, keys: list[str]) -> dict[str, list[float]]:
+        values = self.redis.mget([f"{self.prefix}:{key}" for key in keys])
+        return {
+            key: json.loads(value)
+            for key, value in zip(keys, values)
+            if value is not None
+        }
+
+    def set_many(self, items: dict[str, list[float]]):
+        pipe = self.redis.pipeline()
+        for key, value in items.items():
+            pipe.set(f"{self.prefix}:{key}", json.dumps(value), ex=self.ttl or None)
+        pipe.execute()
+
+
+class EmbeddingCache:
+    """
+    Content-addressed cache of query embeddings.
+
+    Entries are keyed by a hash of (engine, model, text), so switching the
+    embedding engine or model never returns embeddings of the previous one;
+    the in-memory LRU is also emptied when that happens. An optional second
+    tier on disk or in Redis survives restarts and is shared between workers.
+    """
+
+    def __init__(
+        self,
+        max_size: int = RAG_EMBEDDING_CACHE_SIZE,
+        backend: str = RAG_EMBEDDING_CACHE_BACKEND,
+    ):
+        self.max_size = max_size
+        self.memory: OrderedDict[str, list[float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.store = None
+        try:
+            if backend == "disk":
+                self.store = DiskEmbeddingStore(
+                    os.path.join(RAG_EMBEDDING_CACHE_DIR, "embeddings.db"),
+                    RAG_EMBEDDING_CACHE_DISK_SIZE,
+                )
+            elif backend == "redis":
+                self.store = RedisEmbeddingStore(
+                    RAG_EMBEDDING_CACHE_REDIS_URL, RAG_EMBEDDING_CACHE_TTL
+                )
+        except Exception as e:
+            log.warning(f"Embedding cache backend {backend} unavailable: {e}")
+
+        self.active_model = None
+        self.stats = {"hits": 0, "store_hits": 0, "misses": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    def get_key(self, engine: str, model: str, text: str) -> str:
+        return hashlib.sha256(f"{engine}\0{model}\0{text}".encode()).hexdigest()
+
+    def _remember(self, key: str, embedding: list[float]):
+        self.memory[key] = embedding
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_size:
+            self.memory.popitem(last=False)
+
+    def get_many(self, keys: list[str]) -> list[Optional[list[float]]]:
+        results = []
+        with self._lock:
+            for key in keys:
+                embedding = self.memory.get(key)
+                if embedding is not None:
+                    self.memory.move_to_end(key)
+                results.append(embedding)
+
+        missing = [key for key, embedding in zip(keys, results) if embedding is None]
+        stored = {}
+        if missing and self.store is not None:
+            try:
+                stored = self.store.get_many(missing)
+            except Exception as e:
+                log.debug(f"Embedding cache lookup failed: {e}")
+
+        with self._lock:
+            for idx, key in enumerate(keys):
+                if results[idx] is not None:
+                    self.stats["hits"] += 1
+                elif key in stored:
+                    results[idx] = stored[key]
+                    self._remember(key, stored[key])
+                    self.stats["store_hits"] += 1
+                else:
+                    self.stats["misses"] += 1
+
+        return results
+
+    def set_many(self, items: dict[str, list[float]]):
+        with self._lock:
+            for key, embedding in items.items():
+                self._remember(key, embedding)
+
+        if self.store is not None:
+            try:
+                self.store.set_many(items)
+            except Exception as e:
+                log.debug(f"Embedding cache write failed: {e}")
+
+    def clear(self):
+        with self._lock:
+            self.memory.clear()
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {
+                **self.stats,
+                "size": len(self.memory),
+                "max_size": self.max_size,
+                "backend": type(self.store).__name__ if self.store else None,
+            }
+
+    def wrap(self, engine: str, model: str, embedding_function):
+        """
+        Returns `embedding_function` (str or list[str] -> embedding(s)) with
+        cached embeddings served from the cache; only missing texts are
+        embedded, in one call.
+        """
+        if not self.enabled:
+            return embedding_function
+
+        with self._lock:
+            if self.active_model != (engine, model):
+                if self.active_model is not None:
+                    log.info(f"Embedding model changed to {model}, clearing cache")
+                    self.memory.clear()
+                self.active_model = (engine, model)
+
+        def cached_embedding_function(query):
+            texts = query if isinstance(query, list) else [query]
+            keys = [self.get_key(engine, model, text) for text in texts]
+
+            embeddings = self.get_many(keys)
+            missing = list(
+                dict.fromkeys(
+                    text
+                    for text, embedding in zip(texts, embeddings)
+                    if embedding is None
+                )
+            )
+
+            if missing:
+                new_embeddings = embedding_function(missing)
+                if new_embeddings is None:
+                    return None
+
+                new_items = {
+                    self.get_key(engine, model, text): embedding
+                    for text, embedding in zip(missing, new_embeddings)
+                }
+                self.set_many(new_items)
+                embeddings = [
+                    embedding if embedding is not None else new_items[key]
+                    for key, embedding in zip(keys, embeddings)
+                ]
+
+            return embeddings if isinstance(query, list) else embeddings[0]
+
+        return cached_embedding_function
+
+
+EMBEDDING_CACHE = EmbeddingCache()
+
+
+def get_embedding_cache_stats() -> dict:
+    return EMBEDDING_CACHE.get_stats()
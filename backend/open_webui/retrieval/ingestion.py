@@ -0,0 +1,196 @@
+import asyncio
+import logging
+import time
+from typing import Callable, Optional
+
+from fastapi import Request
+
+from open_webui.config import (
+    INGESTION_WORKER_CONCURRENCY,
+    INGESTION_JOB_MAX_RETRIES,
+    INGESTION_JOB_TIMEOUT,
+)
+from open_webui.models.ingestion_jobs import IngestionJobModel, IngestionJobs
+from open_webui.socket.main import sio, USER_POOL
+from open_webui.env import SRC_LOG_LEVELS
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["RAG"])
+
+
+class IngestionJobCancelled(Exception):
+    pass
+
+
+async def emit_job_event(job: IngestionJobModel):
+    for session_id in await USER_POOL.members(job.user_id):
+        await sio.emit(
+            "ingestion-job",
+            job.model_dump(include={"id", "type", "status", "progress", "error"}),
+            to=session_id,
+        )
+
+
+class IngestionJobContext:
+    """Passed to job handlers, which run in a thread, to report their progress."""
+
+    def __init__(self, job: IngestionJobModel, loop: asyncio.AbstractEventLoop):
+        self.job = job
+        self.loop = loop
+
+    def progress(self, progress: float):
+        """
+        Records the progress (0 to 1) of the job and notifies its user. Raises
+        IngestionJobCancelled if the job was cancelled in the meantime, or
+        claimed again by another worker.
+        """
+        cancel_requested = IngestionJobs.update_job_progress(
+            self.job.id, self.job.attempts, progress
+        )
+
+        self.job = self.job.model_copy(update={"progress": progress})
+        asyncio.run_coroutine_threadsafe(emit_job_event(self.job), self.loop)
+
+        if cancel_requested:
+            raise IngestionJobCancelled()
+
+
+class IngestionQueue:
+    """
+    Durable queue of file processing jobs, stored in the database.
+
+    Every app worker runs `concurrency` consumers that claim jobs from the
+    table, so jobs survive restarts and are shared between workers. Failed
+    jobs are retried up to `max_retries` times with exponential backoff.
+
+    Handlers are registered per job type and called in a thread with
+    (request, job, context); their return value is stored as the job result.
+    """
+
+    def __init__(
+        self,
+        concurrency: int = INGESTION_WORKER_CONCURRENCY,
+        max_retries: int = INGESTION_JOB_MAX_RETRIES,
+        timeout: int = INGESTION_JOB_TIMEOUT,
+        poll_interval: float = 2.0,
+    ):
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+
+        self.handlers: dict[str, Callable] = {}
+
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.wakeup: Optional[asyncio.Event] = None
+
+    def register(self, type: str, handler: Callable):
+        self.handlers[type] = handler
+
+    def enqueue(self, user_id: str, type: str, data: dict) -> IngestionJobModel:
+        if type not in self.handlers:
+            raise ValueError(f"Unknown ingestion job type: {type}")
+
+        job = IngestionJobs.insert_new_job(user_id, type, data)
+        if job is None:
+            raise RuntimeError("Error creating ingestion job")
+
+        # Called from request threads, consumers otherwise notice it on their
+        # next poll
+        if self.loop is not None and self.wakeup is not None:
+            self.loop.call_soon_threadsafe(self.wakeup.set)
+        return job
+
+    async def run(self, app):
+        self.loop = asyncio.get_running_loop()
+        self.wakeup = asyncio.Event()
+
+        # Handlers get a request bound to the app, like the routes they reuse
+        request = Request({"type": "http", "app": app, "headers": []})
+        await asyncio.gather(*[self._consume(request) for _ in range(self.concurrency)])
+
+    async def _consume(self, request: Request):
+        while True:
+            try:
+                job = await asyncio.to_thread(
+                    IngestionJobs.claim_next_job, self.timeout
+                )
+            except Exception as e:
+                log.exception(f"Error claiming ingestion job: {e}")
+                job = None
+
+            if job is None:
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self.wakeup.clear()
+                continue
+
+            await self._run_job(request, job)
+
+    async def _keep_claimed(self, job: IngestionJobModel):
+        # Handlers may not report progress for longer than the timeout (e.g.
+        # while processing one large file), the job must not be claimed again
+        while True:
+            await asyncio.sleep(max(self.timeout / 3, 1))
+            try:
+                if not await asyncio.to_thread(
+                    IngestionJobs.touch_job, job.id, job.attempts
+                ):
+                    log.warning(f"Ingestion job {job.id} was claimed by another worker")
+                    return
+            except Exception as e:
+                log.error(f"Error touching ingestion job {job.id}: {e}")
+
+    async def _run_job(self, request: Request, job: IngestionJobModel):
+        log.info(f"Running ingestion job {job.id} ({job.type}, attempt {job.attempts})")
+        await emit_job_event(job)
+
+        # Only updated while this run still owns the job
+        def update_status(status: str, **updated):
+            return asyncio.to_thread(
+                IngestionJobs.update_job_status_by_id,
+                job.id,
+                job.attempts,
+                status,
+                **updated,
+            )
+
+        keep_claimed = asyncio.create_task(self._keep_claimed(job))
+        try:
+            if job.cancel_requested:
+                raise IngestionJobCancelled()
+
+            handler = self.handlers.get(job.type)
+            if handler is None:
+                raise ValueError(f"Unknown ingestion job type: {job.type}")
+
+            context = IngestionJobContext(job, self.loop)
+            result = await asyncio.to_thread(handler, request, job, context)
+
+            updated_job = await update_status(
+                "completed", progress=1.0, result=result, error=None
+            )
+        except IngestionJobCancelled:
+            log.info(f"Cancelled ingestion job {job.id}")
+            updated_job = await update_status("cancelled")
+        except Exception as e:
+            log.exception(f"Ingestion job {job.id} failed: {e}")
+
+            if job.attempts <= self.max_retries and job.type in self.handlers:
+                updated_job = await update_status(
+                    "pending",
+                    error=str(e),
+                    scheduled_at=int(time.time()) + 2**job.attempts,
+                )
+            else:
+                updated_job = await update_status("failed", error=str(e))
+        finally:
+            keep_claimed.cancel()
+
+        if updated_job is not None:
+            await emit_job_event(updated_job)
+
+
+INGESTION_QUEUE = IngestionQueue()
@@ -3,21 +3,6 @@ import logging
 import ftfy
 import sys
 
-from langchain_community.document_loaders import (
-    BSHTMLLoader,
-    CSVLoader,
-    Docx2txtLoader,
-    OutlookMessageLoader,
-    PyPDFLoader,
-    TextLoader,
-    UnstructuredEPubLoader,
-    UnstructuredExcelLoader,
-    UnstructuredMarkdownLoader,
-    UnstructuredPowerPointLoader,
-    UnstructuredRSTLoader,
-    UnstructuredXMLLoader,
-    YoutubeLoader,
-)
 from langchain_core.documents import Document
 from open_webui.env import SRC_LOG_LEVELS, GLOBAL_LOG_LEVEL
 
@@ -134,6 +119,22 @@ class Loader:
         ]
 
     def _get_loader(self, filename: str, file_content_type: str, file_path: str):
+        # Imported on first use, the loaders pull in heavy dependencies
+        from langchain_community.document_loaders import (
+            BSHTMLLoader,
+            CSVLoader,
+            Docx2txtLoader,
+            OutlookMessageLoader,
+            PyPDFLoader,
+            TextLoader,
+            UnstructuredEPubLoader,
+            UnstructuredExcelLoader,
+            UnstructuredMarkdownLoader,
+            UnstructuredPowerPointLoader,
+            UnstructuredRSTLoader,
+            UnstructuredXMLLoader,
+        )
+
         file_ext = filename.split(".")[-1].lower()
 
         if self.engine == "tika" and self.kwargs.get("TIKA_SERVER_URL"):
@@ -0,0 +1,101 @@
+import logging
+import threading
+import time
+from typing import Any, Callable, Iterable, Optional
+
+from open_webui.env import SRC_LOG_LEVELS
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["RAG"])
+
+# Seconds before a model that failed to load is tried again, doubled after
+# each failure in a row up to RETRY_MAX_INTERVAL
+RETRY_INTERVAL = 10
+RETRY_MAX_INTERVAL = 600
+
+
+class LazyModel:
+    """
+    Stands in for a model that is loaded on first use, or ahead of it in the
+    background with `preload`. Attributes are those of the loaded model, so
+    callers use it like the model itself and wait for it on first use.
+
+    A model that fails to load (e.g. its download was interrupted) is tried
+    again on the first use after RETRY_INTERVAL; until then using it raises.
+    """
+
+    def __init__(self, name: str, load: Callable[[], Any]):
+        self.name = name
+        self._load = load
+        self._lock = threading.Lock()
+        self._model = None
+
+        # pending, loading, ready or error
+        self.state = "pending"
+        self.error: Optional[str] = None
+        self.duration: Optional[float] = None
+
+        self.failures = 0
+        self.retry_at = 0.0
+
+    def load(self):
+        with self._lock:
+            if self.state == "error" and time.monotonic() >= self.retry_at:
+                log.info(f"Retrying to load the {self.name} model")
+                self.state = "pending"
+
+            if self.state == "pending":
+                self.state = "loading"
+                start_time = time.perf_counter()
+                try:
+                    self._model = self._load()
+                    if self._model is None:
+                        raise Exception("No model was loaded")
+                    self.state = "ready"
+                    self.error = None
+                    self.failures = 0
+                except Exception as e:
+                    log.error(f"Error loading the {self.name} model: {e}")
+                    self.error = str(e)
+                    self.state = "error"
+                    self.retry_at = time.monotonic() + min(
+                        RETRY_INTERVAL * 2**self.failures, RETRY_MAX_INTERVAL
+                    )
+                    self.failures += 1
+
+                self.duration = round(time.perf_counter() - start_time, 3)
+                if self.state == "ready":
+                    log.info(f"Loaded the {self.name} model in {self.duration:.2f}s")
+
+        if self.state == "error":
+            raise RuntimeError(f"The {self.name} model failed to load: {self.error}")
+        return self._model
+
+    def preload(self):
+        try:
+            self.load()
+        except RuntimeError:
+            # Already logged, and reported by the status
+            pass
+
+    def status(self) -> dict:
+        return {"state": self.state, "duration": self.duration, "error": self.error}
+
+    def __getattr__(self, name: str):
+        # Only called for what isn't an attribute of this object. Private and
+        # special names are left alone, copy and pickle look for those.
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self.load(), name)
+
+
+def are_models_ready(models: Iterable[LazyModel], preload: bool) -> bool:
+    """
+    Whether a worker can take requests: none of its models is loading, nor
+    (when they are preloaded) waiting to be. Models that failed don't hold
+    it back, they are tried again on first use.
+    """
+    return not any(
+        model.state == "loading" or (preload and model.state == "pending")
+        for model in models
+    )
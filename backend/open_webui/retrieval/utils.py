@@ -1,18 +1,29 @@
+import heapq
 import logging
 import os
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional, Union
 
+import aiohttp
 import asyncio
-import requests
 
 from huggingface_hub import snapshot_download
 from langchain.retrievers import ContextualCompressionRetriever, EnsembleRetriever
-from langchain_community.retrievers import BM25Retriever
 from langchain_core.documents import Document
 
+from open_webui.config import (
+    RAG_QUERY_CONCURRENCY,
+    RAG_EMBEDDING_CONCURRENCY,
+    RAG_EMBEDDING_MAX_RETRIES,
+)
+from open_webui.retrieval.bm25 import BM25_INDEX
+from open_webui.retrieval.embedding_cache import EMBEDDING_CACHE
 from open_webui.retrieval.vector.connector import VECTOR_DB_CLIENT
+from open_webui.retrieval.vector.main import SearchResult
+from open_webui.utils.http_client import get_http_session, run_coroutine_sync
 from open_webui.utils.misc import get_last_user_message
+from open_webui.utils.metrics import VECTOR_SEARCH_DURATION, time_embedding
 
 from open_webui.env import SRC_LOG_LEVELS, OFFLINE_MODE
 
@@ -37,11 +48,13 @@ class VectorSearchRetriever(BaseRetriever):
         *,
         run_manager: CallbackManagerForRetrieverRun,
     ) -> list[Document]:
-        result = VECTOR_DB_CLIENT.search(
-            collection_name=self.collection_name,
-            vectors=[self.embedding_function(query)],
-            limit=self.top_k,
-        )
+        query_embedding = self.embedding_function(query)
+        with VECTOR_SEARCH_DURATION.time():
+            result = VECTOR_DB_CLIENT.search(
+                collection_name=self.collection_name,
+                vectors=[query_embedding],
+                limit=self.top_k,
+            )
 
         ids = result.ids[0]
         metadatas = result.metadatas[0]
@@ -58,17 +71,43 @@ class VectorSearchRetriever(BaseRetriever):
         return results
 
 
+class BM25IndexRetriever(BaseRetriever):
+    collection_name: Any
+    top_k: int
+
+    def _get_relevant_documents(
+        self,
+        query: str,
+        *,
+        run_manager: CallbackManagerForRetrieverRun,
+    ) -> list[Document]:
+        results = BM25_INDEX.search(
+            collection_name=self.collection_name,
+            query=query,
+            k=self.top_k,
+        )
+
+        return [
+            Document(
+                metadata=result["metadata"],
+                page_content=result["text"],
+            )
+            for result in results
+        ]
+
+
 def query_doc(
     collection_name: str,
     query_embedding: list[float],
     k: int,
 ):
     try:
-        result = VECTOR_DB_CLIENT.search(
-            collection_name=collection_name,
-            vectors=[query_embedding],
-            limit=k,
-        )
+        with VECTOR_SEARCH_DURATION.time():
+            result = VECTOR_DB_CLIENT.search(
+                collection_name=collection_name,
+                vectors=[query_embedding],
+                limit=k,
+            )
 
         if result:
             log.info(f"query_doc:result {result.ids} {result.metadatas}")
@@ -88,13 +127,10 @@ def query_doc_with_hybrid_search(
     r: float,
 ) -> dict:
     try:
-        result = VECTOR_DB_CLIENT.get(collection_name=collection_name)
-
-        bm25_retriever = BM25Retriever.from_texts(
-            texts=result.documents[0],
-            metadatas=result.metadatas[0],
+        bm25_retriever = BM25IndexRetriever(
+            collection_name=collection_name,
+            top_k=k,
         )
-        bm25_retriever.k = k
 
         vector_search_retriever = VectorSearchRetriever(
             collection_name=collection_name,
@@ -132,44 +168,82 @@ def query_doc_with_hybrid_search(
         raise e
 
 
+def query_docs(
+    collection_name: str,
+    query_embeddings: list[list[float]],
+    k: int,
+) -> Optional[SearchResult]:
+    # One search for all query vectors, every backend returns one row per vector
+    with VECTOR_SEARCH_DURATION.time():
+        result = VECTOR_DB_CLIENT.search(
+            collection_name=collection_name,
+            vectors=query_embeddings,
+            limit=k,
+        )
+
+    if result is not None and len(result.ids) < len(query_embeddings):
+        # Backend only answered the first vector, search the others separately
+        for query_embedding in query_embeddings[len(result.ids) :]:
+            with VECTOR_SEARCH_DURATION.time():
+                row = VECTOR_DB_CLIENT.search(
+                    collection_name=collection_name,
+                    vectors=[query_embedding],
+                    limit=k,
+                )
+            if row is not None:
+                result.ids.extend(row.ids)
+                result.distances.extend(row.distances)
+                result.documents.extend(row.documents)
+                result.metadatas.extend(row.metadatas)
+
+    if result:
+        log.info(f"query_docs:result {result.ids} {result.metadatas}")
+
+    return result
+
+
+def get_query_embeddings(queries: list[str], embedding_function) -> list:
+    # All queries are embedded in a single (batched) call
+    queries = list(queries)
+    if not queries:
+        return []
+    return embedding_function(queries)
+
+
+def map_concurrently(func, items: list) -> list:
+    if len(items) <= 1:
+        return [func(item) for item in items]
+
+    with ThreadPoolExecutor(
+        max_workers=min(len(items), RAG_QUERY_CONCURRENCY)
+    ) as executor:
+        return list(executor.map(func, items))
+
+
 def merge_and_sort_query_results(
     query_results: list[dict], k: int, reverse: bool = False
 ) -> list[dict]:
-    # Initialize lists to store combined data
-    combined_distances = []
-    combined_documents = []
-    combined_metadatas = []
-
-    for data in query_results:
-        combined_distances.extend(data["distances"][0])
-        combined_documents.extend(data["documents"][0])
-        combined_metadatas.extend(data["metadatas"][0])
-
-    # Create a list of tuples (distance, document, metadata)
-    combined = list(zip(combined_distances, combined_documents, combined_metadatas))
-
-    # Sort the list based on distances
-    combined.sort(key=lambda x: x[0], reverse=reverse)
-
-    # We don't have anything :-(
-    if not combined:
-        sorted_distances = []
-        sorted_documents = []
-        sorted_metadatas = []
-    else:
-        # Unzip the sorted list
-        sorted_distances, sorted_documents, sorted_metadatas = zip(*combined)
+    # (distance, document, metadata) of every row of every result
+    combined = (
+        item
+        for data in query_results
+        for distances, documents, metadatas in zip(
+            data["distances"], data["documents"], data["metadatas"]
+        )
+        for item in zip(distances, documents, metadatas)
+    )
 
-        # Slicing the lists to include only k elements
-        sorted_distances = list(sorted_distances)[:k]
-        sorted_documents = list(sorted_documents)[:k]
-        sorted_metadatas = list(sorted_metadatas)[:k]
+    # Only the k best are kept in a bounded heap instead of sorting everything
+    if reverse:
+        top = heapq.nlargest(k, combined, key=lambda x: x[0])
+    else:
+        top = heapq.nsmallest(k, combined, key=lambda x: x[0])
 
     # Create the output dictionary
     result = {
-        "distances": [sorted_distances],
-        "documents": [sorted_documents],
-        "metadatas": [sorted_metadatas],
+        "distances": [[distance for distance, _, _ in top]],
+        "documents": [[document for _, document, _ in top]],
+        "metadatas": [[metadata for _, _, metadata in top]],
     }
 
     return result
@@ -181,25 +255,31 @@ def query_collection(
     embedding_function,
     k: int,
 ) -> dict:
+    collection_names = [name for name in collection_names if name]
+    query_embeddings = (
+        get_query_embeddings(queries, embedding_function) if collection_names else []
+    )
+
+    def process_collection(collection_name):
+        try:
+            result = query_docs(
+                collection_name=collection_name,
+                query_embeddings=query_embeddings,
+                k=k,
+            )
+            if result is not None:
+                return result.model_dump()
+        except Exception as e:
+            log.exception(f"Error when querying the collection: {e}")
+        return None
+
     results = []
-    for query in queries:
-        query_embedding = embedding_function(query)
-        for collection_name in collection_names:
-            if collection_name:
-                try:
-                    result = query_doc(
-                        collection_name=collection_name,
-                        k=k,
-                        query_embedding=query_embedding,
-                    )
-                    if result is not None:
-                        results.append(result.model_dump())
-                except Exception as e:
-                    log.exception(f"Error when querying the collection: {e}")
-            else:
-                pass
+    if query_embeddings:
+        results = map_concurrently(process_collection, collection_names)
 
-    return merge_and_sort_query_results(results, k=k)
+    return merge_and_sort_query_results(
+        [result for result in results if result is not None], k=k
+    )
 
 
 def query_collection_with_hybrid_search(
@@ -210,27 +290,45 @@ def query_collection_with_hybrid_search(
     reranking_function,
     r: float,
 ) -> dict:
-    results = []
-    error = False
-    for collection_name in collection_names:
+    collection_names = list(collection_names)
+    queries = list(dict.fromkeys(queries))
+
+    query_embeddings = dict(
+        zip(queries, get_query_embeddings(queries, embedding_function))
+    )
+
+    def query_embedding_function(query):
+        if isinstance(query, str) and query in query_embeddings:
+            return query_embeddings[query]
+        return embedding_function(query)
+
+    def process_query(task):
+        collection_name, query = task
         try:
-            for query in queries:
-                result = query_doc_with_hybrid_search(
-                    collection_name=collection_name,
-                    query=query,
-                    embedding_function=embedding_function,
-                    k=k,
-                    reranking_function=reranking_function,
-                    r=r,
-                )
-                results.append(result)
+            return query_doc_with_hybrid_search(
+                collection_name=collection_name,
+                query=query,
+                embedding_function=query_embedding_function,
+                k=k,
+                reranking_function=reranking_function,
+                r=r,
+            )
         except Exception as e:
             log.exception(
                 "Error when querying the collection with " f"hybrid_search: {e}"
             )
-            error = True
-
-    if error:
+            return None
+
+    results = map_concurrently(
+        process_query,
+        [
+            (collection_name, query)
+            for collection_name in collection_names
+            for query in queries
+        ],
+    )
+
+    if any(result is None for result in results):
         raise Exception(
             "Hybrid search failed for all collections. Using Non hybrid search as fallback."
         )
@@ -245,28 +343,27 @@ def get_embedding_function(
     url,
     key,
     embedding_batch_size,
+    cache: bool = True,
 ):
     if embedding_engine == "":
-        return lambda query: embedding_function.encode(query).tolist()
+        func = lambda query: embedding_function.encode(query).tolist()
     elif embedding_engine in ["ollama", "openai"]:
+        # Lists are split into batches that are embedded concurrently
         func = lambda query: generate_embeddings(
             engine=embedding_engine,
             model=embedding_model,
             text=query,
             url=url,
             key=key,
+            batch_size=embedding_batch_size,
         )
+    else:
+        return None
 
-        def generate_multiple(query, func):
-            if isinstance(query, list):
-                embeddings = []
-                for i in range(0, len(query), embedding_batch_size):
-                    embeddings.extend(func(query[i : i + embedding_batch_size]))
-                return embeddings
-            else:
-                return func(query)
-
-        return lambda query: generate_multiple(query, func)
+    func = time_embedding(embedding_engine, func)
+    if cache:
+        return EMBEDDING_CACHE.wrap(embedding_engine, embedding_model, func)
+    return func
 
 
 def get_sources_from_files(
@@ -410,72 +507,140 @@ def get_model_path(model: str, update_model: bool = False):
         return model
 
 
-def generate_openai_batch_embeddings(
-    model: str, texts: list[str], url: str = "https://api.openai.com/v1", key: str = ""
-) -> Optional[list[list[float]]]:
-    try:
-        r = requests.post(
-            f"{url}/embeddings",
-            headers={
-                "Content-Type": "application/json",
-                "Authorization": f"Bearer {key}",
-            },
-            json={"input": texts, "model": model},
-        )
-        r.raise_for_status()
-        data = r.json()
-        if "data" in data:
-            return [elem["embedding"] for elem in data["data"]]
-        else:
-            raise "Something went wrong :/"
-    except Exception as e:
-        print(e)
-        return None
-
-
-def generate_ollama_batch_embeddings(
-    model: str, texts: list[str], url: str, key: str = ""
-) -> Optional[list[list[float]]]:
-    try:
-        r = requests.post(
-            f"{url}/api/embed",
-            headers={
-                "Content-Type": "application/json",
-                "Authorization": f"Bearer {key}",
-            },
-            json={"input": texts, "model": model},
-        )
-        r.raise_for_status()
-        data = r.json()
-
-        if "embeddings" in data:
-            return data["embeddings"]
-        else:
-            raise "Something went wrong :/"
-    except Exception as e:
-        print(e)
-        return None
+class EmbeddingRequestError(Exception):
+    def __init__(self, status: int, message: str, retry_after: Optional[float] = None):
+        super().__init__(f"{status}: {message}")
+        self.status = status
+        self.retry_after = retry_after
+
+
+async def agenerate_batch_embeddings(
+    session: aiohttp.ClientSession,
+    engine: str,
+    model: str,
+    texts: list[str],
+    url: str,
+    key: str = "",
+) -> list[list[float]]:
+    async with session.post(
+        f"{url}/embeddings" if engine == "openai" else f"{url}/api/embed",
+        headers={
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {key}",
+        },
+        json={"input": texts, "model": model},
+    ) as r:
+        if r.status >= 400:
+            retry_after = r.headers.get("Retry-After")
+            raise EmbeddingRequestError(
+                r.status,
+                await r.text(),
+                float(retry_after) if retry_after and retry_after.isdigit() else None,
+            )
+        data = await r.json()
+
+    if engine == "openai" and "data" in data:
+        return [
+            elem["embedding"]
+            for elem in sorted(data["data"], key=lambda elem: elem.get("index", 0))
+        ]
+    elif engine == "ollama" and "embeddings" in data:
+        return data["embeddings"]
+    raise Exception("Something went wrong :/")
+
+
+async def agenerate_embeddings(
+    engine: str,
+    model: str,
+    texts: list[str],
+    url: str,
+    key: str = "",
+    batch_size: Optional[int] = None,
+    concurrency: int = RAG_EMBEDDING_CONCURRENCY,
+    max_retries: int = RAG_EMBEDDING_MAX_RETRIES,
+) -> list[list[float]]:
+    """
+    Embeds `texts` in batches of `batch_size`, `concurrency` batches at a time,
+    and returns the embeddings in the order of `texts`.
+
+    Batches rejected with 429/5xx or failing to connect are retried with
+    exponential backoff. Batches rejected as too large (413) are split in
+    half, and later batches are sent at the reduced size.
+    """
+    embeddings: list[Optional[list[float]]] = [None] * len(texts)
+    max_batch_size = {"value": max(batch_size or len(texts), 1)}
+    semaphore = asyncio.Semaphore(concurrency)
+
+    session = await get_http_session(url)
+
+    async def embed(start: int, end: int):
+        if end - start > max_batch_size["value"]:
+            middle = start + max_batch_size["value"]
+            await asyncio.gather(embed(start, middle), embed(middle, end))
+            return
+
+        for attempt in range(max_retries + 1):
+            try:
+                async with semaphore:
+                    embeddings[start:end] = await agenerate_batch_embeddings(
+                        session, engine, model, texts[start:end], url, key
+                    )
+                return
+            except EmbeddingRequestError as e:
+                if e.status == 413 and end - start > 1:
+                    max_batch_size["value"] = min(
+                        max_batch_size["value"], (end - start) // 2
+                    )
+                    log.info(
+                        f"Embedding batch too large, reducing batch size to {max_batch_size['value']}"
+                    )
+                    await embed(start, end)
+                    return
+                if not (e.status == 429 or e.status >= 500):
+                    raise
+                if attempt == max_retries:
+                    raise
+                delay = e.retry_after or 2**attempt
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                if attempt == max_retries:
+                    raise
+                delay = 2**attempt
+
+            log.debug(f"Retrying embedding batch in {delay}s")
+            await asyncio.sleep(delay)
+
+    step = max_batch_size["value"]
+    await asyncio.gather(
+        *[
+            embed(start, min(start + step, len(texts)))
+            for start in range(0, len(texts), step)
+        ]
+    )
+
+    return embeddings
 
 
 def generate_embeddings(engine: str, model: str, text: Union[str, list[str]], **kwargs):
     url = kwargs.get("url", "")
     key = kwargs.get("key", "")
+    batch_size = kwargs.get("batch_size")
 
-    if engine == "ollama":
-        if isinstance(text, list):
-            embeddings = generate_ollama_batch_embeddings(
-                **{"model": model, "texts": text, "url": url, "key": key}
-            )
-        else:
-            embeddings = generate_ollama_batch_embeddings(
-                **{"model": model, "texts": [text], "url": url, "key": key}
+    if engine in ["ollama", "openai"]:
+        texts = text if isinstance(text, list) else [text]
+        try:
+            embeddings = run_coroutine_sync(
+                agenerate_embeddings(
+                    engine=engine,
+                    model=model,
+                    texts=texts,
+                    url=url,
+                    key=key,
+                    batch_size=batch_size,
+                )
             )
-        return embeddings[0] if isinstance(text, str) else embeddings
-    elif engine == "openai":
-        if isinstance(text, list):
-            embeddings = generate_openai_batch_embeddings(model, text, url, key)
-        else:
-            embeddings = generate_openai_batch_embeddings(model, [text], url, key)
+        except Exception as e:
+            log.exception(f"Error generating {engine} embeddings: {e}")
+            return None
 
         return embeddings[0] if isinstance(text, str) else embeddings
 
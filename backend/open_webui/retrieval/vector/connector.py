@@ -1,22 +1,52 @@
+import threading
+
 from open_webui.config import VECTOR_DB
 
-if VECTOR_DB == "milvus":
-    from open_webui.retrieval.vector.dbs.milvus import MilvusClient
 
-    VECTOR_DB_CLIENT = MilvusClient()
-elif VECTOR_DB == "qdrant":
-    from open_webui.retrieval.vector.dbs.qdrant import QdrantClient
+def create_vector_db_client():
+    if VECTOR_DB == "milvus":
+        from open_webui.retrieval.vector.dbs.milvus import MilvusClient
+
+        return MilvusClient()
+    elif VECTOR_DB == "qdrant":
+        from open_webui.retrieval.vector.dbs.qdrant import QdrantClient
+
+        return QdrantClient()
+    elif VECTOR_DB == "opensearch":
+        from open_webui.retrieval.vector.dbs.opensearch import OpenSearchClient
+
+        return OpenSearchClient()
+    elif VECTOR_DB == "pgvector":
+        from open_webui.retrieval.vector.dbs.pgvector import PgvectorClient
+
+        return PgvectorClient()
+    else:
+        from open_webui.retrieval.vector.dbs.chroma import ChromaClient
+
+        return ChromaClient()
+
+
+class LazyVectorDBClient:
+    """
+    Creates the client of the vector database on first use, so its library
+    isn't imported (nor the database opened) while the server starts.
+    """
+
+    def __init__(self):
+        self._client = None
+        self._lock = threading.Lock()
 
-    VECTOR_DB_CLIENT = QdrantClient()
-elif VECTOR_DB == "opensearch":
-    from open_webui.retrieval.vector.dbs.opensearch import OpenSearchClient
+    def initialize(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = create_vector_db_client()
+        return self._client
 
-    VECTOR_DB_CLIENT = OpenSearchClient()
-elif VECTOR_DB == "pgvector":
-    from open_webui.retrieval.vector.dbs.pgvector import PgvectorClient
+    def __getattr__(self, name: str):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self.initialize(), name)
 
-    VECTOR_DB_CLIENT = PgvectorClient()
-else:
-    from open_webui.retrieval.vector.dbs.chroma import ChromaClient
 
-    VECTOR_DB_CLIENT = ChromaClient()
+VECTOR_DB_CLIENT = LazyVectorDBClient()
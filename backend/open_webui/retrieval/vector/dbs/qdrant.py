@@ -84,17 +84,31 @@ class QdrantClient:
         if limit is None:
             limit = NO_LIMIT  # otherwise qdrant would set limit to 10!
 
-        query_response = self.client.query_points(
+        # All vectors are searched in one batched request, one result row each
+        query_responses = self.client.query_batch_points(
             collection_name=f"{self.collection_prefix}_{collection_name}",
-            query=vectors[0],
-            limit=limit,
+            requests=[
+                models.QueryRequest(query=vector, limit=limit, with_payload=True)
+                for vector in vectors
+            ],
         )
-        get_result = self._result_to_get_result(query_response.points)
+
+        ids = []
+        documents = []
+        metadatas = []
+        distances = []
+        for query_response in query_responses:
+            get_result = self._result_to_get_result(query_response.points)
+            ids.extend(get_result.ids)
+            documents.extend(get_result.documents)
+            metadatas.extend(get_result.metadatas)
+            distances.append([point.score for point in query_response.points])
+
         return SearchResult(
-            ids=get_result.ids,
-            documents=get_result.documents,
-            metadatas=get_result.metadatas,
-            distances=[[point.score for point in query_response.points]],
+            ids=ids,
+            documents=documents,
+            metadatas=metadatas,
+            distances=distances,
         )
 
     def query(self, collection_name: str, filter: dict, limit: Optional[int] = None):
@@ -0,0 +1,110 @@
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Optional
+
+from open_webui.config import (
+    RAG_WEB_LOADER_CACHE_TTL,
+    RAG_WEB_LOADER_CACHE_SIZE,
+    RAG_WEB_SEARCH_CACHE_TTL,
+    RAG_WEB_SEARCH_CACHE_SIZE,
+)
+from open_webui.env import SRC_LOG_LEVELS
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["RAG"])
+
+
+class WebCache:
+    """
+    In-memory LRU of at most `max_size` entries, fresh for `ttl` seconds.
+
+    Stale entries are kept until they are evicted, so their value can still
+    be revalidated (e.g. a page with its ETag) instead of fetched again.
+    A `ttl` or `max_size` of 0 disables the cache.
+    """
+
+    def __init__(self, ttl: int, max_size: int):
+        self.ttl = ttl
+        self.max_size = max_size
+
+        # key -> (stored at, value)
+        self.entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "stale_hits": 0, "misses": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_size > 0
+
+    def lookup(self, key: str) -> Optional[tuple[Any, bool]]:
+        """Returns the value of `key` and whether it is still fresh, or None."""
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+
+            self.entries.move_to_end(key)
+            fresh = time.monotonic() - entry[0] < self.ttl
+            self.stats["hits" if fresh else "stale_hits"] += 1
+            return entry[1], fresh
+
+    def get(self, key: str) -> Optional[Any]:
+        """Returns the value of `key` if it is still fresh."""
+        entry = self.lookup(key)
+        return entry[0] if entry is not None and entry[1] else None
+
+    def set(self, key: str, value: Any):
+        if not self.enabled:
+            return
+
+        with self._lock:
+            self.entries[key] = (time.monotonic(), value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def get_or_set(self, key: str, func: Callable[[], Any]) -> Any:
+        value = self.get(key)
+        if value is None:
+            value = func()
+            # Empty results are often transient, they are not kept
+            if value:
+                self.set(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {**self.stats, "size": len(self.entries), "max_size": self.max_size}
+
+
+# url -> {"document", "etag", "last_modified"}
+WEB_PAGE_CACHE = WebCache(RAG_WEB_LOADER_CACHE_TTL, RAG_WEB_LOADER_CACHE_SIZE)
+
+# (engine, query, result count, domain filter) -> list[SearchResult]
+WEB_SEARCH_CACHE = WebCache(RAG_WEB_SEARCH_CACHE_TTL, RAG_WEB_SEARCH_CACHE_SIZE)
+
+
+def get_search_cache_key(engine: str, query: str, *params) -> str:
+    # Queries differing only in case or whitespace return the same results
+    query = " ".join(query.lower().split())
+    return hashlib.sha256(
+        "\0".join([engine, query, *map(str, params)]).encode()
+    ).hexdigest()
+
+
+def get_web_cache_stats() -> dict:
+    return {
+        "pages": WEB_PAGE_CACHE.get_stats(),
+        "searches": WEB_SEARCH_CACHE.get_stats(),
+    }
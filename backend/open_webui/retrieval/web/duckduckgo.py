@@ -2,7 +2,6 @@ import logging
 from typing import Optional
 
 from open_webui.retrieval.web.main import SearchResult, get_filtered_results
-from duckduckgo_search import DDGS
 from open_webui.env import SRC_LOG_LEVELS
 
 log = logging.getLogger(__name__)
@@ -21,6 +20,8 @@ def search_duckduckgo(
     Returns:
         list[SearchResult]: A list of search results
     """
+    from duckduckgo_search import DDGS
+
     # Use the DDGS context manager to create a DDGS object
     with DDGS() as ddgs:
         # Use the ddgs.text() method to perform the search
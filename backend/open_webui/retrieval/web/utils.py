@@ -1,8 +1,16 @@
+import asyncio
+import queue
 import socket
+import threading
+import time
 import urllib.parse
 import validators
-from typing import Union, Sequence, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Optional, Union, Sequence, Iterator
 
+import aiohttp
+from aiohttp.abc import AbstractResolver, ResolveResult
+from bs4 import BeautifulSoup
 from langchain_community.document_loaders import (
     WebBaseLoader,
 )
@@ -10,7 +18,13 @@ from langchain_core.documents import Document
 
 
 from open_webui.constants import ERROR_MESSAGES
-from open_webui.config import ENABLE_RAG_LOCAL_WEB_FETCH
+from open_webui.retrieval.web.cache import WEB_PAGE_CACHE
+from open_webui.config import (
+    ENABLE_RAG_LOCAL_WEB_FETCH,
+    RAG_WEB_LOADER_TIMEOUT,
+    RAG_WEB_LOADER_MAX_SIZE,
+    RAG_WEB_LOADER_REQUESTS_PER_HOST,
+)
 from open_webui.env import SRC_LOG_LEVELS
 
 import logging
@@ -19,6 +33,14 @@ log = logging.getLogger(__name__)
 log.setLevel(SRC_LOG_LEVELS["RAG"])
 
 
+DNS_CACHE_TTL = 300
+
+# hostname -> (expires at, IPv4 addresses, IPv6 addresses)
+DNS_CACHE: dict[str, tuple[float, list[str], list[str]]] = {}
+
+MAX_REDIRECTS = 10
+
+
 def validate_url(url: Union[str, Sequence[str]]):
     if isinstance(url, str):
         if isinstance(validators.url(url), validators.ValidationError):
@@ -29,56 +51,311 @@ def validate_url(url: Union[str, Sequence[str]]):
             # Get IPv4 and IPv6 addresses
             ipv4_addresses, ipv6_addresses = resolve_hostname(parsed_url.hostname)
             # Check if any of the resolved addresses are private
-            # This is technically still vulnerable to DNS rebinding attacks, as we don't control WebBaseLoader
-            for ip in ipv4_addresses:
-                if validators.ipv4(ip, private=True):
-                    raise ValueError(ERROR_MESSAGES.INVALID_URL)
-            for ip in ipv6_addresses:
-                if validators.ipv6(ip, private=True):
-                    raise ValueError(ERROR_MESSAGES.INVALID_URL)
+            check_addresses(ipv4_addresses, ipv6_addresses)
         return True
     elif isinstance(url, Sequence):
-        return all(validate_url(u) for u in url)
+        if len(url) <= 1:
+            return all(validate_url(u) for u in url)
+        # Resolve the hostnames concurrently
+        with ThreadPoolExecutor(max_workers=min(len(url), 16)) as executor:
+            return all(executor.map(validate_url, url))
     else:
         return False
 
 
-def resolve_hostname(hostname):
-    # Get address information
-    addr_info = socket.getaddrinfo(hostname, None)
+async def avalidate_url(url: str):
+    """Async variant of `validate_url`, for a single URL."""
+    if isinstance(validators.url(url), validators.ValidationError):
+        raise ValueError(ERROR_MESSAGES.INVALID_URL)
+    if not ENABLE_RAG_LOCAL_WEB_FETCH:
+        parsed_url = urllib.parse.urlparse(url)
+        check_addresses(*await aresolve_hostname(parsed_url.hostname))
+    return True
+
+
+def check_addresses(ipv4_addresses: list[str], ipv6_addresses: list[str]):
+    for ip in ipv4_addresses:
+        if validators.ipv4(ip, private=True):
+            raise ValueError(ERROR_MESSAGES.INVALID_URL)
+    for ip in ipv6_addresses:
+        if validators.ipv6(ip, private=True):
+            raise ValueError(ERROR_MESSAGES.INVALID_URL)
+
+
+def get_cached_addresses(hostname) -> Optional[tuple[list[str], list[str]]]:
+    cached = DNS_CACHE.get(hostname)
+    if cached is not None and cached[0] > time.monotonic():
+        return cached[1], cached[2]
+    return None
+
 
+def cache_addresses(hostname, addr_info) -> tuple[list[str], list[str]]:
     # Extract IP addresses from address information
     ipv4_addresses = [info[4][0] for info in addr_info if info[0] == socket.AF_INET]
     ipv6_addresses = [info[4][0] for info in addr_info if info[0] == socket.AF_INET6]
 
-    return ipv4_addresses, ipv6_addresses
+    DNS_CACHE[hostname] = (
+        time.monotonic() + DNS_CACHE_TTL,
+        list(dict.fromkeys(ipv4_addresses)),
+        list(dict.fromkeys(ipv6_addresses)),
+    )
+    return DNS_CACHE[hostname][1], DNS_CACHE[hostname][2]
+
+
+def resolve_hostname(hostname):
+    if cached := get_cached_addresses(hostname):
+        return cached
+
+    # Get address information
+    addr_info = socket.getaddrinfo(hostname, None)
+    return cache_addresses(hostname, addr_info)
+
+
+async def aresolve_hostname(hostname):
+    if cached := get_cached_addresses(hostname):
+        return cached
+
+    addr_info = await asyncio.get_running_loop().getaddrinfo(hostname, None)
+    return cache_addresses(hostname, addr_info)
+
+
+class CachedResolver(AbstractResolver):
+    """
+    aiohttp resolver backed by the DNS cache. Pages are fetched from the same
+    addresses their URL was validated against, so a hostname can't be
+    rebound to a private address between the check and the request. Addresses
+    resolved here on a cache miss are checked the same way.
+    """
+
+    async def resolve(
+        self, host: str, port: int = 0, family: int = socket.AF_INET
+    ) -> list[ResolveResult]:
+        ipv4_addresses, ipv6_addresses = await aresolve_hostname(host)
+        if not ENABLE_RAG_LOCAL_WEB_FETCH:
+            check_addresses(ipv4_addresses, ipv6_addresses)
+
+        addresses = []
+        if family in (socket.AF_INET, socket.AF_UNSPEC):
+            addresses += [(socket.AF_INET, ip) for ip in ipv4_addresses]
+        if family in (socket.AF_INET6, socket.AF_UNSPEC):
+            addresses += [(socket.AF_INET6, ip) for ip in ipv6_addresses]
+        if not addresses:
+            raise OSError(f"No addresses found for {host}")
+
+        return [
+            ResolveResult(
+                hostname=host,
+                host=ip,
+                port=port,
+                family=address_family,
+                proto=0,
+                flags=socket.AI_NUMERICHOST | socket.AI_NUMERICSERV,
+            )
+            for address_family, ip in addresses
+        ]
+
+    async def close(self) -> None:
+        pass
+
+
+def copy_document(document: Document) -> Document:
+    return Document(
+        page_content=document.page_content, metadata=dict(document.metadata)
+    )
 
 
 class SafeWebBaseLoader(WebBaseLoader):
-    """WebBaseLoader with enhanced error handling for URLs."""
+    """
+    WebBaseLoader with enhanced error handling for URLs.
+
+    Pages are fetched concurrently, at most `requests_per_second` at a time
+    and `requests_per_host` per host. Each page gets `timeout` seconds and is
+    truncated to `max_size` bytes; redirects are validated like the URLs
+    themselves. Documents are yielded as their pages arrive, pages that fail
+    to load are logged and skipped.
+
+    Loaded pages are kept in WEB_PAGE_CACHE, and revalidated with their
+    ETag/Last-Modified once they are no longer fresh.
+    """
+
+    def __init__(
+        self,
+        *args,
+        timeout: float = RAG_WEB_LOADER_TIMEOUT,
+        max_size: int = RAG_WEB_LOADER_MAX_SIZE,
+        requests_per_host: int = RAG_WEB_LOADER_REQUESTS_PER_HOST,
+        **kwargs,
+    ):
+        super().__init__(*args, **kwargs)
+        self.timeout = timeout
+        self.max_size = max_size
+        self.requests_per_host = requests_per_host
+
+    def _build_document(self, path: str, content: bytes, charset: Optional[str]):
+        parser = "xml" if path.endswith(".xml") else self.default_parser
+        soup = BeautifulSoup(
+            content, parser, from_encoding=self.encoding or charset, **self.bs_kwargs
+        )
+        text = soup.get_text(**self.bs_get_text_kwargs)
+
+        # Build metadata
+        metadata = {"source": path}
+        if title := soup.find("title"):
+            metadata["title"] = title.get_text()
+        if description := soup.find("meta", attrs={"name": "description"}):
+            metadata["description"] = description.get(
+                "content", "No description found."
+            )
+        if html := soup.find("html"):
+            metadata["language"] = html.get("lang", "No language found.")
+
+        return Document(page_content=text, metadata=metadata)
+
+    async def _fetch_page(
+        self, session: aiohttp.ClientSession, path: str, cached: Optional[dict]
+    ) -> Optional[dict]:
+        """
+        Fetches the page at `path`, following redirects. Returns None if the
+        `cached` copy of the page is still valid.
+        """
+        headers = dict(self.session.headers)
+        if cached and cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached and cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+
+        url = path
+        for _ in range(MAX_REDIRECTS + 1):
+            await avalidate_url(url)
+
+            async with session.get(
+                url,
+                headers=headers,
+                allow_redirects=False,
+                ssl=self.session.verify is not False,
+            ) as response:
+                if response.status in (301, 302, 303, 307, 308) and (
+                    location := response.headers.get("Location")
+                ):
+                    url = urllib.parse.urljoin(url, location)
+                    continue
+
+                if response.status == 304 and cached:
+                    return None
+
+                if self.raise_for_status:
+                    response.raise_for_status()
+
+                content = bytearray()
+                async for chunk in response.content.iter_chunked(64 * 1024):
+                    content += chunk
+                    if len(content) >= self.max_size:
+                        log.warning(f"Truncated {path} to {self.max_size} bytes")
+                        del content[self.max_size :]
+                        break
+
+                return {
+                    "content": bytes(content),
+                    "charset": response.charset,
+                    "status": response.status,
+                    "etag": response.headers.get("ETag"),
+                    "last_modified": response.headers.get("Last-Modified"),
+                }
+
+        raise ValueError(f"Too many redirects for {path}")
+
+    async def _load_page(
+        self,
+        session: aiohttp.ClientSession,
+        path: str,
+        semaphore: asyncio.Semaphore,
+        host_semaphores: dict[str, asyncio.Semaphore],
+    ) -> Optional[Document]:
+        cached = WEB_PAGE_CACHE.lookup(path)
+        if cached is not None and cached[1]:
+            return copy_document(cached[0]["document"])
+        cached = cached[0] if cached is not None else None
+
+        host = urllib.parse.urlparse(path).hostname
+        if host not in host_semaphores:
+            host_semaphores[host] = asyncio.Semaphore(self.requests_per_host)
+
+        try:
+            async with host_semaphores[host], semaphore:
+                async with asyncio.timeout(self.timeout):
+                    page = await self._fetch_page(session, path, cached)
+
+            if page is None:
+                # Not modified, the cached copy is fresh again
+                WEB_PAGE_CACHE.set(path, cached)
+                return copy_document(cached["document"])
+
+            # Parse off the event loop, so other pages keep downloading
+            document = await asyncio.to_thread(
+                self._build_document, path, page["content"], page["charset"]
+            )
+            if 200 <= page["status"] < 300:
+                WEB_PAGE_CACHE.set(
+                    path,
+                    {
+                        "document": copy_document(document),
+                        "etag": page["etag"],
+                        "last_modified": page["last_modified"],
+                    },
+                )
+            return document
+        except TimeoutError:
+            log.error(f"Error loading {path}: timed out after {self.timeout}s")
+        except Exception as e:
+            # Log the error and continue with the next URL
+            log.error(f"Error loading {path}: {e}")
+        return None
+
+    async def alazy_load(self) -> AsyncIterator[Document]:
+        """Load the url(s) in web_path concurrently, yielding pages as they arrive."""
+        semaphore = asyncio.Semaphore(max(self.requests_per_second, 1))
+        host_semaphores = {}
+
+        connector = aiohttp.TCPConnector(resolver=CachedResolver())
+        async with aiohttp.ClientSession(
+            connector=connector,
+            cookies=self.session.cookies.get_dict(),
+            trust_env=True,
+        ) as session:
+            tasks = [
+                asyncio.create_task(
+                    self._load_page(session, path, semaphore, host_semaphores)
+                )
+                for path in self.web_paths
+            ]
+            try:
+                for task in asyncio.as_completed(tasks):
+                    if document := await task:
+                        yield document
+            finally:
+                for task in tasks:
+                    task.cancel()
 
     def lazy_load(self) -> Iterator[Document]:
-        """Lazy load text from the url(s) in web_path with error handling."""
-        for path in self.web_paths:
+        """
+        Lazy load text from the url(s) in web_path with error handling. Pages
+        are fetched concurrently in a background event loop.
+        """
+        documents = queue.Queue()
+        done = object()
+
+        async def load():
             try:
-                soup = self._scrape(path, bs_kwargs=self.bs_kwargs)
-                text = soup.get_text(**self.bs_get_text_kwargs)
-
-                # Build metadata
-                metadata = {"source": path}
-                if title := soup.find("title"):
-                    metadata["title"] = title.get_text()
-                if description := soup.find("meta", attrs={"name": "description"}):
-                    metadata["description"] = description.get(
-                        "content", "No description found."
-                    )
-                if html := soup.find("html"):
-                    metadata["language"] = html.get("lang", "No language found.")
-
-                yield Document(page_content=text, metadata=metadata)
-            except Exception as e:
-                # Log the error and continue with the next URL
-                log.error(f"Error loading {path}: {e}")
+                async for document in self.alazy_load():
+                    documents.put(document)
+            finally:
+                documents.put(done)
+
+        thread = threading.Thread(target=asyncio.run, args=(load(),), daemon=True)
+        thread.start()
+
+        while (document := documents.get()) is not done:
+            yield document
 
 
 def get_web_loader(
@@ -14,7 +14,7 @@ from open_webui.models.channels import Channels, ChannelModel, ChannelForm
 from open_webui.models.messages import (
     Messages,
     MessageModel,
-    MessageResponse,
+    MessageUserResponse,
     MessageForm,
 )
 
@@ -139,13 +139,13 @@ async def delete_channel_by_id(id: str, user=Depends(get_admin_user)):
 ############################
 
 
-class MessageUserResponse(MessageResponse):
-    user: UserNameResponse
-
-
 @router.get("/{id}/messages", response_model=list[MessageUserResponse])
 async def get_channel_messages(
-    id: str, skip: int = 0, limit: int = 50, user=Depends(get_verified_user)
+    id: str,
+    skip: int = 0,
+    limit: int = 50,
+    before: Optional[int] = None,
+    user=Depends(get_verified_user),
 ):
     channel = Channels.get_channel_by_id(id)
     if not channel:
@@ -160,31 +160,7 @@ async def get_channel_messages(
             status_code=status.HTTP_403_FORBIDDEN, detail=ERROR_MESSAGES.DEFAULT()
         )
 
-    message_list = Messages.get_messages_by_channel_id(id, skip, limit)
-    users = {}
-
-    messages = []
-    for message in message_list:
-        if message.user_id not in users:
-            user = Users.get_user_by_id(message.user_id)
-            users[message.user_id] = user
-
-        replies = Messages.get_replies_by_message_id(message.id)
-        latest_reply_at = replies[0].created_at if replies else None
-
-        messages.append(
-            MessageUserResponse(
-                **{
-                    **message.model_dump(),
-                    "reply_count": len(replies),
-                    "latest_reply_at": latest_reply_at,
-                    "reactions": Messages.get_reactions_by_message_id(message.id),
-                    "user": UserNameResponse(**users[message.user_id].model_dump()),
-                }
-            )
-        )
-
-    return messages
+    return Messages.get_message_page_by_channel_id(id, before, skip, limit)
 
 
 ############################
@@ -298,7 +274,7 @@ async def post_new_message(
                         to=f"channel:{channel.id}",
                     )
 
-            active_user_ids = get_user_ids_from_room(f"channel:{channel.id}")
+            active_user_ids = await get_user_ids_from_room(f"channel:{channel.id}")
 
             background_tasks.add_task(
                 send_notification,
@@ -338,7 +314,7 @@ async def get_channel_message(
             status_code=status.HTTP_403_FORBIDDEN, detail=ERROR_MESSAGES.DEFAULT()
         )
 
-    message = Messages.get_message_by_id(message_id)
+    message = Messages.get_message_user_response_by_id(message_id)
     if not message:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail=ERROR_MESSAGES.NOT_FOUND
@@ -349,14 +325,7 @@ async def get_channel_message(
             status_code=status.HTTP_400_BAD_REQUEST, detail=ERROR_MESSAGES.DEFAULT()
         )
 
-    return MessageUserResponse(
-        **{
-            **message.model_dump(),
-            "user": UserNameResponse(
-                **Users.get_user_by_id(message.user_id).model_dump()
-            ),
-        }
-    )
+    return message
 
 
 ############################
@@ -372,6 +341,7 @@ async def get_channel_thread_messages(
     message_id: str,
     skip: int = 0,
     limit: int = 50,
+    before: Optional[int] = None,
     user=Depends(get_verified_user),
 ):
     channel = Channels.get_channel_by_id(id)
@@ -387,28 +357,7 @@ async def get_channel_thread_messages(
             status_code=status.HTTP_403_FORBIDDEN, detail=ERROR_MESSAGES.DEFAULT()
         )
 
-    message_list = Messages.get_messages_by_parent_id(id, message_id, skip, limit)
-    users = {}
-
-    messages = []
-    for message in message_list:
-        if message.user_id not in users:
-            user = Users.get_user_by_id(message.user_id)
-            users[message.user_id] = user
-
-        messages.append(
-            MessageUserResponse(
-                **{
-                    **message.model_dump(),
-                    "reply_count": 0,
-                    "latest_reply_at": None,
-                    "reactions": Messages.get_reactions_by_message_id(message.id),
-                    "user": UserNameResponse(**users[message.user_id].model_dump()),
-                }
-            )
-        )
-
-    return messages
+    return Messages.get_thread_page_by_parent_id(id, message_id, before, skip, limit)
 
 
 ############################
@@ -140,8 +140,18 @@ async def import_chat(form_data: ChatImportForm, user=Depends(get_verified_user)
 
 @router.get("/search", response_model=list[ChatTitleIdResponse])
 async def search_user_chats(
-    text: str, page: Optional[int] = None, user=Depends(get_verified_user)
+    text: str,
+    page: Optional[int] = None,
+    folder_id: Optional[str] = None,
+    user=Depends(get_verified_user),
 ):
+    """
+    Searches the chats of the user by title and message content. Titles match
+    the text anywhere; messages match when every word of the text starts one
+    of their words (a prefix match, "wor" finds "world" but "orld" doesn't)
+    on databases with a full-text index of messages, the text anywhere
+    otherwise. `tag:name` words filter by tag.
+    """
     if page is None:
         page = 1
 
@@ -151,7 +161,7 @@ async def search_user_chats(
     chat_list = [
         ChatTitleIdResponse(**chat.model_dump())
         for chat in Chats.get_chats_by_user_id_and_search_text(
-            user.id, text, skip=skip, limit=limit
+            user.id, text, skip=skip, limit=limit, folder_id=folder_id
         )
     ]
 
@@ -15,6 +15,7 @@ from open_webui.models.files import (
     FileModelResponse,
     Files,
 )
+from open_webui.retrieval.ingestion import INGESTION_QUEUE
 from open_webui.routers.retrieval import process_file, ProcessFileForm
 
 from open_webui.config import UPLOAD_DIR
@@ -41,7 +42,10 @@ router = APIRouter()
 
 @router.post("/", response_model=FileModelResponse)
 def upload_file(
-    request: Request, file: UploadFile = File(...), user=Depends(get_verified_user)
+    request: Request,
+    file: UploadFile = File(...),
+    process_in_background: bool = False,
+    user=Depends(get_verified_user),
 ):
     log.info(f"file.content_type: {file.content_type}")
     try:
@@ -52,7 +56,7 @@ def upload_file(
         id = str(uuid.uuid4())
         name = filename
         filename = f"{id}_{filename}"
-        contents, file_path = Storage.upload_file(file.file, filename)
+        size, file_path = Storage.upload_file(file.file, filename)
 
         file_item = Files.insert_new_file(
             user.id,
@@ -64,12 +68,17 @@ def upload_file(
                     "meta": {
                         "name": name,
                         "content_type": file.content_type,
-                        "size": len(contents),
+                        "size": size,
                     },
                 }
             ),
         )
 
+        if process_in_background:
+            # Processed by the ingestion queue, the job reports the progress
+            job = INGESTION_QUEUE.enqueue(user.id, "process_file", {"file_id": id})
+            return FileModelResponse(**file_item.model_dump(), job_id=job.id)
+
         try:
             process_file(request, ProcessFileForm(file_id=id))
             file_item = Files.get_file_by_id(id=id)
@@ -123,7 +132,7 @@ async def delete_all_files(user=Depends(get_admin_user)):
     result = Files.delete_all_files()
     if result:
         try:
-            Storage.delete_all_files()
+            await Storage.adelete_all_files()
         except Exception as e:
             log.exception(e)
             log.error(f"Error deleting files")
@@ -218,7 +227,7 @@ async def get_file_content_by_id(id: str, user=Depends(get_verified_user)):
     file = Files.get_file_by_id(id)
     if file and (file.user_id == user.id or user.role == "admin"):
         try:
-            file_path = Storage.get_file(file.path)
+            file_path = await Storage.aget_file(file.path)
             file_path = Path(file_path)
 
             # Check if the file already exists in the cache
@@ -263,7 +272,7 @@ async def get_html_file_content_by_id(id: str, user=Depends(get_verified_user)):
     file = Files.get_file_by_id(id)
     if file and (file.user_id == user.id or user.role == "admin"):
         try:
-            file_path = Storage.get_file(file.path)
+            file_path = await Storage.aget_file(file.path)
             file_path = Path(file_path)
 
             # Check if the file already exists in the cache
@@ -304,7 +313,7 @@ async def get_file_content_by_id(id: str, user=Depends(get_verified_user)):
         }
 
         if file_path:
-            file_path = Storage.get_file(file_path)
+            file_path = await Storage.aget_file(file_path)
             file_path = Path(file_path)
 
             # Check if the file already exists in the cache
@@ -348,7 +357,7 @@ async def delete_file_by_id(id: str, user=Depends(get_verified_user)):
         result = Files.delete_file_by_id(id)
         if result:
             try:
-                Storage.delete_file(file.path)
+                await Storage.adelete_file(file.path)
             except Exception as e:
                 log.exception(e)
                 log.error(f"Error deleting files")
@@ -8,7 +8,13 @@ from open_webui.models.functions import (
     FunctionResponse,
     Functions,
 )
-from open_webui.utils.plugin import load_function_module_by_id, replace_imports
+from open_webui.utils.plugin import (
+    ainstall_frontmatter_requirements,
+    evict_function_module,
+    get_function_module,
+    load_function_module_by_id,
+    replace_imports,
+)
 from open_webui.config import CACHE_DIR
 from open_webui.constants import ERROR_MESSAGES
 from fastapi import APIRouter, Depends, HTTPException, Request, status
@@ -57,6 +63,7 @@ async def create_new_function(
     if function is None:
         try:
             form_data.content = replace_imports(form_data.content)
+            await ainstall_frontmatter_requirements(form_data.content)
             function_module, function_type, frontmatter = load_function_module_by_id(
                 form_data.id,
                 content=form_data.content,
@@ -174,6 +181,7 @@ async def update_function_by_id(
 ):
     try:
         form_data.content = replace_imports(form_data.content)
+        await ainstall_frontmatter_requirements(form_data.content)
         function_module, function_type, frontmatter = load_function_module_by_id(
             id, content=form_data.content
         )
@@ -214,9 +222,7 @@ async def delete_function_by_id(
     result = Functions.delete_function_by_id(id)
 
     if result:
-        FUNCTIONS = request.app.state.FUNCTIONS
-        if id in FUNCTIONS:
-            del FUNCTIONS[id]
+        evict_function_module(request, id)
 
     return result
 
@@ -256,11 +262,7 @@ async def get_function_valves_spec_by_id(
 ):
     function = Functions.get_function_by_id(id)
     if function:
-        if id in request.app.state.FUNCTIONS:
-            function_module = request.app.state.FUNCTIONS[id]
-        else:
-            function_module, function_type, frontmatter = load_function_module_by_id(id)
-            request.app.state.FUNCTIONS[id] = function_module
+        function_module = get_function_module(request, id, function)
 
         if hasattr(function_module, "Valves"):
             Valves = function_module.Valves
@@ -284,11 +286,7 @@ async def update_function_valves_by_id(
 ):
     function = Functions.get_function_by_id(id)
     if function:
-        if id in request.app.state.FUNCTIONS:
-            function_module = request.app.state.FUNCTIONS[id]
-        else:
-            function_module, function_type, frontmatter = load_function_module_by_id(id)
-            request.app.state.FUNCTIONS[id] = function_module
+        function_module = get_function_module(request, id, function)
 
         if hasattr(function_module, "Valves"):
             Valves = function_module.Valves
@@ -347,11 +345,7 @@ async def get_function_user_valves_spec_by_id(
 ):
     function = Functions.get_function_by_id(id)
     if function:
-        if id in request.app.state.FUNCTIONS:
-            function_module = request.app.state.FUNCTIONS[id]
-        else:
-            function_module, function_type, frontmatter = load_function_module_by_id(id)
-            request.app.state.FUNCTIONS[id] = function_module
+        function_module = get_function_module(request, id, function)
 
         if hasattr(function_module, "UserValves"):
             UserValves = function_module.UserValves
@@ -371,11 +365,7 @@ async def update_function_user_valves_by_id(
     function = Functions.get_function_by_id(id)
 
     if function:
-        if id in request.app.state.FUNCTIONS:
-            function_module = request.app.state.FUNCTIONS[id]
-        else:
-            function_module, function_type, frontmatter = load_function_module_by_id(id)
-            request.app.state.FUNCTIONS[id] = function_module
+        function_module = get_function_module(request, id, function)
 
         if hasattr(function_module, "UserValves"):
             UserValves = function_module.UserValves
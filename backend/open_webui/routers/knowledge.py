@@ -1,4 +1,4 @@
-from typing import List, Optional
+from typing import Optional
 from pydantic import BaseModel
 from fastapi import APIRouter, Depends, HTTPException, status, Request
 import logging
@@ -10,12 +10,15 @@ from open_webui.models.knowledge import (
     KnowledgeUserResponse,
 )
 from open_webui.models.files import Files, FileModel
+from open_webui.models.ingestion_jobs import IngestionJobModel
 from open_webui.retrieval.vector.connector import VECTOR_DB_CLIENT
+from open_webui.retrieval.bm25 import BM25_INDEX
+from open_webui.retrieval.ingestion import INGESTION_QUEUE, IngestionJobContext
 from open_webui.routers.retrieval import (
     process_file,
     ProcessFileForm,
-    process_files_batch,
-    BatchProcessFilesForm,
+    process_files_batch_job,
+    BatchProcessFilesResponse,
 )
 
 
@@ -354,6 +357,7 @@ def update_file_from_knowledge_by_id(
     VECTOR_DB_CLIENT.delete(
         collection_name=knowledge.id, filter={"file_id": form_data.file_id}
     )
+    BM25_INDEX.delete(knowledge.id, filter={"file_id": form_data.file_id})
 
     # Add content to the vector database
     try:
@@ -418,6 +422,7 @@ def remove_file_from_knowledge_by_id(
     VECTOR_DB_CLIENT.delete(
         collection_name=knowledge.id, filter={"file_id": form_data.file_id}
     )
+    BM25_INDEX.delete(knowledge.id, filter={"file_id": form_data.file_id})
 
     if knowledge:
         data = knowledge.data or {}
@@ -475,6 +480,7 @@ async def delete_knowledge_by_id(id: str, user=Depends(get_verified_user)):
 
     try:
         VECTOR_DB_CLIENT.delete_collection(collection_name=id)
+        BM25_INDEX.drop(id)
     except Exception as e:
         log.debug(e)
         pass
@@ -504,6 +510,7 @@ async def reset_knowledge_by_id(id: str, user=Depends(get_verified_user)):
 
     try:
         VECTOR_DB_CLIENT.delete_collection(collection_name=id)
+        BM25_INDEX.drop(id)
     except Exception as e:
         log.debug(e)
         pass
@@ -518,7 +525,34 @@ async def reset_knowledge_by_id(id: str, user=Depends(get_verified_user)):
 ############################
 
 
-@router.post("/{id}/files/batch/add", response_model=Optional[KnowledgeFilesResponse])
+def add_files_to_knowledge_job(
+    request: Request, job: IngestionJobModel, context: IngestionJobContext
+) -> dict:
+    def add_processed_files(response: BatchProcessFilesResponse):
+        # Added after every chunk, so files processed before a cancellation or
+        # failure are not lost
+        knowledge = Knowledges.get_knowledge_by_id(id=job.data["collection_name"])
+        if not knowledge:
+            raise Exception(ERROR_MESSAGES.NOT_FOUND)
+
+        data = knowledge.data or {}
+        existing_file_ids = data.get("file_ids", [])
+
+        # Only add files that were successfully processed
+        for result in response.results:
+            if result.status == "completed" and result.file_id not in existing_file_ids:
+                existing_file_ids.append(result.file_id)
+
+        data["file_ids"] = existing_file_ids
+        Knowledges.update_knowledge_data_by_id(id=knowledge.id, data=data)
+
+    return process_files_batch_job(request, job, context, on_chunk=add_processed_files)
+
+
+INGESTION_QUEUE.register("add_files_to_knowledge", add_files_to_knowledge_job)
+
+
+@router.post("/{id}/files/batch/add", response_model=Optional[IngestionJobModel])
 def add_files_to_knowledge_batch(
     request: Request,
     id: str,
@@ -526,7 +560,8 @@ def add_files_to_knowledge_batch(
     user=Depends(get_verified_user),
 ):
     """
-    Add multiple files to a knowledge base
+    Queue multiple files to be added to a knowledge base. The returned job
+    reports the progress and, once completed, the result of every file.
     """
     knowledge = Knowledges.get_knowledge_by_id(id=id)
     if not knowledge:
@@ -541,56 +576,23 @@ def add_files_to_knowledge_batch(
             detail=ERROR_MESSAGES.ACCESS_PROHIBITED,
         )
 
-    # Get files content
-    print(f"files/batch/add - {len(form_data)} files")
-    files: List[FileModel] = []
-    for form in form_data:
-        file = Files.get_file_by_id(form.file_id)
-        if not file:
+    file_ids = [form.file_id for form in form_data]
+    found_file_ids = {file.id for file in Files.get_files_by_ids(file_ids)}
+    for file_id in file_ids:
+        if file_id not in found_file_ids:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"File {form.file_id} not found",
+                detail=f"File {file_id} not found",
             )
-        files.append(file)
 
-    # Process files
     try:
-        result = process_files_batch(
-            request=request,
-            form_data=BatchProcessFilesForm(files=files, collection_name=id),
-            user=user,
+        return INGESTION_QUEUE.enqueue(
+            user.id,
+            "add_files_to_knowledge",
+            {"file_ids": file_ids, "collection_name": id},
         )
     except Exception as e:
         log.error(
             f"add_files_to_knowledge_batch: Exception occurred: {e}", exc_info=True
         )
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
-
-    # Add successful files to knowledge base
-    data = knowledge.data or {}
-    existing_file_ids = data.get("file_ids", [])
-
-    # Only add files that were successfully processed
-    successful_file_ids = [r.file_id for r in result.results if r.status == "completed"]
-    for file_id in successful_file_ids:
-        if file_id not in existing_file_ids:
-            existing_file_ids.append(file_id)
-
-    data["file_ids"] = existing_file_ids
-    knowledge = Knowledges.update_knowledge_data_by_id(id=id, data=data)
-
-    # If there were any errors, include them in the response
-    if result.errors:
-        error_details = [f"{err.file_id}: {err.error}" for err in result.errors]
-        return KnowledgeFilesResponse(
-            **knowledge.model_dump(),
-            files=Files.get_files_by_ids(existing_file_ids),
-            warnings={
-                "message": "Some files failed to process",
-                "errors": error_details,
-            },
-        )
-
-    return KnowledgeFilesResponse(
-        **knowledge.model_dump(), files=Files.get_files_by_ids(existing_file_ids)
-    )
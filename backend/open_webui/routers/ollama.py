@@ -1,12 +1,7 @@
-# TODO: Implement a more intelligent load balancing mechanism for distributing requests among multiple backend instances.
-# Current implementation uses a simple round-robin approach (random.choice). Consider incorporating algorithms like weighted round-robin,
-# least connections, or least response time for better resource utilization and performance optimization.
-
 import asyncio
 import json
 import logging
 import os
-import random
 import re
 import time
 from typing import Optional, Union
@@ -43,10 +38,17 @@ from open_webui.utils.payload import (
 )
 from open_webui.utils.auth import get_admin_user, get_verified_user
 from open_webui.utils.access_control import has_access
+from open_webui.utils.http_client import get_http_session, release_response
+from open_webui.utils.balancer import Lease, LoadBalancer
+from open_webui.utils.metrics import observe_stream
 
 
 from open_webui.config import (
     UPLOAD_DIR,
+    OLLAMA_LOAD_BALANCER_STRATEGY,
+    OLLAMA_LOAD_BALANCER_FAILURE_THRESHOLD,
+    OLLAMA_LOAD_BALANCER_COOLDOWN,
+    OLLAMA_LOAD_BALANCER_MAX_ATTEMPTS,
 )
 from open_webui.env import (
     ENV,
@@ -61,6 +63,13 @@ log = logging.getLogger(__name__)
 log.setLevel(SRC_LOG_LEVELS["OLLAMA"])
 
 
+OLLAMA_LOAD_BALANCER = LoadBalancer(
+    strategy=OLLAMA_LOAD_BALANCER_STRATEGY,
+    failure_threshold=OLLAMA_LOAD_BALANCER_FAILURE_THRESHOLD,
+    cooldown=OLLAMA_LOAD_BALANCER_COOLDOWN,
+)
+
+
 ##########################################
 #
 # Utility functions
@@ -71,11 +80,13 @@ log.setLevel(SRC_LOG_LEVELS["OLLAMA"])
 async def send_get_request(url, key=None):
     timeout = aiohttp.ClientTimeout(total=AIOHTTP_CLIENT_TIMEOUT_OPENAI_MODEL_LIST)
     try:
-        async with aiohttp.ClientSession(timeout=timeout, trust_env=True) as session:
-            async with session.get(
-                url, headers={**({"Authorization": f"Bearer {key}"} if key else {})}
-            ) as response:
-                return await response.json()
+        session = await get_http_session(url)
+        async with session.get(
+            url,
+            headers={**({"Authorization": f"Bearer {key}"} if key else {})},
+            timeout=timeout,
+        ) as response:
+            return await response.json()
     except Exception as e:
         # Handle connection error here
         log.error(f"Connection error: {e}")
@@ -83,13 +94,11 @@ async def send_get_request(url, key=None):
 
 
 async def cleanup_response(
-    response: Optional[aiohttp.ClientResponse],
-    session: Optional[aiohttp.ClientSession],
+    response: Optional[aiohttp.ClientResponse], lease: Optional[Lease] = None
 ):
-    if response:
-        response.close()
-    if session:
-        await session.close()
+    await release_response(response)
+    if lease:
+        lease.release()
 
 
 async def send_post_request(
@@ -98,13 +107,14 @@ async def send_post_request(
     stream: bool = True,
     key: Optional[str] = None,
     content_type: Optional[str] = None,
+    lease: Optional[Lease] = None,
+    model: Optional[str] = None,
 ):
 
     r = None
     try:
-        session = aiohttp.ClientSession(
-            trust_env=True, timeout=aiohttp.ClientTimeout(total=AIOHTTP_CLIENT_TIMEOUT)
-        )
+        session = await get_http_session(url)
+        start_time = time.perf_counter()
 
         r = await session.post(
             url,
@@ -113,31 +123,49 @@ async def send_post_request(
                 "Content-Type": "application/json",
                 **({"Authorization": f"Bearer {key}"} if key else {}),
             },
+            timeout=aiohttp.ClientTimeout(total=AIOHTTP_CLIENT_TIMEOUT),
         )
         r.raise_for_status()
 
+        if lease:
+            lease.success()
+
         if stream:
             response_headers = dict(r.headers)
 
             if content_type:
                 response_headers["Content-Type"] = content_type
 
+            content = r.content
+            if model:
+                content = observe_stream(
+                    content,
+                    "ollama",
+                    model,
+                    start_time,
+                    sse="text/event-stream" in r.headers.get("Content-Type", ""),
+                )
+
             return StreamingResponse(
-                r.content,
+                content,
                 status_code=r.status,
                 headers=response_headers,
-                background=BackgroundTask(
-                    cleanup_response, response=r, session=session
-                ),
+                background=BackgroundTask(cleanup_response, response=r, lease=lease),
             )
         else:
             res = await r.json()
-            await cleanup_response(r, session)
+            await cleanup_response(r, lease)
             return res
 
     except Exception as e:
         detail = None
 
+        if lease:
+            # Only unreachable or failing backends count against the circuit breaker
+            if r is None or r.status >= 500:
+                lease.failure()
+            lease.release()
+
         if r is not None:
             try:
                 res = await r.json()
@@ -145,6 +173,8 @@ async def send_post_request(
                     detail = f"Ollama: {res.get('error', 'Unknown error')}"
             except Exception:
                 detail = f"Ollama: {e}"
+            finally:
+                await release_response(r)
 
         raise HTTPException(
             status_code=r.status if r else 500,
@@ -681,7 +711,7 @@ async def show_model_info(
             detail=ERROR_MESSAGES.MODEL_NOT_FOUND(form_data.name),
         )
 
-    url_idx = random.choice(models[form_data.name]["urls"])
+    url_idx = get_ranked_url_idxs(request, models[form_data.name]["urls"])[0]
 
     url = request.app.state.config.OLLAMA_BASE_URLS[url_idx]
     key = get_api_key(url, request.app.state.config.OLLAMA_API_CONFIGS)
@@ -745,7 +775,7 @@ async def embed(
             model = f"{model}:latest"
 
         if model in models:
-            url_idx = random.choice(models[model]["urls"])
+            url_idx = get_ranked_url_idxs(request, models[model]["urls"])[0]
         else:
             raise HTTPException(
                 status_code=400,
@@ -814,7 +844,7 @@ async def embeddings(
             model = f"{model}:latest"
 
         if model in models:
-            url_idx = random.choice(models[model]["urls"])
+            url_idx = get_ranked_url_idxs(request, models[model]["urls"])[0]
         else:
             raise HTTPException(
                 status_code=400,
@@ -889,7 +919,7 @@ async def generate_completion(
             model = f"{model}:latest"
 
         if model in models:
-            url_idx = random.choice(models[model]["urls"])
+            url_idx = get_ranked_url_idxs(request, models[model]["urls"])[0]
         else:
             raise HTTPException(
                 status_code=400,
@@ -926,17 +956,89 @@ class GenerateChatCompletionForm(BaseModel):
     keep_alive: Optional[Union[int, str]] = None
 
 
+def get_ranked_url_idxs(
+    request: Request, url_idxs: list[int], key: Optional[str] = None
+) -> list[int]:
+    """
+    Orders the backends (indices into OLLAMA_BASE_URLS) from best to worst
+    according to OLLAMA_LOAD_BALANCER.
+    """
+    urls = request.app.state.config.OLLAMA_BASE_URLS
+    url_idxs = [idx for idx in url_idxs if idx < len(urls)]
+
+    ranked_urls = OLLAMA_LOAD_BALANCER.rank([urls[idx] for idx in url_idxs], key)
+    return [next(idx for idx in url_idxs if urls[idx] == url) for url in ranked_urls]
+
+
+async def get_ollama_urls(
+    request: Request,
+    model: str,
+    url_idx: Optional[int] = None,
+    key: Optional[str] = None,
+) -> list[str]:
+    if url_idx is not None:
+        return [request.app.state.config.OLLAMA_BASE_URLS[url_idx]]
+
+    models = request.app.state.OLLAMA_MODELS
+    if model not in models:
+        raise HTTPException(
+            status_code=400,
+            detail=ERROR_MESSAGES.MODEL_NOT_FOUND(model),
+        )
+
+    return [
+        request.app.state.config.OLLAMA_BASE_URLS[idx]
+        for idx in get_ranked_url_idxs(request, models[model].get("urls", []), key)
+    ]
+
+
 async def get_ollama_url(request: Request, model: str, url_idx: Optional[int] = None):
-    if url_idx is None:
-        models = request.app.state.OLLAMA_MODELS
-        if model not in models:
-            raise HTTPException(
-                status_code=400,
-                detail=ERROR_MESSAGES.MODEL_NOT_FOUND(model),
+    return (await get_ollama_urls(request, model, url_idx))[0]
+
+
+async def send_model_post_request(
+    request: Request,
+    path: str,
+    payload: dict,
+    url_idx: Optional[int] = None,
+    stream: bool = True,
+    content_type: Optional[str] = None,
+    key: Optional[str] = None,
+):
+    """
+    Sends `payload` to the best backend serving `payload["model"]`. When that
+    backend cannot be reached or fails before anything was streamed, the request
+    is retried on the next best backend (up to OLLAMA_LOAD_BALANCER_MAX_ATTEMPTS).
+
+    `key` keeps related requests (e.g. of one chat) on the same backend with the
+    consistent_hash strategy.
+    """
+    urls = await get_ollama_urls(request, payload["model"], url_idx, key)
+    urls = urls[: max(1, OLLAMA_LOAD_BALANCER_MAX_ATTEMPTS)]
+
+    for attempt, url in enumerate(urls):
+        body = {**payload}
+
+        api_config = request.app.state.config.OLLAMA_API_CONFIGS.get(url, {})
+        prefix_id = api_config.get("prefix_id", None)
+        if prefix_id:
+            body["model"] = body["model"].replace(f"{prefix_id}.", "")
+
+        try:
+            return await send_post_request(
+                url=f"{url}{path}",
+                payload=json.dumps(body),
+                stream=stream,
+                key=get_api_key(url, request.app.state.config.OLLAMA_API_CONFIGS),
+                content_type=content_type,
+                lease=OLLAMA_LOAD_BALANCER.acquire(url),
+                model=payload["model"],
             )
-        url_idx = random.choice(models[model].get("urls", []))
-    url = request.app.state.config.OLLAMA_BASE_URLS[url_idx]
-    return url
+        except HTTPException as e:
+            if e.status_code < 500 or attempt == len(urls) - 1:
+                raise e
+
+            log.warning(f"{url}{path} failed ({e.detail}), retrying on next backend")
 
 
 @router.post("/api/chat")
@@ -951,6 +1053,8 @@ async def generate_chat_completion(
     if BYPASS_MODEL_ACCESS_CONTROL:
         bypass_filter = True
 
+    metadata = form_data.get("metadata") or {}
+
     try:
         form_data = GenerateChatCompletionForm(**form_data)
     except Exception as e:
@@ -1004,19 +1108,14 @@ async def generate_chat_completion(
     if ":" not in payload["model"]:
         payload["model"] = f"{payload['model']}:latest"
 
-    url = await get_ollama_url(request, payload["model"], url_idx)
-    api_config = request.app.state.config.OLLAMA_API_CONFIGS.get(url, {})
-
-    prefix_id = api_config.get("prefix_id", None)
-    if prefix_id:
-        payload["model"] = payload["model"].replace(f"{prefix_id}.", "")
-
-    return await send_post_request(
-        url=f"{url}/api/chat",
-        payload=json.dumps(payload),
+    return await send_model_post_request(
+        request,
+        "/api/chat",
+        payload,
+        url_idx=url_idx,
         stream=form_data.stream,
-        key=get_api_key(url, request.app.state.config.OLLAMA_API_CONFIGS),
         content_type="application/x-ndjson",
+        key=metadata.get("chat_id"),
     )
 
 
@@ -1103,19 +1202,12 @@ async def generate_openai_completion(
     if ":" not in payload["model"]:
         payload["model"] = f"{payload['model']}:latest"
 
-    url = await get_ollama_url(request, payload["model"], url_idx)
-    api_config = request.app.state.config.OLLAMA_API_CONFIGS.get(url, {})
-
-    prefix_id = api_config.get("prefix_id", None)
-
-    if prefix_id:
-        payload["model"] = payload["model"].replace(f"{prefix_id}.", "")
-
-    return await send_post_request(
-        url=f"{url}/v1/completions",
-        payload=json.dumps(payload),
+    return await send_model_post_request(
+        request,
+        "/v1/completions",
+        payload,
+        url_idx=url_idx,
         stream=payload.get("stream", False),
-        key=get_api_key(url, request.app.state.config.OLLAMA_API_CONFIGS),
     )
 
 
@@ -1177,18 +1269,13 @@ async def generate_openai_chat_completion(
     if ":" not in payload["model"]:
         payload["model"] = f"{payload['model']}:latest"
 
-    url = await get_ollama_url(request, payload["model"], url_idx)
-    api_config = request.app.state.config.OLLAMA_API_CONFIGS.get(url, {})
-
-    prefix_id = api_config.get("prefix_id", None)
-    if prefix_id:
-        payload["model"] = payload["model"].replace(f"{prefix_id}.", "")
-
-    return await send_post_request(
-        url=f"{url}/v1/chat/completions",
-        payload=json.dumps(payload),
+    return await send_model_post_request(
+        request,
+        "/v1/chat/completions",
+        payload,
+        url_idx=url_idx,
         stream=payload.get("stream", False),
-        key=get_api_key(url, request.app.state.config.OLLAMA_API_CONFIGS),
+        key=(form_data.get("metadata") or {}).get("chat_id"),
     )
 
 
@@ -2,6 +2,7 @@ import asyncio
 import hashlib
 import json
 import logging
+import time
 from pathlib import Path
 from typing import Literal, Optional, overload
 
@@ -38,6 +39,8 @@ from open_webui.utils.payload import (
 
 from open_webui.utils.auth import get_admin_user, get_verified_user
 from open_webui.utils.access_control import has_access
+from open_webui.utils.http_client import get_http_session, release_response
+from open_webui.utils.metrics import observe_stream
 
 
 log = logging.getLogger(__name__)
@@ -54,27 +57,19 @@ log.setLevel(SRC_LOG_LEVELS["OPENAI"])
 async def send_get_request(url, key=None):
     timeout = aiohttp.ClientTimeout(total=AIOHTTP_CLIENT_TIMEOUT_OPENAI_MODEL_LIST)
     try:
-        async with aiohttp.ClientSession(timeout=timeout, trust_env=True) as session:
-            async with session.get(
-                url, headers={**({"Authorization": f"Bearer {key}"} if key else {})}
-            ) as response:
-                return await response.json()
+        session = await get_http_session(url)
+        async with session.get(
+            url,
+            headers={**({"Authorization": f"Bearer {key}"} if key else {})},
+            timeout=timeout,
+        ) as response:
+            return await response.json()
     except Exception as e:
         # Handle connection error here
         log.error(f"Connection error: {e}")
         return None
 
 
-async def cleanup_response(
-    response: Optional[aiohttp.ClientResponse],
-    session: Optional[aiohttp.ClientSession],
-):
-    if response:
-        response.close()
-    if session:
-        await session.close()
-
-
 def openai_o1_handler(payload):
     """
     Handle O1 specific parameters
@@ -620,19 +615,18 @@ async def generate_chat_completion(
     payload = json.dumps(payload)
 
     r = None
-    session = None
     streaming = False
     response = None
 
     try:
-        session = aiohttp.ClientSession(
-            trust_env=True, timeout=aiohttp.ClientTimeout(total=AIOHTTP_CLIENT_TIMEOUT)
-        )
+        session = await get_http_session(url)
+        start_time = time.perf_counter()
 
         r = await session.request(
             method="POST",
             url=f"{url}/chat/completions",
             data=payload,
+            timeout=aiohttp.ClientTimeout(total=AIOHTTP_CLIENT_TIMEOUT),
             headers={
                 "Authorization": f"Bearer {key}",
                 "Content-Type": "application/json",
@@ -661,12 +655,10 @@ async def generate_chat_completion(
         if "text/event-stream" in r.headers.get("Content-Type", ""):
             streaming = True
             return StreamingResponse(
-                r.content,
+                observe_stream(r.content, "openai", model_id, start_time, sse=True),
                 status_code=r.status,
                 headers=dict(r.headers),
-                background=BackgroundTask(
-                    cleanup_response, response=r, session=session
-                ),
+                background=BackgroundTask(release_response, response=r),
             )
         else:
             try:
@@ -692,10 +684,8 @@ async def generate_chat_completion(
             detail=detail if detail else "Open WebUI: Server Connection Error",
         )
     finally:
-        if not streaming and session:
-            if r:
-                r.close()
-            await session.close()
+        if not streaming:
+            await release_response(r)
 
 
 @router.api_route("/{path:path}", methods=["GET", "POST", "PUT", "DELETE"])
@@ -711,11 +701,10 @@ async def proxy(path: str, request: Request, user=Depends(get_verified_user)):
     key = request.app.state.config.OPENAI_API_KEYS[idx]
 
     r = None
-    session = None
     streaming = False
 
     try:
-        session = aiohttp.ClientSession(trust_env=True)
+        session = await get_http_session(url)
         r = await session.request(
             method=request.method,
             url=f"{url}/{path}",
@@ -744,9 +733,7 @@ async def proxy(path: str, request: Request, user=Depends(get_verified_user)):
                 r.content,
                 status_code=r.status,
                 headers=dict(r.headers),
-                background=BackgroundTask(
-                    cleanup_response, response=r, session=session
-                ),
+                background=BackgroundTask(release_response, response=r),
             )
         else:
             response_data = await r.json()
@@ -769,7 +756,5 @@ async def proxy(path: str, request: Request, user=Depends(get_verified_user)):
             detail=detail if detail else "Open WebUI: Server Connection Error",
         )
     finally:
-        if not streaming and session:
-            if r:
-                r.close()
-            await session.close()
+        if not streaming:
+            await release_response(r)
@@ -29,11 +29,16 @@ from langchain.text_splitter import RecursiveCharacterTextSplitter, TokenTextSpl
 from langchain_core.documents import Document
 
 from open_webui.models.files import FileModel, Files
+from open_webui.models.ingestion_jobs import IngestionJobModel, IngestionJobs
 from open_webui.models.knowledge import Knowledges
+from open_webui.models.users import Users
 from open_webui.storage.provider import Storage
 
 
 from open_webui.retrieval.vector.connector import VECTOR_DB_CLIENT
+from open_webui.retrieval.bm25 import BM25_INDEX
+from open_webui.retrieval.ingestion import INGESTION_QUEUE, IngestionJobContext
+from open_webui.retrieval.models.lazy import LazyModel
 
 # Document loaders
 from open_webui.retrieval.loaders.main import Loader
@@ -42,6 +47,7 @@ from open_webui.retrieval.loaders.youtube import YoutubeLoader
 # Web search engines
 from open_webui.retrieval.web.main import SearchResult
 from open_webui.retrieval.web.utils import get_web_loader
+from open_webui.retrieval.web.cache import WEB_SEARCH_CACHE, get_search_cache_key
 from open_webui.retrieval.web.brave import search_brave
 from open_webui.retrieval.web.kagi import search_kagi
 from open_webui.retrieval.web.mojeek import search_mojeek
@@ -151,6 +157,26 @@ def get_rf(
     return rf
 
 
+def get_lazy_ef(
+    engine: str,
+    embedding_model: str,
+    auto_update: bool = False,
+) -> Optional[LazyModel]:
+    # Only local models are loaded, the others are called through their API
+    if not (embedding_model and engine == ""):
+        return None
+    return LazyModel("embedding", lambda: get_ef(engine, embedding_model, auto_update))
+
+
+def get_lazy_rf(
+    reranking_model: str,
+    auto_update: bool = False,
+) -> Optional[LazyModel]:
+    if not reranking_model:
+        return None
+    return LazyModel("reranking", lambda: get_rf(reranking_model, auto_update))
+
+
 ##########################################
 #
 # API routes
@@ -660,6 +686,7 @@ def save_docs_to_vector_db(
     overwrite: bool = False,
     split: bool = True,
     add: bool = False,
+    cache_embeddings: bool = False,
 ) -> bool:
     def _get_docs_info(docs: list[Document]) -> str:
         docs_info = set()
@@ -749,6 +776,7 @@ def save_docs_to_vector_db(
 
             if overwrite:
                 VECTOR_DB_CLIENT.delete_collection(collection_name=collection_name)
+                BM25_INDEX.drop(collection_name)
                 log.info(f"deleting existing collection {collection_name}")
             elif add is False:
                 log.info(
@@ -772,6 +800,9 @@ def save_docs_to_vector_db(
                 else request.app.state.config.RAG_OLLAMA_API_KEY
             ),
             request.app.state.config.RAG_EMBEDDING_BATCH_SIZE,
+            # Chunks of files are rarely embedded twice, only queries and web
+            # pages (which repeat across searches) are cached
+            cache=cache_embeddings,
         )
 
         embeddings = embedding_function(
@@ -792,6 +823,7 @@ def save_docs_to_vector_db(
             collection_name=collection_name,
             items=items,
         )
+        BM25_INDEX.add(collection_name, items)
 
         return True
     except Exception as e:
@@ -824,6 +856,7 @@ def process_file(
             # Usage: /files/{file_id}/data/content/update
 
             VECTOR_DB_CLIENT.delete_collection(collection_name=f"file-{file.id}")
+            BM25_INDEX.drop(f"file-{file.id}")
 
             docs = [
                 Document(
@@ -1064,7 +1097,9 @@ def process_web(
         content = " ".join([doc.page_content for doc in docs])
 
         log.debug(f"text_content: {content}")
-        save_docs_to_vector_db(request, docs, collection_name, overwrite=True)
+        save_docs_to_vector_db(
+            request, docs, collection_name, overwrite=True, cache_embeddings=True
+        )
 
         return {
             "status": True,
@@ -1245,8 +1280,15 @@ def process_web_search(
         logging.info(
             f"trying to web search with {request.app.state.config.RAG_WEB_SEARCH_ENGINE, form_data.query}"
         )
-        web_results = search_web(
-            request, request.app.state.config.RAG_WEB_SEARCH_ENGINE, form_data.query
+        engine = request.app.state.config.RAG_WEB_SEARCH_ENGINE
+        web_results = WEB_SEARCH_CACHE.get_or_set(
+            get_search_cache_key(
+                engine,
+                form_data.query,
+                request.app.state.config.RAG_WEB_SEARCH_RESULT_COUNT,
+                request.app.state.config.RAG_WEB_SEARCH_DOMAIN_FILTER_LIST,
+            ),
+            lambda: search_web(request, engine, form_data.query),
         )
     except Exception as e:
         log.exception(e)
@@ -1272,7 +1314,9 @@ def process_web_search(
             requests_per_second=request.app.state.config.RAG_WEB_SEARCH_CONCURRENT_REQUESTS,
         )
         docs = loader.load()
-        save_docs_to_vector_db(request, docs, collection_name, overwrite=True)
+        save_docs_to_vector_db(
+            request, docs, collection_name, overwrite=True, cache_embeddings=True
+        )
 
         return {
             "status": True,
@@ -1396,6 +1440,7 @@ def delete_entries_from_collection(form_data: DeleteForm, user=Depends(get_admin
                 collection_name=form_data.collection_name,
                 metadata={"hash": hash},
             )
+            BM25_INDEX.delete(form_data.collection_name, filter={"hash": hash})
             return {"status": True}
         else:
             return {"status": False}
@@ -1407,6 +1452,7 @@ def delete_entries_from_collection(form_data: DeleteForm, user=Depends(get_admin
 @router.post("/reset/db")
 def reset_vector_db(user=Depends(get_admin_user)):
     VECTOR_DB_CLIENT.reset()
+    BM25_INDEX.reset()
     Knowledges.delete_all_knowledge()
 
 
@@ -1456,22 +1502,18 @@ class BatchProcessFilesResponse(BaseModel):
     errors: List[BatchProcessFilesResult]
 
 
-@router.post("/process/files/batch")
-def process_files_batch(
-    request: Request,
-    form_data: BatchProcessFilesForm,
-    user=Depends(get_verified_user),
+def save_files_to_vector_db(
+    request: Request, files: List[FileModel], collection_name: str
 ) -> BatchProcessFilesResponse:
     """
     Process a batch of files and save them to the vector database.
     """
     results: List[BatchProcessFilesResult] = []
     errors: List[BatchProcessFilesResult] = []
-    collection_name = form_data.collection_name
 
     # Prepare all documents first
     all_docs: List[Document] = []
-    for file in form_data.files:
+    for file in files:
         try:
             text_content = file.data.get("content", "")
 
@@ -1529,3 +1571,115 @@ def process_files_batch(
                 )
 
     return BatchProcessFilesResponse(results=results, errors=errors)
+
+
+def process_files_batch_job(
+    request: Request,
+    job: IngestionJobModel,
+    context: IngestionJobContext,
+    chunk_size: int = 16,
+    on_chunk=None,
+) -> dict:
+    """
+    Runs a queued batch in chunks of `chunk_size` files, reporting progress
+    (and stopping if cancelled) after each chunk. `on_chunk` is called with
+    the response of every chunk.
+    """
+    file_ids = job.data["file_ids"]
+    results: List[BatchProcessFilesResult] = []
+    errors: List[BatchProcessFilesResult] = []
+
+    user = Users.get_user_by_id(job.user_id)
+    for idx in range(0, len(file_ids), chunk_size):
+        files = Files.get_files_by_ids(file_ids[idx : idx + chunk_size])
+        if user is None or user.role != "admin":
+            # Checked when queued, and again for jobs queued before that
+            files = [file for file in files if file.user_id == job.user_id]
+
+        response = save_files_to_vector_db(request, files, job.data["collection_name"])
+        if on_chunk is not None:
+            on_chunk(response)
+
+        results.extend(response.results)
+        errors.extend(response.errors)
+        context.progress(min(idx + chunk_size, len(file_ids)) / len(file_ids))
+
+    return BatchProcessFilesResponse(results=results, errors=errors).model_dump()
+
+
+@router.post("/process/files/batch", response_model=IngestionJobModel)
+def process_files_batch(
+    request: Request,
+    form_data: BatchProcessFilesForm,
+    user=Depends(get_verified_user),
+) -> IngestionJobModel:
+    """
+    Queue a batch of files to be saved to the vector database. The returned
+    job reports the progress and, once completed, the result of every file.
+    """
+    file_ids = list(dict.fromkeys(file.id for file in form_data.files))
+
+    # The job reads the files from the database, only the caller's may be queued
+    files = Files.get_files_by_ids(file_ids)
+    if len(files) != len(file_ids) or (
+        user.role != "admin" and any(file.user_id != user.id for file in files)
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=ERROR_MESSAGES.NOT_FOUND,
+        )
+
+    return INGESTION_QUEUE.enqueue(
+        user.id,
+        "process_files_batch",
+        {"file_ids": file_ids, "collection_name": form_data.collection_name},
+    )
+
+
+def process_file_job(
+    request: Request, job: IngestionJobModel, context: IngestionJobContext
+) -> dict:
+    result = process_file(
+        request,
+        ProcessFileForm(**job.data),
+        user=Users.get_user_by_id(job.user_id),
+    )
+    return {
+        "collection_name": result.get("collection_name") if result else None,
+        "filename": result.get("filename") if result else None,
+    }
+
+
+INGESTION_QUEUE.register("process_file", process_file_job)
+INGESTION_QUEUE.register("process_files_batch", process_files_batch_job)
+
+
+############################
+# Ingestion Jobs
+############################
+
+
+def get_job_for_user(id: str, user) -> IngestionJobModel:
+    job = IngestionJobs.get_job_by_id(id)
+    if job is None or (job.user_id != user.id and user.role != "admin"):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=ERROR_MESSAGES.NOT_FOUND,
+        )
+    return job
+
+
+@router.get("/process/jobs", response_model=list[IngestionJobModel])
+async def get_ingestion_jobs(user=Depends(get_verified_user)):
+    return IngestionJobs.get_jobs_by_user_id(user.id)
+
+
+@router.get("/process/jobs/{id}", response_model=IngestionJobModel)
+async def get_ingestion_job_by_id(id: str, user=Depends(get_verified_user)):
+    return get_job_for_user(id, user)
+
+
+@router.post("/process/jobs/{id}/cancel", response_model=IngestionJobModel)
+async def cancel_ingestion_job_by_id(id: str, user=Depends(get_verified_user)):
+    get_job_for_user(id, user)
+    return IngestionJobs.cancel_job_by_id(id)
@@ -8,7 +8,13 @@ from open_webui.models.tools import (
     ToolUserResponse,
     Tools,
 )
-from open_webui.utils.plugin import load_tools_module_by_id, replace_imports
+from open_webui.utils.plugin import (
+    ainstall_frontmatter_requirements,
+    evict_tools_module,
+    get_tools_module,
+    load_tools_module_by_id,
+    replace_imports,
+)
 from open_webui.config import CACHE_DIR
 from open_webui.constants import ERROR_MESSAGES
 from fastapi import APIRouter, Depends, HTTPException, Request, status
@@ -89,6 +95,7 @@ async def create_new_tools(
     if tools is None:
         try:
             form_data.content = replace_imports(form_data.content)
+            await ainstall_frontmatter_requirements(form_data.content)
             tools_module, frontmatter = load_tools_module_by_id(
                 form_data.id, content=form_data.content
             )
@@ -173,6 +180,7 @@ async def update_tools_by_id(
 
     try:
         form_data.content = replace_imports(form_data.content)
+        await ainstall_frontmatter_requirements(form_data.content)
         tools_module, frontmatter = load_tools_module_by_id(
             id, content=form_data.content
         )
@@ -230,9 +238,7 @@ async def delete_tools_by_id(
 
     result = Tools.delete_tool_by_id(id)
     if result:
-        TOOLS = request.app.state.TOOLS
-        if id in TOOLS:
-            del TOOLS[id]
+        evict_tools_module(request, id)
 
     return result
 
@@ -272,11 +278,7 @@ async def get_tools_valves_spec_by_id(
 ):
     tools = Tools.get_tool_by_id(id)
     if tools:
-        if id in request.app.state.TOOLS:
-            tools_module = request.app.state.TOOLS[id]
-        else:
-            tools_module, _ = load_tools_module_by_id(id)
-            request.app.state.TOOLS[id] = tools_module
+        tools_module = get_tools_module(request, id, tools)
 
         if hasattr(tools_module, "Valves"):
             Valves = tools_module.Valves
@@ -304,11 +306,7 @@ async def update_tools_valves_by_id(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail=ERROR_MESSAGES.NOT_FOUND,
         )
-    if id in request.app.state.TOOLS:
-        tools_module = request.app.state.TOOLS[id]
-    else:
-        tools_module, _ = load_tools_module_by_id(id)
-        request.app.state.TOOLS[id] = tools_module
+    tools_module = get_tools_module(request, id, tools)
 
     if not hasattr(tools_module, "Valves"):
         raise HTTPException(
@@ -360,11 +358,7 @@ async def get_tools_user_valves_spec_by_id(
 ):
     tools = Tools.get_tool_by_id(id)
     if tools:
-        if id in request.app.state.TOOLS:
-            tools_module = request.app.state.TOOLS[id]
-        else:
-            tools_module, _ = load_tools_module_by_id(id)
-            request.app.state.TOOLS[id] = tools_module
+        tools_module = get_tools_module(request, id, tools)
 
         if hasattr(tools_module, "UserValves"):
             UserValves = tools_module.UserValves
@@ -384,11 +378,7 @@ async def update_tools_user_valves_by_id(
     tools = Tools.get_tool_by_id(id)
 
     if tools:
-        if id in request.app.state.TOOLS:
-            tools_module = request.app.state.TOOLS[id]
-        else:
-            tools_module, _ = load_tools_module_by_id(id)
-            request.app.state.TOOLS[id] = tools_module
+        tools_module = get_tools_module(request, id, tools)
 
         if hasattr(tools_module, "UserValves"):
             UserValves = tools_module.UserValves
@@ -14,7 +14,15 @@ from open_webui.env import (
     WEBSOCKET_REDIS_URL,
 )
 from open_webui.utils.auth import decode_token
-from open_webui.socket.utils import RedisDict, RedisLock
+from open_webui.utils.metrics import SOCKET_SESSIONS
+from open_webui.socket.utils import (
+    RedisDict,
+    RedisSetDict,
+    RedisLock,
+    LocalDict,
+    LocalSetDict,
+    BroadcastCoalescer,
+)
 
 from open_webui.env import (
     GLOBAL_LOG_LEVEL,
@@ -54,9 +62,12 @@ TIMEOUT_DURATION = 3
 
 if WEBSOCKET_MANAGER == "redis":
     log.debug("Using Redis to manage websockets.")
+    # session id -> user
     SESSION_POOL = RedisDict("open-webui:session_pool", redis_url=WEBSOCKET_REDIS_URL)
-    USER_POOL = RedisDict("open-webui:user_pool", redis_url=WEBSOCKET_REDIS_URL)
-    USAGE_POOL = RedisDict("open-webui:usage_pool", redis_url=WEBSOCKET_REDIS_URL)
+    # user id -> session ids
+    USER_POOL = RedisSetDict("open-webui:user_pool", redis_url=WEBSOCKET_REDIS_URL)
+    # model id -> session ids, scored by their last usage update
+    USAGE_POOL = RedisSetDict("open-webui:usage_pool", redis_url=WEBSOCKET_REDIS_URL)
 
     clean_up_lock = RedisLock(
         redis_url=WEBSOCKET_REDIS_URL,
@@ -67,12 +78,29 @@ if WEBSOCKET_MANAGER == "redis":
     renew_func = clean_up_lock.renew_lock
     release_func = clean_up_lock.release_lock
 else:
-    SESSION_POOL = {}
-    USER_POOL = {}
-    USAGE_POOL = {}
+    SESSION_POOL = LocalDict()
+    USER_POOL = LocalSetDict()
+    USAGE_POOL = LocalSetDict()
     aquire_func = release_func = renew_func = lambda: True
 
 
+async def get_models_in_use():
+    # List models that are currently in use
+    models_in_use = await USAGE_POOL.keys()
+    return models_in_use
+
+
+# Presence and usage are sent as diffs, once per tick of the usage pool cleanup
+USER_LIST_BROADCAST = BroadcastCoalescer(
+    sio.emit, "user-list", "user_ids", USER_POOL.keys
+)
+USAGE_BROADCAST = BroadcastCoalescer(sio.emit, "usage", "models", get_models_in_use)
+
+BROADCASTS = {
+    broadcast.event: broadcast for broadcast in [USER_LIST_BROADCAST, USAGE_BROADCAST]
+}
+
+
 async def periodic_usage_pool_cleanup():
     if not aquire_func():
         log.debug("Usage pool cleanup lock already exists. Not running it.")
@@ -85,29 +113,16 @@ async def periodic_usage_pool_cleanup():
                 raise Exception("Unable to renew usage pool cleanup lock.")
 
             now = int(time.time())
-            send_usage = False
-            for model_id, connections in list(USAGE_POOL.items()):
-                # Creating a list of sids to remove if they have timed out
-                expired_sids = [
-                    sid
-                    for sid, details in connections.items()
-                    if now - details["updated_at"] > TIMEOUT_DURATION
-                ]
-
-                for sid in expired_sids:
-                    del connections[sid]
-
-                if not connections:
-                    log.debug(f"Cleaning up model {model_id} from usage pool")
-                    del USAGE_POOL[model_id]
-                else:
-                    USAGE_POOL[model_id] = connections
-
-                send_usage = True
-
-            if send_usage:
-                # Emit updated usage information after cleaning
-                await sio.emit("usage", {"models": get_models_in_use()})
+            for model_id in await USAGE_POOL.keys():
+                # Drop the sessions that timed out, and the model once none is left
+                await USAGE_POOL.remove_before(model_id, now - TIMEOUT_DURATION)
+
+            # Emit what changed since the last tick to the subscribers
+            for broadcast in BROADCASTS.values():
+                try:
+                    await broadcast.flush()
+                except Exception as e:
+                    log.error(f"Error broadcasting {broadcast.event}: {e}")
 
             await asyncio.sleep(TIMEOUT_DURATION)
     finally:
@@ -120,30 +135,20 @@ app = socketio.ASGIApp(
 )
 
 
-def get_models_in_use():
-    # List models that are currently in use
-    models_in_use = list(USAGE_POOL.keys())
-    return models_in_use
-
-
 @sio.on("usage")
 async def usage(sid, data):
     model_id = data["model"]
     # Record the timestamp for the last update
     current_time = int(time.time())
 
-    # Store the new usage data and task
-    USAGE_POOL[model_id] = {
-        **(USAGE_POOL[model_id] if model_id in USAGE_POOL else {}),
-        sid: {"updated_at": current_time},
-    }
-
-    # Broadcast the usage data to all clients
-    await sio.emit("usage", {"models": get_models_in_use()})
+    # Store the new usage data and task, subscribers get it on the next tick
+    await USAGE_POOL.add(model_id, sid, current_time)
 
 
 @sio.event
 async def connect(sid, environ, auth):
+    SOCKET_SESSIONS.inc()
+
     user = None
     if auth and "token" in auth:
         data = decode_token(auth["token"])
@@ -152,15 +157,10 @@ async def connect(sid, environ, auth):
             user = Users.get_user_by_id(data["id"])
 
         if user:
-            SESSION_POOL[sid] = user.model_dump()
-            if user.id in USER_POOL:
-                USER_POOL[user.id] = USER_POOL[user.id] + [sid]
-            else:
-                USER_POOL[user.id] = [sid]
+            await SESSION_POOL.set(sid, user.model_dump())
+            await USER_POOL.add(user.id, sid)
 
             # print(f"user {user.name}({user.id}) connected with session ID {sid}")
-            await sio.emit("user-list", {"user_ids": list(USER_POOL.keys())})
-            await sio.emit("usage", {"models": get_models_in_use()})
 
 
 @sio.on("user-join")
@@ -178,11 +178,8 @@ async def user_join(sid, data):
     if not user:
         return
 
-    SESSION_POOL[sid] = user.model_dump()
-    if user.id in USER_POOL:
-        USER_POOL[user.id] = USER_POOL[user.id] + [sid]
-    else:
-        USER_POOL[user.id] = [sid]
+    await SESSION_POOL.set(sid, user.model_dump())
+    await USER_POOL.add(user.id, sid)
 
     # Join all the channels
     channels = Channels.get_channels_by_user_id(user.id)
@@ -192,7 +189,6 @@ async def user_join(sid, data):
 
     # print(f"user {user.name}({user.id}) connected with session ID {sid}")
 
-    await sio.emit("user-list", {"user_ids": list(USER_POOL.keys())})
     return {"id": user.id, "name": user.name}
 
 
@@ -239,30 +235,56 @@ async def channel_events(sid, data):
                 "channel_id": data["channel_id"],
                 "message_id": data.get("message_id", None),
                 "data": event_data,
-                "user": UserNameResponse(**SESSION_POOL[sid]).model_dump(),
+                "user": UserNameResponse(**await SESSION_POOL.get(sid)).model_dump(),
             },
             room=room,
         )
 
 
+@sio.on("subscribe")
+async def subscribe(sid, data):
+    events = data.get("events", [])
+
+    auth = data["auth"] if "auth" in data else None
+    if not auth or "token" not in auth:
+        return
+
+    data = decode_token(auth["token"])
+    if data is None or "id" not in data:
+        return
+
+    user = Users.get_user_by_id(data["id"])
+    if not user:
+        return
+
+    for event in events:
+        if broadcast := BROADCASTS.get(event):
+            await sio.enter_room(sid, broadcast.room)
+            # Diffs only make sense on top of the current state
+            await sio.emit(event, await broadcast.snapshot(), to=sid)
+
+
+@sio.on("unsubscribe")
+async def unsubscribe(sid, data):
+    for event in data.get("events", []):
+        if broadcast := BROADCASTS.get(event):
+            await sio.leave_room(sid, broadcast.room)
+
+
 @sio.on("user-list")
 async def user_list(sid):
-    await sio.emit("user-list", {"user_ids": list(USER_POOL.keys())})
+    await sio.emit("user-list", await USER_LIST_BROADCAST.snapshot(), to=sid)
 
 
 @sio.event
 async def disconnect(sid):
-    if sid in SESSION_POOL:
-        user = SESSION_POOL[sid]
-        del SESSION_POOL[sid]
-
-        user_id = user["id"]
-        USER_POOL[user_id] = [_sid for _sid in USER_POOL[user_id] if _sid != sid]
+    SOCKET_SESSIONS.dec()
 
-        if len(USER_POOL[user_id]) == 0:
-            del USER_POOL[user_id]
-
-        await sio.emit("user-list", {"user_ids": list(USER_POOL.keys())})
+    user = await SESSION_POOL.get(sid)
+    if user:
+        await SESSION_POOL.delete(sid)
+        # Also drops the user from the pool with their last session
+        await USER_POOL.remove(user["id"], sid)
     else:
         pass
         # print(f"Unknown session ID {sid} disconnected")
@@ -272,7 +294,7 @@ def get_event_emitter(request_info):
     async def __event_emitter__(event_data):
         user_id = request_info["user_id"]
         session_ids = list(
-            set(USER_POOL.get(user_id, []) + [request_info["session_id"]])
+            set(await USER_POOL.members(user_id) + [request_info["session_id"]])
         )
 
         for session_id in session_ids:
@@ -340,28 +362,32 @@ def get_event_call(request_info):
     return __event_call__
 
 
-def get_user_id_from_session_pool(sid):
-    user = SESSION_POOL.get(sid)
+async def get_user_id_from_session_pool(sid):
+    user = await SESSION_POOL.get(sid)
     if user:
         return user["id"]
     return None
 
 
-def get_user_ids_from_room(room):
+async def get_user_ids_from_room(room):
     active_session_ids = sio.manager.get_participants(
         namespace="/",
         room=room,
     )
 
-    active_user_ids = list(
-        set(
-            [SESSION_POOL.get(session_id[0])["id"] for session_id in active_session_ids]
-        )
+    # One round trip for the whole room
+    users = await SESSION_POOL.get_many(
+        [session_id[0] for session_id in active_session_ids]
     )
+    active_user_ids = list(set([user["id"] for user in users if user]))
     return active_user_ids
 
 
-def get_active_status_by_user_id(user_id):
-    if user_id in USER_POOL:
+async def get_active_status_by_user_id(user_id):
+    if await USER_POOL.contains(user_id):
         return True
     return False
+
+
+def get_broadcast_stats():
+    return {event: dict(broadcast.stats) for event, broadcast in BROADCASTS.items()}
@@ -1,6 +1,17 @@
+import asyncio
 import json
-import redis
+import logging
+import time
 import uuid
+from typing import Any, Optional
+
+import redis
+import redis.asyncio as aioredis
+
+from open_webui.env import SRC_LOG_LEVELS
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["SOCKET"])
 
 
 class RedisLock:
@@ -30,58 +41,386 @@ class RedisLock:
             self.redis.delete(self.lock_name)
 
 
+# Keyspace notifications the near caches rely on: K(eyspace) events for
+# g(eneric) commands, $(strings), s(ets), z(sorted sets) and x (expirations)
+KEYSPACE_EVENTS = "Kg$szx"
+
+# Seconds before a near cache tries to subscribe again after losing Redis
+NEAR_CACHE_RETRY_INTERVAL = 5
+
+MISSING = object()
+
+
+async def enable_keyspace_events(client: aioredis.Redis):
+    config = await client.config_get("notify-keyspace-events")
+    flags = config.get("notify-keyspace-events", "")
+    # "A" stands for every type of event
+    enabled = flags.replace("A", "g$lshzxetd")
+    missing = "".join(flag for flag in KEYSPACE_EVENTS if flag not in enabled)
+    if missing:
+        await client.config_set("notify-keyspace-events", flags + missing)
+
+
+class NearCache:
+    """
+    Per-worker copy of the Redis keys matching `pattern`, dropped as soon as
+    a keyspace notification reports they changed, in this worker or another.
+
+    Nothing is cached until the subscription is confirmed, nor after it is
+    lost: reads then go to Redis. Writers also invalidate the keys they wrote
+    right away, so a worker reads its own writes without waiting for their
+    notification.
+    """
+
+    def __init__(self, client: aioredis.Redis, pattern: str):
+        self.client = client
+        self.pattern = pattern
+
+        self.entries: dict[str, Any] = {}
+        self.enabled = False
+        # Incremented on every invalidation; values read from Redis are only
+        # kept if none happened while they were loading
+        self.version = 0
+        self.listener: Optional[asyncio.Task] = None
+
+    def lookup(self, key: str) -> Any:
+        if self.listener is None:
+            self.listener = asyncio.create_task(self._listen())
+        if not self.enabled:
+            return MISSING
+        return self.entries.get(key, MISSING)
+
+    def store(self, key: str, value: Any, version: int):
+        if self.enabled and version == self.version:
+            self.entries[key] = value
+
+    async def get(self, key: str, load) -> Any:
+        value = self.lookup(key)
+        if value is MISSING:
+            version = self.version
+            value = await load()
+            self.store(key, value, version)
+        return value
+
+    def invalidate(self, key: Optional[str] = None):
+        self.version += 1
+        if key is None:
+            self.entries.clear()
+        else:
+            self.entries.pop(key, None)
+
+    async def _listen(self):
+        db = self.client.connection_pool.connection_kwargs.get("db", 0)
+        prefix = f"__keyspace@{db}__:"
+
+        while True:
+            try:
+                await enable_keyspace_events(self.client)
+            except aioredis.ResponseError as e:
+                # e.g. managed servers where CONFIG is disabled
+                log.warning(
+                    f"Keyspace notifications unavailable, {self.pattern} is "
+                    f"not cached: {e}"
+                )
+                return
+            except Exception as e:
+                log.error(f"Error enabling keyspace notifications: {e}")
+                await asyncio.sleep(NEAR_CACHE_RETRY_INTERVAL)
+                continue
+
+            try:
+                async with self.client.pubsub() as pubsub:
+                    await pubsub.psubscribe(prefix + self.pattern)
+                    async for message in pubsub.listen():
+                        if message["type"] == "psubscribe":
+                            self.invalidate()
+                            self.enabled = True
+                        elif message["type"] == "pmessage":
+                            self.invalidate(message["channel"][len(prefix) :])
+            except Exception as e:
+                log.error(f"Lost keyspace notifications for {self.pattern}: {e}")
+            finally:
+                # Changes may be missed from now on
+                self.enabled = False
+                self.invalidate()
+            await asyncio.sleep(NEAR_CACHE_RETRY_INTERVAL)
+
+
 class RedisDict:
+    """
+    Dict of JSON values shared between workers, each stored in its own
+    Redis key under `name`, with the set of keys in `{name}:keys`.
+
+    Reads are served from a near cache when possible.
+    """
+
     def __init__(self, name, redis_url):
         self.name = name
-        self.redis = redis.Redis.from_url(redis_url, decode_responses=True)
+        self.redis = aioredis.Redis.from_url(redis_url, decode_responses=True)
+        self.index_key = f"{name}:keys"
+        self.cache = NearCache(self.redis, f"{name}:*")
+
+    def _key(self, key) -> str:
+        return f"{self.name}:item:{key}"
+
+    async def get(self, key, default=None):
+        item_key = self._key(key)
+        value = await self.cache.get(item_key, lambda: self.redis.get(item_key))
+        # Cached serialized, callers are free to modify what they get
+        return json.loads(value) if value is not None else default
+
+    async def get_many(self, keys: list) -> list:
+        """Values of `keys` (None if missing), in a single round trip."""
+        item_keys = [self._key(key) for key in keys]
+        values = [self.cache.lookup(item_key) for item_key in item_keys]
+
+        missing = [i for i, value in enumerate(values) if value is MISSING]
+        if missing:
+            version = self.cache.version
+            loaded = await self.redis.mget([item_keys[i] for i in missing])
+            for i, value in zip(missing, loaded):
+                values[i] = value
+                self.cache.store(item_keys[i], value, version)
+
+        return [json.loads(value) if value is not None else None for value in values]
+
+    def _invalidate(self, key):
+        self.cache.invalidate(self._key(key))
+        self.cache.invalidate(self.index_key)
+
+    async def set(self, key, value):
+        try:
+            async with self.redis.pipeline(transaction=True) as pipe:
+                pipe.set(self._key(key), json.dumps(value))
+                pipe.sadd(self.index_key, key)
+                await pipe.execute()
+        finally:
+            self._invalidate(key)
+
+    async def delete(self, key):
+        try:
+            async with self.redis.pipeline(transaction=True) as pipe:
+                pipe.delete(self._key(key))
+                pipe.srem(self.index_key, key)
+                await pipe.execute()
+        finally:
+            self._invalidate(key)
+
+    async def keys(self) -> list:
+        return list(
+            await self.cache.get(
+                self.index_key, lambda: self.redis.smembers(self.index_key)
+            )
+        )
+
+    async def contains(self, key) -> bool:
+        return await self.get(key) is not None
+
+
+# Both drop the key from the index once its last member is removed
+REMOVE_MEMBERS_SCRIPT = """
+local removed = redis.call('ZREM', KEYS[1], unpack(ARGV, 2))
+if redis.call('ZCARD', KEYS[1]) == 0 then
+    redis.call('SREM', KEYS[2], ARGV[1])
+end
+return removed
+"""
+
+REMOVE_MEMBERS_BEFORE_SCRIPT = """
+local removed = redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', '(' .. ARGV[2])
+if redis.call('ZCARD', KEYS[1]) == 0 then
+    redis.call('SREM', KEYS[2], ARGV[1])
+end
+return removed
+"""
+
+
+class RedisSetDict:
+    """
+    Dict of sets shared between workers, e.g. user id -> session ids. Each set
+    is a Redis sorted set under `name`, scored by when its members were last
+    added, with the set of keys in `{name}:keys`.
+
+    Members are added and removed atomically, so concurrent updates from
+    several workers never overwrite each other. Reads are served from a near
+    cache when possible.
+    """
+
+    def __init__(self, name, redis_url):
+        self.name = name
+        self.redis = aioredis.Redis.from_url(redis_url, decode_responses=True)
+        self.index_key = f"{name}:keys"
+        self.cache = NearCache(self.redis, f"{name}:*")
+
+        self.remove_script = self.redis.register_script(REMOVE_MEMBERS_SCRIPT)
+        self.remove_before_script = self.redis.register_script(
+            REMOVE_MEMBERS_BEFORE_SCRIPT
+        )
+
+    def _key(self, key) -> str:
+        return f"{self.name}:item:{key}"
+
+    def _invalidate(self, key):
+        self.cache.invalidate(self._key(key))
+        self.cache.invalidate(self.index_key)
+
+    async def add(self, key, member, score: Optional[float] = None):
+        if score is None:
+            score = time.time()
+        try:
+            async with self.redis.pipeline(transaction=True) as pipe:
+                pipe.zadd(self._key(key), {member: score})
+                pipe.sadd(self.index_key, key)
+                await pipe.execute()
+        finally:
+            self._invalidate(key)
+
+    async def remove(self, key, *members) -> int:
+        try:
+            return await self.remove_script(
+                keys=[self._key(key), self.index_key], args=[key, *members]
+            )
+        finally:
+            self._invalidate(key)
+
+    async def remove_before(self, key, score: float) -> int:
+        """Removes the members last added before `score`."""
+        try:
+            return await self.remove_before_script(
+                keys=[self._key(key), self.index_key], args=[key, score]
+            )
+        finally:
+            self._invalidate(key)
+
+    async def members(self, key) -> list:
+        item_key = self._key(key)
+        return list(
+            await self.cache.get(item_key, lambda: self.redis.zrange(item_key, 0, -1))
+        )
+
+    async def keys(self) -> list:
+        return list(
+            await self.cache.get(
+                self.index_key, lambda: self.redis.smembers(self.index_key)
+            )
+        )
+
+    async def contains(self, key) -> bool:
+        return key in await self.keys()
+
+
+class LocalDict:
+    """In-process equivalent of RedisDict, for a single worker."""
+
+    def __init__(self):
+        self.entries = {}
+
+    async def get(self, key, default=None):
+        return self.entries.get(key, default)
+
+    async def get_many(self, keys: list) -> list:
+        return [self.entries.get(key) for key in keys]
+
+    async def set(self, key, value):
+        self.entries[key] = value
+
+    async def delete(self, key):
+        self.entries.pop(key, None)
+
+    async def keys(self) -> list:
+        return list(self.entries.keys())
+
+    async def contains(self, key) -> bool:
+        return key in self.entries
+
+
+class LocalSetDict:
+    """In-process equivalent of RedisSetDict, for a single worker."""
+
+    def __init__(self):
+        # key -> {member: score}
+        self.entries: dict[str, dict[str, float]] = {}
+
+    async def add(self, key, member, score: Optional[float] = None):
+        if score is None:
+            score = time.time()
+        self.entries.setdefault(key, {})[member] = score
+
+    async def remove(self, key, *members) -> int:
+        return self._remove(key, lambda member, score: member in members)
+
+    async def remove_before(self, key, score: float) -> int:
+        return self._remove(key, lambda member, _score: _score < score)
+
+    def _remove(self, key, predicate) -> int:
+        scores = self.entries.get(key, {})
+        removed = [
+            member for member, score in scores.items() if predicate(member, score)
+        ]
+        for member in removed:
+            del scores[member]
+        if not scores:
+            self.entries.pop(key, None)
+        return len(removed)
+
+    async def members(self, key) -> list:
+        return list(self.entries.get(key, {}).keys())
+
+    async def keys(self) -> list:
+        return list(self.entries.keys())
+
+    async def contains(self, key) -> bool:
+        return key in self.entries
 
-    def __setitem__(self, key, value):
-        serialized_value = json.dumps(value)
-        self.redis.hset(self.name, key, serialized_value)
 
-    def __getitem__(self, key):
-        value = self.redis.hget(self.name, key)
-        if value is None:
-            raise KeyError(key)
-        return json.loads(value)
+class BroadcastCoalescer:
+    """
+    Broadcasts the changes of a set (e.g. the ids of the active users) to the
+    sessions that joined `room`, instead of the whole set to every session on
+    each change.
 
-    def __delitem__(self, key):
-        result = self.redis.hdel(self.name, key)
-        if result == 0:
-            raise KeyError(key)
+    Every `flush` compares the set with the last one sent and emits an
+    {"added", "removed"} diff if it changed. Subscribers are sent a snapshot,
+    {key: [...]}, when they join: the last set sent, which the next diffs
+    apply to, or the current one if nothing was sent yet (the first flush
+    then sends the whole set).
+    """
 
-    def __contains__(self, key):
-        return self.redis.hexists(self.name, key)
+    def __init__(self, emit, event: str, key: str, get_state):
+        self.emit = emit
+        self.event = event
+        self.key = key
+        self.room = f"broadcast:{event}"
+        self.get_state = get_state
 
-    def __len__(self):
-        return self.redis.hlen(self.name)
+        self.state: Optional[set] = None
+        self.stats = {"emitted": 0, "suppressed": 0}
 
-    def keys(self):
-        return self.redis.hkeys(self.name)
+    async def snapshot(self) -> dict:
+        if self.state is not None:
+            return {self.key: sorted(self.state)}
+        return {self.key: sorted(await self.get_state())}
 
-    def values(self):
-        return [json.loads(v) for v in self.redis.hvals(self.name)]
+    async def flush(self):
+        state = set(await self.get_state())
 
-    def items(self):
-        return [(k, json.loads(v)) for k, v in self.redis.hgetall(self.name).items()]
+        if self.state is None:
+            # Whatever subscribers have may predate this worker
+            payload = {self.key: sorted(state)}
+        else:
+            added = state - self.state
+            removed = self.state - state
+            if not added and not removed:
+                self.stats["suppressed"] += 1
+                return
+            payload = {"added": sorted(added), "removed": sorted(removed)}
 
-    def get(self, key, default=None):
+        # Snapshots taken from now on are of this state, the diff comes before
+        self.state = state
         try:
-            return self[key]
-        except KeyError:
-            return default
-
-    def clear(self):
-        self.redis.delete(self.name)
-
-    def update(self, other=None, **kwargs):
-        if other is not None:
-            for k, v in other.items() if hasattr(other, "items") else other:
-                self[k] = v
-        for k, v in kwargs.items():
-            self[k] = v
-
-    def setdefault(self, key, default=None):
-        if key not in self:
-            self[key] = default
-        return self[key]
+            await self.emit(self.event, payload, room=self.room)
+        except Exception:
+            # Subscribers missed the diff, the next flush sends the whole set
+            self.state = None
+            raise
+        self.stats["emitted"] += 1
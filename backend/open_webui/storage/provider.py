@@ -1,10 +1,12 @@
+import asyncio
 import os
-import boto3
-from botocore.exceptions import ClientError
 import shutil
+from abc import ABC, abstractmethod
+from typing import BinaryIO, Optional, Tuple
 
-
-from typing import BinaryIO, Tuple, Optional, Union
+import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.exceptions import ClientError
 
 from open_webui.constants import ERROR_MESSAGES
 from open_webui.config import (
@@ -14,112 +16,91 @@ from open_webui.config import (
     S3_BUCKET_NAME,
     S3_REGION_NAME,
     S3_ENDPOINT_URL,
+    S3_CACHE_MAX_SIZE,
     UPLOAD_DIR,
 )
 
 
-import boto3
-from botocore.exceptions import ClientError
-from typing import BinaryIO, Tuple, Optional
+CHUNK_SIZE = 1024 * 1024
 
+# Objects above 8 MiB are transferred in parts of 8 MiB, several at a time,
+# streamed from and to disk
+TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=8 * 1024 * 1024,
+    multipart_chunksize=8 * 1024 * 1024,
+    max_concurrency=4,
+)
 
-class StorageProvider:
-    def __init__(self, provider: Optional[str] = None):
-        self.storage_provider: str = provider or STORAGE_PROVIDER
 
-        self.s3_client = None
-        self.s3_bucket_name: Optional[str] = None
+class StorageProvider(ABC):
+    @abstractmethod
+    def upload_file(self, file: BinaryIO, filename: str) -> Tuple[int, str]:
+        """Stores the file and returns its size and path."""
 
-        if self.storage_provider == "s3":
-            self._initialize_s3()
+    @abstractmethod
+    def get_file(self, file_path: str) -> str:
+        """Returns the path of a local copy of the file."""
 
-    def _initialize_s3(self) -> None:
-        """Initializes the S3 client and bucket name if using S3 storage."""
-        self.s3_client = boto3.client(
-            "s3",
-            region_name=S3_REGION_NAME,
-            endpoint_url=S3_ENDPOINT_URL,
-            aws_access_key_id=S3_ACCESS_KEY_ID,
-            aws_secret_access_key=S3_SECRET_ACCESS_KEY,
-        )
-        self.bucket_name = S3_BUCKET_NAME
+    @abstractmethod
+    def delete_file(self, file_path: str) -> None:
+        """Deletes the file."""
 
-    def _upload_to_s3(self, file_path: str, filename: str) -> Tuple[bytes, str]:
-        """Handles uploading of the file to S3 storage."""
-        if not self.s3_client:
-            raise RuntimeError("S3 Client is not initialized.")
+    @abstractmethod
+    def delete_all_files(self) -> None:
+        """Deletes all files from the storage."""
 
-        try:
-            self.s3_client.upload_file(file_path, self.bucket_name, filename)
-            return (
-                open(file_path, "rb").read(),
-                "s3://" + self.bucket_name + "/" + filename,
-            )
-        except ClientError as e:
-            raise RuntimeError(f"Error uploading file to S3: {e}")
+    # The async variants run in a thread, so transfers don't block the event loop
 
-    def _upload_to_local(self, contents: bytes, filename: str) -> Tuple[bytes, str]:
-        """Handles uploading of the file to local storage."""
-        file_path = f"{UPLOAD_DIR}/{filename}"
-        with open(file_path, "wb") as f:
-            f.write(contents)
-        return contents, file_path
+    async def aupload_file(self, file: BinaryIO, filename: str) -> Tuple[int, str]:
+        return await asyncio.to_thread(self.upload_file, file, filename)
 
-    def _get_file_from_s3(self, file_path: str) -> str:
-        """Handles downloading of the file from S3 storage."""
-        if not self.s3_client:
-            raise RuntimeError("S3 Client is not initialized.")
+    async def aget_file(self, file_path: str) -> str:
+        return await asyncio.to_thread(self.get_file, file_path)
 
-        try:
-            bucket_name, key = file_path.split("//")[1].split("/")
-            local_file_path = f"{UPLOAD_DIR}/{key}"
-            self.s3_client.download_file(bucket_name, key, local_file_path)
-            return local_file_path
-        except ClientError as e:
-            raise RuntimeError(f"Error downloading file from S3: {e}")
+    async def adelete_file(self, file_path: str) -> None:
+        return await asyncio.to_thread(self.delete_file, file_path)
 
-    def _get_file_from_local(self, file_path: str) -> str:
-        """Handles downloading of the file from local storage."""
-        return file_path
+    async def adelete_all_files(self) -> None:
+        return await asyncio.to_thread(self.delete_all_files)
 
-    def _delete_from_s3(self, filename: str) -> None:
-        """Handles deletion of the file from S3 storage."""
-        if not self.s3_client:
-            raise RuntimeError("S3 Client is not initialized.")
 
-        try:
-            self.s3_client.delete_object(Bucket=self.bucket_name, Key=filename)
-        except ClientError as e:
-            raise RuntimeError(f"Error deleting file from S3: {e}")
+class LocalStorageProvider(StorageProvider):
+    def __init__(self, upload_dir: str = UPLOAD_DIR):
+        self.upload_dir = upload_dir
+
+    def upload_file(self, file: BinaryIO, filename: str) -> Tuple[int, str]:
+        """Handles uploading of the file to local storage, in chunks."""
+        file_path = f"{self.upload_dir}/{filename}"
 
-    def _delete_from_local(self, filename: str) -> None:
+        size = 0
+        with open(file_path, "wb") as f:
+            while chunk := file.read(CHUNK_SIZE):
+                f.write(chunk)
+                size += len(chunk)
+
+        if not size:
+            os.remove(file_path)
+            raise ValueError(ERROR_MESSAGES.EMPTY_CONTENT)
+        return size, file_path
+
+    def get_file(self, file_path: str) -> str:
+        """Handles downloading of the file from local storage."""
+        return file_path
+
+    def delete_file(self, file_path: str) -> None:
         """Handles deletion of the file from local storage."""
-        file_path = f"{UPLOAD_DIR}/{filename}"
+        filename = file_path.split("/")[-1]
+        file_path = f"{self.upload_dir}/{filename}"
         if os.path.isfile(file_path):
             os.remove(file_path)
         else:
             print(f"File {file_path} not found in local storage.")
 
-    def _delete_all_from_s3(self) -> None:
-        """Handles deletion of all files from S3 storage."""
-        if not self.s3_client:
-            raise RuntimeError("S3 Client is not initialized.")
-
-        try:
-            response = self.s3_client.list_objects_v2(Bucket=self.bucket_name)
-            if "Contents" in response:
-                for content in response["Contents"]:
-                    self.s3_client.delete_object(
-                        Bucket=self.bucket_name, Key=content["Key"]
-                    )
-        except ClientError as e:
-            raise RuntimeError(f"Error deleting all files from S3: {e}")
-
-    def _delete_all_from_local(self) -> None:
+    def delete_all_files(self) -> None:
         """Handles deletion of all files from local storage."""
-        if os.path.exists(UPLOAD_DIR):
-            for filename in os.listdir(UPLOAD_DIR):
-                file_path = os.path.join(UPLOAD_DIR, filename)
+        if os.path.exists(self.upload_dir):
+            for filename in os.listdir(self.upload_dir):
+                file_path = os.path.join(self.upload_dir, filename)
                 try:
                     if os.path.isfile(file_path) or os.path.islink(file_path):
                         os.unlink(file_path)  # Remove the file or link
@@ -128,42 +109,194 @@ class StorageProvider:
                 except Exception as e:
                     print(f"Failed to delete {file_path}. Reason: {e}")
         else:
-            print(f"Directory {UPLOAD_DIR} not found in local storage.")
+            print(f"Directory {self.upload_dir} not found in local storage.")
 
-    def upload_file(self, file: BinaryIO, filename: str) -> Tuple[bytes, str]:
-        """Uploads a file either to S3 or the local file system."""
-        contents = file.read()
-        if not contents:
-            raise ValueError(ERROR_MESSAGES.EMPTY_CONTENT)
-        contents, file_path = self._upload_to_local(contents, filename)
 
-        if self.storage_provider == "s3":
-            return self._upload_to_s3(file_path, filename)
-        return contents, file_path
+class LocalFileCache:
+    """
+    Local copies of remote files, with the ETag they were stored with.
+
+    The total size of the copies is kept under `max_size` bytes (0 for no
+    limit) by removing the least recently used ones. Use is tracked through
+    the modification time, so it is shared by all workers.
+    """
+
+    def __init__(self, directory: str, max_size: int = 0):
+        self.directory = directory
+        self.etag_dir = os.path.join(directory, ".etags")
+        self.max_size = max_size
+
+    def get_path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def get_temp_path(self, name: str) -> str:
+        # Hidden, so it is never picked up by `evict`
+        return os.path.join(self.directory, f".{name}.{os.getpid()}.download")
+
+    def get_etag(self, name: str) -> Optional[str]:
+        if not os.path.isfile(self.get_path(name)):
+            return None
+        try:
+            with open(os.path.join(self.etag_dir, name)) as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def touch(self, name: str):
+        try:
+            os.utime(self.get_path(name))
+        except FileNotFoundError:
+            pass
+
+    def put(self, name: str, etag: str):
+        os.makedirs(self.etag_dir, exist_ok=True)
+        with open(os.path.join(self.etag_dir, name), "w") as f:
+            f.write(etag)
+
+        self.touch(name)
+        self.evict(keep=name)
+
+    def remove(self, name: str):
+        for path in [self.get_path(name), os.path.join(self.etag_dir, name)]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def evict(self, keep: Optional[str] = None):
+        if self.max_size <= 0:
+            return
+
+        entries = []
+        total_size = 0
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.name.startswith(".") or not entry.is_file():
+                    continue
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.name))
+                total_size += stat.st_size
+
+        for _, size, name in sorted(entries):
+            if total_size <= self.max_size:
+                break
+            if name != keep:
+                self.remove(name)
+                total_size -= size
+
+
+class S3StorageProvider(StorageProvider):
+    """
+    Stores files in S3, using the upload directory as a read-through cache.
+
+    Uploads are written to the cache in chunks and then sent as a multipart
+    upload from disk. A cached copy is served as long as its ETag still
+    matches the object (one HEAD request); otherwise the object is downloaded
+    again in ranged parts straight to disk.
+    """
+
+    def __init__(
+        self,
+        s3_client=None,
+        bucket_name: Optional[str] = S3_BUCKET_NAME,
+        upload_dir: str = UPLOAD_DIR,
+        cache_max_size: int = S3_CACHE_MAX_SIZE,
+    ):
+        self.s3_client = s3_client or boto3.client(
+            "s3",
+            region_name=S3_REGION_NAME,
+            endpoint_url=S3_ENDPOINT_URL,
+            aws_access_key_id=S3_ACCESS_KEY_ID,
+            aws_secret_access_key=S3_SECRET_ACCESS_KEY,
+        )
+        self.bucket_name = bucket_name
+
+        self.local = LocalStorageProvider(upload_dir)
+        self.cache = LocalFileCache(upload_dir, cache_max_size)
+
+    def upload_file(self, file: BinaryIO, filename: str) -> Tuple[int, str]:
+        """Handles uploading of the file to S3 storage."""
+        size, file_path = self.local.upload_file(file, filename)
+
+        try:
+            self.s3_client.upload_file(
+                file_path, self.bucket_name, filename, Config=TRANSFER_CONFIG
+            )
+            response = self.s3_client.head_object(Bucket=self.bucket_name, Key=filename)
+        except ClientError as e:
+            raise RuntimeError(f"Error uploading file to S3: {e}")
+
+        self.cache.put(filename, response["ETag"])
+        return size, "s3://" + self.bucket_name + "/" + filename
 
     def get_file(self, file_path: str) -> str:
-        """Downloads a file either from S3 or the local file system and returns the file path."""
-        if self.storage_provider == "s3":
-            return self._get_file_from_s3(file_path)
-        return self._get_file_from_local(file_path)
+        """Handles downloading of the file from S3 storage."""
+        try:
+            bucket_name, key = file_path.split("//")[1].split("/", 1)
+
+            etag = self.s3_client.head_object(Bucket=bucket_name, Key=key)["ETag"]
+            if self.cache.get_etag(key) == etag:
+                self.cache.touch(key)
+                return self.cache.get_path(key)
+
+            temp_path = self.cache.get_temp_path(key)
+            try:
+                self.s3_client.download_file(
+                    bucket_name, key, temp_path, Config=TRANSFER_CONFIG
+                )
+                os.replace(temp_path, self.cache.get_path(key))
+            finally:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+
+            self.cache.put(key, etag)
+            return self.cache.get_path(key)
+        except ClientError as e:
+            raise RuntimeError(f"Error downloading file from S3: {e}")
 
     def delete_file(self, file_path: str) -> None:
-        """Deletes a file either from S3 or the local file system."""
+        """Handles deletion of the file from S3 storage."""
         filename = file_path.split("/")[-1]
 
-        if self.storage_provider == "s3":
-            self._delete_from_s3(filename)
+        try:
+            self.s3_client.delete_object(Bucket=self.bucket_name, Key=filename)
+        except ClientError as e:
+            raise RuntimeError(f"Error deleting file from S3: {e}")
 
         # Always delete from local storage
-        self._delete_from_local(filename)
+        self.cache.remove(filename)
 
     def delete_all_files(self) -> None:
-        """Deletes all files from the storage."""
-        if self.storage_provider == "s3":
-            self._delete_all_from_s3()
+        """Handles deletion of all files from S3 storage."""
+        try:
+            paginator = self.s3_client.get_paginator("list_objects_v2")
+            for page in paginator.paginate(Bucket=self.bucket_name):
+                # A page holds at most 1000 keys, the limit of one batch delete
+                objects = [
+                    {"Key": content["Key"]} for content in page.get("Contents", [])
+                ]
+                if not objects:
+                    continue
+
+                response = self.s3_client.delete_objects(
+                    Bucket=self.bucket_name,
+                    Delete={"Objects": objects, "Quiet": True},
+                )
+                if response.get("Errors"):
+                    raise RuntimeError(
+                        f"Error deleting all files from S3: {response['Errors']}"
+                    )
+        except ClientError as e:
+            raise RuntimeError(f"Error deleting all files from S3: {e}")
 
         # Always delete from local storage
-        self._delete_all_from_local()
+        self.local.delete_all_files()
+
+
+def get_storage_provider(storage_provider: str) -> StorageProvider:
+    if storage_provider == "s3":
+        return S3StorageProvider()
+    return LocalStorageProvider()
 
 
-Storage = StorageProvider(provider=STORAGE_PROVIDER)
+Storage = get_storage_provider(STORAGE_PROVIDER)
@@ -1,12 +1,224 @@
 # tasks.py
 import asyncio
-from typing import Dict
+import json
+import logging
+import time
+from typing import Dict, Optional
 from uuid import uuid4
 
-# A dictionary to keep track of active tasks
+import redis.asyncio as aioredis
+
+from open_webui.env import (
+    SRC_LOG_LEVELS,
+    TASK_MANAGER,
+    TASK_REDIS_URL,
+    TASK_HEARTBEAT_INTERVAL,
+    TASK_HEARTBEAT_TIMEOUT,
+)
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["MAIN"])
+
+# Identifies this worker in the task registry
+WORKER_ID = str(uuid4())
+
+# Seconds to wait for another worker to stop one of its tasks
+STOP_TIMEOUT = 5
+
+# A dictionary to keep track of the tasks running in this worker
 tasks: Dict[str, asyncio.Task] = {}
 
 
+class LocalTaskRegistry:
+    """Registry of the tasks of a single worker."""
+
+    def __init__(self):
+        # task_id -> {"worker_id", "chat_id", "created_at"}
+        self.items: Dict[str, dict] = {}
+
+    async def register(self, task_id: str, item: dict):
+        self.items[task_id] = item
+
+    async def unregister(self, task_id: str, item: dict):
+        self.items.pop(task_id, None)
+
+    async def get(self, task_id: str) -> Optional[dict]:
+        return self.items.get(task_id)
+
+    async def list(self, chat_id: Optional[str] = None) -> list[str]:
+        return [
+            task_id
+            for task_id, item in self.items.items()
+            if chat_id is None or item["chat_id"] == chat_id
+        ]
+
+    async def request_stop(self, task_id: str) -> bool:
+        # Every task is local, there is nobody else to ask
+        return False
+
+    async def run(self):
+        pass
+
+    async def close(self):
+        pass
+
+
+class RedisTaskRegistry:
+    """
+    Registry of the tasks of all the workers sharing a Redis server.
+
+    Tasks are stored with the worker running them. Workers publish a heartbeat
+    every `heartbeat_interval` seconds; the tasks of workers that missed theirs
+    for `heartbeat_timeout` seconds are reaped by the others. Stop requests
+    are published on a channel, the worker owning the task cancels it.
+    """
+
+    def __init__(
+        self,
+        redis_url: str,
+        prefix: str = "open-webui:tasks",
+        heartbeat_interval: float = TASK_HEARTBEAT_INTERVAL,
+        heartbeat_timeout: float = TASK_HEARTBEAT_TIMEOUT,
+    ):
+        self.redis = aioredis.Redis.from_url(redis_url, decode_responses=True)
+        self.heartbeat_interval = heartbeat_interval
+        self.heartbeat_timeout = heartbeat_timeout
+
+        self.prefix = prefix
+        # task_id -> json item
+        self.tasks_key = prefix
+        # worker_id -> last heartbeat
+        self.workers_key = f"{prefix}:workers"
+        self.channel = f"{prefix}:commands"
+
+        # task_id -> item, of the tasks of this worker
+        self.items: Dict[str, dict] = {}
+
+    def _chat_key(self, chat_id: str) -> str:
+        return f"{self.prefix}:chat:{chat_id}"
+
+    async def register(self, task_id: str, item: dict):
+        self.items[task_id] = item
+        async with self.redis.pipeline(transaction=True) as pipe:
+            # Also counts as a heartbeat, a task is never seen without its owner
+            pipe.hset(self.workers_key, item["worker_id"], time.time())
+            pipe.hset(self.tasks_key, task_id, json.dumps(item))
+            if item["chat_id"]:
+                pipe.sadd(self._chat_key(item["chat_id"]), task_id)
+            await pipe.execute()
+
+    async def unregister(self, task_id: str, item: dict):
+        self.items.pop(task_id, None)
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hdel(self.tasks_key, task_id)
+            if item["chat_id"]:
+                pipe.srem(self._chat_key(item["chat_id"]), task_id)
+            await pipe.execute()
+
+    async def get(self, task_id: str) -> Optional[dict]:
+        item = await self.redis.hget(self.tasks_key, task_id)
+        return json.loads(item) if item is not None else None
+
+    async def list(self, chat_id: Optional[str] = None) -> list[str]:
+        if chat_id is None:
+            return list(await self.redis.hkeys(self.tasks_key))
+        return list(await self.redis.smembers(self._chat_key(chat_id)))
+
+    async def request_stop(self, task_id: str) -> bool:
+        if await self.get(task_id) is None:
+            return False
+
+        await self.redis.publish(
+            self.channel, json.dumps({"action": "stop", "task_id": task_id})
+        )
+        return True
+
+    async def heartbeat(self):
+        await self.redis.hset(self.workers_key, WORKER_ID, time.time())
+
+    async def reap(self):
+        """Drops the tasks of the workers that stopped sending heartbeats."""
+        workers = await self.redis.hgetall(self.workers_key)
+        deadline = time.time() - self.heartbeat_timeout
+        alive = {
+            worker_id
+            for worker_id, heartbeat in workers.items()
+            if float(heartbeat) >= deadline
+        }
+
+        orphans = {}
+        for task_id, item in (await self.redis.hgetall(self.tasks_key)).items():
+            item = json.loads(item)
+            if item["worker_id"] not in alive:
+                orphans[task_id] = item
+
+        dead = set(workers) - alive
+        if not orphans and not dead:
+            return
+
+        log.info(f"Reaping {len(orphans)} task(s) of {len(dead)} dead worker(s)")
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for task_id, item in orphans.items():
+                pipe.hdel(self.tasks_key, task_id)
+                if item["chat_id"]:
+                    pipe.srem(self._chat_key(item["chat_id"]), task_id)
+            if dead:
+                pipe.hdel(self.workers_key, *dead)
+            await pipe.execute()
+
+    async def _heartbeat_loop(self):
+        while True:
+            try:
+                await self.heartbeat()
+                await self.reap()
+            except Exception as e:
+                log.error(f"Error updating the task registry: {e}")
+            await asyncio.sleep(self.heartbeat_interval)
+
+    async def _listen(self):
+        while True:
+            try:
+                async with self.redis.pubsub() as pubsub:
+                    await pubsub.subscribe(self.channel)
+                    async for message in pubsub.listen():
+                        if message["type"] != "message":
+                            continue
+
+                        command = json.loads(message["data"])
+                        if command.get("action") == "stop":
+                            # Only the owner of the task has it
+                            if task := tasks.get(command["task_id"]):
+                                task.cancel()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.error(f"Error listening to task commands: {e}")
+                await asyncio.sleep(self.heartbeat_interval)
+
+    async def run(self):
+        await asyncio.gather(self._heartbeat_loop(), self._listen())
+
+    async def close(self):
+        """Releases the tasks of this worker, which is shutting down."""
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.hdel(self.workers_key, WORKER_ID)
+                for task_id, item in self.items.items():
+                    pipe.hdel(self.tasks_key, task_id)
+                    if item["chat_id"]:
+                        pipe.srem(self._chat_key(item["chat_id"]), task_id)
+                await pipe.execute()
+        except Exception as e:
+            log.error(f"Error releasing tasks: {e}")
+        await self.redis.aclose()
+
+
+if TASK_MANAGER == "redis":
+    TASK_REGISTRY = RedisTaskRegistry(TASK_REDIS_URL)
+else:
+    TASK_REGISTRY = LocalTaskRegistry()
+
+
 def cleanup_task(task_id: str):
     """
     Remove a completed or canceled task from the global `tasks` dictionary.
@@ -14,12 +226,32 @@ def cleanup_task(task_id: str):
     tasks.pop(task_id, None)  # Remove the task if it exists
 
 
-def create_task(coroutine):
+async def run_registered_task(task_id: str, item: dict, coroutine):
+    try:
+        try:
+            await TASK_REGISTRY.register(task_id, item)
+        except Exception as e:
+            # The task still runs, it just can't be stopped from other workers
+            log.error(f"Error registering task {task_id}: {e}")
+
+        return await coroutine
+    finally:
+        # In case it was cancelled before it started
+        coroutine.close()
+        try:
+            await TASK_REGISTRY.unregister(task_id, item)
+        except Exception as e:
+            log.error(f"Error unregistering task {task_id}: {e}")
+
+
+def create_task(coroutine, chat_id: Optional[str] = None):
     """
-    Create a new asyncio task and add it to the global task dictionary.
+    Create a new asyncio task and add it to the global task dictionary and the
+    task registry.
     """
     task_id = str(uuid4())  # Generate a unique ID for the task
-    task = asyncio.create_task(coroutine)  # Create the task
+    item = {"worker_id": WORKER_ID, "chat_id": chat_id, "created_at": time.time()}
+    task = asyncio.create_task(run_registered_task(task_id, item, coroutine))
 
     # Add a done callback for cleanup
     task.add_done_callback(lambda t: cleanup_task(task_id))
@@ -30,25 +262,44 @@ def create_task(coroutine):
 
 def get_task(task_id: str):
     """
-    Retrieve a task by its task ID.
+    Retrieve a task of this worker by its task ID.
     """
     return tasks.get(task_id)
 
 
-def list_tasks():
+async def list_tasks():
+    """
+    List the IDs of the active tasks of all workers.
+    """
+    return await TASK_REGISTRY.list()
+
+
+async def list_task_ids_by_chat_id(chat_id: str):
     """
-    List all currently active task IDs.
+    List the IDs of the active tasks of a chat, on all workers.
     """
-    return list(tasks.keys())
+    return await TASK_REGISTRY.list(chat_id)
 
 
 async def stop_task(task_id: str):
     """
-    Cancel a running task and remove it from the global task list.
+    Cancel a running task, wherever it runs, and remove it from the task list.
     """
     task = tasks.get(task_id)
     if not task:
-        raise ValueError(f"Task with ID {task_id} not found.")
+        if not await TASK_REGISTRY.request_stop(task_id):
+            raise ValueError(f"Task with ID {task_id} not found.")
+
+        # Another worker owns the task, it unregisters it once cancelled
+        deadline = time.monotonic() + STOP_TIMEOUT
+        while time.monotonic() < deadline:
+            if await TASK_REGISTRY.get(task_id) is None:
+                return {
+                    "status": True,
+                    "message": f"Task {task_id} successfully stopped.",
+                }
+            await asyncio.sleep(0.1)
+        return {"status": False, "message": f"Failed to stop task {task_id}."}
 
     task.cancel()  # Request task cancellation
     try:
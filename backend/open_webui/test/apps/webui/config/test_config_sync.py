@@ -0,0 +1,245 @@
+import asyncio
+import copy
+import json
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from open_webui import config as config_module
+from open_webui.config import (
+    DEFAULT_CONFIG,
+    Config,
+    PersistentConfig,
+    apply_config_changes,
+    load_config,
+    reload_config,
+    reset_config,
+    write_config,
+)
+
+
+class FakeRedis:
+    def __init__(self):
+        self.published = []
+
+    def publish(self, channel, message):
+        self.published.append(json.loads(message))
+
+
+@pytest.fixture
+def engine(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'webui.db'}")
+    Config.__table__.create(engine)
+
+    @contextmanager
+    def get_db():
+        db = sessionmaker(bind=engine)()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    monkeypatch.setattr(config_module, "get_db", get_db)
+    # This worker starts with the default config, and no PersistentConfig
+    monkeypatch.setattr(config_module, "CONFIG_DATA", copy.deepcopy(DEFAULT_CONFIG))
+    monkeypatch.setattr(config_module, "CONFIG_VERSION", 0)
+    monkeypatch.setattr(config_module, "PERSISTENT_CONFIG_REGISTRY", [])
+    monkeypatch.setattr(config_module, "CONFIG_REDIS", FakeRedis())
+    yield engine
+    engine.dispose()
+
+
+def get_persistent_config(config_path: str, env_value=None) -> PersistentConfig:
+    return PersistentConfig("TEST_CONFIG", config_path, env_value)
+
+
+def test_write_config(engine):
+    setting = get_persistent_config("test.setting", "env")
+
+    write_config(changes={"test.setting": "first"})
+    write_config(changes={"test.other": 1})
+
+    data, version = load_config()
+    assert version == 2
+    assert data["test"] == {"setting": "first", "other": 1}
+    assert data["ui"] == DEFAULT_CONFIG["ui"]
+    assert config_module.CONFIG_VERSION == 2
+    assert setting.value == "first"
+    assert config_module.CONFIG_REDIS.published == [
+        {"version": 1, "changes": {"test.setting": "first"}},
+        {"version": 2, "changes": {"test.other": 1}},
+    ]
+
+
+def test_racing_writers_keep_both_changes(engine, monkeypatch):
+    write_config(changes={"test.first": 0})
+
+    set_config_value = config_module.set_config_value
+    raced = []
+
+    def set_config_value_racing(config, config_path, value):
+        # Another worker saves its change between this one's read and update
+        if not raced:
+            raced.append(True)
+            write_config(changes={"test.second": 2})
+        set_config_value(config, config_path, value)
+
+    monkeypatch.setattr(config_module, "set_config_value", set_config_value_racing)
+    write_config(changes={"test.first": 1})
+
+    data, version = load_config()
+    assert raced
+    assert version == 3
+    assert data["test"] == {"first": 1, "second": 2}
+    assert config_module.CONFIG_DATA["test"] == {"first": 1, "second": 2}
+    published = config_module.CONFIG_REDIS.published
+    assert [message["version"] for message in published] == [1, 2, 3]
+
+
+def test_apply_config_changes(engine):
+    setting = get_persistent_config("test.setting", "env")
+    config_module.CONFIG_VERSION = 1
+
+    assert apply_config_changes(2, {"test.setting": "changed"})
+    assert config_module.CONFIG_VERSION == 2
+    assert config_module.CONFIG_DATA["test"] == {"setting": "changed"}
+    assert setting.value == "changed"
+
+    # Already applied, e.g. the change of this worker coming back
+    assert apply_config_changes(2, {"test.setting": "stale"})
+    assert apply_config_changes(1, {"test.setting": "stale"})
+    assert setting.value == "changed"
+
+
+@pytest.mark.parametrize(
+    "version, changes",
+    [
+        # A version was missed
+        (3, {"test.setting": "changed"}),
+        # Full configs are not sent
+        (2, None),
+    ],
+)
+def test_apply_config_changes_needing_a_reload(engine, version, changes):
+    config_module.CONFIG_VERSION = 1
+
+    assert not apply_config_changes(version, changes)
+    assert config_module.CONFIG_VERSION == 1
+    assert "test" not in config_module.CONFIG_DATA
+
+
+def test_reload_config(engine):
+    setting = get_persistent_config("test.setting", "env")
+    write_config(changes={"test.setting": "first"})
+    write_config(changes={"test.setting": "second"})
+
+    # A worker that missed both
+    config_module.CONFIG_DATA = copy.deepcopy(DEFAULT_CONFIG)
+    config_module.CONFIG_VERSION = 0
+    assert not apply_config_changes(2, {"test.setting": "second"})
+
+    asyncio.run(reload_config())
+    assert config_module.CONFIG_VERSION == 2
+    assert setting.value == "second"
+
+    # Never goes back to an older version
+    config_module.CONFIG_VERSION = 5
+    asyncio.run(reload_config())
+    assert config_module.CONFIG_VERSION == 5
+
+
+class FakePubSub:
+    def __init__(self, messages: list):
+        self.messages = messages
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        pass
+
+    async def subscribe(self, channel):
+        pass
+
+    async def listen(self):
+        for message in self.messages:
+            if callable(message):
+                message()
+            else:
+                yield message
+        # Stops listening once the messages are handled
+        raise asyncio.CancelledError()
+
+
+def save_as_other_worker(engine, changes: dict):
+    """Saves `changes` as the next version, like another worker would."""
+    db = sessionmaker(bind=engine)()
+    try:
+        config_entry = db.query(Config).order_by(Config.id.desc()).first()
+        data = copy.deepcopy(config_entry.data)
+        for config_path, value in changes.items():
+            config_module.set_config_value(data, config_path, value)
+        config_entry.data = data
+        config_entry.version += 1
+        db.commit()
+    finally:
+        db.close()
+
+
+def test_listen_reloads_on_a_version_gap(engine, monkeypatch):
+    write_config(changes={"test.setting": "first"})
+
+    messages = [
+        {"type": "subscribe"},
+        lambda: save_as_other_worker(engine, {"test.setting": "second"}),
+        lambda: save_as_other_worker(engine, {"test.other": 3}),
+        # The message of version 2 was lost
+        {
+            "type": "message",
+            "data": json.dumps({"version": 3, "changes": {"test.other": 3}}),
+        },
+    ]
+    reloads = []
+
+    async def reload_config_recorded():
+        reloads.append(config_module.CONFIG_VERSION)
+        await reload_config()
+
+    class FakeClient:
+        def pubsub(self):
+            return FakePubSub(messages)
+
+    monkeypatch.setattr(config_module, "reload_config", reload_config_recorded)
+    monkeypatch.setattr(
+        config_module.aioredis.Redis, "from_url", lambda *args, **kwargs: FakeClient()
+    )
+
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(config_module.listen_config_changes())
+
+    # Once when subscribing, once for the gap
+    assert reloads == [1, 1]
+    assert config_module.CONFIG_VERSION == 3
+    assert config_module.CONFIG_DATA["test"] == {"setting": "second", "other": 3}
+
+
+def test_reset_config_continues_the_versions(engine):
+    setting = get_persistent_config("test.setting", "env")
+    write_config(changes={"test.setting": "first"})
+    write_config(changes={"test.setting": "second"})
+
+    reset_config()
+
+    data, version = load_config()
+    assert version == 3
+    assert data == DEFAULT_CONFIG
+    assert config_module.CONFIG_VERSION == 3
+    # Other workers can't apply a full config as changes, they reload it
+    assert config_module.CONFIG_REDIS.published[-1] == {"version": 3, "changes": None}
+    assert not apply_config_changes(4, None)
+
+    write_config(changes={"test.setting": "third"})
+    assert load_config()[1] == 4
+    assert setting.value == "third"
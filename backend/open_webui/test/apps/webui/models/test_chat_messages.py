@@ -0,0 +1,203 @@
+import copy
+import importlib.util
+from pathlib import Path
+
+import pytest
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+from sqlalchemy import create_engine, event, inspect, select
+from sqlalchemy.orm import sessionmaker
+
+from open_webui.models.chats import Chat, ChatMessage, ChatModel, ChatTable
+
+
+MIGRATIONS_DIR = Path(__file__).resolve().parents[4] / "migrations" / "versions"
+
+
+def get_message(id, parent_id=None, children_ids=None, content=""):
+    return {
+        "id": id,
+        "parentId": parent_id,
+        "childrenIds": children_ids or [],
+        "role": "user" if parent_id is None else "assistant",
+        "content": content or f"message {id}",
+        "timestamp": 1700000000,
+    }
+
+
+def get_chat_data():
+    return {
+        "title": "chat",
+        "models": ["model"],
+        "history": {
+            "currentId": "3",
+            "messages": {
+                "1": get_message("1", children_ids=["2", "3"]),
+                "2": get_message("2", parent_id="1"),
+                "3": get_message("3", parent_id="1", content="regenerated"),
+            },
+        },
+    }
+
+
+def get_chat_model(id="chat-1", chat=None):
+    return ChatModel(
+        id=id,
+        user_id="user-1",
+        title="chat",
+        chat=chat if chat is not None else get_chat_data(),
+        created_at=1700000000,
+        updated_at=1700000000,
+    )
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'webui.db'}")
+    Chat.metadata.create_all(engine, tables=[Chat.__table__, ChatMessage.__table__])
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def db(engine):
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+def record_writes(engine) -> list[str]:
+    writes = []
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, many):
+        if statement.split(None, 1)[0] in ("INSERT", "UPDATE", "DELETE"):
+            writes.append(statement)
+
+    return writes
+
+
+def test_round_trip(db):
+    chats = ChatTable()
+    chat_data = get_chat_data()
+
+    result = chats._insert_chat(db, get_chat_model(chat=copy.deepcopy(chat_data)))
+
+    # The document is stored without its messages, which get a row each
+    assert result.chat["history"]["messages"] == {}
+    assert db.query(ChatMessage).count() == 3
+    assert chats._to_chat_model(db, result).chat == chat_data
+
+
+def test_round_trip_without_history(db):
+    chats = ChatTable()
+    chat_data = {"title": "chat", "models": ["model"]}
+
+    result = chats._insert_chat(db, get_chat_model(chat=copy.deepcopy(chat_data)))
+
+    assert db.query(ChatMessage).count() == 0
+    assert chats._to_chat_model(db, result).chat == chat_data
+
+
+def test_sync_messages_writes_only_changes(engine, db):
+    chats = ChatTable()
+    chat_data = get_chat_data()
+    chats._insert_chat(db, get_chat_model(chat=copy.deepcopy(chat_data)))
+
+    messages = chat_data["history"]["messages"]
+    messages["3"]["content"] = "edited"
+    del messages["2"]
+    messages["1"]["childrenIds"] = ["3", "4"]
+    messages["4"] = get_message("4", parent_id="1")
+
+    writes = record_writes(engine)
+    chats._sync_messages(db, "chat-1", copy.deepcopy(messages))
+    db.commit()
+
+    # One insert (4), two updates (1 and 3) and one delete (2)
+    assert sorted(statement.split(None, 1)[0] for statement in writes) == [
+        "DELETE",
+        "INSERT",
+        "UPDATE",
+        "UPDATE",
+    ]
+    assert chats._get_message_maps(db, ["chat-1"])["chat-1"] == messages
+
+
+def test_sync_messages_without_changes_writes_nothing(engine, db):
+    chats = ChatTable()
+    chat_data = get_chat_data()
+    chats._insert_chat(db, get_chat_model(chat=copy.deepcopy(chat_data)))
+
+    writes = record_writes(engine)
+    chats._sync_messages(db, "chat-1", copy.deepcopy(chat_data["history"]["messages"]))
+    db.commit()
+
+    assert writes == []
+
+
+def test_to_chat_models_keeps_messages_of_each_chat_apart(db):
+    chats = ChatTable()
+    first = get_chat_data()
+    second = get_chat_data()
+    second["history"]["messages"]["2"]["content"] = "other chat"
+
+    results = [
+        chats._insert_chat(db, get_chat_model("chat-1", copy.deepcopy(first))),
+        chats._insert_chat(db, get_chat_model("chat-2", copy.deepcopy(second))),
+    ]
+
+    models = chats._to_chat_models(db, results)
+    assert [model.chat for model in models] == [first, second]
+
+
+def load_migration(name: str):
+    (path,) = MIGRATIONS_DIR.glob(f"{name}_*.py")
+    spec = importlib.util.spec_from_file_location(path.stem, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def run_migration(engine, migration, direction: str):
+    with engine.begin() as conn:
+        with Operations.context(MigrationContext.configure(conn)):
+            getattr(migration, direction)()
+
+
+def test_backfill_migration(engine):
+    migration = load_migration("f0d009e8dda8")
+    ChatMessage.__table__.drop(engine)
+
+    chat_data = get_chat_data()
+    legacy_chat_data = {"title": "legacy", "history": {"messages": [{"id": "1"}]}}
+    with engine.begin() as conn:
+        conn.execute(
+            Chat.__table__.insert(),
+            [
+                {**get_chat_model("chat-1").model_dump(), "chat": chat_data},
+                {**get_chat_model("chat-2").model_dump(), "chat": legacy_chat_data},
+            ],
+        )
+
+    run_migration(engine, migration, "upgrade")
+
+    db = sessionmaker(bind=engine)()
+    try:
+        chats = ChatTable()
+        stored = db.get(Chat, "chat-1")
+        assert stored.chat["history"] == {"currentId": "3", "messages": {}}
+        assert chats._to_chat_model(db, stored).chat == chat_data
+
+        # List-shaped histories are left inline, as the table does on write
+        assert db.get(Chat, "chat-2").chat == legacy_chat_data
+        assert db.query(ChatMessage).filter_by(chat_id="chat-2").count() == 0
+    finally:
+        db.close()
+
+    run_migration(engine, migration, "downgrade")
+
+    assert "chat_message" not in inspect(engine).get_table_names()
+    with engine.connect() as conn:
+        rows = dict(conn.execute(select(Chat.id, Chat.chat)).all())
+    assert rows == {"chat-1": chat_data, "chat-2": legacy_chat_data}
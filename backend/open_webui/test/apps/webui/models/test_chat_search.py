@@ -0,0 +1,218 @@
+import importlib.util
+from contextlib import contextmanager
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+from sqlalchemy import create_engine, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import sessionmaker
+
+from open_webui.models import chats as chats_module
+from open_webui.models.chats import Chat, ChatForm, ChatMessage, ChatTable
+
+
+MIGRATIONS_DIR = Path(__file__).resolve().parents[4] / "migrations" / "versions"
+
+
+def get_chat_data(*contents):
+    ids = [str(i) for i in range(len(contents))]
+    return {
+        "title": "chat",
+        "history": {
+            "currentId": ids[-1],
+            "messages": {
+                id: {
+                    "id": id,
+                    "parentId": ids[i - 1] if i else None,
+                    "childrenIds": ids[i + 1 : i + 2],
+                    "role": "assistant" if i % 2 else "user",
+                    "content": content,
+                }
+                for i, (id, content) in enumerate(zip(ids, contents))
+            },
+        },
+    }
+
+
+def load_migration(name: str):
+    (path,) = MIGRATIONS_DIR.glob(f"{name}_*.py")
+    spec = importlib.util.spec_from_file_location(path.stem, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def get_engine(tmp_path, indexed: bool):
+    engine = create_engine(f"sqlite:///{tmp_path / 'webui.db'}")
+    Chat.metadata.create_all(engine, tables=[Chat.__table__, ChatMessage.__table__])
+    if indexed:
+        # Only the FTS5 part, chat_user_id_idx already comes with the table
+        migration = load_migration("c7d2a9e4f815")
+        with engine.begin() as conn:
+            with Operations.context(MigrationContext.configure(conn)):
+                migration.upgrade_sqlite()
+    return engine
+
+
+def use_engine(monkeypatch, engine):
+    @contextmanager
+    def get_db():
+        db = sessionmaker(bind=engine)()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    monkeypatch.setattr(chats_module, "get_db", get_db)
+
+
+@pytest.fixture
+def indexed(tmp_path, monkeypatch):
+    engine = get_engine(tmp_path, indexed=True)
+    use_engine(monkeypatch, engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def unindexed(tmp_path, monkeypatch):
+    engine = get_engine(tmp_path, indexed=False)
+    use_engine(monkeypatch, engine)
+    yield engine
+    engine.dispose()
+
+
+def get_backend(engine):
+    db = sessionmaker(bind=engine)()
+    try:
+        return ChatTable()._get_search_backend(db)
+    finally:
+        db.close()
+
+
+def search(chats: ChatTable, search_text: str, user_id="user-1") -> list[str]:
+    return [
+        chat.id
+        for chat in chats.get_chats_by_user_id_and_search_text(user_id, search_text)
+    ]
+
+
+def get_index(engine) -> dict:
+    """(chat_id, message_id) of each entry -> whether it matches "indexed"."""
+    with engine.connect() as conn:
+        mapping = {
+            row.id: (row.chat_id, row.message_id)
+            for row in conn.execute(text("SELECT * FROM chat_message_search"))
+        }
+        index = {}
+        for rowid, key in mapping.items():
+            # Contentless tables keep no text, each entry is found by its words
+            index[key] = conn.execute(
+                text(
+                    "SELECT COUNT(*) FROM chat_message_fts "
+                    "WHERE rowid = :rowid AND chat_message_fts MATCH :word"
+                ),
+                {"rowid": rowid, "word": "indexed"},
+            ).scalar()
+    return index
+
+
+def test_triggers_keep_the_index_in_sync(indexed):
+    chats = ChatTable()
+    chat = chats.insert_new_chat(
+        "user-1", ChatForm(chat=get_chat_data("indexed text", "other text"))
+    )
+    assert get_index(indexed) == {(chat.id, "0"): 1, (chat.id, "1"): 0}
+
+    chat_data = get_chat_data("other text", "indexed text", "indexed too")
+    chats.update_chat_by_id(chat.id, chat_data)
+    assert get_index(indexed) == {
+        (chat.id, "0"): 0,
+        (chat.id, "1"): 1,
+        (chat.id, "2"): 1,
+    }
+
+    del chat_data["history"]["messages"]["2"]
+    chat_data["history"]["messages"]["1"]["childrenIds"] = []
+    chats.update_chat_by_id(chat.id, chat_data)
+    assert get_index(indexed) == {(chat.id, "0"): 0, (chat.id, "1"): 1}
+
+    chats.delete_chat_by_id(chat.id)
+    assert get_index(indexed) == {}
+    with indexed.connect() as conn:
+        assert not conn.execute(
+            text(
+                "SELECT rowid FROM chat_message_fts WHERE chat_message_fts MATCH 'text'"
+            )
+        ).all()
+
+
+def test_rowids_map_to_their_messages(indexed):
+    chats = ChatTable()
+    first = chats.insert_new_chat("user-1", ChatForm(chat=get_chat_data("apple")))
+    second = chats.insert_new_chat("user-1", ChatForm(chat=get_chat_data("banana")))
+
+    # Rowids freed by a delete must not point the next message to the old one
+    chats.delete_chat_by_id(first.id)
+    third = chats.insert_new_chat("user-1", ChatForm(chat=get_chat_data("cherry")))
+
+    assert search(chats, "apple") == []
+    assert search(chats, "banana") == [second.id]
+    assert search(chats, "cherry") == [third.id]
+
+
+def test_search_with_index(indexed):
+    chats = ChatTable()
+    hello = chats.insert_new_chat(
+        "user-1", ChatForm(chat=get_chat_data("Hello world", "Héllo again"))
+    )
+    world = chats.insert_new_chat("user-1", ChatForm(chat=get_chat_data("world")))
+    other = chats.insert_new_chat("user-2", ChatForm(chat=get_chat_data("world")))
+    assert get_backend(indexed) == "fts5"
+
+    # Every word has to match, as a prefix of a word
+    assert search(chats, "hello wor") == [hello.id]
+    assert sorted(search(chats, "world")) == sorted([hello.id, world.id])
+    assert search(chats, "world", user_id="user-2") == [other.id]
+    # Accents are ignored
+    assert search(chats, "hello again") == [hello.id]
+    # The index matches the start of words only
+    assert search(chats, "orld") == []
+
+
+def test_search_without_index(unindexed):
+    chats = ChatTable()
+    hello = chats.insert_new_chat(
+        "user-1", ChatForm(chat=get_chat_data("Hello world", "again"))
+    )
+    chats.insert_new_chat("user-2", ChatForm(chat=get_chat_data("hello world")))
+    assert get_backend(unindexed) is None
+
+    # The messages are scanned for the text as a whole, anywhere in them
+    assert search(chats, "orld") == [hello.id]
+    assert search(chats, "hello world") == [hello.id]
+    assert search(chats, "world hello") == []
+    assert search(chats, "100%") == []
+
+
+def test_search_through_tsvector(monkeypatch):
+    chats = ChatTable()
+    db = SimpleNamespace(
+        bind=SimpleNamespace(
+            url="postgresql://test/search",
+            dialect=SimpleNamespace(name="postgresql"),
+        )
+    )
+    monkeypatch.setitem(
+        chats_module.SEARCH_BACKENDS, "postgresql://test/search", "tsvector"
+    )
+
+    matches = chats._get_message_matches(db, "user-1", "hello, wor")
+    statement = matches.element.compile(dialect=postgresql.dialect())
+
+    assert "search_vector @@ search_query" in str(statement)
+    assert statement.params == {"search_query": "hello:* & wor:*", "user_id": "user-1"}
+    assert chats._get_message_matches(db, "user-1", "!?") is None
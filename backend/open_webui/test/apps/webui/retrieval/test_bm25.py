@@ -0,0 +1,147 @@
+import os
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from open_webui.retrieval import bm25
+from open_webui.retrieval.bm25 import BM25IndexManager
+
+
+class FakeVectorDBClient:
+    def __init__(self):
+        self.collections: dict[str, dict[str, dict]] = {}
+        self.gets = 0
+
+    def upsert(self, collection_name, items):
+        collection = self.collections.setdefault(collection_name, {})
+        for item in items:
+            collection[item["id"]] = item
+
+    def get(self, collection_name):
+        self.gets += 1
+        items = list(self.collections.get(collection_name, {}).values())
+        return SimpleNamespace(
+            ids=[[item["id"] for item in items]],
+            documents=[[item["text"] for item in items]],
+            metadatas=[[item["metadata"] for item in items]],
+        )
+
+
+@pytest.fixture
+def vector_db(monkeypatch):
+    client = FakeVectorDBClient()
+    monkeypatch.setattr(bm25, "VECTOR_DB_CLIENT", client)
+    return client
+
+
+@pytest.fixture
+def enabled(monkeypatch):
+    monkeypatch.setattr(BM25IndexManager, "is_enabled", lambda self: True)
+
+
+def get_item(id, text, file_id="file-1"):
+    return {"id": id, "text": text, "metadata": {"file_id": file_id}}
+
+
+def add(manager, vector_db, collection_name, items):
+    # As the routers do, the vector DB first
+    vector_db.upsert(collection_name, items)
+    manager.add(collection_name, items)
+
+
+def search_ids(manager, query, k=10):
+    return sorted(result["id"] for result in manager.search("docs", query, k))
+
+
+def test_builds_once_then_follows_changes(tmp_path, vector_db, enabled):
+    manager = BM25IndexManager(str(tmp_path))
+    add(manager, vector_db, "docs", [get_item("1", "apple banana")])
+
+    assert search_ids(manager, "apple") == ["1"]
+    assert vector_db.gets == 1
+
+    add(manager, vector_db, "docs", [get_item("2", "apple cherry", "file-2")])
+    assert search_ids(manager, "apple") == ["1", "2"]
+
+    manager.delete("docs", filter={"file_id": "file-1"})
+    assert search_ids(manager, "apple") == ["2"]
+    assert vector_db.gets == 1
+
+
+def test_workers_keep_each_others_changes(tmp_path, vector_db, enabled):
+    workers = [BM25IndexManager(str(tmp_path)) for _ in range(4)]
+    add(workers[0], vector_db, "docs", [get_item("seed", "seed")])
+    workers[0].search("docs", "seed", 1)
+
+    def add_items(worker, offset):
+        for i in range(25):
+            id = str(offset + i)
+            worker.add("docs", [get_item(id, f"common word{id}")])
+
+    threads = [
+        threading.Thread(target=add_items, args=(worker, i * 100))
+        for i, worker in enumerate(workers)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    for worker in workers:
+        assert len(worker.search("docs", "common", 1000)) == 100
+    assert vector_db.gets == 1
+
+
+def test_compacts_log_into_snapshot(tmp_path, vector_db, enabled):
+    manager = BM25IndexManager(str(tmp_path), min_compact_size=0)
+    add(manager, vector_db, "docs", [get_item("1", "apple")])
+    manager.search("docs", "apple", 1)
+
+    for i in range(2, 10):
+        manager.add("docs", [get_item(str(i), "apple " * 50)])
+
+    # A worker that loads it now reads a snapshot with every change
+    assert len(BM25IndexManager(str(tmp_path)).search("docs", "apple", 100)) == 9
+    log_path = tmp_path / "docs.log"
+    assert (
+        not log_path.exists()
+        or log_path.stat().st_size < (tmp_path / "docs.json").stat().st_size
+    )
+
+
+def test_search_is_not_affected_by_later_changes(tmp_path, vector_db, enabled):
+    manager = BM25IndexManager(str(tmp_path))
+    add(manager, vector_db, "docs", [get_item("1", "apple")])
+    index = manager._get("docs")
+
+    manager.add("docs", [get_item("2", "apple")])
+
+    assert list(index.docs) == ["1"]
+    assert sorted(manager._get("docs").docs) == ["1", "2"]
+
+
+def test_unreadable_index_is_rebuilt(tmp_path, vector_db, enabled):
+    manager = BM25IndexManager(str(tmp_path))
+    add(manager, vector_db, "docs", [get_item("1", "apple")])
+    manager.search("docs", "apple", 1)
+
+    with open(tmp_path / "docs.log", "a") as f:
+        f.write('{"add": [')
+
+    assert search_ids(BM25IndexManager(str(tmp_path)), "apple") == ["1"]
+    assert vector_db.gets == 2
+
+
+def test_disabled_drops_instead_of_updating(tmp_path, vector_db, monkeypatch):
+    manager = BM25IndexManager(str(tmp_path))
+    monkeypatch.setattr(BM25IndexManager, "is_enabled", lambda self: True)
+    add(manager, vector_db, "docs", [get_item("1", "apple")])
+    manager.search("docs", "apple", 1)
+
+    monkeypatch.setattr(BM25IndexManager, "is_enabled", lambda self: False)
+    add(manager, vector_db, "docs", [get_item("2", "apple")])
+    assert not os.path.exists(tmp_path / "docs.json")
+
+    # Rebuilt with what was added meanwhile once hybrid search is used again
+    assert search_ids(manager, "apple") == ["1", "2"]
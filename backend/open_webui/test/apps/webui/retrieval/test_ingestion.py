@@ -0,0 +1,172 @@
+import asyncio
+import time
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from open_webui.models import ingestion_jobs
+from open_webui.models.ingestion_jobs import IngestionJob, IngestionJobs
+from open_webui.retrieval import ingestion
+from open_webui.retrieval.ingestion import IngestionQueue
+
+
+@pytest.fixture(autouse=True)
+def db(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'webui.db'}")
+    IngestionJob.metadata.create_all(engine, tables=[IngestionJob.__table__])
+    SessionLocal = sessionmaker(bind=engine, expire_on_commit=False)
+
+    @contextmanager
+    def get_db():
+        session = SessionLocal()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    monkeypatch.setattr(ingestion_jobs, "get_db", get_db)
+
+    async def emit_job_event(job):
+        pass
+
+    monkeypatch.setattr(ingestion, "emit_job_event", emit_job_event)
+
+    yield get_db
+    engine.dispose()
+
+
+def set_job(db, id: str, **values):
+    with db() as session:
+        session.query(IngestionJob).filter_by(id=id).update(values)
+        session.commit()
+
+
+def test_claims_oldest_runnable_job_once(db):
+    first = IngestionJobs.insert_new_job("user-1", "process_file", {"file_id": "1"})
+    second = IngestionJobs.insert_new_job("user-1", "process_file", {"file_id": "2"})
+    set_job(db, first.id, created_at=first.created_at - 1)
+    set_job(db, second.id, scheduled_at=int(time.time()) + 60)
+
+    job = IngestionJobs.claim_next_job(timeout=60)
+    assert job.id == first.id
+    assert job.status == "running"
+    assert job.attempts == 1
+
+    # Running, and the other one is scheduled later
+    assert IngestionJobs.claim_next_job(timeout=60) is None
+
+
+def test_reclaims_stale_job_from_its_first_run(db):
+    job = IngestionJobs.insert_new_job("user-1", "process_file", {})
+    first_run = IngestionJobs.claim_next_job(timeout=60)
+
+    set_job(db, job.id, updated_at=int(time.time()) - 120)
+    second_run = IngestionJobs.claim_next_job(timeout=60)
+    assert second_run.attempts == 2
+
+    # The first run can neither report progress nor end the job
+    assert IngestionJobs.update_job_progress(job.id, first_run.attempts, 0.5)
+    assert not IngestionJobs.touch_job(job.id, first_run.attempts)
+    assert (
+        IngestionJobs.update_job_status_by_id(
+            job.id, first_run.attempts, "failed", error="stale"
+        )
+        is None
+    )
+
+    assert not IngestionJobs.update_job_progress(job.id, second_run.attempts, 0.5)
+    completed = IngestionJobs.update_job_status_by_id(
+        job.id, second_run.attempts, "completed"
+    )
+    assert completed.status == "completed"
+    assert completed.error is None
+
+
+def run_next_job(queue: IngestionQueue):
+    job = IngestionJobs.claim_next_job(queue.timeout)
+    asyncio.run(queue._run_job(None, job))
+    return IngestionJobs.get_job_by_id(job.id)
+
+
+def test_completed_job_stores_result():
+    queue = IngestionQueue(concurrency=1)
+
+    def double(request, job, context):
+        return {"value": 2 * job.data["value"]}
+
+    queue.register("double", double)
+    IngestionJobs.insert_new_job("user-1", "double", {"value": 21})
+
+    job = run_next_job(queue)
+    assert job.status == "completed"
+    assert job.progress == 1.0
+    assert job.result == {"value": 42}
+
+
+def test_failed_job_is_retried_with_backoff(db):
+    queue = IngestionQueue(concurrency=1, max_retries=1)
+
+    def fail(request, job, context):
+        raise ValueError("unavailable")
+
+    queue.register("fail", fail)
+    created = IngestionJobs.insert_new_job("user-1", "fail", {})
+
+    job = run_next_job(queue)
+    assert job.status == "pending"
+    assert job.error == "unavailable"
+    assert job.scheduled_at >= int(time.time()) + 1
+    assert IngestionJobs.claim_next_job(queue.timeout) is None
+
+    set_job(db, created.id, scheduled_at=0)
+    job = run_next_job(queue)
+    assert job.status == "failed"
+    assert job.attempts == 2
+
+
+def test_cancelled_job_stops_at_next_progress(db):
+    queue = IngestionQueue(concurrency=1)
+
+    def cancel_then_report(request, job, context):
+        IngestionJobs.cancel_job_by_id(job.id)
+        context.progress(0.5)
+        return {}
+
+    queue.register("cancel", cancel_then_report)
+    IngestionJobs.insert_new_job("user-1", "cancel", {})
+
+    async def run():
+        queue.loop = asyncio.get_running_loop()
+        job = IngestionJobs.claim_next_job(queue.timeout)
+        await queue._run_job(None, job)
+        return IngestionJobs.get_job_by_id(job.id)
+
+    assert asyncio.run(run()).status == "cancelled"
+
+
+def test_running_job_is_kept_claimed(db):
+    # Touched every second, as the timeout is shorter
+    queue = IngestionQueue(concurrency=1, timeout=0)
+    created = IngestionJobs.insert_new_job("user-1", "slow", {})
+
+    def slow(request, job, context):
+        set_job(db, job.id, updated_at=0)
+        time.sleep(1.5)
+        return {}
+
+    queue.register("slow", slow)
+    job = IngestionJobs.claim_next_job(queue.timeout)
+
+    async def run():
+        task = asyncio.create_task(queue._run_job(None, job))
+        await asyncio.sleep(1.2)
+        touched = IngestionJobs.get_job_by_id(created.id)
+        await task
+        return touched
+
+    touched = asyncio.run(run())
+    assert touched.status == "running"
+    assert touched.updated_at >= int(time.time()) - 5
+    assert IngestionJobs.get_job_by_id(created.id).status == "completed"
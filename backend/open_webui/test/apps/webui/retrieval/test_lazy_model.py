@@ -0,0 +1,179 @@
+import threading
+import time
+
+import pytest
+
+from open_webui.retrieval.models import lazy as lazy_module
+from open_webui.retrieval.models.lazy import LazyModel, are_models_ready
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def perf_counter(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(lazy_module, "time", clock)
+    return clock
+
+
+class Model:
+    def encode(self, text):
+        return [len(text)]
+
+
+class Loader:
+    """Fails `failures` times, then loads a Model."""
+
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise OSError("Connection reset while downloading")
+        return Model()
+
+
+def test_loads_on_first_use(clock):
+    loader = Loader()
+    model = LazyModel("embedding", loader)
+    assert model.status() == {"state": "pending", "duration": None, "error": None}
+    assert loader.calls == 0
+
+    assert model.encode("text") == [4]
+    assert model.encode("more text") == [9]
+    assert loader.calls == 1
+    assert model.status()["state"] == "ready"
+
+
+def test_private_attributes_are_not_loaded(clock):
+    loader = Loader()
+    model = LazyModel("embedding", loader)
+
+    with pytest.raises(AttributeError):
+        model._private
+    assert loader.calls == 0
+
+
+def test_retries_after_a_failure(clock):
+    loader = Loader(failures=1)
+    model = LazyModel("embedding", loader)
+
+    model.preload()
+    assert model.status()["state"] == "error"
+    assert "Connection reset" in model.status()["error"]
+
+    # Not tried again before the retry interval
+    with pytest.raises(RuntimeError):
+        model.encode("text")
+    assert loader.calls == 1
+
+    clock.now += lazy_module.RETRY_INTERVAL
+    assert model.encode("text") == [4]
+    assert loader.calls == 2
+    assert model.status() == {"state": "ready", "duration": 0, "error": None}
+
+
+def test_retry_interval_backs_off(clock):
+    loader = Loader(failures=8)
+    model = LazyModel("embedding", loader)
+
+    intervals = []
+    for _ in range(8):
+        model.preload()
+        intervals.append(model.retry_at - clock.now)
+        clock.now = model.retry_at
+
+    assert intervals == [10, 20, 40, 80, 160, 320, 600, 600]
+    assert loader.calls == 8
+
+    # Loading resets the backoff
+    model.preload()
+    assert model.status()["state"] == "ready"
+    assert model.failures == 0
+    assert loader.calls == 9
+
+
+def test_loads_once_for_concurrent_uses(clock):
+    started = threading.Event()
+    release = threading.Event()
+
+    def load():
+        started.set()
+        release.wait(5)
+        return Model()
+
+    model = LazyModel("embedding", load)
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(model.encode("text")))
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+
+    started.wait(5)
+    assert model.status()["state"] == "loading"
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert results == [[4]] * 4
+
+
+def test_readiness(clock):
+    readiness_while_loading = []
+
+    def load_reranking():
+        readiness_while_loading.append(are_models_ready(models, preload=False))
+        return Model()
+
+    embedding = LazyModel("embedding", Loader(failures=1))
+    reranking = LazyModel("reranking", load_reranking)
+    models = [embedding, reranking]
+
+    # Waiting to be preloaded holds the worker back, unless loaded on first use
+    assert not are_models_ready(models, preload=True)
+    assert are_models_ready(models, preload=False)
+
+    embedding.preload()
+    assert not are_models_ready(models, preload=True)
+
+    # Loading always holds it back
+    reranking.preload()
+    assert readiness_while_loading == [False]
+
+    # A failed model doesn't keep the worker out of rotation
+    assert embedding.status()["state"] == "error"
+    assert are_models_ready(models, preload=True)
+
+    clock.now += lazy_module.RETRY_INTERVAL
+    embedding.preload()
+    assert embedding.status()["state"] == "ready"
+    assert are_models_ready(models, preload=True)
+
+
+def test_loading_state_during_load():
+    loaded = []
+
+    def load():
+        loaded.append(model.status()["state"])
+        time.sleep(0.01)
+        return Model()
+
+    model = LazyModel("embedding", load)
+    model.preload()
+
+    assert loaded == ["loading"]
+    assert model.status()["state"] == "ready"
+    assert model.status()["duration"] > 0
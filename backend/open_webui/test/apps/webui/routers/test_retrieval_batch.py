@@ -0,0 +1,118 @@
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+from open_webui.models.files import FileModel
+from open_webui.routers import retrieval
+from open_webui.routers.retrieval import BatchProcessFilesForm
+
+
+def get_file(id: str, user_id: str) -> FileModel:
+    return FileModel(
+        id=id,
+        user_id=user_id,
+        filename=f"{id}.txt",
+        data={"content": f"content of {id}"},
+        meta={},
+        created_at=1700000000,
+        updated_at=1700000000,
+    )
+
+
+STORED_FILES = {
+    "own-file": get_file("own-file", "user-1"),
+    "other-file": get_file("other-file", "user-2"),
+}
+
+
+@pytest.fixture
+def queue(monkeypatch):
+    jobs = []
+
+    monkeypatch.setattr(
+        retrieval.Files,
+        "get_files_by_ids",
+        lambda ids: [STORED_FILES[id] for id in ids if id in STORED_FILES],
+    )
+    monkeypatch.setattr(
+        retrieval.INGESTION_QUEUE,
+        "enqueue",
+        lambda user_id, type, data: jobs.append((user_id, type, data)) or data,
+    )
+    return jobs
+
+
+def process_files_batch(user_id: str, role: str, files: list[FileModel]):
+    return retrieval.process_files_batch(
+        SimpleNamespace(),
+        BatchProcessFilesForm(files=files, collection_name="collection"),
+        user=SimpleNamespace(id=user_id, role=role),
+    )
+
+
+def test_queues_own_files(queue):
+    process_files_batch("user-1", "user", [STORED_FILES["own-file"]])
+
+    assert queue == [
+        (
+            "user-1",
+            "process_files_batch",
+            {"file_ids": ["own-file"], "collection_name": "collection"},
+        )
+    ]
+
+
+def test_rejects_files_of_other_users(queue):
+    # The user id sent with the file is not trusted, the stored one is checked
+    forged = get_file("other-file", "user-1")
+
+    with pytest.raises(HTTPException) as e:
+        process_files_batch("user-1", "user", [STORED_FILES["own-file"], forged])
+
+    assert e.value.status_code == 404
+    assert queue == []
+
+
+def test_rejects_unknown_files(queue):
+    with pytest.raises(HTTPException) as e:
+        process_files_batch("user-1", "user", [get_file("missing", "user-1")])
+
+    assert e.value.status_code == 404
+    assert queue == []
+
+
+def test_admins_may_queue_any_file(queue):
+    process_files_batch("admin", "admin", [STORED_FILES["other-file"]])
+
+    assert queue[0][2]["file_ids"] == ["other-file"]
+
+
+def test_job_skips_files_of_other_users(monkeypatch):
+    processed = []
+
+    monkeypatch.setattr(
+        retrieval.Files,
+        "get_files_by_ids",
+        lambda ids: [STORED_FILES[id] for id in ids],
+    )
+    monkeypatch.setattr(
+        retrieval.Users,
+        "get_user_by_id",
+        lambda id: SimpleNamespace(id=id, role="user"),
+    )
+    monkeypatch.setattr(
+        retrieval,
+        "save_files_to_vector_db",
+        lambda request, files, collection_name: processed.extend(files)
+        or retrieval.BatchProcessFilesResponse(results=[], errors=[]),
+    )
+
+    job = SimpleNamespace(
+        user_id="user-1",
+        data={"file_ids": ["own-file", "other-file"], "collection_name": "c"},
+    )
+    context = SimpleNamespace(progress=lambda progress: None)
+    retrieval.process_files_batch_job(SimpleNamespace(), job, context)
+
+    assert [file.id for file in processed] == ["own-file"]
@@ -0,0 +1,77 @@
+import asyncio
+
+from open_webui.socket.utils import BroadcastCoalescer
+
+
+class Subscriber:
+    """Applies the events it receives, as the frontend does."""
+
+    def __init__(self):
+        self.ids = set()
+
+    def receive(self, payload: dict):
+        if "user_ids" in payload:
+            self.ids = set(payload["user_ids"])
+        else:
+            self.ids |= set(payload["added"])
+            self.ids -= set(payload["removed"])
+
+
+def get_broadcast(state: set, subscribers: list):
+    async def emit(event, payload, room):
+        for subscriber in subscribers:
+            subscriber.receive(payload)
+
+    async def get_state():
+        return list(state)
+
+    return BroadcastCoalescer(emit, "user-list", "user_ids", get_state)
+
+
+def test_flush_sends_diffs():
+    state = {"a"}
+    subscriber = Subscriber()
+    broadcast = get_broadcast(state, [subscriber])
+
+    async def run():
+        await broadcast.flush()
+        assert subscriber.ids == {"a"}
+
+        state.update({"b", "c"})
+        await broadcast.flush()
+        state.discard("a")
+        await broadcast.flush()
+        assert subscriber.ids == {"b", "c"}
+
+        await broadcast.flush()
+        assert broadcast.stats == {"emitted": 3, "suppressed": 1}
+
+    asyncio.run(run())
+
+
+def test_subscribers_joining_between_flushes():
+    state = {"a"}
+    subscribers = []
+    broadcast = get_broadcast(state, subscribers)
+
+    async def run():
+        await broadcast.flush()
+
+        # Comes and goes before the next flush, which never reports it
+        state.add("b")
+        subscriber = Subscriber()
+        subscriber.receive(await broadcast.snapshot())
+        subscribers.append(subscriber)
+        state.discard("b")
+
+        state.add("c")
+        await broadcast.flush()
+        assert subscriber.ids == {"a", "c"}
+
+    asyncio.run(run())
+
+
+def test_snapshot_before_first_flush():
+    broadcast = get_broadcast({"a", "b"}, [])
+
+    assert asyncio.run(broadcast.snapshot()) == {"user_ids": ["a", "b"]}
@@ -0,0 +1,217 @@
+import asyncio
+
+import pytest
+
+from open_webui.socket.utils import (
+    LocalDict,
+    LocalSetDict,
+    NearCache,
+    RedisDict,
+    RedisSetDict,
+)
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        pass
+
+    def __getattr__(self, name):
+        return lambda *args: self.commands.append((name, args))
+
+    async def execute(self):
+        return [await getattr(self.redis, name)(*args) for name, args in self.commands]
+
+
+class FakeRedis:
+    """The commands of Redis the pools use, on dicts."""
+
+    def __init__(self):
+        self.data = {}
+        # Holds reads until it is set, to have writes happen meanwhile
+        self.reads = asyncio.Event()
+        self.reads.set()
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    async def get(self, key):
+        value = self.data.get(key)
+        await self.reads.wait()
+        return value
+
+    async def mget(self, keys):
+        return [self.data.get(key) for key in keys]
+
+    async def set(self, key, value):
+        self.data[key] = value
+
+    async def delete(self, key):
+        self.data.pop(key, None)
+
+    async def sadd(self, key, member):
+        self.data.setdefault(key, set()).add(member)
+
+    async def srem(self, key, member):
+        self.data.get(key, set()).discard(member)
+
+    async def smembers(self, key):
+        return set(self.data.get(key, set()))
+
+    async def zadd(self, key, mapping):
+        self.data.setdefault(key, {}).update(mapping)
+
+    async def zrange(self, key, start, end):
+        scores = self.data.get(key, {})
+        return sorted(scores, key=scores.get)
+
+    def remove(self, keys, args, predicate):
+        key, index_key = keys
+        scores = self.data.get(key, {})
+        removed = [member for member in scores if predicate(member, scores[member])]
+        for member in removed:
+            del scores[member]
+        if not scores:
+            self.data.pop(key, None)
+            self.data.get(index_key, set()).discard(args[0])
+        return len(removed)
+
+    async def remove_script(self, keys, args):
+        return self.remove(keys, args, lambda member, score: member in args[1:])
+
+    async def remove_before_script(self, keys, args):
+        return self.remove(keys, args, lambda member, score: score < args[1])
+
+
+def use_fake_redis(pool):
+    """Points `pool` at a FakeRedis, with a near cache that is subscribed."""
+    pool.redis = FakeRedis()
+    pool.cache = NearCache(pool.redis, f"{pool.name}:*")
+    pool.cache.listener = object()
+    pool.cache.enabled = True
+    if isinstance(pool, RedisSetDict):
+        pool.remove_script = pool.redis.remove_script
+        pool.remove_before_script = pool.redis.remove_before_script
+    return pool
+
+
+@pytest.fixture
+def redis_dict():
+    return use_fake_redis(RedisDict("test:dict", "redis://localhost:6379/0"))
+
+
+@pytest.fixture
+def redis_set_dict():
+    return use_fake_redis(RedisSetDict("test:set", "redis://localhost:6379/0"))
+
+
+@pytest.mark.parametrize("pool", ["local", "redis"])
+def test_dict(pool, request):
+    pool = LocalDict() if pool == "local" else request.getfixturevalue("redis_dict")
+
+    async def run():
+        await pool.set("a", {"user": 1})
+        await pool.set("b", {"user": 2})
+        assert await pool.get("a") == {"user": 1}
+        assert await pool.get("c", "default") == "default"
+        assert await pool.get_many(["b", "c", "a"]) == [{"user": 2}, None, {"user": 1}]
+        assert sorted(await pool.keys()) == ["a", "b"]
+        assert await pool.contains("a")
+
+        await pool.delete("a")
+        assert await pool.get("a") is None
+        assert not await pool.contains("a")
+        assert await pool.keys() == ["b"]
+
+    asyncio.run(run())
+
+
+@pytest.mark.parametrize("pool", ["local", "redis"])
+def test_set_dict(pool, request):
+    pool = (
+        LocalSetDict() if pool == "local" else request.getfixturevalue("redis_set_dict")
+    )
+
+    async def run():
+        await pool.add("user", "sid-1", score=1)
+        await pool.add("user", "sid-2", score=2)
+        await pool.add("user", "sid-3", score=3)
+        assert await pool.members("user") == ["sid-1", "sid-2", "sid-3"]
+        assert await pool.keys() == ["user"]
+
+        assert await pool.remove("user", "sid-2", "sid-4") == 1
+        assert await pool.members("user") == ["sid-1", "sid-3"]
+
+        assert await pool.remove_before("user", 3) == 1
+        assert await pool.members("user") == ["sid-3"]
+
+        # The key goes once its last member does
+        assert await pool.remove("user", "sid-3") == 1
+        assert await pool.members("user") == []
+        assert not await pool.contains("user")
+
+    asyncio.run(run())
+
+
+def test_dict_reads_its_own_writes(redis_dict):
+    async def run():
+        await redis_dict.set("a", 1)
+        assert await redis_dict.get("a") == 1
+        assert await redis_dict.keys() == ["a"]
+
+        # Cached now, and no notification will come from the fake
+        await redis_dict.set("a", 2)
+        await redis_dict.set("b", 3)
+        assert await redis_dict.get("a") == 2
+        assert await redis_dict.get_many(["a", "b"]) == [2, 3]
+        assert sorted(await redis_dict.keys()) == ["a", "b"]
+
+        await redis_dict.delete("a")
+        assert await redis_dict.get("a") is None
+        assert await redis_dict.keys() == ["b"]
+
+    asyncio.run(run())
+
+
+def test_dict_drops_loads_overtaken_by_writes(redis_dict):
+    async def run():
+        await redis_dict.set("a", 1)
+
+        redis_dict.redis.reads.clear()
+        load = asyncio.create_task(redis_dict.get("a"))
+        await asyncio.sleep(0)
+        await redis_dict.set("a", 2)
+        redis_dict.redis.reads.set()
+
+        # The load read the value before the write, it isn't kept
+        await load
+        assert await redis_dict.get("a") == 2
+
+    asyncio.run(run())
+
+
+def test_set_dict_reads_its_own_writes(redis_set_dict):
+    async def run():
+        await redis_set_dict.add("user", "sid-1", score=1)
+        assert await redis_set_dict.members("user") == ["sid-1"]
+        assert await redis_set_dict.keys() == ["user"]
+
+        await redis_set_dict.add("user", "sid-2", score=2)
+        await redis_set_dict.add("other", "sid-3", score=3)
+        assert await redis_set_dict.members("user") == ["sid-1", "sid-2"]
+        assert sorted(await redis_set_dict.keys()) == ["other", "user"]
+
+        await redis_set_dict.remove("user", "sid-1")
+        assert await redis_set_dict.members("user") == ["sid-2"]
+
+        await redis_set_dict.remove_before("user", 3)
+        assert await redis_set_dict.members("user") == []
+        assert await redis_set_dict.keys() == ["other"]
+
+    asyncio.run(run())
@@ -0,0 +1,150 @@
+import hashlib
+import io
+import os
+
+from open_webui.storage.provider import LocalFileCache, S3StorageProvider
+
+
+class FakeS3Client:
+    """In-process stand-in for the boto3 S3 client methods used by the provider."""
+
+    def __init__(self):
+        self.objects: dict[tuple[str, str], bytes] = {}
+        self.calls: list[str] = []
+
+    def _put(self, bucket, key, data):
+        self.objects[(bucket, key)] = data
+
+    def upload_file(self, filename, bucket, key, Config=None):
+        self.calls.append("upload_file")
+        with open(filename, "rb") as f:
+            self._put(bucket, key, f.read())
+
+    def head_object(self, Bucket, Key):
+        self.calls.append("head_object")
+        data = self.objects[(Bucket, Key)]
+        return {
+            "ETag": f'"{hashlib.md5(data).hexdigest()}"',
+            "ContentLength": len(data),
+        }
+
+    def download_file(self, bucket, key, filename, Config=None):
+        self.calls.append("download_file")
+        with open(filename, "wb") as f:
+            f.write(self.objects[(bucket, key)])
+
+    def delete_object(self, Bucket, Key):
+        self.calls.append("delete_object")
+        self.objects.pop((Bucket, Key), None)
+
+    def delete_objects(self, Bucket, Delete):
+        self.calls.append("delete_objects")
+        assert len(Delete["Objects"]) <= 1000
+        for item in Delete["Objects"]:
+            self.objects.pop((Bucket, item["Key"]), None)
+        return {}
+
+    def get_paginator(self, operation):
+        assert operation == "list_objects_v2"
+        client = self
+
+        class Paginator:
+            def paginate(self, Bucket):
+                keys = sorted(key for bucket, key in client.objects if bucket == Bucket)
+                for i in range(0, len(keys), 1000):
+                    yield {"Contents": [{"Key": key} for key in keys[i : i + 1000]]}
+
+        return Paginator()
+
+
+def get_provider(tmp_path, cache_max_size=0):
+    s3_client = FakeS3Client()
+    provider = S3StorageProvider(
+        s3_client=s3_client,
+        bucket_name="bucket",
+        upload_dir=str(tmp_path),
+        cache_max_size=cache_max_size,
+    )
+    return provider, s3_client
+
+
+class TestS3StorageProvider:
+    def test_upload_and_cached_get(self, tmp_path):
+        provider, s3_client = get_provider(tmp_path)
+
+        size, file_path = provider.upload_file(io.BytesIO(b"hello"), "a.txt")
+        assert size == 5
+        assert file_path == "s3://bucket/a.txt"
+        assert s3_client.objects[("bucket", "a.txt")] == b"hello"
+
+        # Served from the copy written during the upload
+        local_path = provider.get_file(file_path)
+        assert open(local_path, "rb").read() == b"hello"
+        assert "download_file" not in s3_client.calls
+
+    def test_get_downloads_changed_objects(self, tmp_path):
+        provider, s3_client = get_provider(tmp_path)
+        _, file_path = provider.upload_file(io.BytesIO(b"hello"), "a.txt")
+
+        s3_client.objects[("bucket", "a.txt")] = b"changed"
+        local_path = provider.get_file(file_path)
+        assert open(local_path, "rb").read() == b"changed"
+        assert s3_client.calls.count("download_file") == 1
+
+        provider.get_file(file_path)
+        assert s3_client.calls.count("download_file") == 1
+
+    def test_get_downloads_missing_copies(self, tmp_path):
+        provider, s3_client = get_provider(tmp_path)
+        _, file_path = provider.upload_file(io.BytesIO(b"hello"), "a.txt")
+
+        os.remove(tmp_path / "a.txt")
+        assert open(provider.get_file(file_path), "rb").read() == b"hello"
+        assert s3_client.calls.count("download_file") == 1
+
+    def test_cache_evicts_least_recently_used(self, tmp_path):
+        provider, s3_client = get_provider(tmp_path, cache_max_size=10)
+
+        _, a_path = provider.upload_file(io.BytesIO(b"a" * 4), "a.txt")
+        os.utime(tmp_path / "a.txt", (0, 0))
+        _, b_path = provider.upload_file(io.BytesIO(b"b" * 4), "b.txt")
+        os.utime(tmp_path / "b.txt", (1, 1))
+        _, c_path = provider.upload_file(io.BytesIO(b"c" * 4), "c.txt")
+
+        assert not (tmp_path / "a.txt").exists()
+        assert (tmp_path / "b.txt").exists()
+        assert (tmp_path / "c.txt").exists()
+
+        # Evicted copies are downloaded again
+        assert open(provider.get_file(a_path), "rb").read() == b"aaaa"
+        assert not (tmp_path / "b.txt").exists()
+
+    def test_delete_file(self, tmp_path):
+        provider, s3_client = get_provider(tmp_path)
+        _, file_path = provider.upload_file(io.BytesIO(b"hello"), "a.txt")
+
+        provider.delete_file(file_path)
+        assert ("bucket", "a.txt") not in s3_client.objects
+        assert not (tmp_path / "a.txt").exists()
+
+    def test_delete_all_files_is_paginated(self, tmp_path):
+        provider, s3_client = get_provider(tmp_path)
+        for i in range(2500):
+            s3_client.objects[("bucket", f"{i}.txt")] = b"x"
+        s3_client.objects[("other", "keep.txt")] = b"x"
+
+        provider.delete_all_files()
+        assert list(s3_client.objects) == [("other", "keep.txt")]
+        assert s3_client.calls.count("delete_objects") == 3
+        assert "delete_object" not in s3_client.calls
+
+
+class TestLocalFileCache:
+    def test_etag_requires_local_copy(self, tmp_path):
+        cache = LocalFileCache(str(tmp_path))
+        (tmp_path / "a.txt").write_bytes(b"a")
+        cache.put("a.txt", "etag")
+        assert cache.get_etag("a.txt") == "etag"
+
+        os.remove(tmp_path / "a.txt")
+        assert cache.get_etag("a.txt") is None
@@ -0,0 +1,236 @@
+import asyncio
+import json
+import time
+
+import pytest
+
+from open_webui import tasks as tasks_module
+from open_webui.tasks import RedisTaskRegistry
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        pass
+
+    def __getattr__(self, name):
+        return lambda *args: self.commands.append((name, args))
+
+    async def execute(self):
+        return [await getattr(self.redis, name)(*args) for name, args in self.commands]
+
+
+class FakePubSub:
+    def __init__(self, redis):
+        self.redis = redis
+        self.messages = asyncio.Queue()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        self.redis.subscribers.remove(self)
+
+    async def subscribe(self, channel):
+        self.redis.subscribers.append(self)
+        await self.messages.put({"type": "subscribe", "data": 1})
+
+    async def listen(self):
+        while True:
+            yield await self.messages.get()
+
+
+class FakeRedis:
+    """The commands of Redis the task registry uses, on dicts."""
+
+    def __init__(self):
+        self.data = {}
+        self.subscribers = []
+        self.published = []
+        self.closed = False
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    def pubsub(self):
+        return FakePubSub(self)
+
+    async def hset(self, key, field, value):
+        self.data.setdefault(key, {})[field] = str(value)
+
+    async def hdel(self, key, *fields):
+        for field in fields:
+            self.data.get(key, {}).pop(field, None)
+
+    async def hget(self, key, field):
+        return self.data.get(key, {}).get(field)
+
+    async def hkeys(self, key):
+        return list(self.data.get(key, {}))
+
+    async def hgetall(self, key):
+        return dict(self.data.get(key, {}))
+
+    async def sadd(self, key, member):
+        self.data.setdefault(key, set()).add(member)
+
+    async def srem(self, key, member):
+        self.data.get(key, set()).discard(member)
+
+    async def smembers(self, key):
+        return set(self.data.get(key, set()))
+
+    async def publish(self, channel, message):
+        self.published.append(json.loads(message))
+        for subscriber in self.subscribers:
+            await subscriber.messages.put({"type": "message", "data": message})
+
+    async def aclose(self):
+        self.closed = True
+
+
+def get_item(worker_id=tasks_module.WORKER_ID, chat_id=None, created_at=None):
+    return {
+        "worker_id": worker_id,
+        "chat_id": chat_id,
+        "created_at": created_at or time.time(),
+    }
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    registry = RedisTaskRegistry("redis://localhost:6379/0", heartbeat_timeout=30)
+    registry.redis = FakeRedis()
+    monkeypatch.setattr(tasks_module, "TASK_REGISTRY", registry)
+    monkeypatch.setattr(tasks_module, "STOP_TIMEOUT", 1)
+    return registry
+
+
+@pytest.fixture
+def other_registry(registry):
+    """The registry of another worker sharing the Redis server."""
+    other_registry = RedisTaskRegistry("redis://localhost:6379/0")
+    other_registry.redis = registry.redis
+    return other_registry
+
+
+def test_register_and_list(registry):
+    async def run():
+        await registry.register("task-1", get_item(chat_id="chat-1"))
+        await registry.register("task-2", get_item(chat_id="chat-2"))
+        await registry.register("task-3", get_item())
+
+        assert sorted(await tasks_module.list_tasks()) == ["task-1", "task-2", "task-3"]
+        assert await tasks_module.list_task_ids_by_chat_id("chat-1") == ["task-1"]
+
+        await registry.unregister("task-1", get_item(chat_id="chat-1"))
+        assert await tasks_module.list_task_ids_by_chat_id("chat-1") == []
+        assert await registry.get("task-1") is None
+        assert (await registry.get("task-2"))["chat_id"] == "chat-2"
+
+    asyncio.run(run())
+
+
+def test_stop_task_of_another_worker(registry, other_registry):
+    async def run():
+        item = get_item(worker_id="other-worker", chat_id="chat-1")
+        await other_registry.register("task-1", item)
+
+        # The other worker unregisters the task once it stopped it
+        async def stop_on_request():
+            while not registry.redis.published:
+                await asyncio.sleep(0.01)
+            await other_registry.unregister("task-1", item)
+
+        stopper = asyncio.create_task(stop_on_request())
+        result = await tasks_module.stop_task("task-1")
+        await stopper
+
+        assert result["status"] is True
+        assert registry.redis.published == [{"action": "stop", "task_id": "task-1"}]
+        assert await tasks_module.list_task_ids_by_chat_id("chat-1") == []
+
+    asyncio.run(run())
+
+
+def test_stop_task_of_another_worker_that_doesnt_stop_it(registry, other_registry):
+    async def run():
+        await other_registry.register("task-1", get_item(worker_id="other-worker"))
+
+        result = await tasks_module.stop_task("task-1")
+        assert result["status"] is False
+
+    asyncio.run(run())
+
+
+def test_stop_unknown_task(registry):
+    async def run():
+        with pytest.raises(ValueError):
+            await tasks_module.stop_task("task-1")
+        assert registry.redis.published == []
+
+    asyncio.run(run())
+
+
+def test_stop_requests_cancel_tasks_of_this_worker(registry, monkeypatch):
+    monkeypatch.setattr(tasks_module, "tasks", {})
+
+    async def run():
+        task_id, task = tasks_module.create_task(asyncio.sleep(60), "chat-1")
+        listener = asyncio.create_task(registry._listen())
+        while not registry.redis.subscribers:
+            await asyncio.sleep(0.01)
+
+        # As sent by another worker
+        assert await registry.request_stop(task_id)
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        listener.cancel()
+
+        assert await tasks_module.list_task_ids_by_chat_id("chat-1") == []
+        assert tasks_module.tasks == {}
+
+    asyncio.run(run())
+
+
+def test_reap_drops_tasks_of_dead_workers(registry, other_registry):
+    async def run():
+        await other_registry.register("task-1", get_item("alive", "chat-1"))
+        await other_registry.register("task-2", get_item("dead", "chat-1"))
+        await other_registry.register("task-3", get_item("dead"))
+        await registry.redis.hset(registry.workers_key, "dead", time.time() - 60)
+
+        await registry.reap()
+
+        assert await tasks_module.list_tasks() == ["task-1"]
+        assert await tasks_module.list_task_ids_by_chat_id("chat-1") == ["task-1"]
+        assert list(await registry.redis.hgetall(registry.workers_key)) == ["alive"]
+
+        # Nothing left to reap
+        await registry.reap()
+        assert await tasks_module.list_tasks() == ["task-1"]
+
+    asyncio.run(run())
+
+
+def test_close_releases_the_tasks_of_this_worker(registry, other_registry):
+    async def run():
+        await registry.register("task-1", get_item(chat_id="chat-1"))
+        await registry.register("task-2", get_item())
+        await other_registry.register("task-3", get_item("other-worker", "chat-1"))
+
+        await registry.close()
+
+        assert await tasks_module.list_tasks() == ["task-3"]
+        assert await tasks_module.list_task_ids_by_chat_id("chat-1") == ["task-3"]
+        workers = await registry.redis.hgetall(registry.workers_key)
+        assert list(workers) == ["other-worker"]
+        assert registry.redis.closed
+
+    asyncio.run(run())
@@ -0,0 +1,201 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+import open_webui.utils.balancer as balancer_module
+from open_webui.routers import ollama
+from open_webui.utils.balancer import LoadBalancer
+
+
+URLS = ["http://a:11434", "http://b:11434", "http://c:11434"]
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(balancer_module, "time", clock)
+    return clock
+
+
+def test_unknown_strategy_falls_back_to_random():
+    assert LoadBalancer(strategy="round_robin").strategy == "random"
+
+
+def test_random_ranks_every_url_once():
+    balancer = LoadBalancer(strategy="random")
+    assert sorted(balancer.rank(URLS + URLS[:1])) == sorted(URLS)
+
+
+def test_least_outstanding_prefers_idle_backends(clock):
+    balancer = LoadBalancer(strategy="least_outstanding")
+    leases = [balancer.acquire(URLS[0]), balancer.acquire(URLS[0])]
+    balancer.acquire(URLS[1])
+
+    assert balancer.rank(URLS) == [URLS[2], URLS[1], URLS[0]]
+
+    for lease in leases:
+        lease.release()
+    assert balancer.rank(URLS)[0] != URLS[1]
+
+
+def test_least_outstanding_forgets_abandoned_leases(clock):
+    balancer = LoadBalancer(strategy="least_outstanding", max_lease_age=60)
+    balancer.acquire(URLS[0])
+
+    clock.now += 61
+    assert balancer.get_outstanding(URLS[0]) == 0
+
+
+def test_ewma_prefers_fast_backends(clock):
+    balancer = LoadBalancer(strategy="ewma")
+    balancer.record_success(URLS[0], 2.0)
+    balancer.record_success(URLS[1], 0.5)
+    balancer.record_success(URLS[2], 1.0)
+
+    assert balancer.rank(URLS) == [URLS[1], URLS[2], URLS[0]]
+
+    # Requests in flight weigh on the latency
+    for _ in range(2):
+        balancer.acquire(URLS[1])
+    assert balancer.rank(URLS) == [URLS[2], URLS[1], URLS[0]]
+
+
+def test_consistent_hash_is_stable_per_key(clock):
+    balancer = LoadBalancer(strategy="consistent_hash")
+    first = balancer.rank(URLS, key="chat-1")
+
+    assert sorted(first) == sorted(URLS)
+    for _ in range(5):
+        assert balancer.rank(list(reversed(URLS)), key="chat-1") == first
+
+    # Removing a backend only moves the keys it held
+    remaining = [url for url in URLS if url != first[-1]]
+    assert balancer.rank(remaining, key="chat-1")[0] == first[0]
+
+
+def test_circuit_opens_after_consecutive_failures(clock):
+    balancer = LoadBalancer(
+        strategy="least_outstanding", failure_threshold=2, cooldown=30
+    )
+
+    balancer.record_failure(URLS[0])
+    assert balancer.is_available(URLS[0])
+
+    balancer.record_failure(URLS[0])
+    assert not balancer.is_available(URLS[0])
+    # Ejected backends are still used, but last
+    assert balancer.rank(URLS)[-1] == URLS[0]
+
+
+def test_success_resets_consecutive_failures(clock):
+    balancer = LoadBalancer(failure_threshold=2)
+
+    balancer.record_failure(URLS[0])
+    balancer.record_success(URLS[0], 0.1)
+    balancer.record_failure(URLS[0])
+    assert balancer.is_available(URLS[0])
+
+
+def test_circuit_half_opens_after_cooldown(clock):
+    balancer = LoadBalancer(failure_threshold=1, cooldown=30)
+    balancer.record_failure(URLS[0])
+
+    clock.now += 31
+    assert balancer.is_available(URLS[0])
+
+    # A failure on the trial request opens the circuit again
+    balancer.acquire(URLS[0]).failure()
+    assert not balancer.is_available(URLS[0])
+
+    # A success on the next one closes it
+    clock.now += 31
+    balancer.acquire(URLS[0]).success()
+    assert balancer.is_available(URLS[0])
+    assert balancer.backends[URLS[0]].consecutive_failures == 0
+
+
+def test_lease_reports_once():
+    balancer = LoadBalancer(failure_threshold=1)
+    lease = balancer.acquire(URLS[0])
+
+    lease.success()
+    lease.failure()
+    lease.release()
+    lease.release()
+
+    assert balancer.is_available(URLS[0])
+    assert balancer.get_outstanding(URLS[0]) == 0
+
+
+def get_request():
+    config = SimpleNamespace(OLLAMA_BASE_URLS=URLS, OLLAMA_API_CONFIGS={})
+    state = SimpleNamespace(config=config, OLLAMA_MODELS={"llama": {"urls": [0, 1, 2]}})
+    return SimpleNamespace(app=SimpleNamespace(state=state))
+
+
+@pytest.fixture
+def balancer(monkeypatch):
+    balancer = LoadBalancer(strategy="consistent_hash")
+    monkeypatch.setattr(ollama, "OLLAMA_LOAD_BALANCER", balancer)
+    monkeypatch.setattr(ollama, "OLLAMA_LOAD_BALANCER_MAX_ATTEMPTS", 2)
+    return balancer
+
+
+def mock_send_post_request(monkeypatch, status_codes: dict):
+    calls = []
+
+    async def send_post_request(url, lease, **kwargs):
+        calls.append(url)
+        lease.release()
+        status_code = status_codes.get(url.removesuffix("/api/chat"))
+        if status_code:
+            raise HTTPException(status_code=status_code, detail="error")
+        return "response"
+
+    monkeypatch.setattr(ollama, "send_post_request", send_post_request)
+    return calls
+
+
+def send_chat_request():
+    return asyncio.run(
+        ollama.send_model_post_request(
+            get_request(), "/api/chat", {"model": "llama"}, key="chat-1"
+        )
+    )
+
+
+def test_retries_next_backend_before_first_byte(monkeypatch, balancer):
+    ranked = balancer.rank(URLS, key="chat-1")
+    calls = mock_send_post_request(monkeypatch, {ranked[0]: 502})
+
+    assert send_chat_request() == "response"
+    assert calls == [f"{ranked[0]}/api/chat", f"{ranked[1]}/api/chat"]
+
+
+def test_does_not_retry_client_errors(monkeypatch, balancer):
+    ranked = balancer.rank(URLS, key="chat-1")
+    calls = mock_send_post_request(monkeypatch, {ranked[0]: 400})
+
+    with pytest.raises(HTTPException) as e:
+        send_chat_request()
+    assert e.value.status_code == 400
+    assert calls == [f"{ranked[0]}/api/chat"]
+
+
+def test_stops_after_max_attempts(monkeypatch, balancer):
+    calls = mock_send_post_request(monkeypatch, {url: 503 for url in URLS})
+
+    with pytest.raises(HTTPException) as e:
+        send_chat_request()
+    assert e.value.status_code == 503
+    assert len(calls) == 2
@@ -0,0 +1,134 @@
+"""
+Offline load and latency benchmark of Open WebUI.
+
+Starts the server in a fresh data directory, with mock Ollama and OpenAI
+backends streaming tokens at a fixed rate, and drives its hot paths at a
+given concurrency. Run from the backend directory:
+
+    python -m open_webui.test.benchmark run --output base.json
+    python -m open_webui.test.benchmark run --output head.json
+    python -m open_webui.test.benchmark compare base.json head.json --fail-over 10
+
+DATABASE_URL and VECTOR_DB are taken from the environment, to benchmark
+other databases than the default SQLite and Chroma.
+"""
+
+import argparse
+import asyncio
+import json
+import shutil
+import sys
+import tempfile
+from dataclasses import fields
+
+from open_webui.test.benchmark.harness import (
+    SCENARIOS,
+    BenchmarkSettings,
+    compare_reports,
+    run_benchmark,
+)
+from open_webui.test.benchmark.mock_backends import MockSettings
+
+
+def add_settings_arguments(parser: argparse.ArgumentParser, settings_class):
+    for field in fields(settings_class):
+        parser.add_argument(
+            f"--{field.name.replace('_', '-')}",
+            type=field.type,
+            default=field.default,
+            help=f"(default: {field.default})",
+        )
+
+
+def get_settings(args: argparse.Namespace, settings_class):
+    return settings_class(
+        **{field.name: getattr(args, field.name) for field in fields(settings_class)}
+    )
+
+
+def run(args: argparse.Namespace):
+    scenarios = args.scenarios.split(",") if args.scenarios else list(SCENARIOS)
+    for name in scenarios:
+        if name not in SCENARIOS:
+            sys.exit(f"Unknown scenario {name}, choose from {', '.join(SCENARIOS)}")
+
+    data_dir = args.data_dir or tempfile.mkdtemp(prefix="open-webui-benchmark-")
+    try:
+        report = asyncio.run(
+            run_benchmark(
+                scenarios,
+                get_settings(args, BenchmarkSettings),
+                get_settings(args, MockSettings),
+                data_dir,
+            )
+        )
+    finally:
+        if not args.data_dir:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Report written to {args.output}")
+
+
+def compare(args: argparse.Namespace):
+    with open(args.base) as f:
+        base = json.load(f)
+    with open(args.head) as f:
+        head = json.load(f)
+
+    changes = compare_reports(base, head)
+    print(f"{'scenario':<18} {'metric':<40} {'base':>12} {'head':>12} {'change':>9}")
+    for change in changes:
+        percent = f"{change['change']:+.1f}%" if change["change"] is not None else ""
+        print(
+            f"{change['scenario']:<18} {change['metric']:<40} "
+            f"{change['base']:>12} {change['head']:>12} {percent:>9}"
+        )
+
+    if args.fail_over is not None:
+        regressions = [
+            change
+            for change in changes
+            if change["regression"] is not None
+            and change["regression"] > args.fail_over
+        ]
+        if regressions:
+            sys.exit(
+                f"{len(regressions)} metric(s) regressed by over {args.fail_over}%"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m open_webui.test.benchmark")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="Run the benchmark")
+    run_parser.add_argument(
+        "--scenarios",
+        help=f"Comma separated scenarios to run (default: {','.join(SCENARIOS)})",
+    )
+    run_parser.add_argument("--output", default="benchmark.json")
+    run_parser.add_argument(
+        "--data-dir", help="Kept after the run (default: a temporary directory)"
+    )
+    add_settings_arguments(run_parser, BenchmarkSettings)
+    add_settings_arguments(run_parser, MockSettings)
+    run_parser.set_defaults(func=run)
+
+    compare_parser = subparsers.add_parser("compare", help="Compare two reports")
+    compare_parser.add_argument("base")
+    compare_parser.add_argument("head")
+    compare_parser.add_argument(
+        "--fail-over",
+        type=float,
+        help="Exit with an error if a metric regressed by more than this percent",
+    )
+    compare_parser.set_defaults(func=compare)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+"""
+Creates the admin user of a benchmark run and prints its token. Runs in its
+own process, with the environment of the server under test.
+"""
+
+import json
+import sys
+import uuid
+
+from open_webui.models.auths import Auths
+from open_webui.models.users import Users
+from open_webui.utils.auth import create_token, get_password_hash
+
+
+def main(email: str):
+    user = Users.get_user_by_email(email)
+    if user is None:
+        user = Auths.insert_new_auth(
+            email, get_password_hash(str(uuid.uuid4())), "Benchmark", role="admin"
+        )
+
+    print(json.dumps({"id": user.id, "token": create_token(data={"id": user.id})}))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1])
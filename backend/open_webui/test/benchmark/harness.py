@@ -0,0 +1,789 @@
+import asyncio
+import json
+import math
+import os
+import platform
+import socket
+import subprocess
+import sys
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Optional
+
+import aiohttp
+import psutil
+import socketio
+from prometheus_client.parser import text_string_to_metric_families
+
+from open_webui.test.benchmark.mock_backends import (
+    EMBEDDING_MODEL,
+    OLLAMA_MODEL,
+    OPENAI_MODEL,
+    WORDS,
+    MockBackends,
+    MockSettings,
+)
+
+
+BACKEND_DIR = Path(__file__).resolve().parents[3]
+
+REPORT_VERSION = 1
+
+BENCHMARK_EMAIL = "benchmark@openwebui.com"
+
+
+@dataclass
+class BenchmarkSettings:
+    requests: int = 100
+    concurrency: int = 8
+    warmup: int = 5
+    socket_clients: int = 50
+    # Size of every ingested file, in KB
+    file_size: int = 64
+    # Seconds to wait for a socket event to reach every client
+    delivery_timeout: float = 5.0
+
+
+####################################
+# Statistics
+####################################
+
+
+def percentile(values: list[float], q: float) -> float:
+    # Nearest rank, so every reported value was actually measured
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]
+
+
+def summarize(values: list[float], scale: float = 1000) -> Optional[dict]:
+    """Percentiles of `values`, in milliseconds by default."""
+    if not values:
+        return None
+    return {
+        "p50": round(percentile(values, 50) * scale, 3),
+        "p95": round(percentile(values, 95) * scale, 3),
+        "p99": round(percentile(values, 99) * scale, 3),
+        "mean": round(sum(values) / len(values) * scale, 3),
+        "max": round(max(values) * scale, 3),
+    }
+
+
+def histogram_quantile(buckets: dict[float, float], q: float) -> Optional[float]:
+    """Upper bound of the bucket holding the `q` quantile of a histogram."""
+    count = buckets.get(float("inf"), 0)
+    if not count:
+        return None
+    for bound in sorted(buckets):
+        if buckets[bound] >= q * count:
+            return bound
+    return None
+
+
+####################################
+# Server under test
+####################################
+
+
+def get_free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def get_server_env(data_dir: str, backends: MockBackends) -> dict:
+    """Environment of the server: offline, and pointed at the mock backends."""
+    env = {
+        **os.environ,
+        "DATA_DIR": data_dir,
+        "WEBUI_SECRET_KEY": "benchmark",
+        "GLOBAL_LOG_LEVEL": "WARNING",
+        "ENABLE_METRICS": "true",
+        "ENABLE_CHANNELS": "true",
+        "ENABLE_OLLAMA_API": "true",
+        "OLLAMA_BASE_URLS": backends.ollama_url,
+        "ENABLE_OPENAI_API": "true",
+        "OPENAI_API_BASE_URLS": backends.openai_url,
+        "OPENAI_API_KEYS": "benchmark",
+        "RAG_EMBEDDING_ENGINE": "openai",
+        "RAG_EMBEDDING_MODEL": EMBEDDING_MODEL,
+        "RAG_OPENAI_API_BASE_URL": backends.openai_url,
+        "RAG_OPENAI_API_KEY": "benchmark",
+        "ENABLE_TAGS_GENERATION": "false",
+        "ENABLE_SEARCH_QUERY_GENERATION": "false",
+        "ENABLE_RETRIEVAL_QUERY_GENERATION": "false",
+        "ENABLE_AUTOCOMPLETE_GENERATION": "false",
+        # Nothing may leave the machine
+        "OFFLINE_MODE": "true",
+        "HF_HUB_OFFLINE": "1",
+        "ANONYMIZED_TELEMETRY": "false",
+        "SCARF_NO_ANALYTICS": "true",
+        "DO_NOT_TRACK": "true",
+    }
+    # Sign in is never used, the client only has to be created
+    env.setdefault("SUPABASE_URL", "http://127.0.0.1:9")
+    env.setdefault("SUPABASE_ANON_KEY", "benchmark.offline.key")
+    return env
+
+
+class Server:
+    """Open WebUI running in a single uvicorn worker, in its own process."""
+
+    def __init__(self, env: dict, log_path: str):
+        self.env = env
+        self.log_path = log_path
+        self.port = get_free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        self.process = None
+        self._log_file = None
+
+    def start(self):
+        self._log_file = open(self.log_path, "w")
+        self.process = subprocess.Popen(
+            [
+                sys.executable,
+                "-m",
+                "uvicorn",
+                "open_webui.main:app",
+                "--host",
+                "127.0.0.1",
+                "--port",
+                str(self.port),
+                "--log-level",
+                "warning",
+            ],
+            cwd=BACKEND_DIR,
+            env=self.env,
+            stdout=self._log_file,
+            stderr=subprocess.STDOUT,
+        )
+
+    async def wait_until_ready(self, session: aiohttp.ClientSession, timeout=300):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"Server exited, see {self.log_path}")
+            try:
+                async with session.get(f"{self.url}/health") as r:
+                    if r.status == 200:
+                        return
+            except aiohttp.ClientError:
+                pass
+            await asyncio.sleep(0.5)
+        raise TimeoutError(f"Server didn't start in {timeout}s, see {self.log_path}")
+
+    def create_admin(self) -> dict:
+        result = subprocess.run(
+            [
+                sys.executable,
+                "-m",
+                "open_webui.test.benchmark.bootstrap",
+                BENCHMARK_EMAIL,
+            ],
+            cwd=BACKEND_DIR,
+            env=self.env,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        # Logs go to stdout as well, the user is the last line
+        return json.loads(result.stdout.strip().splitlines()[-1])
+
+    def rss(self) -> int:
+        return psutil.Process(self.process.pid).memory_info().rss
+
+    def stop(self):
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+        if self._log_file:
+            self._log_file.close()
+
+
+class MetricsSnapshot:
+    """Samples of the /metrics endpoint of the server, to diff two of them."""
+
+    def __init__(self, text: str):
+        self.samples = {}
+        for family in text_string_to_metric_families(text):
+            for sample in family.samples:
+                key = (sample.name, tuple(sorted(sample.labels.items())))
+                self.samples[key] = sample.value
+
+    def delta(self, other: "MetricsSnapshot", name: str) -> dict[tuple, float]:
+        return {
+            labels: value - other.samples.get((sample_name, labels), 0)
+            for (sample_name, labels), value in self.samples.items()
+            if sample_name == name
+        }
+
+
+def get_db_queries(before: MetricsSnapshot, after: MetricsSnapshot) -> dict:
+    """Mean database queries per request, by route."""
+    sums = after.delta(before, "open_webui_http_request_db_queries_sum")
+    counts = after.delta(before, "open_webui_http_request_db_queries_count")
+
+    db_queries = {}
+    for labels, count in counts.items():
+        labels_dict = dict(labels)
+        if count <= 0 or labels_dict["route"] == "/metrics":
+            continue
+        route = f"{labels_dict['method']} {labels_dict['route']}"
+        db_queries[route] = round(sums.get(labels, 0) / count, 2)
+    return db_queries
+
+
+def get_event_loop_lag(before: MetricsSnapshot, after: MetricsSnapshot) -> dict:
+    """Event loop lag of the server, in milliseconds."""
+    buckets = {
+        float(dict(labels)["le"]): value
+        for labels, value in after.delta(
+            before, "open_webui_event_loop_lag_seconds_bucket"
+        ).items()
+    }
+    total = sum(after.delta(before, "open_webui_event_loop_lag_seconds_sum").values())
+    count = sum(after.delta(before, "open_webui_event_loop_lag_seconds_count").values())
+    if not count:
+        return None
+
+    def to_ms(value):
+        return round(value * 1000, 3) if value is not None else None
+
+    return {
+        "mean": to_ms(total / count),
+        "p99": to_ms(histogram_quantile(buckets, 0.99)),
+        "max": to_ms(histogram_quantile(buckets, 1)),
+    }
+
+
+####################################
+# Scenarios
+####################################
+
+
+@dataclass
+class Context:
+    url: str
+    token: str
+    user_id: str
+    session: aiohttp.ClientSession
+    settings: BenchmarkSettings
+    mock_settings: MockSettings
+
+    @property
+    def headers(self) -> dict:
+        return {"Authorization": f"Bearer {self.token}"}
+
+
+def get_content(line: bytes, sse: bool) -> Optional[str]:
+    """Text of a streamed chunk, SSE in the OpenAI format or NDJSON from Ollama."""
+    line = line.strip()
+    if sse:
+        if not line.startswith(b"data:") or line == b"data: [DONE]":
+            return None
+        line = line[len(b"data:") :]
+    if not line:
+        return None
+
+    try:
+        data = json.loads(line)
+    except ValueError:
+        return None
+    if sse:
+        choices = data.get("choices") or [{}]
+        return choices[0].get("delta", {}).get("content")
+    return data.get("message", {}).get("content")
+
+
+async def stream_completion(
+    ctx: Context, path: str, payload: dict, sse: bool = True
+) -> dict:
+    start_time = time.perf_counter()
+    ttft = None
+    tokens = 0
+    async with ctx.session.post(
+        f"{ctx.url}{path}", json=payload, headers=ctx.headers
+    ) as r:
+        if r.status != 200:
+            return {"error": f"{r.status}: {(await r.text())[:200]}"}
+        async for line in r.content:
+            if get_content(line, sse):
+                tokens += 1
+                if ttft is None:
+                    ttft = time.perf_counter() - start_time
+
+    latency = time.perf_counter() - start_time
+    if not tokens:
+        return {"error": "No tokens received"}
+    return {"latency": latency, "ttft": ttft, "tokens": tokens}
+
+
+class Scenario:
+    name = None
+
+    async def setup(self, ctx: Context):
+        pass
+
+    async def request(self, ctx: Context, i: int) -> dict:
+        """Makes one request, returns its `latency` (and `ttft`) or an `error`."""
+        raise NotImplementedError
+
+    async def teardown(self, ctx: Context):
+        pass
+
+
+def get_messages(i: int) -> list[dict]:
+    return [{"role": "user", "content": f"Benchmark request {i}, say something."}]
+
+
+class ChatCompletionsScenario(Scenario):
+    """The full chat pipeline, as used by the web UI."""
+
+    name = "chat_completions"
+
+    async def request(self, ctx, i):
+        payload = {"model": OPENAI_MODEL, "messages": get_messages(i), "stream": True}
+        return await stream_completion(ctx, "/api/chat/completions", payload)
+
+
+class OllamaChatScenario(Scenario):
+    name = "ollama_chat"
+
+    async def request(self, ctx, i):
+        payload = {"model": OLLAMA_MODEL, "messages": get_messages(i), "stream": True}
+        return await stream_completion(ctx, "/ollama/api/chat", payload, sse=False)
+
+
+class OpenAIChatScenario(Scenario):
+    name = "openai_chat"
+
+    async def request(self, ctx, i):
+        payload = {"model": OPENAI_MODEL, "messages": get_messages(i), "stream": True}
+        return await stream_completion(ctx, "/openai/chat/completions", payload)
+
+
+def get_document(i: int, words: int) -> str:
+    # Different documents share words, so queries match several chunks
+    return " ".join(f"{WORDS[(i * 7 + j) % len(WORDS)]}{j % 97}" for j in range(words))
+
+
+class RagQueryScenario(Scenario):
+    """Vector search of a collection, embedding the query on the mock backend."""
+
+    name = "rag_query"
+    collection_name = "benchmark-rag"
+
+    async def setup(self, ctx):
+        content = "\n\n".join(get_document(i, 200) for i in range(50))
+        async with ctx.session.post(
+            f"{ctx.url}/api/v1/retrieval/process/text",
+            json={
+                "name": "benchmark",
+                "content": content,
+                "collection_name": self.collection_name,
+            },
+            headers=ctx.headers,
+        ) as r:
+            if r.status != 200:
+                raise RuntimeError(f"Error indexing documents: {await r.text()}")
+
+    async def request(self, ctx, i):
+        start_time = time.perf_counter()
+        async with ctx.session.post(
+            f"{ctx.url}/api/v1/retrieval/query/doc",
+            json={
+                "collection_name": self.collection_name,
+                "query": get_document(i, 8),
+                "k": 5,
+            },
+            headers=ctx.headers,
+        ) as r:
+            body = await r.read()
+            if r.status != 200:
+                return {"error": f"{r.status}: {body[:200]}"}
+        return {"latency": time.perf_counter() - start_time}
+
+
+class FileIngestionScenario(Scenario):
+    """Uploads text files, each extracted, chunked, embedded and indexed."""
+
+    name = "file_ingestion"
+
+    async def request(self, ctx, i):
+        # Roughly file_size KB of words, different for every file
+        content = get_document(i, ctx.settings.file_size * 1024 // 8)
+        data = aiohttp.FormData()
+        data.add_field(
+            "file",
+            content.encode(),
+            filename=f"benchmark-{i}.txt",
+            content_type="text/plain",
+        )
+
+        start_time = time.perf_counter()
+        async with ctx.session.post(
+            f"{ctx.url}/api/v1/files/", data=data, headers=ctx.headers
+        ) as r:
+            if r.status != 200:
+                return {"error": f"{r.status}: {(await r.text())[:200]}"}
+            file = await r.json()
+        if file.get("error"):
+            return {"error": file["error"]}
+        return {"latency": time.perf_counter() - start_time}
+
+
+class SocketFanoutScenario(Scenario):
+    """
+    Channel messages sent to many connected socket clients. The latency is
+    the time until every client got the message, the TTFT until the first.
+    """
+
+    name = "socket_fanout"
+
+    def __init__(self):
+        self.clients = []
+        self.channel_id = None
+        # message content -> [sent at, received at, event set once all got it]
+        self.messages = {}
+
+    def on_event(self, data):
+        if data.get("data", {}).get("type") != "message":
+            return
+        message = self.messages.get(data["data"]["data"].get("content"))
+        if message is None:
+            return
+
+        message[1].append(time.perf_counter())
+        if len(message[1]) == len(self.clients):
+            message[2].set()
+
+    async def setup(self, ctx):
+        async with ctx.session.post(
+            f"{ctx.url}/api/v1/channels/create",
+            json={"name": "benchmark"},
+            headers=ctx.headers,
+        ) as r:
+            if r.status != 200:
+                raise RuntimeError(f"Error creating channel: {await r.text()}")
+            self.channel_id = (await r.json())["id"]
+
+        async def connect():
+            client = socketio.AsyncClient(reconnection=False)
+            client.on("channel-events", self.on_event)
+            await client.connect(
+                ctx.url,
+                socketio_path="/ws/socket.io",
+                transports=["websocket"],
+                auth={"token": ctx.token},
+            )
+            # Joins the rooms of the channels of the user
+            await client.call("user-join", {"auth": {"token": ctx.token}})
+            return client
+
+        # Connected in batches, like browsers opening the app
+        for start in range(0, ctx.settings.socket_clients, 10):
+            count = min(10, ctx.settings.socket_clients - start)
+            self.clients += await asyncio.gather(*[connect() for _ in range(count)])
+
+    async def request(self, ctx, i):
+        content = f"benchmark message {i} {time.perf_counter()}"
+        message = [time.perf_counter(), [], asyncio.Event()]
+        self.messages[content] = message
+
+        try:
+            async with ctx.session.post(
+                f"{ctx.url}/api/v1/channels/{self.channel_id}/messages/post",
+                json={"content": content},
+                headers=ctx.headers,
+            ) as r:
+                if r.status != 200:
+                    return {"error": f"{r.status}: {(await r.text())[:200]}"}
+                await r.read()
+
+            try:
+                await asyncio.wait_for(message[2].wait(), ctx.settings.delivery_timeout)
+            except asyncio.TimeoutError:
+                return {
+                    "error": f"Delivered to {len(message[1])} of "
+                    f"{len(self.clients)} clients"
+                }
+            return {
+                "latency": message[1][-1] - message[0],
+                "ttft": message[1][0] - message[0],
+            }
+        finally:
+            self.messages.pop(content, None)
+
+    async def teardown(self, ctx):
+        await asyncio.gather(*[client.disconnect() for client in self.clients])
+        self.clients = []
+
+
+SCENARIOS = {
+    scenario.name: scenario
+    for scenario in [
+        ChatCompletionsScenario,
+        OllamaChatScenario,
+        OpenAIChatScenario,
+        RagQueryScenario,
+        FileIngestionScenario,
+        SocketFanoutScenario,
+    ]
+}
+
+
+####################################
+# Runner
+####################################
+
+
+async def run_load(
+    ctx: Context, scenario: Scenario, requests: int, offset: int = 0
+) -> list[dict]:
+    """Makes `requests` requests, `concurrency` at a time."""
+    samples = []
+    next_request = iter(range(offset, offset + requests))
+
+    async def worker():
+        for i in next_request:
+            try:
+                samples.append(await scenario.request(ctx, i))
+            except Exception as e:
+                samples.append({"error": f"{type(e).__name__}: {e}"})
+
+    await asyncio.gather(*[worker() for _ in range(ctx.settings.concurrency)])
+    return samples
+
+
+async def sample_rss(server: Server, peak: list[int], interval: float = 0.1):
+    while True:
+        peak[0] = max(peak[0], server.rss())
+        await asyncio.sleep(interval)
+
+
+async def scrape_metrics(ctx: Context) -> MetricsSnapshot:
+    async with ctx.session.get(f"{ctx.url}/metrics") as r:
+        r.raise_for_status()
+        return MetricsSnapshot(await r.text())
+
+
+async def run_scenario(ctx: Context, server: Server, scenario: Scenario) -> dict:
+    await scenario.setup(ctx)
+    try:
+        # Warms up the caches and connection pools, not measured
+        await run_load(ctx, scenario, ctx.settings.warmup)
+
+        before = await scrape_metrics(ctx)
+        peak_rss = [server.rss()]
+        sampler = asyncio.create_task(sample_rss(server, peak_rss))
+
+        start_time = time.perf_counter()
+        samples = await run_load(
+            ctx, scenario, ctx.settings.requests, offset=ctx.settings.warmup
+        )
+        duration = time.perf_counter() - start_time
+
+        sampler.cancel()
+        after = await scrape_metrics(ctx)
+    finally:
+        await scenario.teardown(ctx)
+
+    completed = [sample for sample in samples if "error" not in sample]
+    errors = [sample["error"] for sample in samples if "error" in sample]
+    tokens_per_second = [
+        (sample["tokens"] - 1) / (sample["latency"] - sample["ttft"])
+        for sample in completed
+        if sample.get("tokens", 0) > 1 and sample["latency"] > sample["ttft"]
+    ]
+
+    return {
+        "requests": len(samples),
+        "errors": len(errors),
+        # A few of them, enough to tell what went wrong
+        "error_samples": sorted(set(errors))[:5],
+        "duration": round(duration, 3),
+        "throughput": round(len(completed) / duration, 3) if duration else None,
+        "latency": summarize([sample["latency"] for sample in completed]),
+        "ttft": summarize(
+            [sample["ttft"] for sample in completed if sample.get("ttft") is not None]
+        ),
+        "tokens_per_second": (
+            round(sum(tokens_per_second) / len(tokens_per_second), 3)
+            if tokens_per_second
+            else None
+        ),
+        "db_queries": get_db_queries(before, after),
+        "event_loop_lag": get_event_loop_lag(before, after),
+        "rss": {
+            "peak_mb": round(peak_rss[0] / 1024 / 1024, 1),
+            "end_mb": round(server.rss() / 1024 / 1024, 1),
+        },
+    }
+
+
+def get_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=BACKEND_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+async def run_benchmark(
+    scenarios: list[str],
+    settings: BenchmarkSettings,
+    mock_settings: MockSettings,
+    data_dir: str,
+    log=print,
+) -> dict:
+    report = {
+        "version": REPORT_VERSION,
+        "created_at": int(time.time()),
+        "commit": get_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "settings": asdict(settings),
+        "mock_settings": asdict(mock_settings),
+        "scenarios": {},
+    }
+
+    with MockBackends(mock_settings) as backends:
+        server = Server(
+            get_server_env(data_dir, backends), os.path.join(data_dir, "server.log")
+        )
+        server.start()
+        try:
+            connector = aiohttp.TCPConnector(limit=0)
+            timeout = aiohttp.ClientTimeout(total=300)
+            async with aiohttp.ClientSession(
+                connector=connector, timeout=timeout
+            ) as session:
+                log(f"Starting server on {server.url}")
+                await server.wait_until_ready(session)
+                report["startup_rss_mb"] = round(server.rss() / 1024 / 1024, 1)
+
+                user = await asyncio.to_thread(server.create_admin)
+                ctx = Context(
+                    url=server.url,
+                    token=user["token"],
+                    user_id=user["id"],
+                    session=session,
+                    settings=settings,
+                    mock_settings=mock_settings,
+                )
+
+                for name in scenarios:
+                    log(f"Running {name}")
+                    result = await run_scenario(ctx, server, SCENARIOS[name]())
+                    report["scenarios"][name] = result
+                    log(format_result(name, result))
+        finally:
+            server.stop()
+
+    return report
+
+
+####################################
+# Reports
+####################################
+
+
+def format_result(name: str, result: dict) -> str:
+    def ms(stats, key):
+        return f"{stats[key]:.1f}ms" if stats else "-"
+
+    lag = result["event_loop_lag"]
+    return (
+        f"  {name}: {result['throughput']} req/s, "
+        f"latency p50 {ms(result['latency'], 'p50')} "
+        f"p95 {ms(result['latency'], 'p95')} p99 {ms(result['latency'], 'p99')}, "
+        f"ttft p50 {ms(result['ttft'], 'p50')}, "
+        f"loop lag p99 {lag['p99'] if lag else '-'}ms, "
+        f"rss peak {result['rss']['peak_mb']}MB, "
+        f"errors {result['errors']}/{result['requests']}"
+    )
+
+
+# (path in the scenario results, whether higher is better)
+COMPARED_METRICS = [
+    (("throughput",), True),
+    (("latency", "p50"), False),
+    (("latency", "p95"), False),
+    (("latency", "p99"), False),
+    (("ttft", "p50"), False),
+    (("ttft", "p95"), False),
+    (("ttft", "p99"), False),
+    (("tokens_per_second",), True),
+    (("event_loop_lag", "p99"), False),
+    (("rss", "peak_mb"), False),
+    (("errors",), False),
+]
+
+
+def get_value(result: dict, path: tuple):
+    for key in path:
+        if not isinstance(result, dict):
+            return None
+        result = result.get(key)
+    return result
+
+
+def compare_reports(base: dict, head: dict) -> list[dict]:
+    """Changes of every compared metric between two reports, scenario by scenario."""
+    changes = []
+    for name, head_result in head["scenarios"].items():
+        base_result = base["scenarios"].get(name)
+        if base_result is None:
+            continue
+
+        for path, higher_is_better in COMPARED_METRICS:
+            base_value = get_value(base_result, path)
+            head_value = get_value(head_result, path)
+            if base_value is None or head_value is None:
+                continue
+
+            change = (
+                (head_value - base_value) / base_value * 100 if base_value else None
+            )
+            regression = None
+            if change is not None:
+                regression = -change if higher_is_better else change
+            elif head_value != base_value:
+                # From zero, any increase is a regression (or an improvement)
+                regression = math.inf if higher_is_better != (head_value > 0) else 0
+            changes.append(
+                {
+                    "scenario": name,
+                    "metric": ".".join(path),
+                    "base": base_value,
+                    "head": head_value,
+                    "change": round(change, 2) if change is not None else None,
+                    "regression": regression,
+                }
+            )
+
+        base_queries = base_result.get("db_queries", {})
+        for route, head_value in head_result.get("db_queries", {}).items():
+            base_value = base_queries.get(route)
+            if base_value is not None and base_value != head_value:
+                changes.append(
+                    {
+                        "scenario": name,
+                        "metric": f"db_queries[{route}]",
+                        "base": base_value,
+                        "head": head_value,
+                        "change": None,
+                        "regression": None,
+                    }
+                )
+    return changes
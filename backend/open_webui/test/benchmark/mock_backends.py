@@ -0,0 +1,286 @@
+import asyncio
+import hashlib
+import json
+import math
+import threading
+import time
+from dataclasses import dataclass
+
+from aiohttp import web
+
+
+OLLAMA_MODEL = "bench-ollama:latest"
+OPENAI_MODEL = "bench-openai"
+EMBEDDING_MODEL = "bench-embedding"
+EMBEDDING_DIMENSIONS = 384
+
+WORDS = (
+    "the quick brown fox jumps over a lazy dog while streaming tokens to every "
+    "connected client of the benchmark in a steady and reproducible rhythm"
+).split()
+
+
+@dataclass
+class MockSettings:
+    # Seconds before the first token of a response
+    time_to_first_token: float = 0.05
+    # Tokens streamed per second, after the first one
+    tokens_per_second: float = 200.0
+    # Tokens in every response
+    response_tokens: int = 64
+    # Seconds to compute the embeddings of a batch
+    embedding_latency: float = 0.005
+
+
+def get_tokens(count: int) -> list[str]:
+    # Same response for every request, so runs are comparable
+    return [f"{WORDS[i % len(WORDS)]} " for i in range(count)]
+
+
+def embed(text: str) -> list[float]:
+    """
+    Hashed bag of words: deterministic, and texts sharing words are close,
+    so retrieval returns meaningful results without a model.
+    """
+    vector = [0.0] * EMBEDDING_DIMENSIONS
+    for word in text.lower().split():
+        digest = hashlib.md5(word.encode()).digest()
+        index = int.from_bytes(digest[:4], "little") % EMBEDDING_DIMENSIONS
+        vector[index] += 1.0 if digest[4] & 1 else -1.0
+
+    norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+    return [value / norm for value in vector]
+
+
+async def stream_tokens(settings: MockSettings):
+    await asyncio.sleep(settings.time_to_first_token)
+    interval = 1 / settings.tokens_per_second if settings.tokens_per_second else 0
+    start_time = time.perf_counter()
+    for i, token in enumerate(get_tokens(settings.response_tokens)):
+        # Paced against the start, so slow writes don't lower the rate
+        delay = start_time + i * interval - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        yield token
+
+
+####################################
+# Ollama
+####################################
+
+
+def create_ollama_app(settings: MockSettings) -> web.Application:
+    routes = web.RouteTableDef()
+    model = {
+        "name": OLLAMA_MODEL,
+        "model": OLLAMA_MODEL,
+        "modified_at": "2025-01-01T00:00:00Z",
+        "size": 0,
+        "digest": hashlib.sha256(OLLAMA_MODEL.encode()).hexdigest(),
+        "details": {"format": "gguf", "family": "bench", "parameter_size": "0B"},
+    }
+
+    @routes.get("/")
+    async def root(request):
+        return web.Response(text="Ollama is running")
+
+    @routes.get("/api/version")
+    async def version(request):
+        return web.json_response({"version": "0.5.4"})
+
+    @routes.get("/api/tags")
+    async def tags(request):
+        return web.json_response({"models": [model]})
+
+    @routes.get("/api/ps")
+    async def ps(request):
+        return web.json_response({"models": []})
+
+    @routes.post("/api/chat")
+    @routes.post("/api/generate")
+    async def chat(request):
+        payload = await request.json()
+        is_chat = request.path == "/api/chat"
+
+        def chunk(content: str, done: bool) -> dict:
+            data = {
+                "model": payload.get("model", OLLAMA_MODEL),
+                "created_at": "2025-01-01T00:00:00Z",
+                "done": done,
+            }
+            if is_chat:
+                data["message"] = {"role": "assistant", "content": content}
+            else:
+                data["response"] = content
+            if done:
+                data["eval_count"] = settings.response_tokens
+            return data
+
+        if not payload.get("stream", True):
+            content = "".join([token async for token in stream_tokens(settings)])
+            return web.json_response(chunk(content, True))
+
+        response = web.StreamResponse(headers={"Content-Type": "application/x-ndjson"})
+        await response.prepare(request)
+        async for token in stream_tokens(settings):
+            await response.write(json.dumps(chunk(token, False)).encode() + b"\n")
+        await response.write(json.dumps(chunk("", True)).encode() + b"\n")
+        await response.write_eof()
+        return response
+
+    @routes.post("/api/embed")
+    async def embeddings(request):
+        payload = await request.json()
+        texts = payload["input"]
+        if isinstance(texts, str):
+            texts = [texts]
+
+        await asyncio.sleep(settings.embedding_latency)
+        return web.json_response(
+            {"model": payload["model"], "embeddings": [embed(text) for text in texts]}
+        )
+
+    app = web.Application(client_max_size=64 * 1024 * 1024)
+    app.add_routes(routes)
+    return app
+
+
+####################################
+# OpenAI
+####################################
+
+
+def create_openai_app(settings: MockSettings) -> web.Application:
+    routes = web.RouteTableDef()
+
+    @routes.get("/v1/models")
+    async def models(request):
+        return web.json_response(
+            {
+                "object": "list",
+                "data": [
+                    {"id": model, "object": "model", "created": 0, "owned_by": "bench"}
+                    for model in [OPENAI_MODEL, EMBEDDING_MODEL]
+                ],
+            }
+        )
+
+    @routes.post("/v1/chat/completions")
+    async def chat_completions(request):
+        payload = await request.json()
+        model = payload.get("model", OPENAI_MODEL)
+
+        def chunk(delta: dict, finish_reason=None) -> dict:
+            return {
+                "id": "chatcmpl-bench",
+                "object": "chat.completion.chunk",
+                "created": 0,
+                "model": model,
+                "choices": [
+                    {"index": 0, "delta": delta, "finish_reason": finish_reason}
+                ],
+            }
+
+        if not payload.get("stream", False):
+            content = "".join([token async for token in stream_tokens(settings)])
+            return web.json_response(
+                {
+                    "id": "chatcmpl-bench",
+                    "object": "chat.completion",
+                    "created": 0,
+                    "model": model,
+                    "choices": [
+                        {
+                            "index": 0,
+                            "message": {"role": "assistant", "content": content},
+                            "finish_reason": "stop",
+                        }
+                    ],
+                    "usage": {"completion_tokens": settings.response_tokens},
+                }
+            )
+
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        async for token in stream_tokens(settings):
+            data = json.dumps(chunk({"content": token}))
+            await response.write(f"data: {data}\n\n".encode())
+        data = json.dumps(chunk({}, "stop"))
+        await response.write(f"data: {data}\n\ndata: [DONE]\n\n".encode())
+        await response.write_eof()
+        return response
+
+    @routes.post("/v1/embeddings")
+    async def embeddings(request):
+        payload = await request.json()
+        texts = payload["input"]
+        if isinstance(texts, str):
+            texts = [texts]
+
+        await asyncio.sleep(settings.embedding_latency)
+        return web.json_response(
+            {
+                "object": "list",
+                "model": payload["model"],
+                "data": [
+                    {"object": "embedding", "index": i, "embedding": embed(text)}
+                    for i, text in enumerate(texts)
+                ],
+            }
+        )
+
+    app = web.Application(client_max_size=64 * 1024 * 1024)
+    app.add_routes(routes)
+    return app
+
+
+class MockBackends:
+    """
+    Mock Ollama and OpenAI servers, running on their own event loop in a
+    background thread so the load generator doesn't slow them down.
+    """
+
+    def __init__(self, settings: MockSettings, host: str = "127.0.0.1"):
+        self.settings = settings
+        self.host = host
+        self.ollama_url = None
+        self.openai_url = None
+
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._runners = []
+
+    async def _start_app(self, app: web.Application) -> str:
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        site = web.TCPSite(runner, self.host, 0)
+        await site.start()
+        self._runners.append(runner)
+
+        port = site._server.sockets[0].getsockname()[1]
+        return f"http://{self.host}:{port}"
+
+    async def _start(self):
+        self.ollama_url = await self._start_app(create_ollama_app(self.settings))
+        openai_url = await self._start_app(create_openai_app(self.settings))
+        self.openai_url = f"{openai_url}/v1"
+
+    async def _stop(self):
+        for runner in self._runners:
+            await runner.cleanup()
+
+    def start(self):
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self._start(), self._loop).result()
+
+    def stop(self):
+        asyncio.run_coroutine_threadsafe(self._stop(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
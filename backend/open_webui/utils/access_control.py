@@ -1,9 +1,40 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
 from typing import Optional, Union, List, Dict, Any
 from open_webui.models.users import Users, UserModel
-from open_webui.models.groups import Groups
+from open_webui.models.groups import Groups, GroupModel
 import json
 
 
+# Groups of each user, resolved once per request (see `user_groups_cache`)
+_user_groups: ContextVar[Optional[Dict[str, List[GroupModel]]]] = ContextVar(
+    "user_groups", default=None
+)
+
+
+@contextmanager
+def user_groups_cache():
+    """
+    Within this context a user's groups are only queried once, so checking
+    access to many resources (e.g. listing models) costs a single lookup.
+    """
+    token = _user_groups.set({})
+    try:
+        yield
+    finally:
+        _user_groups.reset(token)
+
+
+def get_user_groups(user_id: str) -> List[GroupModel]:
+    cache = _user_groups.get()
+    if cache is None:
+        return Groups.get_groups_by_member_id(user_id)
+
+    if user_id not in cache:
+        cache[user_id] = Groups.get_groups_by_member_id(user_id)
+    return cache[user_id]
+
+
 def get_permissions(
     user_id: str,
     default_permissions: Dict[str, Any],
@@ -30,7 +61,7 @@ def get_permissions(
                     permissions[key] = permissions[key] or value
         return permissions
 
-    user_groups = Groups.get_groups_by_member_id(user_id)
+    user_groups = get_user_groups(user_id)
 
     # deep copy default permissions to avoid modifying the original dict
     permissions = json.loads(json.dumps(default_permissions))
@@ -66,7 +97,7 @@ def has_permission(
     permission_hierarchy = permission_key.split(".")
 
     # Retrieve user group permissions
-    user_groups = Groups.get_groups_by_member_id(user_id)
+    user_groups = get_user_groups(user_id)
 
     for group in user_groups:
         group_permissions = group.permissions
@@ -85,7 +116,7 @@ def has_access(
     if access_control is None:
         return type == "read"
 
-    user_groups = Groups.get_groups_by_member_id(user_id)
+    user_groups = get_user_groups(user_id)
     user_group_ids = [group.id for group in user_groups]
     permission_access = access_control.get(type, {})
     permitted_group_ids = permission_access.get("group_ids", [])
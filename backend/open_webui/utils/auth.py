@@ -1,3 +1,4 @@
+import asyncio
 import logging
 import uuid
 import jwt
@@ -8,7 +9,11 @@ from typing import Optional, Union, List, Dict
 from open_webui.models.users import Users
 
 from open_webui.constants import ERROR_MESSAGES
-from open_webui.env import WEBUI_SECRET_KEY
+from open_webui.env import (
+    WEBUI_SECRET_KEY,
+    USER_LAST_ACTIVE_UPDATE_INTERVAL,
+    SRC_LOG_LEVELS,
+)
 
 from fastapi import Depends, HTTPException, Request, Response, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
@@ -16,6 +21,9 @@ from passlib.context import CryptContext
 
 logging.getLogger("passlib").setLevel(logging.ERROR)
 
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["MAIN"])
+
 
 SESSION_SECRET = WEBUI_SECRET_KEY
 ALGORITHM = "HS256"
@@ -121,14 +129,14 @@ def get_current_user(
         )
 
     if data is not None and "id" in data:
-        user = Users.get_user_by_id(data["id"])
+        user = Users.get_cached_user_by_id(data["id"])
         if user is None:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail=ERROR_MESSAGES.INVALID_TOKEN,
             )
         else:
-            Users.update_user_last_active_by_id(user.id)
+            Users.touch_user_last_active_by_id(user.id)
         return user
     else:
         raise HTTPException(
@@ -138,7 +146,7 @@ def get_current_user(
 
 
 def get_current_user_by_api_key(api_key: str):
-    user = Users.get_user_by_api_key(api_key)
+    user = Users.get_cached_user_by_api_key(api_key)
 
     if user is None:
         raise HTTPException(
@@ -146,11 +154,21 @@ def get_current_user_by_api_key(api_key: str):
             detail=ERROR_MESSAGES.INVALID_TOKEN,
         )
     else:
-        Users.update_user_last_active_by_id(user.id)
+        Users.touch_user_last_active_by_id(user.id)
 
     return user
 
 
+async def periodic_user_last_active_flush():
+    # Writes the `last_active_at` recorded by authenticated requests
+    while True:
+        await asyncio.sleep(max(USER_LAST_ACTIVE_UPDATE_INTERVAL, 1))
+        try:
+            await asyncio.to_thread(Users.flush_user_last_active)
+        except Exception as e:
+            log.exception(f"Error writing user activity: {e}")
+
+
 def get_verified_user(user=Depends(get_current_user)):
     if user.role not in {"user", "admin"}:
         raise HTTPException(
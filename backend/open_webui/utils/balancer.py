@@ -0,0 +1,202 @@
+import bisect
+import hashlib
+import logging
+import random
+import time
+from typing import Optional
+
+from open_webui.env import SRC_LOG_LEVELS
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["OLLAMA"])
+
+
+class BackendState:
+    def __init__(self):
+        # lease id -> start time of the requests currently in flight
+        self.leases: dict[int, float] = {}
+        self.ewma_latency: Optional[float] = None
+
+        self.consecutive_failures = 0
+        self.ejected_until = 0.0
+
+
+class Lease:
+    """
+    Tracks one request to a backend. `success`/`failure` feed the latency
+    average and the circuit breaker, `release` ends the request (idempotent).
+    """
+
+    def __init__(self, balancer: "LoadBalancer", url: str, lease_id: int):
+        self.balancer = balancer
+        self.url = url
+        self.id = lease_id
+        self.start = time.monotonic()
+        self.reported = False
+
+    def success(self):
+        if not self.reported:
+            self.reported = True
+            self.balancer.record_success(self.url, time.monotonic() - self.start)
+
+    def failure(self):
+        if not self.reported:
+            self.reported = True
+            self.balancer.record_failure(self.url)
+
+    def release(self):
+        self.balancer.release(self)
+
+
+class LoadBalancer:
+    """
+    Picks backends for requests among the URLs that serve a model.
+
+    Strategies:
+    - "random": uniform choice (previous behaviour)
+    - "least_outstanding": fewest requests in flight
+    - "ewma": lowest latency average, weighted by requests in flight
+    - "consistent_hash": stable backend per key (e.g. chat id), keeping the KV
+      cache of a conversation warm on one node; falls back to
+      "least_outstanding" when no key is given
+
+    Backends that fail `failure_threshold` times in a row are ejected for
+    `cooldown` seconds (passive health checking). After the cooldown a backend
+    is tried again and a single success closes the circuit.
+    """
+
+    STRATEGIES = ["random", "least_outstanding", "ewma", "consistent_hash"]
+
+    def __init__(
+        self,
+        strategy: str = "least_outstanding",
+        failure_threshold: int = 3,
+        cooldown: float = 30.0,
+        ewma_decay: float = 0.3,
+        replicas: int = 64,
+        max_lease_age: float = 600.0,
+    ):
+        if strategy not in self.STRATEGIES:
+            log.warning(f"Unknown load balancer strategy {strategy}, using random")
+            strategy = "random"
+
+        self.strategy = strategy
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.ewma_decay = ewma_decay
+        self.replicas = replicas
+        # Leases that were never released (e.g. abandoned streams) stop
+        # counting as in flight after this many seconds
+        self.max_lease_age = max_lease_age
+
+        self.backends: dict[str, BackendState] = {}
+        self._rings: dict[tuple, tuple[list[int], list[tuple[int, str]]]] = {}
+        self._next_lease_id = 0
+
+    def _get_state(self, url: str) -> BackendState:
+        if url not in self.backends:
+            self.backends[url] = BackendState()
+        return self.backends[url]
+
+    def get_outstanding(self, url: str) -> int:
+        state = self._get_state(url)
+
+        now = time.monotonic()
+        for lease_id, start in list(state.leases.items()):
+            if now - start > self.max_lease_age:
+                del state.leases[lease_id]
+
+        return len(state.leases)
+
+    def is_available(self, url: str) -> bool:
+        return self._get_state(url).ejected_until <= time.monotonic()
+
+    def _hash(self, value: str) -> int:
+        return int(hashlib.md5(value.encode()).hexdigest()[:16], 16)
+
+    def _get_ring(self, urls: list[str]) -> tuple[list[int], list[tuple[int, str]]]:
+        ring_key = tuple(sorted(urls))
+        if ring_key not in self._rings:
+            ring = sorted(
+                (self._hash(f"{url}#{replica}"), url)
+                for url in ring_key
+                for replica in range(self.replicas)
+            )
+            self._rings[ring_key] = ([point for point, _ in ring], ring)
+        return self._rings[ring_key]
+
+    def _rank_consistent_hash(self, urls: list[str], key: str) -> list[str]:
+        points, ring = self._get_ring(urls)
+
+        ranked = []
+        idx = bisect.bisect(points, self._hash(key))
+        for offset in range(len(ring)):
+            url = ring[(idx + offset) % len(ring)][1]
+            if url not in ranked:
+                ranked.append(url)
+                if len(ranked) == len(urls):
+                    break
+        return ranked
+
+    def rank(self, urls: list[str], key: Optional[str] = None) -> list[str]:
+        """
+        Returns `urls` ordered from best to worst, with ejected backends moved to
+        the end (they are still used when nothing else is available).
+        """
+        urls = list(dict.fromkeys(urls))
+        if len(urls) <= 1:
+            return urls
+
+        if self.strategy == "consistent_hash" and key:
+            ranked = self._rank_consistent_hash(urls, key)
+        elif self.strategy == "random":
+            ranked = random.sample(urls, len(urls))
+        elif self.strategy == "ewma":
+            ranked = sorted(
+                random.sample(urls, len(urls)),
+                key=lambda url: (self._get_state(url).ewma_latency or 0.0)
+                * (self.get_outstanding(url) + 1),
+            )
+        else:
+            ranked = sorted(
+                random.sample(urls, len(urls)),
+                key=lambda url: self.get_outstanding(url),
+            )
+
+        available = [url for url in ranked if self.is_available(url)]
+        ejected = [url for url in ranked if not self.is_available(url)]
+        return available + ejected
+
+    def acquire(self, url: str) -> Lease:
+        state = self._get_state(url)
+
+        self._next_lease_id += 1
+        lease = Lease(self, url, self._next_lease_id)
+        state.leases[lease.id] = lease.start
+        return lease
+
+    def release(self, lease: Lease):
+        self._get_state(lease.url).leases.pop(lease.id, None)
+
+    def record_success(self, url: str, latency: float):
+        state = self._get_state(url)
+
+        if state.ewma_latency is None:
+            state.ewma_latency = latency
+        else:
+            state.ewma_latency = (
+                self.ewma_decay * latency + (1 - self.ewma_decay) * state.ewma_latency
+            )
+
+        state.consecutive_failures = 0
+        state.ejected_until = 0.0
+
+    def record_failure(self, url: str):
+        state = self._get_state(url)
+        state.consecutive_failures += 1
+
+        if state.consecutive_failures >= self.failure_threshold:
+            state.ejected_until = time.monotonic() + self.cooldown
+            log.warning(
+                f"Ejecting {url} for {self.cooldown}s after {state.consecutive_failures} consecutive failures"
+            )
@@ -0,0 +1,119 @@
+import asyncio
+import json
+import logging
+import time
+from typing import Optional
+
+from open_webui.models.chats import Chats
+from open_webui.env import (
+    SRC_LOG_LEVELS,
+    REALTIME_CHAT_SAVE_INTERVAL,
+    REALTIME_CHAT_SAVE_MAX_BYTES,
+)
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["MODELS"])
+
+
+# Process-wide counters, read with `get_chat_writer_stats`
+CHAT_WRITER_STATS = {"deltas": 0, "flushes": 0}
+
+
+def get_chat_writer_stats() -> dict:
+    return {**CHAT_WRITER_STATS}
+
+
+class ChatMessageWriter:
+    """
+    Write-behind buffer for a message that is being streamed into a chat.
+
+    Updates are merged in memory and written with a single upsert once
+    `interval` seconds have passed since the last write, once `max_bytes` of new
+    content are pending, or when `flush`/`close` is called. A timer makes sure
+    pending updates are written even if the stream stalls.
+    """
+
+    def __init__(
+        self,
+        chat_id: str,
+        message_id: str,
+        interval: float = REALTIME_CHAT_SAVE_INTERVAL,
+        max_bytes: int = REALTIME_CHAT_SAVE_MAX_BYTES,
+    ):
+        self.chat_id = chat_id
+        self.message_id = message_id
+        self.interval = interval
+        self.max_bytes = max_bytes
+
+        self.pending: dict = {}
+        self.pending_bytes = 0
+        self.last_flush = time.monotonic()
+
+        self.deltas = 0
+        self.flushes = 0
+
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    def update(self, message: dict, size: Optional[int] = None):
+        """
+        Buffers `message` (merged into the stored message on flush). `size` is the
+        number of new bytes the update carries, defaulting to its JSON length.
+        """
+        self.pending.update(message)
+        self.pending_bytes += (
+            size if size is not None else len(json.dumps(message, default=str))
+        )
+
+        self.deltas += 1
+        CHAT_WRITER_STATS["deltas"] += 1
+
+        if (
+            self.pending_bytes >= self.max_bytes
+            or time.monotonic() - self.last_flush >= self.interval
+        ):
+            self.flush()
+        else:
+            self._schedule()
+
+    def flush(self):
+        self._cancel_timer()
+
+        if not self.pending:
+            return
+
+        pending, self.pending = self.pending, {}
+        self.pending_bytes = 0
+        self.last_flush = time.monotonic()
+
+        try:
+            Chats.upsert_message_to_chat_by_id_and_message_id(
+                self.chat_id, self.message_id, pending
+            )
+        except Exception as e:
+            log.exception(f"Failed to save message {self.message_id}: {e}")
+
+        self.flushes += 1
+        CHAT_WRITER_STATS["flushes"] += 1
+
+    def close(self):
+        self.flush()
+        log.debug(
+            f"chat writer {self.chat_id}/{self.message_id}: {self.deltas} deltas, {self.flushes} flushes"
+        )
+
+    def _schedule(self):
+        if self._timer is not None:
+            return
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+
+        delay = max(0.0, self.interval - (time.monotonic() - self.last_flush))
+        self._timer = loop.call_later(delay, self.flush)
+
+    def _cancel_timer(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
@@ -0,0 +1,179 @@
+import inspect
+import logging
+import time
+from typing import Optional
+
+from open_webui.models.functions import FunctionModel, Functions
+from open_webui.models.users import Users
+from open_webui.utils.plugin import get_function_module
+from open_webui.env import SRC_LOG_LEVELS
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["MAIN"])
+
+
+def get_user_valves(function_id: str, user_id: str) -> dict:
+    # Read from the cached user, which the request's authentication just loaded
+    user = Users.get_cached_user_by_id(user_id)
+    user_settings = user.settings.model_dump() if user and user.settings else {}
+    return user_settings.get("functions", {}).get("valves", {}).get(function_id, {})
+
+
+class FunctionHandler:
+    """Handler of a function (inlet, outlet, ...), its signature inspected once."""
+
+    def __init__(self, handler):
+        self.handler = handler
+        self.parameters = set(inspect.signature(handler).parameters)
+        self.is_coroutine = inspect.iscoroutinefunction(handler)
+
+    async def __call__(self, body: dict, extra_params: dict):
+        params = {"body": body} | {
+            k: v for k, v in extra_params.items() if k in self.parameters
+        }
+
+        if self.is_coroutine:
+            return await self.handler(**params)
+        return self.handler(**params)
+
+
+class CompiledFunction:
+    """
+    Loaded function module with its valves applied and its handlers bound, built
+    once per change of the function instead of on every request.
+    """
+
+    HANDLERS = ["inlet", "outlet", "stream", "action"]
+
+    def __init__(self, id: str, module, valves: Optional[dict]):
+        self.id = id
+        self.module = module
+
+        valves = valves if valves else {}
+        if hasattr(module, "valves") and hasattr(module, "Valves"):
+            module.valves = module.Valves(**valves)
+        self.priority = valves.get("priority", 0)
+
+        self.handlers = {
+            name: FunctionHandler(getattr(module, name))
+            for name in self.HANDLERS
+            if hasattr(module, name)
+        }
+        self.UserValves = getattr(module, "UserValves", None)
+
+    async def call(self, name: str, body: dict, extra_params: dict):
+        handler = self.handlers[name]
+        extra_params = {"__id__": self.id, **extra_params}
+
+        if (
+            "__user__" in handler.parameters
+            and extra_params.get("__user__")
+            and self.UserValves is not None
+        ):
+            __user__ = extra_params["__user__"]
+            try:
+                extra_params["__user__"] = {
+                    **__user__,
+                    "valves": self.UserValves(
+                        **get_user_valves(self.id, __user__["id"])
+                    ),
+                }
+            except Exception as e:
+                log.error(f"Error loading user valves of {self.id}: {e}")
+
+        return await handler(body, extra_params)
+
+
+class FilterChain:
+    """Filters applied to the requests of a model, sorted by priority."""
+
+    def __init__(self, functions: list[CompiledFunction]):
+        self.functions = sorted(functions, key=lambda function: function.priority)
+
+    def get_skip_files(self) -> Optional[bool]:
+        skip_files = None
+        for function in self.functions:
+            # Check if the function has a file_handler variable
+            if hasattr(function.module, "file_handler"):
+                skip_files = function.module.file_handler
+        return skip_files
+
+    async def process(self, filter_type: str, body: dict, extra_params: dict):
+        for function in self.functions:
+            if filter_type in function.handlers:
+                body = await function.call(filter_type, body, extra_params)
+        return body
+
+
+class CompiledFunctions:
+    """
+    Compiled functions and filter chains of one function type.
+
+    Everything is dropped when a function of that type is created, updated
+    (including its valves or global/active flags) or deleted, by any worker.
+    Checking for that costs one aggregate query per request.
+    """
+
+    def __init__(self, type: str):
+        self.type = type
+
+        self.state = None
+        self.built_at = 0
+        self.functions: dict[str, CompiledFunction] = {}
+        # sorted filter ids of a model -> chain
+        self.chains: dict[tuple, FilterChain] = {}
+
+    def refresh(self):
+        state = Functions.get_functions_state_by_type(self.type)
+
+        # `updated_at` has a resolution of one second, changes made in the
+        # second the cache was built can't be told apart from older ones
+        if state != self.state or state[1] >= self.built_at:
+            self.state = state
+            self.built_at = int(time.time())
+            self.functions = {}
+            self.chains = {}
+
+    def get_function(
+        self, request, function_id: str, function: Optional[FunctionModel] = None
+    ) -> CompiledFunction:
+        if function_id not in self.functions:
+            module = get_function_module(request, function_id, function)
+            self.functions[function_id] = CompiledFunction(
+                function_id, module, Functions.get_function_valves_by_id(function_id)
+            )
+        return self.functions[function_id]
+
+    def get_filter_chain(self, request, filter_ids: list[str]) -> FilterChain:
+        key = tuple(sorted(set(filter_ids)))
+        if key not in self.chains:
+            self.chains[key] = FilterChain(
+                [
+                    self.get_function(request, function.id, function)
+                    for function in Functions.get_functions_by_type(
+                        "filter", active_only=True
+                    )
+                    if function.is_global or function.id in key
+                ]
+            )
+        return self.chains[key]
+
+
+FILTER_FUNCTIONS = CompiledFunctions("filter")
+ACTION_FUNCTIONS = CompiledFunctions("action")
+
+
+def get_filter_chain(request, model: dict) -> FilterChain:
+    filter_ids = []
+    if "info" in model and "meta" in model["info"]:
+        filter_ids = model["info"]["meta"].get("filterIds", [])
+
+    FILTER_FUNCTIONS.refresh()
+    return FILTER_FUNCTIONS.get_filter_chain(request, filter_ids)
+
+
+def get_action_function(
+    request, action_id: str, action: Optional[FunctionModel] = None
+) -> CompiledFunction:
+    ACTION_FUNCTIONS.refresh()
+    return ACTION_FUNCTIONS.get_function(request, action_id, action)
@@ -0,0 +1,139 @@
+import asyncio
+import logging
+import threading
+from typing import Optional
+from urllib.parse import urlparse
+
+import aiohttp
+
+from open_webui.env import (
+    SRC_LOG_LEVELS,
+    AIOHTTP_CLIENT_TIMEOUT,
+    AIOHTTP_CLIENT_POOL_SIZE,
+    AIOHTTP_CLIENT_KEEPALIVE_TIMEOUT,
+    AIOHTTP_CLIENT_DNS_CACHE_TTL,
+)
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["MAIN"])
+
+# Timeout of the requests that don't pass their own: AIOHTTP_CLIENT_TIMEOUT, or
+# the default of aiohttp sessions (5 minutes) if it isn't set
+DEFAULT_TIMEOUT = (
+    aiohttp.ClientTimeout(total=AIOHTTP_CLIENT_TIMEOUT)
+    if AIOHTTP_CLIENT_TIMEOUT is not None
+    else aiohttp.client.DEFAULT_TIMEOUT
+)
+
+
+class HTTPClientManager:
+    """
+    Application-lifetime aiohttp sessions for upstream APIs.
+
+    Each upstream (scheme://host:port) gets its own session and connection pool,
+    so connections are kept alive and reused across requests instead of paying
+    a TCP/TLS handshake per request. Requests pass their own timeout, those that
+    don't get DEFAULT_TIMEOUT.
+
+    Sessions belong to the event loop they were created on, so loops other than
+    the server's (see `run_coroutine_sync`) get sessions of their own.
+    """
+
+    def __init__(
+        self,
+        pool_size: int = AIOHTTP_CLIENT_POOL_SIZE,
+        keepalive_timeout: float = AIOHTTP_CLIENT_KEEPALIVE_TIMEOUT,
+        dns_cache_ttl: int = AIOHTTP_CLIENT_DNS_CACHE_TTL,
+    ):
+        self.pool_size = pool_size
+        self.keepalive_timeout = keepalive_timeout
+        self.dns_cache_ttl = dns_cache_ttl
+
+        self.sessions: dict[
+            tuple[asyncio.AbstractEventLoop, str], aiohttp.ClientSession
+        ] = {}
+
+    def _get_key(self, url: str) -> str:
+        parsed_url = urlparse(url)
+        return f"{parsed_url.scheme}://{parsed_url.netloc}"
+
+    async def get_session(self, url: str) -> aiohttp.ClientSession:
+        # Nothing is awaited between the lookup and the insert, so concurrent
+        # requests on a loop never create two sessions
+        key = (asyncio.get_running_loop(), self._get_key(url))
+
+        session = self.sessions.get(key)
+        if session is None or session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.pool_size,
+                keepalive_timeout=self.keepalive_timeout,
+                use_dns_cache=True,
+                ttl_dns_cache=self.dns_cache_ttl,
+            )
+            session = aiohttp.ClientSession(
+                connector=connector,
+                trust_env=True,
+                timeout=DEFAULT_TIMEOUT,
+            )
+            self.sessions[key] = session
+            log.debug(f"Created HTTP client pool for {key[1]}")
+
+        return session
+
+    async def close(self):
+        sessions, self.sessions = self.sessions, {}
+
+        current_loop = asyncio.get_running_loop()
+        for (loop, _), session in sessions.items():
+            try:
+                if loop is current_loop:
+                    await session.close()
+                elif loop.is_running():
+                    await asyncio.wrap_future(
+                        asyncio.run_coroutine_threadsafe(session.close(), loop)
+                    )
+            except Exception as e:
+                log.debug(f"Error closing HTTP client session: {e}")
+
+
+HTTP_CLIENT = HTTPClientManager()
+
+
+async def get_http_session(url: str) -> aiohttp.ClientSession:
+    return await HTTP_CLIENT.get_session(url)
+
+
+_background_loop: Optional[asyncio.AbstractEventLoop] = None
+_background_loop_lock = threading.Lock()
+
+
+def get_background_loop() -> asyncio.AbstractEventLoop:
+    global _background_loop
+
+    with _background_loop_lock:
+        if _background_loop is None:
+            _background_loop = asyncio.new_event_loop()
+            threading.Thread(
+                target=_background_loop.run_forever,
+                name="http-client-loop",
+                daemon=True,
+            ).start()
+    return _background_loop
+
+
+def run_coroutine_sync(coroutine):
+    """
+    Runs `coroutine` from synchronous code and returns its result. It runs on a
+    long-lived loop of its own, so the sessions it gets from `get_http_session`
+    are kept, with their connections, from one call to the next.
+    """
+    return asyncio.run_coroutine_threadsafe(coroutine, get_background_loop()).result()
+
+
+async def release_response(response: Optional[aiohttp.ClientResponse]):
+    """
+    Returns the connection of a (streamed) response to its pool. Responses whose
+    body was not fully read have their connection closed instead.
+    """
+    if response:
+        response.release()
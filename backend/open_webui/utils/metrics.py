@@ -0,0 +1,239 @@
+import asyncio
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import AsyncIterator, Optional
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+# Metrics are kept per worker. With several workers, set PROMETHEUS_MULTIPROC_DIR
+# to a directory shared by all of them so /metrics reports their sum (without the
+# cache counters, which only exist in the memory of each worker).
+
+REQUEST_DURATION = Histogram(
+    "open_webui_http_request_duration_seconds",
+    "Time spent handling HTTP requests, until the response starts.",
+    ["method", "route", "status"],
+)
+
+REQUEST_DB_QUERIES = Histogram(
+    "open_webui_http_request_db_queries",
+    "Database queries made while handling HTTP requests.",
+    ["method", "route"],
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100, 200, 500),
+)
+
+UPSTREAM_TIME_TO_FIRST_TOKEN = Histogram(
+    "open_webui_upstream_time_to_first_token_seconds",
+    "Time from sending a streamed request to a model backend to its first chunk.",
+    ["backend", "model"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 20, 30, 60, 120),
+)
+
+UPSTREAM_TOKENS_PER_SECOND = Histogram(
+    "open_webui_upstream_tokens_per_second",
+    "Generation speed of model backends, counting one token per streamed chunk.",
+    ["backend", "model"],
+    buckets=(1, 5, 10, 20, 30, 50, 75, 100, 150, 200, 500),
+)
+
+CHAT_STAGE_DURATION = Histogram(
+    "open_webui_chat_stage_duration_seconds",
+    "Time spent in each stage of chat completion payload processing.",
+    ["stage"],
+)
+
+EMBEDDING_DURATION = Histogram(
+    "open_webui_embedding_duration_seconds",
+    "Time spent computing embeddings that weren't cached.",
+    ["engine"],
+)
+
+VECTOR_SEARCH_DURATION = Histogram(
+    "open_webui_vector_search_duration_seconds",
+    "Time spent searching the vector database.",
+)
+
+EVENT_LOOP_LAG = Histogram(
+    "open_webui_event_loop_lag_seconds",
+    "How late the event loop wakes up a task sleeping for a fixed interval.",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+
+SOCKET_SESSIONS = Gauge(
+    "open_webui_socket_sessions",
+    "Connected socket.io sessions.",
+    multiprocess_mode="livesum",
+)
+
+
+####################################
+# Database queries per request
+####################################
+
+# Holds a one-item list counting the queries of the current request
+DB_QUERY_COUNT: ContextVar[Optional[list]] = ContextVar("db_query_count", default=None)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def count_db_query(conn, cursor, statement, parameters, context, executemany):
+    count = DB_QUERY_COUNT.get()
+    if count is not None:
+        count[0] += 1
+
+
+####################################
+# Helpers
+####################################
+
+
+def get_route_name(scope: dict) -> str:
+    # The route template (e.g. /api/v1/chats/{id}), never the raw path, so
+    # every id doesn't get its own series. Templates of mounted apps are
+    # relative to their mount point, which is in the root path.
+    route = scope.get("route")
+    if path := getattr(route, "path", None):
+        return scope.get("root_path", "") + path
+    return "unmatched"
+
+
+@contextmanager
+def time_chat_stage(stage: str):
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        CHAT_STAGE_DURATION.labels(stage).observe(time.perf_counter() - start_time)
+
+
+def time_embedding(engine: str, embedding_function):
+    """Returns `embedding_function` recording how long each call takes."""
+    histogram = EMBEDDING_DURATION.labels(engine or "sentence_transformers")
+
+    def timed_embedding_function(query):
+        with histogram.time():
+            return embedding_function(query)
+
+    return timed_embedding_function
+
+
+async def observe_stream(
+    stream: AsyncIterator[bytes],
+    backend: str,
+    model: str,
+    start_time: float,
+    sse: bool = False,
+) -> AsyncIterator[bytes]:
+    """
+    Passes a streamed response of a model backend through, recording the time
+    to its first chunk and the generation speed. Tokens are approximated by
+    the streamed events: lines of JSON, or "data:" lines with `sse`.
+    """
+    first_chunk_time = None
+    tokens = 0
+    try:
+        async for chunk in stream:
+            if first_chunk_time is None:
+                first_chunk_time = time.perf_counter()
+                UPSTREAM_TIME_TO_FIRST_TOKEN.labels(backend, model).observe(
+                    first_chunk_time - start_time
+                )
+            tokens += chunk.count(b"data:") if sse else chunk.count(b"\n")
+            yield chunk
+    finally:
+        if first_chunk_time is not None and tokens > 1:
+            elapsed = time.perf_counter() - first_chunk_time
+            if elapsed > 0:
+                UPSTREAM_TOKENS_PER_SECOND.labels(backend, model).observe(
+                    (tokens - 1) / elapsed
+                )
+
+
+async def monitor_event_loop_lag(interval: float = 0.1):
+    # Anything blocking the loop delays every request and socket event the same
+    while True:
+        start_time = time.perf_counter()
+        await asyncio.sleep(interval)
+        EVENT_LOOP_LAG.observe(max(time.perf_counter() - start_time - interval, 0))
+
+
+class StatsCollector:
+    """Exposes the counters the caches and socket broadcasts keep themselves."""
+
+    def describe(self):
+        # Otherwise the registry collects once on registration, at import time
+        return []
+
+    def collect(self):
+        # Imported here, these modules pull in most of the app
+        from open_webui.retrieval.embedding_cache import get_embedding_cache_stats
+        from open_webui.retrieval.web.cache import get_web_cache_stats
+        from open_webui.socket.main import get_broadcast_stats
+        from open_webui.utils.chat_writer import get_chat_writer_stats
+
+        lookups = CounterMetricFamily(
+            "open_webui_cache_lookups",
+            "Cache lookups by cache and result.",
+            labels=["cache", "result"],
+        )
+        sizes = GaugeMetricFamily(
+            "open_webui_cache_entries",
+            "Entries held in memory by cache.",
+            labels=["cache"],
+        )
+
+        caches = {"embeddings": get_embedding_cache_stats()}
+        for name, stats in get_web_cache_stats().items():
+            caches[f"web_{name}"] = stats
+
+        for cache, stats in caches.items():
+            for result in ["hits", "store_hits", "stale_hits", "misses"]:
+                if result in stats:
+                    lookups.add_metric([cache, result], stats[result])
+            sizes.add_metric([cache], stats["size"])
+
+        yield lookups
+        yield sizes
+
+        chat_writer = CounterMetricFamily(
+            "open_webui_chat_writer_operations",
+            "Streamed message updates buffered, and writes made for them.",
+            labels=["operation"],
+        )
+        for operation, count in get_chat_writer_stats().items():
+            chat_writer.add_metric([operation], count)
+        yield chat_writer
+
+        broadcasts = CounterMetricFamily(
+            "open_webui_socket_broadcast_ticks",
+            "Presence and usage broadcast ticks, emitted or suppressed as unchanged.",
+            labels=["event", "result"],
+        )
+        for broadcast_event, stats in get_broadcast_stats().items():
+            for result, count in stats.items():
+                broadcasts.add_metric([broadcast_event, result], count)
+        yield broadcasts
+
+
+REGISTRY.register(StatsCollector())
+
+
+def generate_metrics() -> tuple[bytes, str]:
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
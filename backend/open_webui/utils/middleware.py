@@ -7,7 +7,6 @@ from aiocache import cached
 from typing import Any, Optional
 import random
 import json
-import inspect
 from uuid import uuid4
 from concurrent.futures import ThreadPoolExecutor
 
@@ -32,10 +31,10 @@ from open_webui.routers.tasks import (
 )
 from open_webui.routers.retrieval import process_web_search, SearchForm
 from open_webui.utils.webhook import post_webhook
+from open_webui.utils.chat_writer import ChatMessageWriter
 
 
 from open_webui.models.users import UserModel
-from open_webui.models.functions import Functions
 from open_webui.models.models import Models
 
 from open_webui.retrieval.utils import get_sources_from_files
@@ -55,7 +54,8 @@ from open_webui.utils.misc import (
     prepend_to_first_user_message_content,
 )
 from open_webui.utils.tools import get_tools
-from open_webui.utils.plugin import load_function_module_by_id
+from open_webui.utils.filter import get_filter_chain
+from open_webui.utils.metrics import time_chat_stage
 
 
 from open_webui.tasks import create_task
@@ -76,92 +76,13 @@ log.setLevel(SRC_LOG_LEVELS["MAIN"])
 
 
 async def chat_completion_filter_functions_handler(request, body, model, extra_params):
-    skip_files = None
-
-    def get_filter_function_ids(model):
-        def get_priority(function_id):
-            function = Functions.get_function_by_id(function_id)
-            if function is not None and hasattr(function, "valves"):
-                # TODO: Fix FunctionModel
-                return (function.valves if function.valves else {}).get("priority", 0)
-            return 0
-
-        filter_ids = [
-            function.id for function in Functions.get_global_filter_functions()
-        ]
-        if "info" in model and "meta" in model["info"]:
-            filter_ids.extend(model["info"]["meta"].get("filterIds", []))
-            filter_ids = list(set(filter_ids))
-
-        enabled_filter_ids = [
-            function.id
-            for function in Functions.get_functions_by_type("filter", active_only=True)
-        ]
-
-        filter_ids = [
-            filter_id for filter_id in filter_ids if filter_id in enabled_filter_ids
-        ]
-
-        filter_ids.sort(key=get_priority)
-        return filter_ids
-
-    filter_ids = get_filter_function_ids(model)
-    for filter_id in filter_ids:
-        filter = Functions.get_function_by_id(filter_id)
-        if not filter:
-            continue
-
-        if filter_id in request.app.state.FUNCTIONS:
-            function_module = request.app.state.FUNCTIONS[filter_id]
-        else:
-            function_module, _, _ = load_function_module_by_id(filter_id)
-            request.app.state.FUNCTIONS[filter_id] = function_module
-
-        # Check if the function has a file_handler variable
-        if hasattr(function_module, "file_handler"):
-            skip_files = function_module.file_handler
-
-        # Apply valves to the function
-        if hasattr(function_module, "valves") and hasattr(function_module, "Valves"):
-            valves = Functions.get_function_valves_by_id(filter_id)
-            function_module.valves = function_module.Valves(
-                **(valves if valves else {})
-            )
-
-        if hasattr(function_module, "inlet"):
-            try:
-                inlet = function_module.inlet
-
-                # Create a dictionary of parameters to be passed to the function
-                params = {"body": body} | {
-                    k: v
-                    for k, v in {
-                        **extra_params,
-                        "__model__": model,
-                        "__id__": filter_id,
-                    }.items()
-                    if k in inspect.signature(inlet).parameters
-                }
-
-                if "__user__" in params and hasattr(function_module, "UserValves"):
-                    try:
-                        params["__user__"]["valves"] = function_module.UserValves(
-                            **Functions.get_user_valves_by_id_and_user_id(
-                                filter_id, params["__user__"]["id"]
-                            )
-                        )
-                    except Exception as e:
-                        print(e)
-
-                if inspect.iscoroutinefunction(inlet):
-                    body = await inlet(**params)
-                else:
-                    body = inlet(**params)
+    filter_chain = get_filter_chain(request, model)
 
-            except Exception as e:
-                print(f"Error: {e}")
-                raise e
+    body = await filter_chain.process(
+        "inlet", body, {**extra_params, "__model__": model}
+    )
 
+    skip_files = filter_chain.get_skip_files()
     if skip_files and "files" in body.get("metadata", {}):
         del body["metadata"]["files"]
 
@@ -522,7 +443,9 @@ async def chat_completion_files_handler(
         if len(queries) == 0:
             queries = [get_last_user_message(body["messages"])]
 
-        sources = get_sources_from_files(
+        # Embedding, searching and reranking block, keep them off the event loop
+        sources = await asyncio.to_thread(
+            get_sources_from_files,
             files=files,
             queries=queries,
             embedding_function=request.app.state.EMBEDDING_FUNCTION,
@@ -635,14 +558,16 @@ async def process_chat_payload(request, form_data, metadata, user, model):
     features = form_data.pop("features", None)
     if features:
         if "web_search" in features and features["web_search"]:
-            form_data = await chat_web_search_handler(
-                request, form_data, extra_params, user
-            )
+            with time_chat_stage("web_search"):
+                form_data = await chat_web_search_handler(
+                    request, form_data, extra_params, user
+                )
 
     try:
-        form_data, flags = await chat_completion_filter_functions_handler(
-            request, form_data, model, extra_params
-        )
+        with time_chat_stage("filters"):
+            form_data, flags = await chat_completion_filter_functions_handler(
+                request, form_data, model, extra_params
+            )
     except Exception as e:
         return Exception(f"Error: {e}")
 
@@ -660,15 +585,19 @@ async def process_chat_payload(request, form_data, metadata, user, model):
     form_data["metadata"] = metadata
 
     try:
-        form_data, flags = await chat_completion_tools_handler(
-            request, form_data, user, models, extra_params
-        )
+        with time_chat_stage("tools"):
+            form_data, flags = await chat_completion_tools_handler(
+                request, form_data, user, models, extra_params
+            )
         sources.extend(flags.get("sources", []))
     except Exception as e:
         log.exception(e)
 
     try:
-        form_data, flags = await chat_completion_files_handler(request, form_data, user)
+        with time_chat_stage("rag"):
+            form_data, flags = await chat_completion_files_handler(
+                request, form_data, user
+            )
         sources.extend(flags.get("sources", []))
     except Exception as e:
         log.exception(e)
@@ -896,7 +825,7 @@ async def process_chat_response(
                     )
 
                     # Send a webhook notification if the user is not active
-                    if get_active_status_by_user_id(user.id) is None:
+                    if await get_active_status_by_user_id(user.id) is None:
                         webhook_url = Users.get_user_webhook_url_by_id(user.id)
                         if webhook_url:
                             post_webhook(
@@ -933,6 +862,8 @@ async def process_chat_response(
             )
             content = message.get("content", "") if message else ""
 
+            writer = ChatMessageWriter(metadata["chat_id"], metadata["message_id"])
+
             try:
                 for event in events:
                     await event_emitter(
@@ -989,13 +920,12 @@ async def process_chat_response(
                                 content = f"{content}{value}"
 
                                 if ENABLE_REALTIME_CHAT_SAVE:
-                                    # Save message in the database
-                                    Chats.upsert_message_to_chat_by_id_and_message_id(
-                                        metadata["chat_id"],
-                                        metadata["message_id"],
+                                    # Buffer the message, writes are coalesced
+                                    writer.update(
                                         {
                                             "content": content,
                                         },
+                                        size=len(value),
                                     )
                                 else:
                                     data = {
@@ -1020,7 +950,9 @@ async def process_chat_response(
                 title = Chats.get_chat_title_by_id(metadata["chat_id"])
                 data = {"done": True, "content": content, "title": title}
 
-                if not ENABLE_REALTIME_CHAT_SAVE:
+                if ENABLE_REALTIME_CHAT_SAVE:
+                    writer.flush()
+                else:
                     # Save message in the database
                     Chats.upsert_message_to_chat_by_id_and_message_id(
                         metadata["chat_id"],
@@ -1031,7 +963,7 @@ async def process_chat_response(
                     )
 
                 # Send a webhook notification if the user is not active
-                if get_active_status_by_user_id(user.id) is None:
+                if await get_active_status_by_user_id(user.id) is None:
                     webhook_url = Users.get_user_webhook_url_by_id(user.id)
                     if webhook_url:
                         post_webhook(
@@ -1055,6 +987,7 @@ async def process_chat_response(
                 await background_tasks_handler()
             except asyncio.CancelledError:
                 print("Task was cancelled!")
+                writer.flush()
                 await event_emitter({"type": "task-cancelled"})
 
                 if not ENABLE_REALTIME_CHAT_SAVE:
@@ -1066,12 +999,17 @@ async def process_chat_response(
                             "content": content,
                         },
                     )
+            finally:
+                # Never drop buffered content, whatever ended the stream
+                writer.close()
 
             if response.background is not None:
                 await response.background()
 
         # background_tasks.add_task(post_response_handler, response, events)
-        task_id, _ = create_task(post_response_handler(response, events))
+        task_id, _ = create_task(
+            post_response_handler(response, events), chat_id=metadata.get("chat_id")
+        )
         return {"status": True, "task_id": task_id}
 
     else:
@@ -13,7 +13,7 @@ from open_webui.models.functions import Functions
 from open_webui.models.models import Models
 
 
-from open_webui.utils.plugin import load_function_module_by_id
+from open_webui.utils.plugin import get_function_module
 from open_webui.utils.access_control import has_access
 
 
@@ -192,13 +192,6 @@ async def get_all_models(request):
                 }
             ]
 
-    def get_function_module_by_id(function_id):
-        if function_id in request.app.state.FUNCTIONS:
-            function_module = request.app.state.FUNCTIONS[function_id]
-        else:
-            function_module, _, _ = load_function_module_by_id(function_id)
-            request.app.state.FUNCTIONS[function_id] = function_module
-
     for model in models:
         action_ids = [
             action_id
@@ -212,7 +205,7 @@ async def get_all_models(request):
             if action_function is None:
                 raise Exception(f"Action not found: {action_id}")
 
-            function_module = get_function_module_by_id(action_id)
+            function_module = get_function_module(request, action_id, action_function)
             model["actions"].extend(
                 get_action_items_from_module(action_function, function_module)
             )
@@ -157,6 +157,10 @@ def convert_payload_openai_to_ollama(openai_payload: dict) -> dict:
     if "format" in openai_payload:
         ollama_payload["format"] = openai_payload["format"]
 
+    # Not sent upstream, but used to route the request (e.g. by chat id)
+    if "metadata" in openai_payload:
+        ollama_payload["metadata"] = openai_payload["metadata"]
+
     # If there are advanced parameters in the payload, format them in Ollama's options field
     ollama_options = {}
 
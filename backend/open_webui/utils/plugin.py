@@ -1,12 +1,19 @@
+import asyncio
+import hashlib
+import json
+import marshal
 import os
 import re
 import subprocess
 import sys
+import threading
+import time
 from importlib import util
+from pathlib import Path
 import types
-import tempfile
 import logging
 
+from open_webui.config import CACHE_DIR
 from open_webui.env import SRC_LOG_LEVELS
 from open_webui.models.functions import Functions
 from open_webui.models.tools import Tools
@@ -14,6 +21,13 @@ from open_webui.models.tools import Tools
 log = logging.getLogger(__name__)
 log.setLevel(SRC_LOG_LEVELS["MAIN"])
 
+PLUGIN_CACHE_DIR = Path(CACHE_DIR) / "plugins"
+
+# module name -> (content hash, loaded objects returned by the load function)
+PLUGIN_MODULES: dict[str, tuple[str, tuple]] = {}
+
+REQUIREMENTS_LOCK = threading.Lock()
+
 
 def extract_frontmatter(content):
     """
@@ -68,108 +82,320 @@ def replace_imports(content):
     return content
 
 
-def load_tools_module_by_id(toolkit_id, content=None):
+def get_content_hash(content: str) -> str:
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def _write_file(path: Path, data: bytes):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp_path.write_bytes(data)
+    os.replace(tmp_path, path)
+
+
+def get_plugin_code(content: str, content_hash: str) -> tuple[Path, types.CodeType]:
+    """
+    Returns the source file and the code object of `content`. Both are written
+    to the cache directory once per content hash, so other workers and restarts
+    skip compiling it again.
+    """
+    source_path = PLUGIN_CACHE_DIR / "src" / f"{content_hash}.py"
+    code_path = (
+        PLUGIN_CACHE_DIR / "src" / f"{content_hash}.{sys.implementation.cache_tag}.bin"
+    )
+
+    if not source_path.exists():
+        _write_file(source_path, content.encode("utf-8"))
+
+    try:
+        data = code_path.read_bytes()
+        if data[: len(util.MAGIC_NUMBER)] == util.MAGIC_NUMBER:
+            return source_path, marshal.loads(data[len(util.MAGIC_NUMBER) :])
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        log.debug(f"Ignoring unreadable compiled plugin {code_path}: {e}")
+
+    code = compile(content, str(source_path), "exec")
+    try:
+        _write_file(code_path, util.MAGIC_NUMBER + marshal.dumps(code))
+    except Exception as e:
+        log.debug(f"Failed to cache compiled plugin {code_path}: {e}")
+    return source_path, code
 
+
+def exec_plugin_module(module_name: str, content: str) -> types.ModuleType:
+    content_hash = get_content_hash(content)
+    source_path, code = get_plugin_code(content, content_hash)
+
+    module = types.ModuleType(module_name)
+    module.__dict__["__file__"] = str(source_path)
+    sys.modules[module_name] = module
+
+    try:
+        try:
+            exec(code, module.__dict__)
+        except ImportError:
+            # The requirements may have been recorded as installed in another
+            # environment (e.g. before the container was recreated)
+            requirements = extract_frontmatter(content).get("requirements", "")
+            if not requirements:
+                raise
+
+            log.info(f"Reinstalling requirements of {module_name}: {requirements}")
+            install_frontmatter_requirements(requirements, force=True)
+
+            module = types.ModuleType(module_name)
+            module.__dict__["__file__"] = str(source_path)
+            sys.modules[module_name] = module
+            exec(code, module.__dict__)
+    except Exception:
+        sys.modules.pop(module_name, None)
+        raise
+
+    log.info(f"Loaded module: {module.__name__}")
+    return module
+
+
+def get_stored_content(id: str, content: str, update_by_id) -> str:
+    replaced = replace_imports(content)
+    # Only written back once, for content stored before the imports were renamed
+    if replaced != content:
+        update_by_id(id, {"content": replaced})
+    return replaced
+
+
+def load_tools_module_by_id(toolkit_id, content=None):
+    """
+    Loads the tools module of a toolkit from `content`, or from the stored
+    content if None. The module is only executed again if the content changed
+    since the previous load, otherwise the same `Tools` instance is returned.
+    Requirements of new content must be installed first, see
+    `ainstall_frontmatter_requirements`.
+    """
     if content is None:
         tool = Tools.get_tool_by_id(toolkit_id)
         if not tool:
             raise Exception(f"Toolkit not found: {toolkit_id}")
 
-        content = tool.content
-
-        content = replace_imports(content)
-        Tools.update_tool_by_id(toolkit_id, {"content": content})
-    else:
-        frontmatter = extract_frontmatter(content)
-        # Install required packages found within the frontmatter
-        install_frontmatter_requirements(frontmatter.get("requirements", ""))
+        content = get_stored_content(toolkit_id, tool.content, Tools.update_tool_by_id)
 
     module_name = f"tool_{toolkit_id}"
-    module = types.ModuleType(module_name)
-    sys.modules[module_name] = module
+    content_hash = get_content_hash(content)
 
-    # Create a temporary file and use it to define `__file__` so
-    # that it works as expected from the module's perspective.
-    temp_file = tempfile.NamedTemporaryFile(delete=False)
-    temp_file.close()
-    try:
-        with open(temp_file.name, "w", encoding="utf-8") as f:
-            f.write(content)
-        module.__dict__["__file__"] = temp_file.name
+    cached = PLUGIN_MODULES.get(module_name)
+    if cached and cached[0] == content_hash:
+        return cached[1]
 
-        # Executing the modified content in the created module's namespace
-        exec(content, module.__dict__)
+    try:
+        module = exec_plugin_module(module_name, content)
         frontmatter = extract_frontmatter(content)
-        log.info(f"Loaded module: {module.__name__}")
 
         # Create and return the object if the class 'Tools' is found in the module
         if hasattr(module, "Tools"):
-            return module.Tools(), frontmatter
+            result = (module.Tools(), frontmatter)
         else:
             raise Exception("No Tools class found in the module")
     except Exception as e:
         log.error(f"Error loading module: {toolkit_id}: {e}")
-        del sys.modules[module_name]  # Clean up
+        sys.modules.pop(module_name, None)  # Clean up
         raise e
-    finally:
-        os.unlink(temp_file.name)
+
+    PLUGIN_MODULES[module_name] = (content_hash, result)
+    return result
 
 
 def load_function_module_by_id(function_id, content=None):
+    """
+    Loads the module of a function from `content`, or from the stored content
+    if None. The module is only executed again if the content changed since
+    the previous load, otherwise the same instance is returned. Requirements
+    of new content must be installed first, see
+    `ainstall_frontmatter_requirements`.
+    """
     if content is None:
         function = Functions.get_function_by_id(function_id)
         if not function:
             raise Exception(f"Function not found: {function_id}")
-        content = function.content
 
-        content = replace_imports(content)
-        Functions.update_function_by_id(function_id, {"content": content})
-    else:
-        frontmatter = extract_frontmatter(content)
-        install_frontmatter_requirements(frontmatter.get("requirements", ""))
+        content = get_stored_content(
+            function_id, function.content, Functions.update_function_by_id
+        )
 
     module_name = f"function_{function_id}"
-    module = types.ModuleType(module_name)
-    sys.modules[module_name] = module
+    content_hash = get_content_hash(content)
 
-    # Create a temporary file and use it to define `__file__` so
-    # that it works as expected from the module's perspective.
-    temp_file = tempfile.NamedTemporaryFile(delete=False)
-    temp_file.close()
-    try:
-        with open(temp_file.name, "w", encoding="utf-8") as f:
-            f.write(content)
-        module.__dict__["__file__"] = temp_file.name
+    cached = PLUGIN_MODULES.get(module_name)
+    if cached and cached[0] == content_hash:
+        return cached[1]
 
-        # Execute the modified content in the created module's namespace
-        exec(content, module.__dict__)
+    try:
+        module = exec_plugin_module(module_name, content)
         frontmatter = extract_frontmatter(content)
-        log.info(f"Loaded module: {module.__name__}")
 
         # Create appropriate object based on available class type in the module
         if hasattr(module, "Pipe"):
-            return module.Pipe(), "pipe", frontmatter
+            result = (module.Pipe(), "pipe", frontmatter)
         elif hasattr(module, "Filter"):
-            return module.Filter(), "filter", frontmatter
+            result = (module.Filter(), "filter", frontmatter)
         elif hasattr(module, "Action"):
-            return module.Action(), "action", frontmatter
+            result = (module.Action(), "action", frontmatter)
         else:
             raise Exception("No Function class found in the module")
     except Exception as e:
         log.error(f"Error loading module: {function_id}: {e}")
-        del sys.modules[module_name]  # Cleanup by removing the module in case of error
+        # Cleanup by removing the module in case of error
+        sys.modules.pop(module_name, None)
 
         Functions.update_function_by_id(function_id, {"is_active": False})
         raise e
-    finally:
-        os.unlink(temp_file.name)
 
+    PLUGIN_MODULES[module_name] = (content_hash, result)
+    return result
 
-def install_frontmatter_requirements(requirements):
-    if requirements:
-        req_list = [req.strip() for req in requirements.split(",")]
-        for req in req_list:
-            log.info(f"Installing requirement: {req}")
-            subprocess.check_call([sys.executable, "-m", "pip", "install", req])
-    else:
+
+def get_function_module(request, function_id, function=None):
+    """
+    Returns the loaded module of a function, loading it on first use.
+
+    Pass the already fetched `function` row to also reload the module if its
+    content changed since it was loaded (e.g. updated through another worker).
+    Without it no query is made, the module is evicted when the function is
+    saved or deleted through this worker.
+    """
+    cached = PLUGIN_MODULES.get(f"function_{function_id}")
+    function_module = request.app.state.FUNCTIONS.get(function_id)
+    if (
+        function_module is None
+        or cached is None
+        or (
+            function is not None
+            and cached[0] != get_content_hash(replace_imports(function.content))
+        )
+    ):
+        function_module, _, _ = load_function_module_by_id(function_id)
+        request.app.state.FUNCTIONS[function_id] = function_module
+
+    return function_module
+
+
+def get_tools_module(request, tool_id, tool=None):
+    """
+    Returns the loaded module of a toolkit, loading it on first use.
+
+    Pass the already fetched `tool` row to also reload the module if its
+    content changed since it was loaded (e.g. updated through another worker).
+    Without it no query is made, the module is evicted when the toolkit is
+    saved or deleted through this worker.
+    """
+    cached = PLUGIN_MODULES.get(f"tool_{tool_id}")
+    tools_module = request.app.state.TOOLS.get(tool_id)
+    if (
+        tools_module is None
+        or cached is None
+        or (
+            tool is not None
+            and cached[0] != get_content_hash(replace_imports(tool.content))
+        )
+    ):
+        tools_module, _ = load_tools_module_by_id(tool_id)
+        request.app.state.TOOLS[tool_id] = tools_module
+
+    return tools_module
+
+
+def evict_function_module(request, function_id):
+    """Forgets the loaded module of a deleted function."""
+    request.app.state.FUNCTIONS.pop(function_id, None)
+    PLUGIN_MODULES.pop(f"function_{function_id}", None)
+    sys.modules.pop(f"function_{function_id}", None)
+
+
+def evict_tools_module(request, tool_id):
+    """Forgets the loaded module of a deleted toolkit."""
+    request.app.state.TOOLS.pop(tool_id, None)
+    PLUGIN_MODULES.pop(f"tool_{tool_id}", None)
+    sys.modules.pop(f"tool_{tool_id}", None)
+
+
+def get_requirements_record_path(requirements: str) -> Path:
+    key = get_content_hash(f"{sys.prefix}\0{requirements}")
+    return PLUGIN_CACHE_DIR / "requirements" / f"{key}.json"
+
+
+def install_frontmatter_requirements(requirements, force=False):
+    """
+    Installs the comma separated `requirements` of a plugin. The result is
+    recorded in the cache directory, so the same requirements are only
+    installed once across workers and restarts unless `force` is set.
+    """
+    if not requirements:
         log.info("No requirements found in frontmatter.")
+        return
+
+    # One pip at a time, it isn't safe to run concurrently on an environment
+    with REQUIREMENTS_LOCK:
+        record_path = get_requirements_record_path(requirements)
+        if not force:
+            try:
+                record = json.loads(record_path.read_text())
+                if record.get("status") == "installed":
+                    log.debug(f"Requirements already installed: {requirements}")
+                    return
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                log.debug(f"Ignoring unreadable record {record_path}: {e}")
+
+        record = {"requirements": requirements, "status": "installed", "error": None}
+        try:
+            req_list = [req.strip() for req in requirements.split(",")]
+            for req in req_list:
+                log.info(f"Installing requirement: {req}")
+                subprocess.check_call([sys.executable, "-m", "pip", "install", req])
+        except Exception as e:
+            record = {**record, "status": "failed", "error": str(e)}
+            raise e
+        finally:
+            try:
+                _write_file(
+                    record_path,
+                    json.dumps({**record, "updated_at": int(time.time())}).encode(),
+                )
+            except Exception as e:
+                log.warning(f"Failed to record requirements {requirements}: {e}")
+
+
+async def ainstall_frontmatter_requirements(content: str):
+    """
+    Installs the requirements of the plugin `content` before it is loaded,
+    in a thread, so the event loop keeps serving other requests while pip runs.
+    """
+    requirements = extract_frontmatter(content).get("requirements", "")
+    if requirements:
+        await asyncio.to_thread(install_frontmatter_requirements, requirements)
+
+
+def install_plugin_requirements():
+    """
+    Installs the requirements of all stored functions and tools that were not
+    installed yet, e.g. on the first start of a new deployment. Run at startup
+    in a thread, so requests don't wait for pip.
+    """
+    contents = [function.content for function in Functions.get_functions(True)]
+    contents += [tool.content for tool in Tools.get_tools()]
+
+    for content in contents:
+        requirements = extract_frontmatter(content).get("requirements", "")
+        if not requirements:
+            continue
+
+        record_path = get_requirements_record_path(requirements)
+        if record_path.exists():
+            # Installed, or failed and left for the next explicit save
+            continue
+
+        try:
+            install_frontmatter_requirements(requirements)
+        except Exception as e:
+            log.error(f"Failed to install requirements {requirements}: {e}")
@@ -0,0 +1,28 @@
+import logging
+import time
+
+# Set first, so the imports below count towards the startup
+_stage_started_at = time.perf_counter()
+
+from open_webui.env import SRC_LOG_LEVELS
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["MAIN"])
+
+
+# Seconds spent in each stage of the startup of this worker, in order
+STARTUP_STAGES: dict[str, float] = {}
+
+
+def end_startup_stage(name: str):
+    """Records the time since the previous stage ended as the time of `name`."""
+    global _stage_started_at
+
+    now = time.perf_counter()
+    STARTUP_STAGES[name] = round(now - _stage_started_at, 3)
+    _stage_started_at = now
+    log.info(f"Startup stage {name} took {STARTUP_STAGES[name]:.2f}s")
+
+
+def get_startup_time() -> float:
+    return round(sum(STARTUP_STAGES.values()), 3)
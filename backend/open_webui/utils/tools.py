@@ -12,7 +12,7 @@ from langchain_core.utils.function_calling import convert_to_openai_function
 
 from open_webui.models.tools import Tools
 from open_webui.models.users import UserModel
-from open_webui.utils.plugin import load_tools_module_by_id
+from open_webui.utils.plugin import get_tools_module
 
 log = logging.getLogger(__name__)
 
@@ -45,10 +45,7 @@ def get_tools(
         if tools is None:
             continue
 
-        module = request.app.state.TOOLS.get(tool_id, None)
-        if module is None:
-            module, _ = load_tools_module_by_id(tool_id)
-            request.app.state.TOOLS[tool_id] = module
+        module = get_tools_module(request, tool_id, tools)
 
         extra_params["__id__"] = tool_id
         if hasattr(module, "valves") and hasattr(module, "Valves"):
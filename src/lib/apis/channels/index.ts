@@ -173,12 +173,15 @@ export const getChannelMessages = async (
 	token: string = '',
 	channel_id: string,
 	skip: number = 0,
-	limit: number = 50
+	limit: number = 50,
+	before: number | null = null
 ) => {
 	let error = null;
 
 	const res = await fetch(
-		`${WEBUI_API_BASE_URL}/channels/${channel_id}/messages?skip=${skip}&limit=${limit}`,
+		`${WEBUI_API_BASE_URL}/channels/${channel_id}/messages?skip=${skip}&limit=${limit}${
+			before !== null ? `&before=${before}` : ''
+		}`,
 		{
 			method: 'GET',
 			headers: {
@@ -213,12 +216,15 @@ export const getChannelThreadMessages = async (
 	channel_id: string,
 	message_id: string,
 	skip: number = 0,
-	limit: number = 50
+	limit: number = 50,
+	before: number | null = null
 ) => {
 	let error = null;
 
 	const res = await fetch(
-		`${WEBUI_API_BASE_URL}/channels/${channel_id}/messages/${message_id}/thread?skip=${skip}&limit=${limit}`,
+		`${WEBUI_API_BASE_URL}/channels/${channel_id}/messages/${message_id}/thread?skip=${skip}&limit=${limit}${
+			before !== null ? `&before=${before}` : ''
+		}`,
 		{
 			method: 'GET',
 			headers: {